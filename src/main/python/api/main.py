@@ -3,6 +3,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, HTMLResponse
 from contextlib import asynccontextmanager
+import asyncio
+import logging
+import os
 import sys
 from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
@@ -11,15 +14,41 @@ from core.database import db_manager
 from api.routers import clients_router, deliveries_router, drivers_router, vehicles_router, dashboard_router, routes_router
 from api.routers.scheduling import router as scheduling_router
 from api.security import CSRFMiddleware
+from api.middleware import ResponseCacheMiddleware, CompressionMiddleware
+from api.utils.serialization import FastJSONResponse
 from config.cors_config import cors_config
+from config.cache_config import cache_config
+from config.cloud_config import cloud_config
+from core.cache import response_cache, build_backend
+from services.scheduling_jobs import scheduling_jobs
+from services.travel_profiles import refresh_nightly, travel_profiles
+
+logger = logging.getLogger(__name__)
 
 # 應用程式生命週期管理
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # 啟動時初始化資料庫
     db_manager.initialize()
+    # 排程工作狀態存於資料庫，任一 worker 都能查詢與停止
+    scheduling_jobs.configure(db_manager.get_session)
+    # 載入行車時間模型，並於每晚重新計算
+    refresh_task = None
+    profile_config = cloud_config.travel_profile_config
+    if profile_config['enabled']:
+        try:
+            travel_profiles.load(profile_config['path'])
+        except Exception as e:
+            # 模型檔損毀時以固定車速規劃，直到下次重新計算
+            logger.error(f"Could not load travel profile, planning without it: {e}")
+        refresh_task = asyncio.create_task(refresh_nightly(
+            db_manager.get_session, profile_config['path'],
+            profile_config['refresh_hour'], profile_config['history_days']
+        ))
     yield
     # 關閉時清理資源
+    if refresh_task:
+        refresh_task.cancel()
     db_manager.close()
 
 # 建立 FastAPI 應用程式
@@ -28,9 +57,21 @@ app = FastAPI(
     description="幸福氣配送管理系統 API",
     version="1.0.0",
     lifespan=lifespan,
-    redoc_url=None  # Disable default ReDoc to use our custom one
+    redoc_url=None,  # Disable default ReDoc to use our custom one
+    default_response_class=FastJSONResponse
 )
 
+# 讀取端點回應快取（ETag / 304）
+# 先註冊於 CORS 之內，快取命中的回應仍會加上 CORS 標頭
+cache_backend = build_backend(cache_config) if cache_config.enabled else None
+if cache_backend is not None:
+    response_cache.configure(cache_backend)
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        cache=response_cache,
+        rules=cache_config.get_rules()
+    )
+
 # CORS 設定 (允許前端應用程式存取)
 # Using secure CORS configuration based on environment
 cors_settings = cors_config.get_cors_settings()
@@ -42,6 +83,12 @@ app.add_middleware(
 # CSRF Protection Middleware
 app.add_middleware(CSRFMiddleware)
 
+# 大型回應壓縮（Brotli / GZip）
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+)
+
 # 路由註冊 - 加上 /api 前綴
 app.include_router(clients_router, prefix="/api")
 app.include_router(deliveries_router, prefix="/api")
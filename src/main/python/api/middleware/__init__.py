@@ -0,0 +1,6 @@
+"""HTTP middleware for API responses"""
+
+from .response_cache import ResponseCacheMiddleware
+from .compression import CompressionMiddleware
+
+__all__ = ['ResponseCacheMiddleware', 'CompressionMiddleware']
@@ -0,0 +1,91 @@
+"""
+Response Compression Middleware
+Compresses large API responses with Brotli (when available) or GZip
+"""
+
+import gzip
+from typing import Optional
+
+from fastapi import Request, Response
+from starlette.datastructures import MutableHeaders
+from starlette.middleware.base import BaseHTTPMiddleware
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+class CompressionMiddleware(BaseHTTPMiddleware):
+    """
+    Compression middleware with a minimum size threshold
+    """
+
+    COMPRESSIBLE_TYPES = ("application/json", "text/html", "text/plain", "text/css", "application/javascript")
+    # 串流回應（SSE）不可緩衝，直接略過
+    STREAMING_TYPES = ("text/event-stream",)
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        super().__init__(app)
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def dispatch(self, request: Request, call_next):
+        """
+        Process response through compression
+        """
+        encoding = self._select_encoding(request.headers.get("accept-encoding", ""))
+        response = await call_next(request)
+
+        if encoding is None or not self._is_compressible(response):
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        # 保留原始標頭列表，重複的標頭（多個 Set-Cookie）不可合併
+        headers = MutableHeaders(raw=[(k, v) for k, v in response.raw_headers if k != b"content-length"])
+
+        if len(body) < self.minimum_size:
+            return Response(content=body, status_code=response.status_code,
+                            headers=headers, media_type=response.media_type)
+
+        if encoding == "br":
+            body = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            body = gzip.compress(body, compresslevel=self.gzip_level)
+
+        headers["content-encoding"] = encoding
+        # 附加在既有的 Vary（例如 CORS 的 Origin）之後
+        vary = [v.strip() for value in headers.getlist("vary") for v in value.split(",") if v.strip()]
+        if "accept-encoding" not in (v.lower() for v in vary):
+            vary.append("Accept-Encoding")
+        headers["vary"] = ", ".join(vary)
+        # 壓縮後內容不同，ETag 改為弱比較
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["etag"] = f"W/{etag}"
+
+        return Response(content=body, status_code=response.status_code,
+                        headers=headers, media_type=response.media_type)
+
+    def _select_encoding(self, accept_encoding: str) -> Optional[str]:
+        accepted = set()
+        for part in accept_encoding.split(","):
+            name, _, params = part.strip().partition(";")
+            if name and params.replace(" ", "") not in ("q=0", "q=0.0"):
+                accepted.add(name.lower())
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _is_compressible(self, response: Response) -> bool:
+        if response.status_code < 200 or response.status_code in (204, 304):
+            return False
+        if "content-encoding" in response.headers:
+            return False
+        content_type = response.headers.get("content-type", "")
+        if content_type.startswith(self.STREAMING_TYPES):
+            return False
+        return content_type.startswith(self.COMPRESSIBLE_TYPES)
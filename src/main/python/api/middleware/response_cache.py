@@ -0,0 +1,96 @@
+"""
+Response Cache Middleware
+Serves cached GET responses for configured endpoints and answers
+conditional requests (If-None-Match) with 304 Not Modified
+"""
+
+import re
+from typing import List, Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from config.cache_config import CacheRule
+from core.cache import CachedResponse, ResponseCache
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """
+    Response cache middleware for read-heavy endpoints polled by the SPA
+    """
+
+    CACHE_CONTROL = "no-cache"  # 瀏覽器每次皆以 ETag 重新驗證
+    # 由快取重新產生或不應重播給其他使用者的標頭
+    UNCACHED_HEADERS = {"content-length", "content-type", "etag", "cache-control", "x-cache", "set-cookie"}
+
+    def __init__(self, app, cache: ResponseCache, rules: List[CacheRule]):
+        super().__init__(app)
+        self.cache = cache
+        self.rules = [(re.compile(rule.path_pattern), rule) for rule in rules]
+
+    async def dispatch(self, request: Request, call_next):
+        """
+        Process request through the response cache
+        """
+        if request.method != "GET":
+            return await call_next(request)
+
+        matched = self._match_rule(request.url.path)
+        if matched is None:
+            return await call_next(request)
+
+        rule, path_params = matched
+        key = self._cache_key(request)
+        entry = self.cache.get(key)
+        cache_status = "HIT"
+
+        if entry is None:
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            route_headers = {
+                name: value for name, value in response.headers.items()
+                if name.lower() not in self.UNCACHED_HEADERS
+            }
+            entry = CachedResponse.from_body(
+                body, response.media_type or response.headers.get("content-type"), route_headers
+            )
+            tags = [tag.format(**path_params) for tag in rule.tags]
+            self.cache.set(key, entry, rule.ttl_seconds, tags)
+            cache_status = "MISS"
+
+        headers = {
+            **entry.headers,
+            "ETag": entry.etag,
+            "Cache-Control": self.CACHE_CONTROL,
+            "X-Cache": cache_status,
+        }
+
+        if self._etag_matches(request.headers.get("if-none-match"), entry.etag):
+            return Response(status_code=304, headers=headers)
+
+        return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+    def _match_rule(self, path: str) -> Optional[Tuple[CacheRule, dict]]:
+        for pattern, rule in self.rules:
+            match = pattern.match(path)
+            if match:
+                return rule, match.groupdict()
+        return None
+
+    @staticmethod
+    def _cache_key(request: Request) -> str:
+        query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+        return f"GET:{request.url.path}?{query}"
+
+    @staticmethod
+    def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [value.strip() for value in if_none_match.split(",")]
+        # 弱比較：忽略 W/ 前綴
+        return any(candidate.removeprefix("W/") == etag for candidate in candidates)
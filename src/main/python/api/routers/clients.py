@@ -2,20 +2,23 @@
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Query, Path, status
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
+from sqlalchemy import func
 from datetime import datetime, date
 
 from core.database import get_db
 from models.database_schema import Client, Delivery
+from services.search_service import search_index
 from ..schemas.client import (
     ClientCreate,
     ClientUpdate,
     ClientResponse,
     ClientListResponse,
-    ClientSearchParams
+    ClientSearchParams,
+    ClientSuggestion
 )
 from ..schemas.base import PaginationParams, ResponseMessage
 from ..schemas.delivery import DeliveryListResponse, DeliveryResponse
+from ..utils import apply_indexed_search
 
 router = APIRouter(
     prefix="/clients",
@@ -52,18 +55,7 @@ async def get_clients(
     
     # Apply filters
     if search.keyword:
-        keyword_filters = []
-        if hasattr(Client, 'name'):
-            keyword_filters.append(Client.name.ilike(f"%{search.keyword}%"))
-        if hasattr(Client, 'address'):
-            keyword_filters.append(Client.address.ilike(f"%{search.keyword}%"))
-        if hasattr(Client, 'contact_person'):
-            keyword_filters.append(Client.contact_person.ilike(f"%{search.keyword}%"))
-        if hasattr(Client, 'client_code'):
-            keyword_filters.append(Client.client_code.ilike(f"%{search.keyword}%"))
-        
-        if keyword_filters:
-            query = query.filter(or_(*keyword_filters))
+        query = apply_indexed_search(query, Client, search.keyword)
     
     if search.district:
         query = query.filter(Client.district == search.district)
@@ -498,3 +490,37 @@ async def get_districts(db: Session = Depends(get_db)):
     return [d[0] for d in districts if d[0]]
 
 
+
+
+@router.get("/search/suggest", response_model=List[ClientSuggestion], summary="客戶關鍵字快速搜尋")
+async def suggest_clients(
+    q: str = Query(..., min_length=1, description="搜尋關鍵字（名稱、地址、客戶編號、聯絡人）"),
+    limit: int = Query(10, ge=1, le=50, description="最多回傳筆數"),
+    db: Session = Depends(get_db)
+):
+    """
+    依相關度排序回傳符合的客戶，供電話接單時即時查詢
+    
+    - 中文可輸入地址或名稱片段（例如「中興路」）
+    - 英數字採前綴比對（例如客戶編號開頭）
+    """
+    ranked = search_index.rank(db, Client, q, limit)
+    if not ranked:
+        return []
+    
+    clients = {
+        c.id: c for c in db.query(Client).filter(Client.id.in_([client_id for client_id, _ in ranked])).all()
+    }
+    
+    return [
+        ClientSuggestion(
+            id=client_id,
+            client_code=clients[client_id].client_code,
+            name=clients[client_id].name or clients[client_id].short_name or clients[client_id].invoice_title,
+            address=clients[client_id].address,
+            district=clients[client_id].district,
+            score=round(score, 4)
+        )
+        for client_id, score in ranked
+        if client_id in clients
+    ]
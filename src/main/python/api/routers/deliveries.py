@@ -20,8 +20,10 @@ from ..utils import (
     normalize_status,
     format_status_for_response,
     apply_date_range_filter,
-    apply_keyword_search,
-    apply_sorting
+    apply_indexed_search,
+    apply_sorting,
+    FastJSONResponse,
+    row_serializer
 )
 
 router = APIRouter(
@@ -61,7 +63,7 @@ async def get_deliveries(
     
     # Apply filters
     if search.keyword:
-        query = apply_keyword_search(query, search.keyword, Client.name, Client.address)
+        query = apply_indexed_search(query, Client, search.keyword)
     
     if search.client_id:
         query = query.filter(Delivery.client_id == search.client_id)
@@ -102,19 +104,17 @@ async def get_deliveries(
     # Apply pagination
     deliveries = query.offset(pagination.offset).limit(pagination.page_size).all()
     
-    # Convert to response model
-    delivery_responses = []
-    for delivery in deliveries:
-        delivery_data = build_delivery_response(delivery, db)
-        delivery_responses.append(DeliveryResponse.model_validate(delivery_data))
-    
-    return DeliveryListResponse(
-        items=delivery_responses,
-        total=total,
-        page=pagination.page,
-        page_size=pagination.page_size,
-        total_pages=(total + pagination.page_size - 1) // pagination.page_size
-    )
+    # Serialize straight from the built rows (response_model kept for docs)
+    serialize = row_serializer(DeliveryResponse)
+    delivery_responses = [serialize(build_delivery_response(delivery, db)) for delivery in deliveries]
+    
+    return FastJSONResponse({
+        "items": delivery_responses,
+        "total": total,
+        "page": pagination.page,
+        "page_size": pagination.page_size,
+        "total_pages": (total + pagination.page_size - 1) // pagination.page_size
+    })
 
 
 @router.get("/{delivery_id}", response_model=DeliveryResponse, summary="取得配送單詳細資料")
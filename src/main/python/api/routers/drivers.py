@@ -2,7 +2,7 @@
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
+from sqlalchemy import func
 from datetime import datetime, date
 import json
 
@@ -16,6 +16,7 @@ from ..schemas.driver import (
     DriverSearchParams
 )
 from ..schemas.base import PaginationParams, ResponseMessage
+from ..utils import apply_indexed_search
 
 router = APIRouter(
     prefix="/drivers",
@@ -50,12 +51,7 @@ async def get_drivers(
     
     # Apply filters
     if search.keyword:
-        keyword_filter = or_(
-            Driver.name.ilike(f"%{search.keyword}%"),
-            Driver.employee_id.ilike(f"%{search.keyword}%"),
-            Driver.phone.ilike(f"%{search.keyword}%")
-        )
-        query = query.filter(keyword_filter)
+        query = apply_indexed_search(query, Driver, search.keyword)
     
     # Map status if needed (using is_active for now)
     if search.status:
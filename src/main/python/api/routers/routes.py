@@ -14,6 +14,12 @@ from domain.services.route_optimizer import RouteOptimizationService
 import services.routing  # Import to register optimizers
 from services.driver_service import DriverService
 from services.vehicle_service import VehicleService
+from services.planning_snapshot import planning_snapshot_query
+from services.route_geometry import RouteGeometryStore, polyline_for_zoom
+from common.availability import HOURLY_FIELDS, available_hours, client_availability_mask
+from common.geo_utils import encode_polyline
+from api.utils.serialization import FastJSONResponse, row_serializer
+from api.utils.client_lookup import ClientLookup, get_client_lookup, route_client_ids
 from api.schemas.route import (
     RoutePlanRequest,
     RouteCreateRequest,
@@ -29,12 +35,16 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/routes", tags=["routes"])
 
 
-def parse_route_details(route: Route, db: Session = None) -> List[RoutePointResponse]:
+def parse_route_details(
+    route: Route,
+    db: Session = None,
+    lookup: Optional[ClientLookup] = None
+) -> List[RoutePointResponse]:
     """Parse route details JSON into RoutePointResponse objects"""
     if not route.route_details:
         return []
     
-    if not db:
+    if not db and not lookup:
         # If no db session provided, we can't fetch client details
         return []
     
@@ -42,19 +52,17 @@ def parse_route_details(route: Route, db: Session = None) -> List[RoutePointResp
         details = json.loads(route.route_details)
         points = []
         
+        # Resolve all clients of the route in one batched query
+        lookup = lookup or ClientLookup(db)
+        lookup.prefetch(p['client_id'] for p in details.get('points', []))
+        
         for point_data in details.get('points', []):
-            # Get client info for additional details
-            client = db.query(Client).filter(
-                Client.id == point_data['client_id']
-            ).first()
+            client = lookup.get(point_data['client_id'])
             
             if client:
-                time_windows = []
                 # Parse time windows from client hours
-                for hour in range(8, 20):
-                    attr_name = f'hour_{hour}_{hour+1}'
-                    if hasattr(client, attr_name) and getattr(client, attr_name):
-                        time_windows.append({"start": hour, "end": hour + 1})
+                availability = client_availability_mask(client, HOURLY_FIELDS)
+                time_windows = [{"start": hour, "end": hour + 1} for hour in available_hours(availability)]
                 
                 point = RoutePointResponse(
                     client_id=point_data['client_id'],
@@ -80,7 +88,8 @@ def parse_route_details(route: Route, db: Session = None) -> List[RoutePointResp
 @router.post("/plan", response_model=RouteOptimizationResult)
 async def plan_routes(
     request: RoutePlanRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    lookup: ClientLookup = Depends(get_client_lookup)
 ):
     """
     Generate optimized routes for a given date
@@ -135,10 +144,11 @@ async def plan_routes(
         if not drivers:
             raise HTTPException(status_code=400, detail="沒有可用的司機")
         
-        # Get deliveries for the date
-        deliveries = db.query(Delivery).filter(
-            Delivery.scheduled_date == request.delivery_date,
-            Delivery.status.in_([DeliveryStatus.PENDING, DeliveryStatus.SCHEDULED])
+        # Get deliveries for the date (clients eager-loaded, planning columns only)
+        deliveries = planning_snapshot_query(
+            db,
+            delivery_date=request.delivery_date,
+            area=request.area
         ).all()
         
         # Convert to format expected by optimizer
@@ -169,6 +179,7 @@ async def plan_routes(
         
         # Convert optimizer results to database routes
         routes = []
+        geometry_store = RouteGeometryStore.default(db)
         for opt_route in optimization_result.routes:
             # Create route in database
             route = Route(
@@ -189,6 +200,7 @@ async def plan_routes(
             )
             db.add(route)
             db.flush()
+            geometry_store.finalize(route)
             
             # Update delivery assignments
             for delivery_info in opt_route['deliveries']:
@@ -210,6 +222,7 @@ async def plan_routes(
         optimization_time = time.time() - start_time
         
         # Convert routes to response format
+        lookup.prefetch(cid for route in routes for cid in route_client_ids(route))
         route_responses = []
         for route in routes:
             driver = db.query(Driver).filter(Driver.id == route.driver_id).first()
@@ -232,7 +245,7 @@ async def plan_routes(
                 optimization_score=route.optimization_score,
                 created_at=route.created_at,
                 updated_at=route.updated_at,
-                route_points=parse_route_details(route, db)
+                route_points=parse_route_details(route, db, lookup)
             )
             route_responses.append(route_response)
         
@@ -312,38 +325,28 @@ async def get_routes(
                      .limit(limit) \
                      .all()
         
-        # Convert to response format
+        # Convert to response format (serialized straight from ORM rows)
+        serialize = row_serializer(RouteResponse)
         items = []
         for route in routes:
             driver = db.query(Driver).filter(Driver.id == route.driver_id).first()
             vehicle = db.query(Vehicle).filter(Vehicle.id == route.vehicle_id).first()
             
-            items.append(RouteResponse(
-                id=route.id,
-                route_date=route.route_date,
-                route_name=route.route_name,
-                area=route.area,
-                driver_id=route.driver_id,
+            item = serialize(route)
+            item.update(
                 driver_name=driver.name if driver else None,
-                vehicle_id=route.vehicle_id,
                 vehicle_plate=vehicle.plate_number if vehicle else None,
-                vehicle_type=vehicle.vehicle_type.name.lower() if vehicle and vehicle.vehicle_type else None,
-                total_clients=route.total_clients,
-                total_distance_km=route.total_distance_km,
-                estimated_duration_minutes=route.estimated_duration_minutes,
-                is_optimized=route.is_optimized,
-                optimization_score=route.optimization_score,
-                created_at=route.created_at,
-                updated_at=route.updated_at
-            ))
-        
-        return RouteListResponse(
-            items=items,
-            total=total,
-            page=skip // limit + 1,
-            page_size=limit,
-            total_pages=(total + limit - 1) // limit
-        )
+                vehicle_type=vehicle.vehicle_type.name.lower() if vehicle and vehicle.vehicle_type else None
+            )
+            items.append(item)
+        
+        return FastJSONResponse({
+            "items": items,
+            "total": total,
+            "page": skip // limit + 1,
+            "page_size": limit,
+            "total_pages": (total + limit - 1) // limit
+        })
         
     except Exception as e:
         logger.error(f"Failed to get routes: {str(e)}")
@@ -353,7 +356,8 @@ async def get_routes(
 @router.get("/{route_id}", response_model=RouteResponse)
 async def get_route(
     route_id: int = Path(..., description="路線ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    lookup: ClientLookup = Depends(get_client_lookup)
 ):
     """Get route details by ID"""
     try:
@@ -366,7 +370,7 @@ async def get_route(
         vehicle = db.query(Vehicle).filter(Vehicle.id == route.vehicle_id).first()
         
         # Parse route details with proper database session
-        route_points = parse_route_details(route, db)
+        route_points = parse_route_details(route, db, lookup)
         
         return RouteResponse(
             id=route.id,
@@ -398,9 +402,18 @@ async def get_route(
 @router.get("/{route_id}/map", response_model=RouteMapData)
 async def get_route_map_data(
     route_id: int = Path(..., description="路線ID"),
-    db: Session = Depends(get_db)
+    zoom: int = Query(13, ge=1, le=20, description="地圖縮放等級（決定折線簡化程度）"),
+    response_format: str = Query("json", alias="format", pattern="^(json|encoded)$",
+                                 description="json：座標陣列；encoded：路線點也以 encoded polyline 回傳"),
+    db: Session = Depends(get_db),
+    lookup: ClientLookup = Depends(get_client_lookup)
 ):
-    """Get map visualization data for a route"""
+    """
+    Get map visualization data for a route
+    
+    The route polyline is read from the geometry stored when the route was
+    finalized, simplified for the requested zoom; no routing calls are made.
+    """
     try:
         route = db.query(Route).filter(Route.id == route_id).first()
         
@@ -413,9 +426,10 @@ async def get_route_map_data(
         
         if route.route_details:
             details = json.loads(route.route_details)
+            clients = lookup.get_many(point['client_id'] for point in details.get('points', []))
             
             for idx, point in enumerate(details.get('points', [])):
-                client = db.query(Client).filter(Client.id == point['client_id']).first()
+                client = clients.get(point['client_id'])
                 
                 if client and point.get('lat') and point.get('lng'):
                     waypoint = [point['lat'], point['lng']]
@@ -450,11 +464,32 @@ async def get_route_map_data(
                 [22.73, 121.12]
             ]
         
+        # Stored geometry, simplified for the zoom level
+        geometry = RouteGeometryStore.default(db).get(route)
+        polyline = polyline_for_zoom(geometry, zoom) if geometry else None
+        
+        if response_format == 'encoded':
+            # Marker positions are the waypoints, in order
+            for marker in markers:
+                del marker['position']
+            return RouteMapData(
+                route_id=route.id,
+                center_lat=center_lat,
+                center_lng=center_lng,
+                zoom_level=zoom,
+                polyline=polyline,
+                waypoints=[],
+                waypoints_polyline=encode_polyline(waypoints),
+                markers=markers,
+                area_boundary=area_boundary
+            )
+        
         return RouteMapData(
             route_id=route.id,
             center_lat=center_lat,
             center_lng=center_lng,
-            zoom_level=13,
+            zoom_level=zoom,
+            polyline=polyline,
             waypoints=waypoints,
             markers=markers,
             area_boundary=area_boundary
@@ -470,7 +505,8 @@ async def get_route_map_data(
 @router.post("", response_model=RouteResponse)
 async def create_route(
     request: RouteCreateRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    lookup: ClientLookup = Depends(get_client_lookup)
 ):
     """Create a new route manually"""
     try:
@@ -491,8 +527,9 @@ async def create_route(
         total_distance = 0.0
         total_duration = 0
         
+        clients = lookup.get_many(point.client_id for point in request.route_points)
         for point in request.route_points:
-            client = db.query(Client).filter(Client.id == point.client_id).first()
+            client = clients.get(point.client_id)
             if not client:
                 raise HTTPException(
                     status_code=400, 
@@ -528,6 +565,8 @@ async def create_route(
         )
         
         db.add(route)
+        db.flush()
+        RouteGeometryStore.default(db).finalize(route)
         
         # Create deliveries
         for point in request.route_points:
@@ -576,7 +615,8 @@ async def create_route(
 async def update_route(
     route_id: int = Path(..., description="路線ID"),
     request: RouteUpdateRequest = ...,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    lookup: ClientLookup = Depends(get_client_lookup)
 ):
     """Update an existing route"""
     try:
@@ -611,8 +651,9 @@ async def update_route(
             total_distance = 0.0
             total_duration = 0
             
+            clients = lookup.get_many(point.client_id for point in request.route_points)
             for point in request.route_points:
-                client = db.query(Client).filter(Client.id == point.client_id).first()
+                client = clients.get(point.client_id)
                 if not client:
                     raise HTTPException(
                         status_code=400, 
@@ -637,6 +678,9 @@ async def update_route(
             route.total_clients = len(request.route_points)
             route.total_distance_km = total_distance
             route.estimated_duration_minutes = total_duration
+            
+            # Geometry is recomputed only if the stop order changed
+            RouteGeometryStore.default(db).finalize(route)
         
         route.updated_at = datetime.utcnow()
         
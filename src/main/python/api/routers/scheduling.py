@@ -1,27 +1,44 @@
 """Advanced scheduling API endpoints"""
 from datetime import datetime, date, timedelta
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
+import asyncio
 import logging
 
 from core.database import get_db
 from models.database_schema import Client, Driver, Vehicle, Delivery, DeliveryStatus, Route
 from common.scheduling.engine import SchedulingEngine
+from common.scheduling.insertion import InsertionPlanner
 from common.scheduling.models import (
     DeliveryRequest, DriverAvailability, VehicleInfo,
     SchedulingParameters, OptimizationObjective,
     SchedulingResult
 )
 from common.time_utils import parse_client_time_windows
+from services.planning_snapshot import planning_snapshot_query
+from services.previous_routes import load_previous_routes
+from services.scheduling_jobs import SchedulingJob, scheduling_jobs
+from services.travel_profiles import travel_profiles
+from services.same_day_insertion import (
+    DayRoutes, apply_insertion, load_day_routes, same_day_candidates
+)
 from api.schemas.base import ResponseMessage
+from api.utils.serialization import FastJSONResponse, dumps, row_serializer
+from api.utils.client_lookup import ClientLookup, get_client_lookup
 from pydantic import BaseModel, Field
 
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/scheduling", tags=["advanced-scheduling"])
 
+# /generate answers within one request, well inside gunicorn's 120 s worker
+# timeout; longer searches run as background jobs
+SYNC_TIME_LIMIT_SECONDS = 60
+JOB_TIME_LIMIT_SECONDS = 300
+
 
 class SchedulingRequest(BaseModel):
     """Request model for advanced scheduling"""
@@ -32,10 +49,14 @@ class SchedulingRequest(BaseModel):
     )
     algorithm: Optional[str] = Field(
         default="greedy",
-        description="Algorithm to use: greedy, genetic, simulated_annealing"
+        description="Algorithm to use: greedy, genetic, simulated_annealing, portfolio, ortools, lns"
+    )
+    max_iterations: Optional[int] = Field(default=None, description="Max optimization iterations (default: run to the time limit)")
+    time_limit_seconds: Optional[int] = Field(
+        default=None,
+        description=f"Time limit for optimization (default: {SYNC_TIME_LIMIT_SECONDS}s for /generate, "
+                    f"at most {SYNC_TIME_LIMIT_SECONDS}s there; {JOB_TIME_LIMIT_SECONDS}s for /jobs)"
     )
-    max_iterations: Optional[int] = Field(default=1000, description="Max optimization iterations")
-    time_limit_seconds: Optional[int] = Field(default=300, description="Time limit for optimization")
     allow_overtime: Optional[bool] = Field(default=False, description="Allow driver overtime")
     travel_speed_kmh: Optional[float] = Field(default=30.0, description="Average travel speed")
     
@@ -49,6 +70,10 @@ class SchedulingRequest(BaseModel):
     service_time_buffer: Optional[float] = Field(default=1.1, description="Service time buffer multiplier")
     min_deliveries_per_route: Optional[int] = Field(default=5, description="Minimum deliveries per route")
     max_deliveries_per_route: Optional[int] = Field(default=20, description="Maximum deliveries per route")
+    warm_start: Optional[bool] = Field(
+        default=False,
+        description="Seed genetic / simulated annealing from the previous comparable day's routes"
+    )
 
 
 class SchedulingResponse(BaseModel):
@@ -75,196 +100,363 @@ class SchedulingResponse(BaseModel):
     warnings: List[str] = Field(default_factory=list)
 
 
+class InsertionRequest(BaseModel):
+    """Request model for ranking same-day insertions"""
+    schedule_date: date = Field(..., description="Date whose routes receive the deliveries")
+    delivery_ids: Optional[List[int]] = Field(
+        None, description="Unassigned deliveries to insert (default: same-day clients' pending orders)"
+    )
+    now: Optional[datetime] = Field(None, description="Nothing is scheduled before this time")
+    driver_ids: Optional[List[int]] = Field(None, description="Only insert into these drivers' routes")
+    limit: int = Field(default=5, ge=1, le=50, description="Options returned per delivery")
+    travel_speed_kmh: float = Field(default=30.0, description="Average travel speed")
+    max_deliveries_per_route: int = Field(default=20, description="Maximum deliveries per route")
+
+
+class InsertionApplyRequest(InsertionRequest):
+    """Request model for applying one ranked insertion"""
+    delivery_id: int = Field(..., description="Delivery to insert")
+    driver_id: int = Field(..., description="Driver of the chosen option")
+    position: int = Field(..., ge=0, description="Position of the chosen option")
+
+
+# Planners per date, kept while the day's routes are unchanged
+MAX_CACHED_PLANNERS = 7
+_insertion_planners: Dict[date, tuple] = {}
+
+
+def _empty_scheduling_response(request: SchedulingRequest) -> SchedulingResponse:
+    """Response for a date with nothing to schedule"""
+    return SchedulingResponse(
+        success=True,
+        message="No deliveries to schedule",
+        schedule_date=request.schedule_date,
+        algorithm_used=request.algorithm,
+        computation_time=0.0,
+        total_deliveries=0,
+        scheduled_deliveries=0,
+        unscheduled_deliveries=0,
+        total_routes=0,
+        total_distance=0.0,
+        average_utilization=0.0,
+        conflicts_count=0
+    )
+
+
+def _delivery_request(delivery: Delivery, schedule_date: date) -> DeliveryRequest:
+    """Scheduling request for a delivery whose client is loaded"""
+    client = delivery.client
+    
+    # Parse client time windows and convert to datetime windows for the specific date
+    datetime_windows = [
+        (datetime.combine(schedule_date, start_time), datetime.combine(schedule_date, end_time))
+        for start_time, end_time in parse_client_time_windows(client)
+    ]
+    
+    # Calculate service time
+    from common.time_utils import calculate_service_time
+    cylinder_type = getattr(delivery, 'cylinder_type', None) or "20kg"
+    quantity = getattr(delivery, 'quantity', None) or 1
+    service_duration = calculate_service_time(
+        cylinder_type,
+        quantity,
+        "commercial" if client.client_type == "business" else "residential"
+    )
+    
+    return DeliveryRequest(
+        delivery_id=delivery.id,
+        client_id=client.id,
+        location=(client.latitude or 22.7553, client.longitude or 121.1504),
+        time_windows=datetime_windows,
+        service_duration=service_duration,
+        cylinder_type=cylinder_type,
+        quantity=quantity,
+        priority=getattr(client, 'priority', 1),
+        special_requirements=[]
+    )
+
+
+def _driver_availability(driver: Driver, schedule_date: date, max_deliveries: int,
+                         location=(22.7553, 121.1504)) -> DriverAvailability:
+    """Driver availability for a day (assume full day availability for now)"""
+    return DriverAvailability(
+        driver_id=driver.id,
+        employee_id=driver.employee_id,
+        name=driver.name,
+        available_hours=[
+            (datetime.combine(schedule_date, datetime.min.time()).replace(hour=8),
+             datetime.combine(schedule_date, datetime.min.time()).replace(hour=18))
+        ],
+        current_location=location,
+        max_deliveries=max_deliveries,
+        skills=[],
+        vehicle_id=None
+    )
+
+
+def _vehicle_info(vehicle: Vehicle) -> VehicleInfo:
+    """Vehicle info with default capacities based on vehicle type"""
+    capacity = {
+        "16kg": 30,
+        "20kg": 25,
+        "50kg": 10
+    }
+    
+    if vehicle.vehicle_type.name == "TRUCK":
+        capacity = {"16kg": 50, "20kg": 40, "50kg": 15}
+    elif vehicle.vehicle_type.name == "VAN":
+        capacity = {"16kg": 30, "20kg": 25, "50kg": 10}
+    
+    return VehicleInfo(
+        vehicle_id=vehicle.id,
+        plate_number=vehicle.plate_number,
+        capacity=capacity,
+        fuel_efficiency=10.0,
+        max_distance=200.0,
+        current_location=(22.7553, 121.1504)
+    )
+
+
+def _build_scheduling_inputs(request: SchedulingRequest, db: Session):
+    """
+    Load deliveries, drivers and vehicles for a scheduling request
+    
+    Returns:
+        (deliveries, delivery_requests, drivers, driver_availability,
+        vehicle_info, parameters), or None when there is nothing to schedule
+    """
+    # Get pending deliveries with their planning columns in two queries
+    deliveries = planning_snapshot_query(
+        db,
+        delivery_date=request.schedule_date,
+        area=request.area,
+        client_ids=request.client_ids
+    ).all()
+    
+    if not deliveries:
+        return None
+    
+    # Convert deliveries to scheduling requests
+    delivery_requests = [
+        _delivery_request(delivery, request.schedule_date)
+        for delivery in deliveries if delivery.client
+    ]
+    
+    # Get available drivers
+    driver_query = db.query(Driver).filter(
+        and_(
+            Driver.is_active == True,
+            Driver.is_available == True
+        )
+    )
+    
+    if request.driver_ids:
+        driver_query = driver_query.filter(Driver.id.in_(request.driver_ids))
+    
+    drivers = driver_query.all()
+    
+    if not drivers:
+        raise HTTPException(status_code=400, detail="No available drivers")
+    
+    # Convert to driver availability
+    driver_availability = [
+        _driver_availability(driver, request.schedule_date, request.max_deliveries_per_route or 20)
+        for driver in drivers
+    ]
+    
+    # Get available vehicles
+    vehicle_query = db.query(Vehicle).filter(
+        and_(
+            Vehicle.is_active == True,
+            Vehicle.is_available == True
+        )
+    )
+    
+    if request.vehicle_ids:
+        vehicle_query = vehicle_query.filter(Vehicle.id.in_(request.vehicle_ids))
+    
+    vehicles = vehicle_query.all()
+    
+    # Convert to vehicle info
+    vehicle_info = [_vehicle_info(vehicle) for vehicle in vehicles]
+    
+    # Map string objectives to enum
+    objective_map = {
+        "minimize_distance": OptimizationObjective.MINIMIZE_DISTANCE,
+        "maximize_time_compliance": OptimizationObjective.MAXIMIZE_TIME_COMPLIANCE,
+        "balance_workload": OptimizationObjective.BALANCE_WORKLOAD,
+        "minimize_overtime": OptimizationObjective.MINIMIZE_OVERTIME,
+        "maximize_utilization": OptimizationObjective.MAXIMIZE_UTILIZATION
+    }
+    
+    objectives = []
+    for obj_str in request.optimization_objectives:
+        if obj_str in objective_map:
+            objectives.append(objective_map[obj_str])
+    
+    if not objectives:
+        objectives = [OptimizationObjective.MINIMIZE_DISTANCE]
+    
+    # Create scheduling parameters
+    parameters = SchedulingParameters(
+        date=request.schedule_date,
+        optimization_objectives=objectives,
+        max_iterations=request.max_iterations,
+        time_limit_seconds=request.time_limit_seconds or JOB_TIME_LIMIT_SECONDS,
+        allow_overtime=request.allow_overtime,
+        travel_speed_kmh=request.travel_speed_kmh,
+        service_time_buffer=request.service_time_buffer
+    )
+    
+    # Previous routes on the same weekday for the same drivers and area
+    if request.warm_start:
+        _, parameters.warm_start = load_previous_routes(
+            db, request.schedule_date, [driver.id for driver in drivers], request.area
+        )
+    
+    return deliveries, delivery_requests, drivers, driver_availability, vehicle_info, parameters
+
+
+def _build_scheduling_response(request: SchedulingRequest,
+                               result: SchedulingResult,
+                               deliveries: List[Delivery],
+                               delivery_requests: List[DeliveryRequest],
+                               drivers: List[Driver],
+                               lookup: ClientLookup) -> Dict:
+    """Convert an engine result into the SchedulingResponse payload"""
+    # Convert result to response
+    routes = []
+    if result.schedule:
+        # Group by driver/vehicle
+        from collections import defaultdict
+        driver_routes = defaultdict(list)
+        
+        for entry in result.schedule:
+            driver_routes[entry.driver_id].append(entry)
+        
+        # Resolve every scheduled client in one batched query
+        lookup.prefetch(entry.client_id for entry in result.schedule)
+        
+        for driver_id, entries in driver_routes.items():
+            driver = next(d for d in drivers if d.id == driver_id)
+            
+            # Sort entries by time
+            sorted_entries = sorted(entries, key=lambda e: e.time_slot.start_time)
+            
+            route_deliveries = []
+            for entry in sorted_entries:
+                client = lookup.get(entry.client_id)
+                route_deliveries.append({
+                    "delivery_id": entry.delivery_id,
+                    "client_id": entry.client_id,
+                    "client_name": client.short_name or client.invoice_title if client else "",
+                    "address": client.address if client else "",
+                    "scheduled_time": entry.time_slot.start_time.isoformat(),
+                    "service_duration": entry.service_duration,
+                    "location": list(entry.location) if entry.location else None
+                })
+            
+            routes.append({
+                "driver_id": driver_id,
+                "driver_name": driver.name,
+                "vehicle_id": sorted_entries[0].vehicle_id,
+                "deliveries": route_deliveries,
+                "total_deliveries": len(route_deliveries),
+                "start_time": sorted_entries[0].time_slot.start_time.isoformat(),
+                "end_time": sorted_entries[-1].end_time.isoformat()
+            })
+    
+    # Get unscheduled clients
+    scheduled_delivery_ids = {e.delivery_id for e in result.schedule}
+    unscheduled_clients = []
+    
+    for delivery in deliveries:
+        if delivery.id not in scheduled_delivery_ids:
+            client = delivery.client
+            if client:
+                unscheduled_clients.append({
+                    "client_id": client.id,
+                    "client_name": client.short_name or client.invoice_title,
+                    "address": client.address,
+                    "reason": "Could not fit in schedule"
+                })
+    
+    # Format conflicts
+    conflicts = []
+    for conflict in result.conflicts:
+        conflicts.append({
+            "type": conflict.conflict_type.value,
+            "description": conflict.description,
+            "severity": conflict.severity,
+            "affected_deliveries": [e.delivery_id for e in conflict.entries]
+        })
+    
+    # Prepare warnings
+    warnings = []
+    if result.conflicts:
+        warnings.append(f"{len(result.conflicts)} scheduling conflicts detected")
+    if unscheduled_clients:
+        warnings.append(f"{len(unscheduled_clients)} clients could not be scheduled")
+    if result.metrics.get('average_utilization', 0) < 50:
+        warnings.append("Low driver utilization - consider reducing number of drivers")
+    if request.warm_start and 'warm_start' not in result.metrics:
+        warnings.append("Warm start not applied - no comparable previous routes or algorithm does not support it")
+    
+    return dict(
+        success=result.success,
+        message=result.error_message or f"Successfully scheduled {len(result.schedule)} deliveries",
+        schedule_date=request.schedule_date,
+        algorithm_used=result.algorithm_used,
+        computation_time=result.computation_time,
+        total_deliveries=len(delivery_requests),
+        scheduled_deliveries=len(result.schedule),
+        unscheduled_deliveries=len(unscheduled_clients),
+        total_routes=len(routes),
+        total_distance=result.metrics.get('total_distance', 0),
+        average_utilization=result.metrics.get('average_utilization', 0),
+        conflicts_count=len(result.conflicts),
+        routes=routes,
+        unscheduled_clients=unscheduled_clients,
+        conflicts=conflicts,
+        warnings=warnings
+    )
+
+
 @router.post("/generate", response_model=SchedulingResponse)
-async def generate_schedule(
+def generate_schedule(
     request: SchedulingRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    lookup: ClientLookup = Depends(get_client_lookup)
 ):
     """
     Generate optimized schedule using advanced algorithms
     
     - Uses constraint-based scheduling with multiple optimization objectives
-    - Supports different algorithms: greedy (fast), genetic (optimal), simulated annealing (balanced)
+    - Supports different algorithms: greedy (fast), genetic (optimal), simulated annealing (balanced),
+      ortools (VRPTW solver), lns (adaptive large neighbourhood search)
     - Handles time windows, capacity constraints, and driver availability
     - Provides conflict detection and resolution
+    - Runs in the threadpool, for at most SYNC_TIME_LIMIT_SECONDS; use
+      POST /jobs for longer searches
     """
+    if request.time_limit_seconds is None:
+        request = request.model_copy(update={"time_limit_seconds": SYNC_TIME_LIMIT_SECONDS})
+    elif request.time_limit_seconds > SYNC_TIME_LIMIT_SECONDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"time_limit_seconds above {SYNC_TIME_LIMIT_SECONDS}s: use POST /api/scheduling/jobs"
+        )
+    
     try:
         logger.info(f"Generating schedule for {request.schedule_date} using {request.algorithm}")
         
-        # Get pending deliveries
-        query = db.query(Delivery).filter(
-            and_(
-                Delivery.scheduled_date == request.schedule_date,
-                Delivery.status.in_([DeliveryStatus.PENDING, DeliveryStatus.SCHEDULED])
-            )
-        )
-        
-        if request.area:
-            query = query.join(Client).filter(Client.area == request.area)
-        
-        if request.client_ids:
-            query = query.filter(Delivery.client_id.in_(request.client_ids))
-        
-        deliveries = query.all()
-        
-        if not deliveries:
-            return SchedulingResponse(
-                success=True,
-                message="No deliveries to schedule",
-                schedule_date=request.schedule_date,
-                algorithm_used=request.algorithm,
-                computation_time=0.0,
-                total_deliveries=0,
-                scheduled_deliveries=0,
-                unscheduled_deliveries=0,
-                total_routes=0,
-                total_distance=0.0,
-                average_utilization=0.0,
-                conflicts_count=0
-            )
-        
-        # Convert deliveries to scheduling requests
-        delivery_requests = []
-        for delivery in deliveries:
-            client = delivery.client
-            if not client:
-                continue
-            
-            # Parse client time windows
-            time_windows = parse_client_time_windows(client)
-            
-            # Convert to datetime windows for the specific date
-            datetime_windows = []
-            for start_time, end_time in time_windows:
-                datetime_windows.append((
-                    datetime.combine(request.schedule_date, start_time),
-                    datetime.combine(request.schedule_date, end_time)
-                ))
-            
-            # Calculate service time
-            from common.time_utils import calculate_service_time
-            service_duration = calculate_service_time(
-                delivery.cylinder_type or "20kg",
-                delivery.quantity or 1,
-                "commercial" if client.client_type == "business" else "residential"
-            )
-            
-            delivery_request = DeliveryRequest(
-                delivery_id=delivery.id,
-                client_id=client.id,
-                location=(client.latitude or 22.7553, client.longitude or 121.1504),
-                time_windows=datetime_windows,
-                service_duration=service_duration,
-                cylinder_type=delivery.cylinder_type or "20kg",
-                quantity=delivery.quantity or 1,
-                priority=getattr(client, 'priority', 1),
-                special_requirements=[]
-            )
-            delivery_requests.append(delivery_request)
-        
-        # Get available drivers
-        driver_query = db.query(Driver).filter(
-            and_(
-                Driver.is_active == True,
-                Driver.is_available == True
-            )
-        )
-        
-        if request.driver_ids:
-            driver_query = driver_query.filter(Driver.id.in_(request.driver_ids))
-        
-        drivers = driver_query.all()
-        
-        if not drivers:
-            raise HTTPException(status_code=400, detail="No available drivers")
-        
-        # Convert to driver availability
-        driver_availability = []
-        for driver in drivers:
-            # Assume full day availability for now
-            availability = DriverAvailability(
-                driver_id=driver.id,
-                employee_id=driver.employee_id,
-                name=driver.name,
-                available_hours=[
-                    (datetime.combine(request.schedule_date, datetime.min.time()).replace(hour=8),
-                     datetime.combine(request.schedule_date, datetime.min.time()).replace(hour=18))
-                ],
-                current_location=(22.7553, 121.1504),  # Default location
-                max_deliveries=request.max_deliveries_per_route or 20,
-                skills=[],
-                vehicle_id=None
-            )
-            driver_availability.append(availability)
-        
-        # Get available vehicles
-        vehicle_query = db.query(Vehicle).filter(
-            and_(
-                Vehicle.is_active == True,
-                Vehicle.is_available == True
-            )
-        )
-        
-        if request.vehicle_ids:
-            vehicle_query = vehicle_query.filter(Vehicle.id.in_(request.vehicle_ids))
-        
-        vehicles = vehicle_query.all()
-        
-        # Convert to vehicle info
-        vehicle_info = []
-        for vehicle in vehicles:
-            # Default capacities based on vehicle type
-            capacity = {
-                "16kg": 30,
-                "20kg": 25,
-                "50kg": 10
-            }
-            
-            if vehicle.vehicle_type.name == "TRUCK":
-                capacity = {"16kg": 50, "20kg": 40, "50kg": 15}
-            elif vehicle.vehicle_type.name == "VAN":
-                capacity = {"16kg": 30, "20kg": 25, "50kg": 10}
-            
-            info = VehicleInfo(
-                vehicle_id=vehicle.id,
-                plate_number=vehicle.plate_number,
-                capacity=capacity,
-                fuel_efficiency=10.0,
-                max_distance=200.0,
-                current_location=(22.7553, 121.1504)
-            )
-            vehicle_info.append(info)
-        
-        # Map string objectives to enum
-        objective_map = {
-            "minimize_distance": OptimizationObjective.MINIMIZE_DISTANCE,
-            "maximize_time_compliance": OptimizationObjective.MAXIMIZE_TIME_COMPLIANCE,
-            "balance_workload": OptimizationObjective.BALANCE_WORKLOAD,
-            "minimize_overtime": OptimizationObjective.MINIMIZE_OVERTIME,
-            "maximize_utilization": OptimizationObjective.MAXIMIZE_UTILIZATION
-        }
-        
-        objectives = []
-        for obj_str in request.optimization_objectives:
-            if obj_str in objective_map:
-                objectives.append(objective_map[obj_str])
-        
-        if not objectives:
-            objectives = [OptimizationObjective.MINIMIZE_DISTANCE]
-        
-        # Create scheduling parameters
-        parameters = SchedulingParameters(
-            date=request.schedule_date,
-            optimization_objectives=objectives,
-            max_iterations=request.max_iterations,
-            time_limit_seconds=request.time_limit_seconds,
-            allow_overtime=request.allow_overtime,
-            travel_speed_kmh=request.travel_speed_kmh,
-            service_time_buffer=request.service_time_buffer
-        )
+        inputs = _build_scheduling_inputs(request, db)
+        if inputs is None:
+            return _empty_scheduling_response(request)
+        deliveries, delivery_requests, drivers, driver_availability, vehicle_info, parameters = inputs
         
         # Run scheduling engine
-        engine = SchedulingEngine()
+        engine = SchedulingEngine(travel_profile=travel_profiles.current())
         result = engine.generate_schedule(
             delivery_requests=delivery_requests,
             driver_availability=driver_availability,
@@ -273,99 +465,10 @@ async def generate_schedule(
             algorithm=request.algorithm
         )
         
-        # Convert result to response
-        routes = []
-        if result.schedule:
-            # Group by driver/vehicle
-            from collections import defaultdict
-            driver_routes = defaultdict(list)
-            
-            for entry in result.schedule:
-                driver_routes[entry.driver_id].append(entry)
-            
-            for driver_id, entries in driver_routes.items():
-                driver = next(d for d in drivers if d.id == driver_id)
-                
-                # Sort entries by time
-                sorted_entries = sorted(entries, key=lambda e: e.time_slot.start_time)
-                
-                route_deliveries = []
-                for entry in sorted_entries:
-                    client = db.query(Client).filter(Client.id == entry.client_id).first()
-                    route_deliveries.append({
-                        "delivery_id": entry.delivery_id,
-                        "client_id": entry.client_id,
-                        "client_name": client.short_name or client.invoice_title if client else "",
-                        "address": client.address if client else "",
-                        "scheduled_time": entry.time_slot.start_time.isoformat(),
-                        "service_duration": entry.service_duration,
-                        "location": list(entry.location) if entry.location else None
-                    })
-                
-                routes.append({
-                    "driver_id": driver_id,
-                    "driver_name": driver.name,
-                    "vehicle_id": sorted_entries[0].vehicle_id,
-                    "deliveries": route_deliveries,
-                    "total_deliveries": len(route_deliveries),
-                    "start_time": sorted_entries[0].time_slot.start_time.isoformat(),
-                    "end_time": sorted_entries[-1].end_time.isoformat()
-                })
-        
-        # Get unscheduled clients
-        scheduled_delivery_ids = {e.delivery_id for e in result.schedule}
-        unscheduled_clients = []
-        
-        for delivery in deliveries:
-            if delivery.id not in scheduled_delivery_ids:
-                client = delivery.client
-                if client:
-                    unscheduled_clients.append({
-                        "client_id": client.id,
-                        "client_name": client.short_name or client.invoice_title,
-                        "address": client.address,
-                        "reason": "Could not fit in schedule"
-                    })
-        
-        # Format conflicts
-        conflicts = []
-        for conflict in result.conflicts:
-            conflicts.append({
-                "type": conflict.conflict_type.value,
-                "description": conflict.description,
-                "severity": conflict.severity,
-                "affected_deliveries": [e.delivery_id for e in conflict.entries]
-            })
-        
-        # Prepare warnings
-        warnings = []
-        if result.conflicts:
-            warnings.append(f"{len(result.conflicts)} scheduling conflicts detected")
-        if unscheduled_clients:
-            warnings.append(f"{len(unscheduled_clients)} clients could not be scheduled")
-        if result.metrics.get('average_utilization', 0) < 50:
-            warnings.append("Low driver utilization - consider reducing number of drivers")
-        
-        response = SchedulingResponse(
-            success=result.success,
-            message=result.error_message or f"Successfully scheduled {len(result.schedule)} deliveries",
-            schedule_date=request.schedule_date,
-            algorithm_used=result.algorithm_used,
-            computation_time=result.computation_time,
-            total_deliveries=len(delivery_requests),
-            scheduled_deliveries=len(result.schedule),
-            unscheduled_deliveries=len(unscheduled_clients),
-            total_routes=len(routes),
-            total_distance=result.metrics.get('total_distance', 0),
-            average_utilization=result.metrics.get('average_utilization', 0),
-            conflicts_count=len(result.conflicts),
-            routes=routes,
-            unscheduled_clients=unscheduled_clients,
-            conflicts=conflicts,
-            warnings=warnings
-        )
-        
-        return response
+        # Large nested payload: serialize directly instead of re-validating every route dict
+        return FastJSONResponse(row_serializer(SchedulingResponse)(_build_scheduling_response(
+            request, result, deliveries, delivery_requests, drivers, lookup
+        )))
         
     except HTTPException:
         raise
@@ -374,6 +477,104 @@ async def generate_schedule(
         raise HTTPException(status_code=500, detail=f"Schedule generation failed: {str(e)}")
 
 
+@router.post("/jobs", status_code=202)
+async def start_scheduling_job(
+    request: SchedulingRequest,
+    db: Session = Depends(get_db),
+    lookup: ClientLookup = Depends(get_client_lookup)
+):
+    """
+    Start schedule generation in the background
+    
+    - Progress (best score, scheduled / unscheduled counts) is available from
+      GET /jobs/{job_id} or streamed from GET /jobs/{job_id}/events
+    - POST /jobs/{job_id}/stop accepts the current best plan early (not
+      supported by the portfolio algorithm)
+    """
+    inputs = _build_scheduling_inputs(request, db)
+    if inputs is None:
+        empty = _empty_scheduling_response(request).model_dump(mode="json")
+        job = scheduling_jobs.start(lambda job: empty)
+        return {"job_id": job.job_id, "status": job.status}
+    deliveries, delivery_requests, drivers, driver_availability, vehicle_info, parameters = inputs
+    
+    # The worker thread outlives this request's session, so load everything it reads now
+    lookup.prefetch(delivery.client_id for delivery in deliveries)
+    
+    engine = SchedulingEngine(travel_profile=travel_profiles.current())
+    
+    def run(job: SchedulingJob) -> Dict:
+        result = engine.generate_schedule(
+            delivery_requests=delivery_requests,
+            driver_availability=driver_availability,
+            vehicle_info=vehicle_info,
+            parameters=parameters,
+            algorithm=request.algorithm,
+            progress_callback=job.on_progress
+        )
+        return row_serializer(SchedulingResponse)(_build_scheduling_response(
+            request, result, deliveries, delivery_requests, drivers, lookup
+        ))
+    
+    job = scheduling_jobs.start(run, stoppable=engine.supports_early_stop(request.algorithm))
+    logger.info(f"Started scheduling job {job.job_id} for {request.schedule_date} using {request.algorithm}")
+    return {"job_id": job.job_id, "status": job.status}
+
+
+def _get_job(job_id: str):
+    job = scheduling_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Scheduling job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+async def get_scheduling_job(job_id: str):
+    """Poll a scheduling job: status, latest progress and the result once completed"""
+    return FastJSONResponse(_get_job(job_id).to_dict())
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_scheduling_job(job_id: str, heartbeat_seconds: float = Query(15.0, gt=0, le=60)):
+    """
+    Server-sent events for a scheduling job
+    
+    Emits a "progress" event whenever the incumbent improves and a final
+    "done" event with the job (including its result), then closes
+    """
+    job = _get_job(job_id)
+    
+    async def events():
+        version = -1
+        while True:
+            current = await asyncio.to_thread(job.wait_for_change, version, heartbeat_seconds)
+            if current == version:
+                yield b": keep-alive\n\n"
+                continue
+            version = current
+            if job.done:
+                yield b"event: done\ndata: " + dumps(job.to_dict()) + b"\n\n"
+                return
+            if job.progress is not None:
+                yield b"event: progress\ndata: " + dumps(job.progress) + b"\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/jobs/{job_id}/stop")
+async def stop_scheduling_job(job_id: str):
+    """Stop a running job early; it completes with the best plan found so far"""
+    job = _get_job(job_id)
+    if not job.stoppable:
+        raise HTTPException(status_code=409, detail="This scheduling algorithm cannot be stopped early")
+    job.request_stop()
+    return {"job_id": job.job_id, "status": job.status, "stop_requested": True}
+
+
 @router.post("/apply", response_model=ResponseMessage)
 async def apply_schedule(
     schedule_date: date = Body(..., description="Date of schedule to apply"),
@@ -459,6 +660,183 @@ async def apply_schedule(
         raise HTTPException(status_code=500, detail=f"Failed to apply schedule: {str(e)}")
 
 
+def _insertion_planner(request: InsertionRequest, db: Session) -> Tuple[InsertionPlanner, DayRoutes]:
+    """
+    Planner over the day's active routes, reusing the cached one (and its
+    travel matrix) while the routes are unchanged
+    """
+    routes = load_day_routes(db, request.schedule_date, request.driver_ids)
+    if not routes.deliveries:
+        raise HTTPException(status_code=404, detail="No active routes for this date")
+    
+    key = (routes.signature(), request.travel_speed_kmh, request.max_deliveries_per_route,
+           travel_profiles.version)
+    cached = _insertion_planners.get(request.schedule_date)
+    if cached and cached[0] == key:
+        planner = cached[1]
+        planner.set_now(request.now)
+        return planner, routes
+    
+    drivers = {d.id: d for d in db.query(Driver).filter(Driver.id.in_(list(routes.deliveries)))}
+    vehicle_ids = [v for v in routes.vehicle_ids.values() if v]
+    vehicles = db.query(Vehicle).filter(Vehicle.id.in_(vehicle_ids)).all() if vehicle_ids else []
+    
+    driver_availability = []
+    for driver_id in routes.deliveries:
+        if driver_id not in drivers:
+            continue
+        availability = _driver_availability(
+            drivers[driver_id], request.schedule_date, request.max_deliveries_per_route,
+            location=routes.start_locations.get(driver_id, (22.7553, 121.1504))
+        )
+        availability.vehicle_id = routes.vehicle_ids.get(driver_id)
+        driver_availability.append(availability)
+    
+    parameters = SchedulingParameters(
+        date=request.schedule_date,
+        optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE],
+        travel_speed_kmh=request.travel_speed_kmh
+    )
+    planner = SchedulingEngine(travel_profile=travel_profiles.current()).insertion_planner(
+        {
+            driver_id: [_delivery_request(d, request.schedule_date) for d in deliveries if d.client]
+            for driver_id, deliveries in routes.deliveries.items()
+        },
+        driver_availability,
+        [_vehicle_info(vehicle) for vehicle in vehicles],
+        parameters,
+        now=request.now,
+        locked_stops=routes.locked_stops
+    )
+    
+    _insertion_planners[request.schedule_date] = (key, planner)
+    while len(_insertion_planners) > MAX_CACHED_PLANNERS:
+        _insertion_planners.pop(next(iter(_insertion_planners)))
+    return planner, routes
+
+
+def _insertion_requests(request: InsertionRequest, delivery_ids: Optional[List[int]], db: Session):
+    """Unassigned deliveries to insert as scheduling requests"""
+    deliveries = same_day_candidates(db, request.schedule_date, delivery_ids)
+    return deliveries, [_delivery_request(d, request.schedule_date) for d in deliveries if d.client]
+
+
+def _option_payload(option) -> Dict:
+    return {
+        "driver_id": option.driver_id,
+        "vehicle_id": option.vehicle_id,
+        "position": option.position,
+        "detour_km": option.detour_km,
+        "detour_minutes": option.detour_minutes,
+        "service_start": option.service_start.isoformat(),
+        "slack_minutes": option.slack_minutes
+    }
+
+
+@router.post("/insertions")
+async def rank_insertions(
+    request: InsertionRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Rank cheapest feasible insertions of same-day orders into today's routes
+    
+    Existing routes keep their order; each delivery gets the best positions
+    across all active routes that keep every stop inside its time window,
+    the driver inside their hours and the vehicle inside its capacity.
+    Apply one with /insertions/apply instead of regenerating the day.
+    """
+    try:
+        start = datetime.now()
+        planner, _ = _insertion_planner(request, db)
+        deliveries, delivery_requests = _insertion_requests(request, request.delivery_ids, db)
+        options = planner.rank(delivery_requests, limit=request.limit)
+        
+        return {
+            "schedule_date": request.schedule_date,
+            "computation_ms": round((datetime.now() - start).total_seconds() * 1000, 1),
+            "deliveries": [
+                {
+                    "delivery_id": delivery.id,
+                    "client_id": delivery.client_id,
+                    "options": [_option_payload(o) for o in options.get(delivery.id, [])]
+                }
+                for delivery in deliveries
+            ],
+            "unplaceable": [delivery_id for delivery_id, found in options.items() if not found]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to rank insertions: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to rank insertions: {str(e)}")
+
+
+@router.post("/insertions/apply", response_model=ResponseMessage)
+async def apply_insertion_option(
+    request: InsertionApplyRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Insert one delivery at a ranked position and update the driver's route
+    
+    The option is re-checked against the current routes; later stops of the
+    route are renumbered and their estimated arrivals move.
+    """
+    try:
+        planner, routes = _insertion_planner(request, db)
+        _, delivery_requests = _insertion_requests(request, [request.delivery_id], db)
+        if not delivery_requests:
+            raise HTTPException(status_code=404, detail="Delivery not found or already assigned")
+        planner.rank(delivery_requests, limit=1)
+        
+        try:
+            schedule = planner.apply(request.delivery_id, request.driver_id, request.position)
+        except ValueError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        
+        apply_insertion(db, request.schedule_date, routes, request.driver_id, schedule)
+        db.commit()
+        
+        # The cached planner already holds the new route
+        routes.deliveries[request.driver_id] = sorted(
+            db.query(Delivery).filter(Delivery.id.in_([e.delivery_id for e in schedule])),
+            key=lambda d: d.route_sequence
+        )
+        key = (routes.signature(), request.travel_speed_kmh, request.max_deliveries_per_route,
+               travel_profiles.version)
+        _insertion_planners[request.schedule_date] = (key, planner)
+        
+        return ResponseMessage(
+            success=True,
+            message=f"Inserted delivery {request.delivery_id} into driver {request.driver_id}'s route",
+            data={
+                "driver_id": request.driver_id,
+                "route": [
+                    {
+                        "delivery_id": entry.delivery_id,
+                        "client_id": entry.client_id,
+                        "sequence": routes.next_sequence.get(request.driver_id, 1) + idx,
+                        "scheduled_time": entry.time_slot.start_time.isoformat()
+                    }
+                    for idx, entry in enumerate(schedule)
+                ]
+            }
+        )
+        
+    except HTTPException:
+        db.rollback()
+        # The planner may already hold the insertion that was not saved
+        _insertion_planners.pop(request.schedule_date, None)
+        raise
+    except Exception as e:
+        db.rollback()
+        _insertion_planners.pop(request.schedule_date, None)
+        logger.error(f"Failed to apply insertion: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Failed to apply insertion: {str(e)}")
+
+
 @router.get("/conflicts/{schedule_date}")
 async def get_schedule_conflicts(
     schedule_date: date,
@@ -89,4 +89,13 @@ class ClientSearchParams(BaseModel):
     is_corporate: Optional[bool] = Field(None, description="是否為公司戶")
     is_active: Optional[bool] = Field(default=True, description="是否啟用")
     order_by: str = Field(default="created_at", description="排序欄位")
-    order_desc: bool = Field(default=True, description="是否降冪排序")
\ No newline at end of file
+    order_desc: bool = Field(default=True, description="是否降冪排序")
+
+class ClientSuggestion(BaseModel):
+    """Schema for keyword search suggestions (phone order lookup)"""
+    id: int
+    client_code: Optional[str] = None
+    name: Optional[str] = None
+    address: Optional[str] = None
+    district: Optional[str] = None
+    score: float = Field(0.0, description="相關度分數（越高越相關）")
@@ -130,8 +130,9 @@ class RouteMapData(BaseModel):
     zoom_level: int = Field(default=13, ge=1, le=20, description="地圖縮放等級")
     
     # Route polyline
-    polyline: Optional[str] = Field(None, description="路線折線編碼")
-    waypoints: List[Dict[str, Any]] = Field(..., description="路線點座標")
+    polyline: Optional[str] = Field(None, description="路線折線編碼（依縮放等級簡化）")
+    waypoints: List[List[float]] = Field(..., description="路線點座標 [緯度, 經度]")
+    waypoints_polyline: Optional[str] = Field(None, description="路線點座標編碼（format=encoded 時取代 waypoints）")
     
     # Markers
     markers: List[Dict[str, Any]] = Field(..., description="標記點資料")
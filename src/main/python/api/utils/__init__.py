@@ -14,9 +14,20 @@ from .status_utils import (
     normalize_status,
     format_status_for_response
 )
+from .serialization import (
+    FastJSONResponse,
+    RowSerializer,
+    row_serializer
+)
+from .client_lookup import (
+    ClientLookup,
+    get_client_lookup,
+    route_client_ids
+)
 from .query_builders import (
     apply_date_range_filter,
     apply_keyword_search,
+    apply_indexed_search,
     apply_sorting,
     apply_pagination,
     build_filter_conditions
@@ -35,9 +46,18 @@ __all__ = [
     'get_delivery_status_map',
     'normalize_status',
     'format_status_for_response',
+    # serialization
+    'FastJSONResponse',
+    'RowSerializer',
+    'row_serializer',
+    # client_lookup
+    'ClientLookup',
+    'get_client_lookup',
+    'route_client_ids',
     # query_builders
     'apply_date_range_filter',
     'apply_keyword_search',
+    'apply_indexed_search',
     'apply_sorting',
     'apply_pagination',
     'build_filter_conditions'
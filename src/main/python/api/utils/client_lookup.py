@@ -0,0 +1,70 @@
+"""Batched client lookup with a per-request identity cache"""
+import json
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+from core.database import get_db
+from models.database_schema import Client, Route
+
+
+class ClientLookup:
+    """
+    Resolves clients by ID for one request
+
+    IDs are collected up front and fetched with a single IN query per chunk;
+    resolved clients (and misses) are cached so repeated lookups in the same
+    request never go back to the database
+    """
+
+    # SQLite 預設最多 999 個綁定參數
+    CHUNK_SIZE = 500
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._cache: Dict[int, Optional[Client]] = {}
+        self.query_count = 0
+
+    def prefetch(self, client_ids: Iterable[int]) -> None:
+        """
+        Load all not-yet-cached clients in batched IN queries
+
+        Args:
+            client_ids: Client IDs to resolve
+        """
+        missing = list(dict.fromkeys(cid for cid in client_ids if cid is not None and cid not in self._cache))
+        for start in range(0, len(missing), self.CHUNK_SIZE):
+            chunk = missing[start:start + self.CHUNK_SIZE]
+            self.query_count += 1
+            found = {c.id: c for c in self.db.query(Client).filter(Client.id.in_(chunk)).all()}
+            for cid in chunk:
+                self._cache[cid] = found.get(cid)
+
+    def get(self, client_id: Optional[int]) -> Optional[Client]:
+        """Get one client, loading it if it was not prefetched (None for a missing ID)"""
+        if client_id not in self._cache:
+            self.prefetch([client_id])
+        return self._cache.get(client_id)
+
+    def get_many(self, client_ids: Iterable[int]) -> Dict[int, Client]:
+        """Get several clients keyed by ID (missing IDs are omitted)"""
+        client_ids = list(client_ids)
+        self.prefetch(client_ids)
+        return {cid: self._cache[cid] for cid in client_ids if self._cache.get(cid) is not None}
+
+
+def route_client_ids(route: Route) -> List[int]:
+    """Client IDs referenced by a route's route_details points"""
+    if not route.route_details:
+        return []
+    try:
+        details = json.loads(route.route_details)
+    except (TypeError, ValueError):
+        return []
+    return [point['client_id'] for point in details.get('points', []) if 'client_id' in point]
+
+
+def get_client_lookup(db: Session = Depends(get_db)) -> ClientLookup:
+    """FastAPI dependency: one ClientLookup per request, sharing the request's session"""
+    return ClientLookup(db)
@@ -58,6 +58,29 @@ def apply_keyword_search(
         return query.filter(or_(*conditions))
 
 
+def apply_indexed_search(
+    query: Query,
+    model: Any,
+    keyword: str
+) -> Query:
+    """
+    Apply keyword search through the client/driver search index
+    
+    Args:
+        query: The SQLAlchemy query to filter
+        model: Indexed model (Client or Driver)
+        keyword: The search keyword
+        
+    Returns:
+        Filtered query
+    """
+    if not keyword:
+        return query
+    
+    from services.search_service import search_index
+    return query.filter(search_index.filter_clause(query.session, model, keyword))
+
+
 def apply_sorting(
     query: Query,
     order_column: Any,
@@ -0,0 +1,105 @@
+"""Fast JSON serialization utilities for large API responses"""
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple, Type, get_args
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Fallback encoder for types orjson / json cannot serialize natively"""
+    if isinstance(value, Decimal):
+        # 與 Pydantic JSON 輸出一致，Decimal 以字串表示
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "tolist"):
+        # numpy 陣列與純量
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize content to compact UTF-8 JSON bytes
+
+    Args:
+        content: JSON-compatible content (dicts, lists, dates, Decimals, enums)
+
+    Returns:
+        Encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (falls back to the standard library)"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+_MISSING = object()
+
+
+class RowSerializer:
+    """
+    Projects ORM rows or pre-built dicts onto a response schema's fields
+    without running Pydantic validation, for hot list endpoints that return
+    FastJSONResponse directly (the schema is still used for OpenAPI docs)
+    """
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.schema = schema
+        self.fields: List[Tuple[str, Any, bool]] = []
+        for name, field in schema.model_fields.items():
+            if field.default is not PydanticUndefined:
+                default = field.default
+            elif field.default_factory is not None:
+                default = field.default_factory
+            else:
+                default = None
+            is_decimal = field.annotation is Decimal or Decimal in get_args(field.annotation)
+            self.fields.append((name, default, is_decimal))
+
+    def __call__(self, row: Any) -> Dict[str, Any]:
+        get = row.get if isinstance(row, dict) else (lambda name, default: getattr(row, name, default))
+        data = {}
+        for name, default, is_decimal in self.fields:
+            value = get(name, _MISSING)
+            if value is _MISSING or value is None:
+                value = default() if callable(default) else default
+            elif is_decimal and not isinstance(value, str):
+                value = str(Decimal(str(value)))
+            data[name] = value
+        return data
+
+    def many(self, rows: List[Any]) -> List[Dict[str, Any]]:
+        return [self(row) for row in rows]
+
+
+@lru_cache(maxsize=None)
+def row_serializer(schema: Type[BaseModel]) -> RowSerializer:
+    """Get the cached RowSerializer for a response schema"""
+    return RowSerializer(schema)
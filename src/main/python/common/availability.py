@@ -0,0 +1,212 @@
+"""Client availability bitmasks for fast time-window checks.
+
+Availability is an ``int`` bitmask over the minutes of a day: bit ``m`` is set
+when the client can receive a delivery during minute ``[m, m + 1)``. Window
+checks then become integer bit operations instead of datetime arithmetic.
+Python ints are unbounded, so masks relative to a reference midnight may also
+extend past 24:00 for multi-day windows.
+"""
+from datetime import datetime, time
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Tuple
+
+from .minutes import ONE_MINUTE, TimeValue
+
+MINUTES_PER_HOUR = 60
+
+# 客戶資料的營業時段欄位 (start_hour, end_hour, field_name)
+HOURLY_FIELDS = tuple((hour, hour + 1, f'hour_{hour}_{hour + 1}') for hour in range(8, 20))
+TWO_HOUR_FIELDS = tuple((hour, hour + 2, f'hour_{hour}_{hour + 2}') for hour in range(8, 20, 2))
+
+
+def range_mask(start_minute: int, end_minute: int) -> int:
+    """Mask with minutes [start_minute, end_minute) set."""
+    if end_minute <= start_minute:
+        return 0
+    return ((1 << (end_minute - start_minute)) - 1) << start_minute
+
+
+def mask_from_windows(windows: Iterable[Tuple[int, int]]) -> int:
+    """
+    Build a mask from (start_minute, end_minute) windows.
+
+    Args:
+        windows: Windows in minutes since midnight
+
+    Returns:
+        Availability bitmask
+    """
+    mask = 0
+    for start_minute, end_minute in windows:
+        mask |= range_mask(start_minute, end_minute)
+    return mask
+
+
+def mask_from_hour_windows(windows: Iterable[Tuple[int, int]]) -> int:
+    """Build a mask from (start_hour, end_hour) windows."""
+    return mask_from_windows(
+        (start * MINUTES_PER_HOUR, end * MINUTES_PER_HOUR) for start, end in windows or []
+    )
+
+
+@lru_cache(maxsize=None)
+def _mask_for_flags(flags: int, fields: Tuple[Tuple[int, int, str], ...]) -> int:
+    return mask_from_hour_windows(
+        (start, end) for bit, (start, end, _) in enumerate(fields) if flags >> bit & 1
+    )
+
+
+def client_availability_mask(client: Any,
+                             fields: Optional[Tuple[Tuple[int, int, str], ...]] = None) -> int:
+    """
+    Availability mask from a client's hour_X_Y columns.
+
+    Supports both 2-hour slots (hour_8_10) and individual hour slots
+    (hour_8_9), like parse_client_time_windows. Masks are cached per
+    combination of flags, so each client costs one getattr per column.
+
+    Args:
+        client: Client object with hour_X_Y boolean fields
+        fields: Slot fields to read (detected from the client by default)
+
+    Returns:
+        Availability bitmask
+    """
+    if fields is None:
+        has_two_hour_slots = any(hasattr(client, name) for _, _, name in TWO_HOUR_FIELDS)
+        fields = TWO_HOUR_FIELDS if has_two_hour_slots else HOURLY_FIELDS
+
+    flags = 0
+    for bit, (_, _, name) in enumerate(fields):
+        if getattr(client, name, False):
+            flags |= 1 << bit
+    return _mask_for_flags(flags, fields)
+
+
+def overlaps(mask_a: int, mask_b: int) -> bool:
+    """Whether two availabilities share at least one minute."""
+    return mask_a & mask_b != 0
+
+
+def intersect(mask_a: int, mask_b: int) -> int:
+    """Minutes available in both masks."""
+    return mask_a & mask_b
+
+
+def fits(mask: int, start_minute: int, end_minute: int) -> bool:
+    """
+    Whether [start_minute, end_minute) lies entirely within available minutes.
+
+    A zero-length interval fits when it touches an available minute, matching
+    the inclusive ``window_start <= t <= window_end`` comparisons it replaces.
+    """
+    if start_minute < 0:
+        return False
+    if end_minute <= start_minute:
+        return bool(mask >> start_minute & 1) or (start_minute > 0 and bool(mask >> (start_minute - 1) & 1))
+    needed = (1 << (end_minute - start_minute)) - 1
+    return (mask >> start_minute) & needed == needed
+
+
+def earliest_fit(mask: int, duration_minutes: int, not_before: int = 0) -> Optional[int]:
+    """
+    Earliest start minute with duration_minutes of continuous availability.
+
+    Args:
+        mask: Availability bitmask
+        duration_minutes: Required continuous minutes
+        not_before: Earliest allowed start minute
+
+    Returns:
+        Start minute, or None if nothing fits
+    """
+    not_before = max(not_before, 0)
+    runs = mask
+    # After the loop, bit i is set iff minutes i .. i + duration - 1 are all available
+    length = 1
+    while length < duration_minutes:
+        step = min(length, duration_minutes - length)
+        runs &= runs >> step
+        length += step
+
+    runs = runs >> not_before << not_before
+    if not runs:
+        return None
+    return (runs & -runs).bit_length() - 1
+
+
+def mask_windows(mask: int) -> List[Tuple[int, int]]:
+    """
+    Split a mask into maximal (start_minute, end_minute) windows.
+
+    Args:
+        mask: Availability bitmask
+
+    Returns:
+        Sorted, merged windows
+    """
+    windows = []
+    while mask:
+        start = (mask & -mask).bit_length() - 1
+        shifted = mask >> start
+        length = (shifted ^ (shifted + 1)).bit_length() - 1
+        windows.append((start, start + length))
+        mask &= ~range_mask(start, start + length)
+    return windows
+
+
+def available_hours(mask: int) -> List[int]:
+    """Start hours of the whole hours fully covered by the mask."""
+    hour = range_mask(0, MINUTES_PER_HOUR)
+    return [h for h in range(mask.bit_length() // MINUTES_PER_HOUR + 1)
+            if (mask >> (h * MINUTES_PER_HOUR)) & hour == hour]
+
+
+def minutes_to_time(minute: int) -> time:
+    """Minutes since midnight to a time of day."""
+    return time(minute // MINUTES_PER_HOUR, minute % MINUTES_PER_HOUR)
+
+
+def windows_mask(
+    windows: List[Tuple[TimeValue, TimeValue]]
+) -> Optional[Tuple[Optional[TimeValue], int]]:
+    """
+    Convert datetime or minute-offset windows into (reference, mask).
+
+    Args:
+        windows: Windows as datetimes or int minutes
+
+    Returns:
+        (reference, mask) where the reference is the earliest window's
+        midnight (datetimes) or the earliest start (minutes); (None, 0) for no
+        windows; None when a datetime boundary is not on a whole minute
+    """
+    if not windows:
+        return None, 0
+
+    earliest = min(start for start, _ in windows)
+    if isinstance(earliest, int):
+        return earliest, mask_from_windows((start - earliest, end - earliest) for start, end in windows)
+
+    day_start = datetime.combine(earliest.date(), time(0, 0), tzinfo=earliest.tzinfo)
+    mask = 0
+    for window_start, window_end in windows:
+        start, start_rest = divmod(window_start - day_start, ONE_MINUTE)
+        end, end_rest = divmod(window_end - day_start, ONE_MINUTE)
+        if start_rest or end_rest:
+            return None
+        mask |= range_mask(start, end)
+    return day_start, mask
+
+
+def fits_interval(reference: Optional[TimeValue], mask: int,
+                  start: TimeValue, end: TimeValue) -> bool:
+    """Whether an interval fits a mask built by windows_mask."""
+    if reference is None:
+        return False
+    if isinstance(reference, int):
+        return fits(mask, start - reference, end - reference)
+    # Minute-aligned windows: floor the start, ceil the end
+    start_minute = (start - reference) // ONE_MINUTE
+    end_minute = -((reference - end) // ONE_MINUTE)
+    return fits(mask, start_minute, end_minute)
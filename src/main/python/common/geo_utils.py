@@ -1,6 +1,8 @@
 """Geographic utilities for distance calculations and coordinate operations."""
 import math
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional, Sequence
+
+import numpy as np
 
 
 def calculate_haversine_distance(
@@ -39,6 +41,24 @@ def calculate_haversine_distance(
     return distance
 
 
+def calculate_haversine_matrix(points: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """
+    Great circle distances between every pair of points, vectorized.
+    
+    Args:
+        points: (lat, lon) pairs
+        
+    Returns:
+        n x n float array of distances in kilometers
+    """
+    coords = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    lat = coords[:, 0][:, None]
+    lon = coords[:, 1][:, None]
+    
+    a = np.sin((lat.T - lat) / 2) ** 2 + np.cos(lat) * np.cos(lat.T) * np.sin((lon.T - lon) / 2) ** 2
+    return 2 * 6371.0 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
 def calculate_manhattan_distance(
     lat1: float, lon1: float, lat2: float, lon2: float
 ) -> float:
@@ -135,4 +155,110 @@ def validate_coordinates(lat: float, lon: float) -> bool:
     Returns:
         True if valid, False otherwise
     """
-    return -90 <= lat <= 90 and -180 <= lon <= 180
\ No newline at end of file
+    return -90 <= lat <= 90 and -180 <= lon <= 180
+
+
+def encode_polyline(points: Sequence[Tuple[float, float]], precision: int = 5) -> str:
+    """
+    Encode coordinates with the Google Maps encoded polyline algorithm.
+    
+    Args:
+        points: (lat, lon) pairs
+        precision: Decimal places kept (5 as in the Google Maps APIs)
+        
+    Returns:
+        Encoded polyline string
+    """
+    factor = 10 ** precision
+    chunks = []
+    previous = (0, 0)
+    
+    for lat, lon in points:
+        current = (int(round(lat * factor)), int(round(lon * factor)))
+        for delta in (current[0] - previous[0], current[1] - previous[1]):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            chunks.append(chr(value + 63))
+        previous = current
+    
+    return "".join(chunks)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[Tuple[float, float]]:
+    """
+    Decode a Google Maps encoded polyline.
+    
+    Args:
+        encoded: Encoded polyline string
+        precision: Decimal places it was encoded with
+        
+    Returns:
+        List of (lat, lon) pairs
+    """
+    factor = 10 ** precision
+    points = []
+    coordinate = [0, 0]
+    index = 0
+    
+    while index < len(encoded):
+        for axis in (0, 1):
+            result = shift = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            coordinate[axis] += ~(result >> 1) if result & 1 else result >> 1
+        points.append((coordinate[0] / factor, coordinate[1] / factor))
+    
+    return points
+
+
+def simplify_polyline(
+    points: Sequence[Tuple[float, float]],
+    tolerance_m: float
+) -> List[Tuple[float, float]]:
+    """
+    Douglas-Peucker simplification of a polyline.
+    
+    Points are projected onto a local equirectangular plane, which is
+    accurate to well under a meter at the scale of a delivery route.
+    
+    Args:
+        points: (lat, lon) pairs
+        tolerance_m: Largest distance in meters a dropped point may be
+            from the simplified line
+        
+    Returns:
+        Kept (lat, lon) pairs, always including the first and last
+    """
+    points = list(points)
+    if len(points) < 3 or tolerance_m <= 0:
+        return points
+    
+    coords = np.radians(np.asarray(points, dtype=float))
+    xy = np.column_stack((coords[:, 1] * math.cos(coords[:, 0].mean()), coords[:, 0])) * 6371000.0
+    keep = np.zeros(len(points), dtype=bool)
+    keep[[0, -1]] = True
+    
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        segment = xy[last] - xy[first]
+        offsets = xy[first + 1:last] - xy[first]
+        length_sq = float(segment @ segment)
+        along = np.clip(offsets @ segment / length_sq, 0.0, 1.0) if length_sq > 0 else np.zeros(len(offsets))
+        distances = np.hypot(*(offsets - along[:, None] * segment).T)
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance_m:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.extend(((first, split), (split, last)))
+    
+    return [points[i] for i in np.flatnonzero(keep)]
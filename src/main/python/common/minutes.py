@@ -0,0 +1,77 @@
+"""Minute-offset time values for the scheduling core.
+
+Inside the scheduling engine times are plain ``int`` minutes since midnight of
+the scheduling day, which avoids allocating datetime/timedelta objects in the
+algorithms' inner loops. SchedulingEngine converts at its boundary with a
+DayClock. Shared helpers below accept either representation so the scheduling
+classes can still be used directly with datetimes.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import List, Tuple, TypeVar, Union
+
+ONE_MINUTE = timedelta(minutes=1)
+
+TimeValue = Union[datetime, int]
+T = TypeVar('T', datetime, int)
+
+
+def add_minutes(moment: T, minutes: int) -> T:
+    """Add minutes to a datetime or a minute offset."""
+    if isinstance(moment, int):
+        return moment + minutes
+    return moment + timedelta(minutes=minutes)
+
+
+def minutes_between(start: TimeValue, end: TimeValue) -> float:
+    """Minutes from start to end (negative if end is earlier)."""
+    delta = end - start
+    if isinstance(delta, int):
+        return delta
+    return delta.total_seconds() / 60
+
+
+def format_time_value(moment: TimeValue) -> str:
+    """String form used in identifiers (ISO for datetimes)."""
+    if isinstance(moment, int):
+        return str(moment)
+    return moment.isoformat()
+
+
+class DayClock:
+    """Converts between datetimes and minutes since a day's midnight."""
+
+    def __init__(self, day: date):
+        """
+        Initialize clock.
+
+        Args:
+            day: Scheduling day whose midnight is minute 0
+        """
+        self.day_start = datetime.combine(day, time(0, 0))
+
+    def to_minutes(self, moment: TimeValue, round_up: bool = False) -> int:
+        """
+        Datetime to minutes since midnight (ints pass through).
+
+        Args:
+            moment: Datetime to convert
+            round_up: Round partial minutes up instead of down
+
+        Returns:
+            Minute offset
+        """
+        if isinstance(moment, int):
+            return moment
+        if round_up:
+            return -((self.day_start - moment) // ONE_MINUTE)
+        return (moment - self.day_start) // ONE_MINUTE
+
+    def to_datetime(self, minute: TimeValue) -> datetime:
+        """Minutes since midnight to a datetime (datetimes pass through)."""
+        if isinstance(minute, datetime):
+            return minute
+        return self.day_start + timedelta(minutes=minute)
+
+    def windows_to_minutes(self, windows: List[Tuple[TimeValue, TimeValue]]) -> List[Tuple[int, int]]:
+        """Convert windows to minutes, rounding partial minutes inwards."""
+        return [(self.to_minutes(start, round_up=True), self.to_minutes(end)) for start, end in windows]
@@ -8,6 +8,12 @@ from .constraints import (
     TravelTimeConstraint
 )
 from .conflicts import ConflictResolver
+from .evaluator import ConstraintEvaluator
+from .portfolio import PortfolioScheduler, PortfolioMember
+from .ortools_scheduler import ORToolsScheduler
+from .lns import LNSScheduler
+from .insertion import InsertionPlanner, InsertionOption
+from .travel_profile import TravelTimeProfile, TravelObservation
 
 __all__ = [
     'SchedulingEngine',
@@ -18,5 +24,14 @@ __all__ = [
     'CapacityConstraint',
     'DriverAvailabilityConstraint',
     'TravelTimeConstraint',
-    'ConflictResolver'
+    'ConflictResolver',
+    'ConstraintEvaluator',
+    'PortfolioScheduler',
+    'PortfolioMember',
+    'ORToolsScheduler',
+    'LNSScheduler',
+    'InsertionPlanner',
+    'InsertionOption',
+    'TravelTimeProfile',
+    'TravelObservation'
 ]
\ No newline at end of file
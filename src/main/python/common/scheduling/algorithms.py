@@ -2,6 +2,7 @@
 from typing import List, Dict, Tuple, Optional, Any
 from datetime import datetime, timedelta
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
 import random
 import math
 from collections import defaultdict
@@ -12,11 +13,15 @@ from ..time_utils import (
     ScheduleEntry, TimeSlot, calculate_travel_time,
     find_available_slots, optimize_schedule_order
 )
+from ..minutes import add_minutes, minutes_between
 from .models import (
     DeliveryRequest, DriverAvailability, SchedulingParameters,
-    SchedulingResult, OptimizationObjective
+    SchedulingResult, OptimizationObjective, SchedulingProgress, ProgressCallback,
+    DEFAULT_MAX_ITERATIONS
 )
 from .constraints import SchedulingConstraint
+from .evaluator import ConstraintEvaluator
+from .warm_start import WarmStartPlan, build_warm_start
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +29,9 @@ logger = logging.getLogger(__name__)
 class SchedulingAlgorithm(ABC):
     """Abstract base class for scheduling algorithms."""
     
+    # Whether the run honours a progress callback's stop request
+    supports_early_stop = True
+    
     def __init__(self, name: str):
         """Initialize algorithm with name."""
         self.name = name
@@ -33,7 +41,8 @@ class SchedulingAlgorithm(ABC):
                 delivery_requests: List[DeliveryRequest],
                 driver_availability: List[DriverAvailability],
                 parameters: SchedulingParameters,
-                constraints: List[SchedulingConstraint]) -> SchedulingResult:
+                constraints: List[SchedulingConstraint],
+                progress_callback: Optional[ProgressCallback] = None) -> SchedulingResult:
         """
         Generate schedule for deliveries.
         
@@ -42,12 +51,49 @@ class SchedulingAlgorithm(ABC):
             driver_availability: List of available drivers
             parameters: Scheduling parameters
             constraints: List of constraints to satisfy
+            progress_callback: Called with improving incumbents; returning
+                True stops the run early with the best schedule so far
             
         Returns:
             SchedulingResult with optimized schedule
         """
         pass
     
+    def _report_progress(self,
+                         progress_callback: Optional[ProgressCallback],
+                         iteration: int,
+                         start_time: float,
+                         best_score: float,
+                         best_schedule: List[ScheduleEntry],
+                         total_deliveries: int,
+                         improved: bool = True) -> bool:
+        """Report the incumbent; returns True if the callback asked to stop."""
+        if progress_callback is None:
+            return False
+        return bool(progress_callback(SchedulingProgress(
+            algorithm=self.name,
+            iteration=iteration,
+            elapsed=time_module.time() - start_time,
+            best_score=best_score,
+            scheduled=len(best_schedule),
+            unscheduled=total_deliveries - len(best_schedule),
+            schedule=best_schedule,
+            improved=improved
+        )))
+    
+    def _warm_start_plan(self,
+                         delivery_requests: List[DeliveryRequest],
+                         driver_availability: List[DriverAvailability],
+                         parameters: SchedulingParameters) -> Optional[WarmStartPlan]:
+        """Seed schedule from parameters.warm_start, or None when not requested."""
+        if not parameters.warm_start or not driver_availability:
+            return None
+        plan = build_warm_start(
+            delivery_requests, driver_availability, parameters.warm_start, parameters.travel_speed_kmh
+        )
+        logger.info(f"Warm start: {plan.stats}")
+        return plan
+    
     def evaluate_schedule(self, 
                          schedule: List[ScheduleEntry],
                          parameters: SchedulingParameters) -> float:
@@ -146,7 +192,8 @@ class GreedyScheduler(SchedulingAlgorithm):
                 delivery_requests: List[DeliveryRequest],
                 driver_availability: List[DriverAvailability],
                 parameters: SchedulingParameters,
-                constraints: List[SchedulingConstraint]) -> SchedulingResult:
+                constraints: List[SchedulingConstraint],
+                progress_callback: Optional[ProgressCallback] = None) -> SchedulingResult:
         """Generate schedule using greedy approach."""
         start_time = time_module.time()
         schedule = []
@@ -177,16 +224,17 @@ class GreedyScheduler(SchedulingAlgorithm):
                     conflicts = False
                     for existing in driver_entries:
                         if (slot_start < existing.end_time and 
-                            slot_start + timedelta(minutes=request.service_duration) > existing.time_slot.start_time):
+                            add_minutes(slot_start, request.service_duration) > existing.time_slot.start_time):
                             conflicts = True
                             # Try after this delivery
-                            slot_start = existing.end_time + timedelta(minutes=10)
+                            slot_start = add_minutes(existing.end_time, 10)
                     
-                    if not conflicts and slot_start + timedelta(minutes=request.service_duration) <= window_end:
+                    slot_end = add_minutes(slot_start, request.service_duration)
+                    if not conflicts and slot_end <= window_end:
                         # Create schedule entry
                         time_slot = TimeSlot(
                             start_time=slot_start,
-                            end_time=slot_start + timedelta(minutes=request.service_duration)
+                            end_time=slot_end
                         )
                         
                         entry = ScheduleEntry(
@@ -234,12 +282,16 @@ class GreedyScheduler(SchedulingAlgorithm):
         # Detect conflicts
         from ..time_utils import detect_conflicts
         conflicts = detect_conflicts(optimized_schedule)
+        optimization_score = self.evaluate_schedule(optimized_schedule, parameters)
+        
+        self._report_progress(progress_callback, 1, start_time, optimization_score,
+                              optimized_schedule, len(delivery_requests))
         
         return SchedulingResult(
             schedule=optimized_schedule,
             metrics=metrics,
             conflicts=conflicts,
-            optimization_score=self.evaluate_schedule(optimized_schedule, parameters),
+            optimization_score=optimization_score,
             computation_time=computation_time,
             algorithm_used=self.name,
             parameters_used=parameters,
@@ -261,17 +313,21 @@ class GeneticScheduler(SchedulingAlgorithm):
                 delivery_requests: List[DeliveryRequest],
                 driver_availability: List[DriverAvailability],
                 parameters: SchedulingParameters,
-                constraints: List[SchedulingConstraint]) -> SchedulingResult:
+                constraints: List[SchedulingConstraint],
+                progress_callback: Optional[ProgressCallback] = None) -> SchedulingResult:
         """Generate schedule using genetic algorithm."""
         start_time = time_module.time()
         
-        # Generate initial population
+        # Generate initial population, seeded from previous routes if given
+        warm_plan = self._warm_start_plan(delivery_requests, driver_availability, parameters)
         population = self._generate_initial_population(
-            delivery_requests, driver_availability, parameters
+            delivery_requests, driver_availability, parameters, warm_plan
         )
         
         best_schedule = None
         best_score = -float('inf')
+        evaluator = ConstraintEvaluator(constraints)
+        stopped_early = False
         
         for generation in range(self.generations):
             # Evaluate fitness
@@ -283,8 +339,7 @@ class GeneticScheduler(SchedulingAlgorithm):
                 score = self.evaluate_schedule(schedule, parameters)
                 
                 # Penalty for constraint violations
-                for constraint in constraints:
-                    score -= constraint.cost(schedule)
+                score -= evaluator.cost(schedule)
                 
                 fitness_scores.append((score, chromosome, schedule))
             
@@ -292,10 +347,17 @@ class GeneticScheduler(SchedulingAlgorithm):
             fitness_scores.sort(key=lambda x: x[0], reverse=True)
             
             # Update best
-            if fitness_scores[0][0] > best_score:
+            improved = fitness_scores[0][0] > best_score
+            if improved:
                 best_score = fitness_scores[0][0]
                 best_schedule = fitness_scores[0][2]
             
+            # Report the incumbent; the callback may stop the run early
+            if self._report_progress(progress_callback, generation + 1, start_time, best_score,
+                                     best_schedule, len(delivery_requests), improved):
+                stopped_early = True
+                break
+            
             # Check time limit
             if time_module.time() - start_time > parameters.time_limit_seconds:
                 break
@@ -337,8 +399,11 @@ class GeneticScheduler(SchedulingAlgorithm):
                 "drivers_used": len(set(e.driver_id for e in best_schedule)),
                 "total_distance": self._calculate_total_distance(best_schedule),
                 "average_utilization": self._calculate_utilization(best_schedule),
-                "generations_completed": generation + 1
+                "generations_completed": generation + 1,
+                "stopped_early": stopped_early
             }
+            if warm_plan is not None:
+                metrics["warm_start"] = warm_plan.stats
             
             from ..time_utils import detect_conflicts
             conflicts = detect_conflicts(best_schedule)
@@ -369,11 +434,30 @@ class GeneticScheduler(SchedulingAlgorithm):
     def _generate_initial_population(self,
                                    delivery_requests: List[DeliveryRequest],
                                    driver_availability: List[DriverAvailability],
-                                   parameters: SchedulingParameters) -> List[Dict]:
-        """Generate initial population of chromosomes."""
+                                   parameters: SchedulingParameters,
+                                   warm_plan: Optional[WarmStartPlan] = None) -> List[Dict]:
+        """
+        Generate initial population of chromosomes.
+        
+        With a warm start plan, the first half of the population is the
+        seeded chromosome and mutations of it; the rest stays random to keep
+        diversity.
+        """
         population = []
         
-        for _ in range(self.population_size):
+        if warm_plan is not None:
+            seed = {'assignments': {}, 'order': defaultdict(list)}
+            for entry in warm_plan.schedule:
+                seed['assignments'][entry.delivery_id] = (entry.driver_id, entry.time_slot.start_time)
+                seed['order'][entry.driver_id].append(entry.delivery_id)
+            for request in warm_plan.unplaced:
+                self._assign_randomly(seed, request, driver_availability)
+            
+            population.append(seed)
+            while len(population) < max(1, self.population_size // 2):
+                population.append(self._mutate(seed))
+        
+        while len(population) < self.population_size:
             chromosome = {
                 'assignments': {},  # delivery_id -> (driver_id, start_time)
                 'order': {}  # driver_id -> [delivery_ids in order]
@@ -381,18 +465,7 @@ class GeneticScheduler(SchedulingAlgorithm):
             
             # Random assignment
             for request in delivery_requests:
-                driver = random.choice(driver_availability)
-                window = random.choice(request.time_windows)
-                start_time = window[0] + timedelta(
-                    minutes=random.randint(0, 
-                        int((window[1] - window[0]).total_seconds() / 60 - request.service_duration))
-                )
-                
-                chromosome['assignments'][request.delivery_id] = (driver.driver_id, start_time)
-                
-                if driver.driver_id not in chromosome['order']:
-                    chromosome['order'][driver.driver_id] = []
-                chromosome['order'][driver.driver_id].append(request.delivery_id)
+                self._assign_randomly(chromosome, request, driver_availability)
             
             # Shuffle order for each driver
             for driver_id in chromosome['order']:
@@ -402,6 +475,24 @@ class GeneticScheduler(SchedulingAlgorithm):
         
         return population
     
+    def _assign_randomly(self,
+                         chromosome: Dict,
+                         request: DeliveryRequest,
+                         driver_availability: List[DriverAvailability]):
+        """Assign a request to a random driver and start time within one of its windows."""
+        driver = random.choice(driver_availability)
+        window = random.choice(request.time_windows)
+        start_time = add_minutes(
+            window[0],
+            random.randint(0, int(minutes_between(window[0], window[1]) - request.service_duration))
+        )
+        
+        chromosome['assignments'][request.delivery_id] = (driver.driver_id, start_time)
+        
+        if driver.driver_id not in chromosome['order']:
+            chromosome['order'][driver.driver_id] = []
+        chromosome['order'][driver.driver_id].append(request.delivery_id)
+    
     def _chromosome_to_schedule(self,
                               chromosome: Dict,
                               delivery_requests: List[DeliveryRequest],
@@ -416,7 +507,7 @@ class GeneticScheduler(SchedulingAlgorithm):
                 
                 time_slot = TimeSlot(
                     start_time=start_time,
-                    end_time=start_time + timedelta(minutes=request.service_duration)
+                    end_time=add_minutes(start_time, request.service_duration)
                 )
                 
                 entry = ScheduleEntry(
@@ -496,8 +587,9 @@ class GeneticScheduler(SchedulingAlgorithm):
             
         elif mutation_type == 'reorder' and mutated['order']:
             # Shuffle one driver's route
-            driver_id = random.choice([d for d in mutated['order'] if len(mutated['order'][d]) > 1])
-            random.shuffle(mutated['order'][driver_id])
+            shufflable = [d for d in mutated['order'] if len(mutated['order'][d]) > 1]
+            if shufflable:
+                random.shuffle(mutated['order'][random.choice(shufflable)])
             
         elif mutation_type == 'retime' and mutated['assignments']:
             # Change start time
@@ -506,68 +598,207 @@ class GeneticScheduler(SchedulingAlgorithm):
             
             # Random time shift
             shift_minutes = random.randint(-30, 30)
-            new_time = old_time + timedelta(minutes=shift_minutes)
+            new_time = add_minutes(old_time, shift_minutes)
             mutated['assignments'][delivery_id] = (driver_id, new_time)
         
         return mutated
 
 
+@dataclass(slots=True)
+class ScheduleMove:
+    """
+    A neighbourhood move on a schedule list.
+    
+    Entries are never mutated: a move records (index, old_entry, new_entry)
+    for each position it changes, so applying or undoing it only rebinds
+    list slots and costs O(1) regardless of schedule size.
+    """
+    operation: str
+    changes: List[Tuple[int, ScheduleEntry, ScheduleEntry]]
+    
+    def apply(self, schedule: List[ScheduleEntry]):
+        """Apply the move to the schedule in place."""
+        for index, _, new_entry in self.changes:
+            schedule[index] = new_entry
+    
+    def undo(self, schedule: List[ScheduleEntry]):
+        """Revert the move on a schedule it was applied to."""
+        for index, old_entry, _ in reversed(self.changes):
+            schedule[index] = old_entry
+
+
 class SimulatedAnnealingScheduler(SchedulingAlgorithm):
-    """Simulated annealing algorithm for schedule optimization."""
+    """
+    Simulated annealing algorithm for schedule optimization.
     
-    def __init__(self, initial_temperature: float = 100.0, cooling_rate: float = 0.95):
-        """Initialize simulated annealing scheduler."""
+    The run is budgeted by parameters.time_limit_seconds; when
+    parameters.max_iterations is set the run also stops there, whichever
+    is reached first, and the cooling schedule follows the tighter of the
+    two budgets. Without a time limit the iteration budget defaults to
+    DEFAULT_MAX_ITERATIONS. The starting
+    temperature is calibrated from sampled move deltas, and every
+    adapt_window iterations the temperature is cooled or warmed so the
+    acceptance rate follows a target that decays over the budget. When the
+    best score has not improved for restart_windows windows the search
+    restarts from the best solution with a reheated temperature.
+    """
+    
+    MIN_TEMPERATURE = 1e-6
+    
+    def __init__(self,
+                 initial_temperature: float = 100.0,
+                 cooling_rate: float = 0.95,
+                 initial_acceptance: float = 0.5,
+                 final_acceptance: float = 0.01,
+                 adapt_window: int = 50,
+                 restart_windows: int = 10,
+                 calibration_samples: int = 30,
+                 max_trace_points: int = 200):
+        """
+        Initialize simulated annealing scheduler.
+        
+        Args:
+            initial_temperature: Upper bound for the calibrated starting temperature
+            cooling_rate: Temperature factor applied per adaptation window
+            initial_acceptance: Target acceptance rate at the start of the budget
+            final_acceptance: Target acceptance rate at the end of the budget
+            adapt_window: Iterations between temperature adjustments
+            restart_windows: Windows without a new best before restarting
+            calibration_samples: Moves sampled to calibrate the temperature
+            max_trace_points: Maximum entries kept in metrics['trace']
+        """
         super().__init__("Simulated Annealing Scheduler")
         self.initial_temperature = initial_temperature
         self.cooling_rate = cooling_rate
+        self.initial_acceptance = initial_acceptance
+        self.final_acceptance = final_acceptance
+        self.adapt_window = adapt_window
+        self.restart_windows = restart_windows
+        self.calibration_samples = calibration_samples
+        self.max_trace_points = max_trace_points
     
     def schedule(self,
                 delivery_requests: List[DeliveryRequest],
                 driver_availability: List[DriverAvailability],
                 parameters: SchedulingParameters,
-                constraints: List[SchedulingConstraint]) -> SchedulingResult:
+                constraints: List[SchedulingConstraint],
+                progress_callback: Optional[ProgressCallback] = None) -> SchedulingResult:
         """Generate schedule using simulated annealing."""
         start_time = time_module.time()
         
-        # Generate initial solution using greedy
-        greedy = GreedyScheduler()
-        initial_result = greedy.schedule(
-            delivery_requests, driver_availability, parameters, constraints
-        )
+        # Start from the previous routes if given, else from the greedy solution
+        warm_plan = self._warm_start_plan(delivery_requests, driver_availability, parameters)
+        if warm_plan is not None:
+            # Moves never add deliveries, so the seed must hold every request
+            initial_schedule = self._insert_unplaced(
+                warm_plan.schedule, warm_plan.unplaced, driver_availability
+            )
+        else:
+            greedy = GreedyScheduler()
+            initial_schedule = greedy.schedule(
+                delivery_requests, driver_availability, parameters, constraints
+            ).schedule
+        evaluator = ConstraintEvaluator(constraints)
+        
+        def score(schedule: List[ScheduleEntry]) -> float:
+            return self.evaluate_schedule(schedule, parameters) - evaluator.cost(schedule)
         
-        current_solution = initial_result.schedule
-        current_score = initial_result.optimization_score
+        # The current solution is one list updated by applying and undoing
+        # moves; it is only copied when a new best is found
+        current_solution = list(initial_schedule)
+        current_score = score(current_solution)
         
-        best_solution = current_solution.copy()
+        best_solution = list(current_solution)
         best_score = current_score
         
-        temperature = self.initial_temperature
-        iteration = 0
+        drivers = sorted(set(e.driver_id for e in current_solution))
+        start_temperature = self._calibrate_temperature(current_solution, drivers, current_score, score)
+        temperature = start_temperature
         
-        while temperature > 0.1 and time_module.time() - start_time < parameters.time_limit_seconds:
-            # Generate neighbor solution
-            neighbor = self._generate_neighbor(current_solution, delivery_requests)
-            neighbor_score = self.evaluate_schedule(neighbor, parameters)
-            
-            # Apply penalty for constraints
-            for constraint in constraints:
-                neighbor_score -= constraint.cost(neighbor)
+        iteration = 0
+        total_accepted = 0
+        window_proposed = window_accepted = 0
+        window_best = best_score
+        stale_windows = 0
+        restarts = 0
+        trace = []
+        trace_every = 1  # adaptation windows between trace points
+        windows = 0
+        reported_score = None
+        stopped_early = False
+        
+        while current_solution:
+            progress = self._progress(start_time, iteration, parameters)
+            if progress >= 1.0:
+                break
             
-            # Accept or reject
-            delta = neighbor_score - current_score
+            # Generate neighbor solution
+            move = self._propose_move(current_solution, drivers)
             
-            if delta > 0 or random.random() < math.exp(delta / temperature):
-                current_solution = neighbor
-                current_score = neighbor_score
+            if move is not None:
+                move.apply(current_solution)
+                neighbor_score = score(current_solution)
+                window_proposed += 1
+                
+                # Accept or reject
+                delta = neighbor_score - current_score
                 
-                if current_score > best_score:
-                    best_solution = current_solution.copy()
-                    best_score = current_score
+                if delta > 0 or random.random() < math.exp(delta / temperature):
+                    current_score = neighbor_score
+                    window_accepted += 1
+                    
+                    if current_score > best_score:
+                        best_solution = list(current_solution)
+                        best_score = current_score
+                else:
+                    move.undo(current_solution)
             
-            # Cool down
-            temperature *= self.cooling_rate
             iteration += 1
+            if iteration % self.adapt_window:
+                continue
+            
+            # Steer the acceptance rate toward a target that decays over the budget
+            acceptance = window_accepted / window_proposed if window_proposed else 0.0
+            target = self.initial_acceptance * (self.final_acceptance / self.initial_acceptance) ** progress
+            if acceptance > target:
+                temperature = max(temperature * self.cooling_rate, self.MIN_TEMPERATURE)
+            else:
+                temperature = min(temperature / self.cooling_rate, start_temperature)
+            total_accepted += window_accepted
+            window_proposed = window_accepted = 0
+            
+            # Restart from the best solution when the search stagnates
+            stale_windows = 0 if best_score > window_best else stale_windows + 1
+            window_best = best_score
+            if stale_windows >= self.restart_windows:
+                current_solution = list(best_solution)
+                current_score = best_score
+                temperature = max(temperature, start_temperature * (1.0 - progress))
+                stale_windows = 0
+                restarts += 1
+            
+            windows += 1
+            if windows % trace_every == 0:
+                trace.append({
+                    "iteration": iteration,
+                    "elapsed": round(time_module.time() - start_time, 4),
+                    "temperature": temperature,
+                    "current_score": current_score,
+                    "best_score": best_score
+                })
+                if len(trace) > self.max_trace_points:
+                    trace = trace[1::2]
+                    trace_every *= 2
+            
+            # Report the incumbent once per window; the callback may stop the run early
+            improved = reported_score is None or best_score > reported_score
+            reported_score = best_score
+            if self._report_progress(progress_callback, iteration, start_time, best_score,
+                                     best_solution, len(delivery_requests), improved):
+                stopped_early = True
+                break
         
+        total_accepted += window_accepted
         computation_time = time_module.time() - start_time
         
         # Calculate final metrics
@@ -579,8 +810,15 @@ class SimulatedAnnealingScheduler(SchedulingAlgorithm):
             "total_distance": self._calculate_total_distance(best_solution),
             "average_utilization": self._calculate_utilization(best_solution),
             "iterations": iteration,
-            "final_temperature": temperature
+            "initial_temperature": start_temperature,
+            "final_temperature": temperature,
+            "acceptance_rate": total_accepted / iteration if iteration else 0.0,
+            "restarts": restarts,
+            "trace": trace,
+            "stopped_early": stopped_early
         }
+        if warm_plan is not None:
+            metrics["warm_start"] = warm_plan.stats
         
         from ..time_utils import detect_conflicts
         conflicts = detect_conflicts(best_solution)
@@ -596,43 +834,160 @@ class SimulatedAnnealingScheduler(SchedulingAlgorithm):
             success=True
         )
     
+    def _insert_unplaced(self,
+                         schedule: List[ScheduleEntry],
+                         unplaced: List[DeliveryRequest],
+                         driver_availability: List[DriverAvailability]) -> List[ScheduleEntry]:
+        """
+        Add requests the warm start could not place to its schedule.
+        
+        Each request, by priority and earliest window, takes the earliest
+        start on any driver that does not overlap that driver's deliveries;
+        if none fits it starts at its earliest window on the least busy
+        driver and the constraint penalty leaves the repair to annealing.
+        """
+        schedule = list(schedule)
+        ordered = sorted(unplaced, key=lambda r: (-r.priority, min(tw[0] for tw in r.time_windows)))
+        
+        for request in ordered:
+            best = None  # (start, driver)
+            for driver in driver_availability:
+                busy = sorted((e.time_slot.start_time, e.end_time)
+                              for e in schedule if e.driver_id == driver.driver_id)
+                for window_start, window_end in request.time_windows:
+                    start = window_start
+                    for busy_start, busy_end in busy:
+                        if start < busy_end and add_minutes(start, request.service_duration) > busy_start:
+                            start = busy_end
+                    if add_minutes(start, request.service_duration) <= window_end:
+                        if best is None or start < best[0]:
+                            best = (start, driver)
+            
+            if best is None:
+                loads = defaultdict(int)
+                for entry in schedule:
+                    loads[entry.driver_id] += 1
+                best = (min(tw[0] for tw in request.time_windows),
+                        min(driver_availability, key=lambda d: loads[d.driver_id]))
+            
+            start, driver = best
+            schedule.append(ScheduleEntry(
+                delivery_id=request.delivery_id,
+                client_id=request.client_id,
+                driver_id=driver.driver_id,
+                vehicle_id=driver.vehicle_id or 1,
+                time_slot=TimeSlot(start_time=start, end_time=add_minutes(start, request.service_duration)),
+                service_duration=request.service_duration,
+                priority=request.priority,
+                location=request.location
+            ))
+        
+        return schedule
+    
+    @staticmethod
+    def _progress(start_time: float, iteration: int, parameters: SchedulingParameters) -> float:
+        """Fraction of the time or iteration budget used, whichever is larger."""
+        progress = 0.0
+        if parameters.time_limit_seconds:
+            progress = (time_module.time() - start_time) / parameters.time_limit_seconds
+        if parameters.max_iterations:
+            progress = max(progress, iteration / parameters.max_iterations)
+        elif not parameters.time_limit_seconds:
+            progress = iteration / DEFAULT_MAX_ITERATIONS
+        return progress
+    
+    def _calibrate_temperature(self,
+                               current: List[ScheduleEntry],
+                               drivers: List[int],
+                               current_score: float,
+                               score) -> float:
+        """
+        Starting temperature accepting an average worsening move with
+        probability initial_acceptance, capped at initial_temperature.
+        
+        Args:
+            current: Current schedule (left unchanged)
+            drivers: Driver IDs for reassignment moves
+            current_score: Score of current
+            score: Scoring function for a schedule
+            
+        Returns:
+            Starting temperature
+        """
+        worsening = []
+        for _ in range(self.calibration_samples):
+            move = self._propose_move(current, drivers)
+            if move is None:
+                continue
+            move.apply(current)
+            delta = score(current) - current_score
+            move.undo(current)
+            if delta < 0:
+                worsening.append(-delta)
+        
+        if not worsening:
+            return self.initial_temperature
+        temperature = (sum(worsening) / len(worsening)) / -math.log(self.initial_acceptance)
+        return min(max(temperature, self.MIN_TEMPERATURE), self.initial_temperature)
+    
     def _generate_neighbor(self, 
                          current: List[ScheduleEntry],
                          delivery_requests: List[DeliveryRequest]) -> List[ScheduleEntry]:
-        """Generate neighbor solution."""
-        neighbor = [entry for entry in current]  # Deep copy would be better
+        """Generate neighbor solution as a new list; current is left untouched."""
+        neighbor = list(current)
+        move = self._propose_move(neighbor, sorted(set(e.driver_id for e in neighbor)))
+        if move is not None:
+            move.apply(neighbor)
+        return neighbor
+    
+    def _propose_move(self,
+                      current: List[ScheduleEntry],
+                      drivers: List[int]) -> Optional[ScheduleMove]:
+        """
+        Propose a random swap, move or shift without applying it.
         
-        if not neighbor:
-            return neighbor
+        Args:
+            current: Current schedule
+            drivers: Driver IDs deliveries may be moved between
+            
+        Returns:
+            ScheduleMove, or None if the chosen operation is not possible
+        """
+        if not current:
+            return None
         
         # Random perturbation
         operation = random.choice(['swap', 'move', 'shift'])
         
-        if operation == 'swap' and len(neighbor) >= 2:
-            # Swap two deliveries
-            idx1, idx2 = random.sample(range(len(neighbor)), 2)
-            
-            # Swap time slots
-            neighbor[idx1].time_slot, neighbor[idx2].time_slot = \
-                neighbor[idx2].time_slot, neighbor[idx1].time_slot
+        if operation == 'swap' and len(current) >= 2:
+            # Swap time slots of two deliveries
+            idx1, idx2 = random.sample(range(len(current)), 2)
+            first, second = current[idx1], current[idx2]
+            return ScheduleMove(operation, [
+                (idx1, first, replace(first, time_slot=second.time_slot)),
+                (idx2, second, replace(second, time_slot=first.time_slot))
+            ])
                 
         elif operation == 'move':
             # Move delivery to different driver
-            entry = random.choice(neighbor)
-            drivers = list(set(e.driver_id for e in neighbor))
+            idx = random.randrange(len(current))
+            entry = current[idx]
             
             if len(drivers) > 1:
                 new_driver = random.choice([d for d in drivers if d != entry.driver_id])
-                entry.driver_id = new_driver
+                return ScheduleMove(operation, [(idx, entry, replace(entry, driver_id=new_driver))])
                 
         elif operation == 'shift':
             # Shift delivery time
-            entry = random.choice(neighbor)
+            idx = random.randrange(len(current))
+            entry = current[idx]
             shift_minutes = random.randint(-30, 30)
             
-            new_start = entry.time_slot.start_time + timedelta(minutes=shift_minutes)
-            new_end = new_start + timedelta(minutes=entry.service_duration)
+            new_start = add_minutes(entry.time_slot.start_time, shift_minutes)
+            new_end = add_minutes(new_start, entry.service_duration)
             
-            entry.time_slot = TimeSlot(start_time=new_start, end_time=new_end)
+            return ScheduleMove(operation, [
+                (idx, entry, replace(entry, time_slot=TimeSlot(start_time=new_start, end_time=new_end)))
+            ])
         
-        return neighbor
\ No newline at end of file
+        return None
@@ -2,16 +2,144 @@
 from typing import List, Dict, Optional, Tuple, Any
 from datetime import datetime, timedelta
 from collections import defaultdict
+from bisect import bisect_left, insort
 import logging
 
 from ..time_utils import (
     ScheduleEntry, SchedulingConflict, ConflictType, 
-    TimeSlot, detect_conflicts, calculate_travel_time
+    TimeSlot, check_consecutive_entries, calculate_travel_time
 )
+from ..minutes import add_minutes, TimeValue
 from .models import DeliveryRequest, DriverAvailability
 
 logger = logging.getLogger(__name__)
 
+# Conflict types detected between consecutive deliveries of one driver
+PAIR_CONFLICT_TYPES = (ConflictType.TIME_OVERLAP, ConflictType.TRAVEL_TIME_INSUFFICIENT)
+
+
+class ScheduleIndex:
+    """
+    Index over a schedule being repaired.
+    
+    Keeps a delivery-id -> position map, per-driver timelines sorted by
+    start time and per-driver / per-vehicle loads, so fixes update in
+    O(log k) and conflict re-checks only look at a driver's neighbours.
+    """
+    
+    def __init__(self, schedule: List[ScheduleEntry]):
+        """
+        Build index.
+        
+        Args:
+            schedule: Schedule entries (updated in place through the index)
+        """
+        self.schedule = schedule
+        self.positions: Dict[int, int] = {}
+        self.timelines: Dict[int, List[Tuple[TimeValue, int]]] = defaultdict(list)
+        self.driver_loads: Dict[int, int] = defaultdict(int)
+        self.vehicle_loads: Dict[int, int] = defaultdict(int)
+        
+        for position, entry in enumerate(schedule):
+            self.positions.setdefault(entry.delivery_id, position)
+            self.timelines[entry.driver_id].append(self._key(position))
+            self.driver_loads[entry.driver_id] += 1
+            self.vehicle_loads[entry.vehicle_id] += 1
+        
+        for timeline in self.timelines.values():
+            timeline.sort()
+    
+    def _key(self, position: int) -> Tuple[TimeValue, int]:
+        # Position breaks ties the same way a stable sort by start time would
+        return (self.schedule[position].time_slot.start_time, position)
+    
+    def get(self, delivery_id: int) -> Optional[ScheduleEntry]:
+        """Get the schedule entry of a delivery."""
+        position = self.positions.get(delivery_id)
+        return self.schedule[position] if position is not None else None
+    
+    def move(self, delivery_id: int,
+             time_slot: Optional[TimeSlot] = None,
+             driver_id: Optional[int] = None) -> bool:
+        """
+        Change a delivery's time slot and/or driver, keeping timelines sorted.
+        
+        Returns:
+            True if the delivery exists in the schedule
+        """
+        position = self.positions.get(delivery_id)
+        if position is None:
+            return False
+        
+        entry = self.schedule[position]
+        timeline = self.timelines[entry.driver_id]
+        del timeline[bisect_left(timeline, self._key(position))]
+        
+        if time_slot is not None:
+            entry.time_slot = time_slot
+        if driver_id is not None and driver_id != entry.driver_id:
+            self.driver_loads[entry.driver_id] -= 1
+            self.driver_loads[driver_id] += 1
+            entry.driver_id = driver_id
+        
+        insort(self.timelines[entry.driver_id], self._key(position))
+        return True
+    
+    def set_vehicle(self, delivery_id: int, vehicle_id: int) -> bool:
+        """Reassign a delivery to another vehicle."""
+        entry = self.get(delivery_id)
+        if entry is None:
+            return False
+        self.vehicle_loads[entry.vehicle_id] -= 1
+        self.vehicle_loads[vehicle_id] += 1
+        entry.vehicle_id = vehicle_id
+        return True
+    
+    def has_overlap(self, driver_id: int, slot: TimeSlot, exclude_delivery_id: int) -> bool:
+        """Check whether a slot overlaps any other delivery of the driver."""
+        timeline = self.timelines.get(driver_id, [])
+        # Only entries starting before the slot ends can overlap it
+        end = bisect_left(timeline, (slot.end_time, -1))
+        for _, position in timeline[:end]:
+            other = self.schedule[position]
+            if other.delivery_id != exclude_delivery_id and slot.overlaps_with(other.time_slot):
+                return True
+        return False
+    
+    def neighbours(self, delivery_id: int) -> Tuple[Optional[ScheduleEntry], Optional[ScheduleEntry]]:
+        """Get the previous and next delivery on the same driver's timeline."""
+        position = self.positions.get(delivery_id)
+        if position is None:
+            return None, None
+        
+        timeline = self.timelines[self.schedule[position].driver_id]
+        idx = bisect_left(timeline, self._key(position))
+        previous = self.schedule[timeline[idx - 1][1]] if idx > 0 else None
+        following = self.schedule[timeline[idx + 1][1]] if idx + 1 < len(timeline) else None
+        return previous, following
+    
+    def conflict_persists(self, conflict: SchedulingConflict) -> bool:
+        """
+        Re-check a pair conflict against the current neighbours only.
+        
+        Equivalent to running detect_conflicts on the whole schedule and
+        looking for the same conflict type on the same deliveries.
+        """
+        if conflict.conflict_type not in PAIR_CONFLICT_TYPES or len(conflict.entries) < 2:
+            return False
+        
+        first_id, second_id = conflict.entries[0].delivery_id, conflict.entries[1].delivery_id
+        previous, following = self.neighbours(first_id)
+        
+        if following is not None and following.delivery_id == second_id:
+            pair = (self.get(first_id), following)
+        elif previous is not None and previous.delivery_id == second_id:
+            pair = (previous, self.get(first_id))
+        else:
+            return False
+        
+        return any(c.conflict_type == conflict.conflict_type for c in check_consecutive_entries(*pair))
+
 
 class ConflictResolver:
     """Resolves scheduling conflicts using various strategies."""
@@ -48,6 +176,7 @@ class ConflictResolver:
             Tuple of (updated_schedule, remaining_conflicts)
         """
         resolved_schedule = schedule.copy()
+        index = ScheduleIndex(resolved_schedule)
         remaining_conflicts = []
         
         # Sort conflicts by severity (highest first)
@@ -61,24 +190,20 @@ class ConflictResolver:
                 attempts += 1
                 
                 if conflict.conflict_type == ConflictType.TIME_OVERLAP:
-                    resolved = self._resolve_time_overlap(resolved_schedule, conflict)
+                    resolved = self._resolve_time_overlap(index, conflict)
                 elif conflict.conflict_type == ConflictType.TRAVEL_TIME_INSUFFICIENT:
-                    resolved = self._resolve_travel_time(resolved_schedule, conflict)
+                    resolved = self._resolve_travel_time(index, conflict)
                 elif conflict.conflict_type == ConflictType.TIME_WINDOW_VIOLATION:
-                    resolved = self._resolve_time_window(resolved_schedule, conflict)
+                    resolved = self._resolve_time_window(index, conflict)
                 elif conflict.conflict_type == ConflictType.CAPACITY_EXCEEDED:
-                    resolved = self._resolve_capacity(resolved_schedule, conflict)
+                    resolved = self._resolve_capacity(index, conflict)
                 elif conflict.conflict_type == ConflictType.DRIVER_UNAVAILABLE:
-                    resolved = self._resolve_driver_availability(resolved_schedule, conflict)
+                    resolved = self._resolve_driver_availability(index, conflict)
                 
                 if resolved:
                     logger.info(f"Resolved conflict: {conflict.conflict_type.value}")
-                    # Re-detect conflicts after resolution
-                    new_conflicts = detect_conflicts(resolved_schedule)
-                    if not any(c.conflict_type == conflict.conflict_type and 
-                             set(e.delivery_id for e in c.entries) == 
-                             set(e.delivery_id for e in conflict.entries) 
-                             for c in new_conflicts):
+                    # Re-check only the affected driver's neighbours
+                    if not index.conflict_persists(conflict):
                         break
                     else:
                         resolved = False
@@ -89,7 +214,7 @@ class ConflictResolver:
         
         return resolved_schedule, remaining_conflicts
     
-    def _resolve_time_overlap(self, schedule: List[ScheduleEntry], 
+    def _resolve_time_overlap(self, index: ScheduleIndex, 
                             conflict: SchedulingConflict) -> bool:
         """Resolve time overlap conflicts."""
         if len(conflict.entries) < 2:
@@ -99,33 +224,21 @@ class ConflictResolver:
         entry1, entry2 = conflict.entries[0], conflict.entries[1]
         
         # Find alternative time slot for entry2
-        new_start = entry1.end_time + timedelta(minutes=5)
+        new_start = add_minutes(entry1.end_time, 5)
         new_slot = TimeSlot(
             start_time=new_start,
-            end_time=new_start + timedelta(minutes=entry2.service_duration)
+            end_time=add_minutes(new_start, entry2.service_duration)
         )
         
         # Check if new slot is within client time windows
-        if entry2.delivery_id in self.delivery_requests:
-            request = self.delivery_requests[entry2.delivery_id]
-            valid_slot = False
-            
-            for window_start, window_end in request.time_windows:
-                if new_slot.start_time >= window_start and new_slot.end_time <= window_end:
-                    valid_slot = True
-                    break
-            
-            if valid_slot:
-                # Update schedule
-                for i, entry in enumerate(schedule):
-                    if entry.delivery_id == entry2.delivery_id:
-                        schedule[i].time_slot = new_slot
-                        return True
+        if self._is_slot_valid_for_delivery(new_slot, entry2.delivery_id):
+            if index.move(entry2.delivery_id, time_slot=new_slot):
+                return True
         
         # Try reassigning to different driver
-        return self._reassign_delivery(schedule, entry2)
+        return self._reassign_delivery(index, entry2)
     
-    def _resolve_travel_time(self, schedule: List[ScheduleEntry], 
+    def _resolve_travel_time(self, index: ScheduleIndex, 
                            conflict: SchedulingConflict) -> bool:
         """Resolve insufficient travel time conflicts."""
         if len(conflict.entries) < 2:
@@ -141,23 +254,20 @@ class ConflictResolver:
             
             # Add buffer time
             required_gap = travel_time + 10  # 10 minutes buffer
-            new_start = entry1.end_time + timedelta(minutes=required_gap)
+            new_start = add_minutes(entry1.end_time, required_gap)
             
             new_slot = TimeSlot(
                 start_time=new_start,
-                end_time=new_start + timedelta(minutes=entry2.service_duration)
+                end_time=add_minutes(new_start, entry2.service_duration)
             )
             
             # Update if within time windows
             if self._is_slot_valid_for_delivery(new_slot, entry2.delivery_id):
-                for i, entry in enumerate(schedule):
-                    if entry.delivery_id == entry2.delivery_id:
-                        schedule[i].time_slot = new_slot
-                        return True
+                return index.move(entry2.delivery_id, time_slot=new_slot)
         
         return False
     
-    def _resolve_time_window(self, schedule: List[ScheduleEntry], 
+    def _resolve_time_window(self, index: ScheduleIndex, 
                            conflict: SchedulingConflict) -> bool:
         """Resolve time window violations."""
         for entry in conflict.entries:
@@ -166,61 +276,41 @@ class ConflictResolver:
                 
                 # Find first available slot within time windows
                 for window_start, window_end in request.time_windows:
-                    slot_duration = timedelta(minutes=entry.service_duration)
-                    
                     # Try slots at 15-minute intervals
                     current_time = window_start
-                    while current_time + slot_duration <= window_end:
+                    while add_minutes(current_time, entry.service_duration) <= window_end:
                         new_slot = TimeSlot(
                             start_time=current_time,
-                            end_time=current_time + slot_duration
+                            end_time=add_minutes(current_time, entry.service_duration)
                         )
                         
-                        # Check if slot conflicts with other deliveries
-                        has_conflict = False
-                        for other_entry in schedule:
-                            if (other_entry.delivery_id != entry.delivery_id and
-                                other_entry.driver_id == entry.driver_id and
-                                new_slot.overlaps_with(other_entry.time_slot)):
-                                has_conflict = True
-                                break
-                        
-                        if not has_conflict:
-                            # Update schedule
-                            for i, sched_entry in enumerate(schedule):
-                                if sched_entry.delivery_id == entry.delivery_id:
-                                    schedule[i].time_slot = new_slot
-                                    return True
+                        # Check if slot conflicts with the driver's other deliveries
+                        if not index.has_overlap(entry.driver_id, new_slot, entry.delivery_id):
+                            if index.move(entry.delivery_id, time_slot=new_slot):
+                                return True
                         
-                        current_time += timedelta(minutes=15)
+                        current_time = add_minutes(current_time, 15)
         
         return False
     
-    def _resolve_capacity(self, schedule: List[ScheduleEntry], 
+    def _resolve_capacity(self, index: ScheduleIndex, 
                         conflict: SchedulingConflict) -> bool:
         """Resolve capacity exceeded conflicts."""
-        # Group deliveries by vehicle
-        vehicle_deliveries = defaultdict(list)
-        for entry in schedule:
-            vehicle_deliveries[entry.vehicle_id].append(entry)
-        
         # Try to redistribute deliveries
         for entry in conflict.entries:
             # Find alternative vehicle with capacity
-            for vehicle_id, deliveries in vehicle_deliveries.items():
-                if vehicle_id != entry.vehicle_id:
+            for vehicle_id, load in index.vehicle_loads.items():
+                if vehicle_id != entry.vehicle_id and load > 0:
                     # Check if vehicle has capacity
                     # This is simplified - in reality would check actual capacity
-                    if len(deliveries) < 15:  # Assume max 15 deliveries per vehicle
+                    if load < 15:  # Assume max 15 deliveries per vehicle
                         # Reassign to this vehicle
-                        for i, sched_entry in enumerate(schedule):
-                            if sched_entry.delivery_id == entry.delivery_id:
-                                schedule[i].vehicle_id = vehicle_id
-                                return True
+                        if index.set_vehicle(entry.delivery_id, vehicle_id):
+                            return True
         
         return False
     
-    def _resolve_driver_availability(self, schedule: List[ScheduleEntry], 
+    def _resolve_driver_availability(self, index: ScheduleIndex, 
                                    conflict: SchedulingConflict) -> bool:
         """Resolve driver unavailability conflicts."""
         for entry in conflict.entries:
@@ -232,23 +322,19 @@ class ConflictResolver:
                         if (entry.time_slot.start_time >= period_start and 
                             entry.end_time <= period_end):
                             # Reassign to available driver
-                            for i, sched_entry in enumerate(schedule):
-                                if sched_entry.delivery_id == entry.delivery_id:
-                                    schedule[i].driver_id = driver_id
-                                    return True
+                            if index.move(entry.delivery_id, driver_id=driver_id):
+                                return True
         
         return False
     
-    def _reassign_delivery(self, schedule: List[ScheduleEntry], 
+    def _reassign_delivery(self, index: ScheduleIndex, 
                          entry: ScheduleEntry) -> bool:
         """Try to reassign delivery to different driver."""
-        # Find drivers with fewer deliveries
-        driver_loads = defaultdict(int)
-        for sched_entry in schedule:
-            driver_loads[sched_entry.driver_id] += 1
-        
-        # Sort drivers by load
-        sorted_drivers = sorted(driver_loads.items(), key=lambda x: x[1])
+        # Sort drivers by load (loads are kept up to date by the index)
+        sorted_drivers = sorted(
+            ((driver_id, load) for driver_id, load in index.driver_loads.items() if load > 0),
+            key=lambda x: x[1]
+        )
         
         for driver_id, load in sorted_drivers:
             if driver_id != entry.driver_id and load < 20:  # Max 20 deliveries
@@ -259,10 +345,8 @@ class ConflictResolver:
                         if (entry.time_slot.start_time >= period_start and 
                             entry.end_time <= period_end):
                             # Reassign
-                            for i, sched_entry in enumerate(schedule):
-                                if sched_entry.delivery_id == entry.delivery_id:
-                                    schedule[i].driver_id = driver_id
-                                    return True
+                            if index.move(entry.delivery_id, driver_id=driver_id):
+                                return True
         
         return False
     
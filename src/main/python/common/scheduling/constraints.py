@@ -4,7 +4,10 @@ from datetime import datetime, timedelta
 from collections import defaultdict
 
 from ..time_utils import SchedulingConstraint, ScheduleEntry, calculate_travel_time
+from ..availability import windows_mask, fits_interval
+from ..minutes import minutes_between
 from .models import DriverAvailability, VehicleInfo
+from .travel_profile import TravelTimeProfile
 
 
 class TimeWindowConstraint(SchedulingConstraint):
@@ -19,27 +22,39 @@ class TimeWindowConstraint(SchedulingConstraint):
         """
         super().__init__(name="Time Window Constraint", is_hard=True)
         self.time_windows = time_windows
+        self._masks: Optional[Dict[int, Optional[Tuple[Any, int]]]] = None
+    
+    @property
+    def masks(self) -> Dict[int, Optional[Tuple[Any, int]]]:
+        """client_id -> (reference, availability bitmask); None if not minute-aligned.
+        
+        Compiled on first use, since schedulers that never check constraints
+        (greedy) should not pay for it.
+        """
+        if self._masks is None:
+            self._masks = {
+                client_id: windows_mask(windows)
+                for client_id, windows in self.time_windows.items()
+            }
+        return self._masks
+    
+    def fits(self, client_id: int, start: datetime, end: datetime) -> bool:
+        """Check if an interval fits the client's time windows (unknown clients always fit)."""
+        if client_id not in self.masks:
+            return True
+        
+        compiled = self.masks[client_id]
+        if compiled is None:
+            return any(start >= window_start and end <= window_end
+                       for window_start, window_end in self.time_windows[client_id])
+        return fits_interval(compiled[0], compiled[1], start, end)
     
     def check(self, schedule: List[ScheduleEntry]) -> Tuple[bool, Optional[str]]:
         """Check if all deliveries are within time windows."""
         violations = []
         
         for entry in schedule:
-            if entry.client_id not in self.time_windows:
-                continue
-                
-            windows = self.time_windows[entry.client_id]
-            delivery_start = entry.time_slot.start_time
-            delivery_end = entry.end_time
-            
-            # Check if delivery fits in any window
-            fits_in_window = False
-            for window_start, window_end in windows:
-                if delivery_start >= window_start and delivery_end <= window_end:
-                    fits_in_window = True
-                    break
-            
-            if not fits_in_window:
+            if not self.fits(entry.client_id, entry.time_slot.start_time, entry.end_time):
                 violations.append(f"Delivery {entry.delivery_id} for client {entry.client_id} outside time windows")
         
         if violations:
@@ -139,17 +154,20 @@ class DriverAvailabilityConstraint(SchedulingConstraint):
 class TravelTimeConstraint(SchedulingConstraint):
     """Ensures sufficient travel time between consecutive deliveries."""
     
-    def __init__(self, min_buffer_minutes: int = 5, speed_kmh: float = 30.0):
+    def __init__(self, min_buffer_minutes: int = 5, speed_kmh: float = 30.0,
+                 travel_profile: Optional[TravelTimeProfile] = None):
         """
         Initialize travel time constraint.
         
         Args:
             min_buffer_minutes: Minimum buffer time between deliveries
             speed_kmh: Average travel speed
+            travel_profile: Time-of-day travel times; replaces speed_kmh when given
         """
         super().__init__(name="Travel Time Constraint", is_hard=True)
         self.min_buffer_minutes = min_buffer_minutes
         self.speed_kmh = speed_kmh
+        self.travel_profile = travel_profile
     
     def check(self, schedule: List[ScheduleEntry]) -> Tuple[bool, Optional[str]]:
         """Check if there's sufficient travel time between deliveries."""
@@ -169,15 +187,20 @@ class TravelTimeConstraint(SchedulingConstraint):
                 
                 if current.location and next_entry.location:
                     # Calculate required travel time
-                    travel_time = calculate_travel_time(
-                        current.location, 
-                        next_entry.location,
-                        self.speed_kmh
-                    )
+                    if self.travel_profile is not None:
+                        travel_time = self.travel_profile.travel_minutes(
+                            current.location, next_entry.location, current.end_time
+                        )
+                    else:
+                        travel_time = calculate_travel_time(
+                            current.location, 
+                            next_entry.location,
+                            self.speed_kmh
+                        )
                     
                     # Calculate available time
                     available_time = int(
-                        (next_entry.time_slot.start_time - current.end_time).total_seconds() / 60
+                        minutes_between(current.end_time, next_entry.time_slot.start_time)
                     )
                     
                     if available_time < travel_time + self.min_buffer_minutes:
@@ -258,7 +281,7 @@ class WorkingHoursConstraint(SchedulingConstraint):
             # Calculate total working time
             first_start = sorted_entries[0].time_slot.start_time
             last_end = sorted_entries[-1].end_time
-            total_hours = (last_end - first_start).total_seconds() / 3600
+            total_hours = minutes_between(first_start, last_end) / 60
             
             if total_hours > self.max_hours_per_day:
                 violations.append(
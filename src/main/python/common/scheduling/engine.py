@@ -1,17 +1,20 @@
 """Main scheduling engine for LuckyGas delivery system."""
 from typing import List, Dict, Optional, Tuple, Any
 from datetime import datetime, date, timedelta
+from dataclasses import replace
 import logging
 from collections import defaultdict
 
 from ..time_utils import (
-    ScheduleEntry, SchedulingConflict, validate_schedule,
+    ScheduleEntry, SchedulingConflict, TimeSlot, validate_schedule,
     calculate_schedule_metrics, detect_conflicts
 )
+from ..minutes import DayClock
 from .models import (
     DeliveryRequest, DriverAvailability, VehicleInfo,
     SchedulingParameters, SchedulingResult, OptimizationObjective,
-    DeliveryRoute, RouteSegment, SchedulingStats
+    DeliveryRoute, RouteSegment, SchedulingStats,
+    SchedulingProgress, ProgressCallback
 )
 from .algorithms import (
     SchedulingAlgorithm, GreedyScheduler, 
@@ -24,6 +27,11 @@ from .constraints import (
     GeographicClusteringConstraint
 )
 from .conflicts import ConflictResolver
+from .portfolio import PortfolioScheduler
+from .ortools_scheduler import ORToolsScheduler
+from .lns import LNSScheduler
+from .insertion import InsertionPlanner
+from .travel_profile import TravelTimeProfile
 
 logger = logging.getLogger(__name__)
 
@@ -31,21 +39,38 @@ logger = logging.getLogger(__name__)
 class SchedulingEngine:
     """Main scheduling engine that orchestrates the scheduling process."""
     
-    def __init__(self):
-        """Initialize scheduling engine."""
+    def __init__(self, travel_profile: Optional[TravelTimeProfile] = None):
+        """
+        Initialize scheduling engine.
+        
+        Args:
+            travel_profile: Time-of-day travel times learned from history;
+                None uses parameters.travel_speed_kmh at all hours
+        """
+        self.travel_profile = travel_profile
         self.algorithms = {
             'greedy': GreedyScheduler(),
             'genetic': GeneticScheduler(),
-            'simulated_annealing': SimulatedAnnealingScheduler()
+            'simulated_annealing': SimulatedAnnealingScheduler(),
+            'portfolio': PortfolioScheduler(),
+            'ortools': ORToolsScheduler(travel_profile=travel_profile),
+            'lns': LNSScheduler(travel_profile=travel_profile)
         }
         self.default_algorithm = 'greedy'
     
+    def supports_early_stop(self, algorithm: Optional[str] = None) -> bool:
+        """Whether a progress callback can stop the given algorithm early."""
+        scheduler = self.algorithms.get(algorithm or self.default_algorithm,
+                                        self.algorithms[self.default_algorithm])
+        return scheduler.supports_early_stop
+    
     def generate_schedule(self,
                          delivery_requests: List[DeliveryRequest],
                          driver_availability: List[DriverAvailability],
                          vehicle_info: List[VehicleInfo],
                          parameters: Optional[SchedulingParameters] = None,
-                         algorithm: Optional[str] = None) -> SchedulingResult:
+                         algorithm: Optional[str] = None,
+                         progress_callback: Optional[ProgressCallback] = None) -> SchedulingResult:
         """
         Generate optimized schedule for deliveries.
         
@@ -55,6 +80,8 @@ class SchedulingEngine:
             vehicle_info: List of available vehicles
             parameters: Scheduling parameters (optional)
             algorithm: Algorithm to use (optional)
+            progress_callback: Receives improving incumbents (with datetime
+                schedules); returning True stops the run early (optional)
             
         Returns:
             SchedulingResult with optimized schedule
@@ -78,25 +105,54 @@ class SchedulingEngine:
         logger.info(f"Generating schedule using {algorithm_name} algorithm")
         logger.info(f"Processing {len(delivery_requests)} deliveries with {len(driver_availability)} drivers")
         
+        # Work in integer minutes since the scheduling day's midnight
+        clock = DayClock(parameters.date)
+        minute_requests = [
+            replace(req, time_windows=clock.windows_to_minutes(req.time_windows))
+            for req in delivery_requests
+        ]
+        vehicle_capacities = {v.vehicle_id: v.capacity for v in vehicle_info}
+        minute_drivers = [
+            replace(driver,
+                    available_hours=clock.windows_to_minutes(driver.available_hours),
+                    vehicle_capacity=driver.vehicle_capacity or vehicle_capacities.get(driver.vehicle_id))
+            for driver in driver_availability
+        ]
+        
         # Build constraints
         constraints = self._build_constraints(
-            delivery_requests, driver_availability, vehicle_info, parameters
+            minute_requests, minute_drivers, vehicle_info, parameters
         )
         
+        # Incumbents are reported with datetime schedules, like the final result;
+        # a schedule is converted once, when it becomes the incumbent
+        report = None
+        if progress_callback is not None:
+            converted: List[ScheduleEntry] = []
+            
+            def report(progress: SchedulingProgress) -> Optional[bool]:
+                if progress.improved or not converted:
+                    converted[:] = [self._entry_to_datetimes(entry, clock) for entry in progress.schedule]
+                progress.schedule = list(converted)
+                return progress_callback(progress)
+        
         # Run scheduling algorithm
         scheduler = self.algorithms[algorithm_name]
         result = scheduler.schedule(
-            delivery_requests, driver_availability, parameters, constraints
+            minute_requests, minute_drivers, parameters, constraints, report
         )
         
+        # Resolve conflicts if any
+        if result.success and result.schedule and result.conflicts:
+            result = self._resolve_conflicts(
+                result, minute_requests, minute_drivers
+            )
+        
+        # Back to datetimes for callers
+        self._result_to_datetimes(result, clock)
+        
         # Post-process schedule
         if result.success and result.schedule:
-            # Resolve conflicts if any
-            if result.conflicts:
-                result = self._resolve_conflicts(
-                    result, delivery_requests, driver_availability
-                )
-            
             # Generate routes
             routes = self._generate_routes(result.schedule, parameters.date)
             result.metrics['routes'] = len(routes)
@@ -170,6 +226,52 @@ class SchedulingEngine:
             delivery_requests, driver_availability, [], parameters, algorithm
         )
     
+    def insertion_planner(self,
+                          routes: Dict[int, List[DeliveryRequest]],
+                          driver_availability: List[DriverAvailability],
+                          vehicle_info: List[VehicleInfo],
+                          parameters: SchedulingParameters,
+                          now: Optional[datetime] = None,
+                          locked_stops: Optional[Dict[int, int]] = None) -> InsertionPlanner:
+        """
+        Build a planner that inserts new deliveries into an existing day's routes.
+        
+        Unlike generate_schedule the routes stay as they are; the planner
+        ranks cheapest feasible insertion positions for same-day orders
+        and applies the chosen one.
+        
+        Args:
+            routes: Remaining requests per driver_id, in visiting order
+            driver_availability: Drivers of those routes
+            vehicle_info: Vehicles, for cylinder capacities
+            parameters: Scheduling parameters
+            now: Nothing is scheduled before this time (optional)
+            locked_stops: Leading stops per driver_id that must stay first (optional)
+            
+        Returns:
+            InsertionPlanner over the routes
+        """
+        vehicle_capacities = {v.vehicle_id: v.capacity for v in vehicle_info}
+        drivers = [
+            replace(driver, vehicle_capacity=driver.vehicle_capacity or vehicle_capacities.get(driver.vehicle_id))
+            for driver in driver_availability
+        ]
+        buffer = next(
+            c.min_buffer_minutes
+            for c in self._build_constraints([], drivers, [], parameters)
+            if isinstance(c, TravelTimeConstraint)
+        )
+        travel_matrix = None
+        if self.travel_profile is not None:
+            departure = now if now is not None else min(
+                (start for d in drivers for start, _ in d.available_hours), default=8 * 60
+            )
+            travel_matrix = self.travel_profile.travel_matrix(departure)
+        return InsertionPlanner(
+            drivers, routes, parameters, now=now, locked_stops=locked_stops, buffer_minutes=buffer,
+            travel_matrix=travel_matrix
+        )
+    
     def _build_constraints(self,
                          delivery_requests: List[DeliveryRequest],
                          driver_availability: List[DriverAvailability],
@@ -192,7 +294,8 @@ class SchedulingEngine:
         # Travel time constraint
         constraints.append(TravelTimeConstraint(
             min_buffer_minutes=5,
-            speed_kmh=parameters.travel_speed_kmh
+            speed_kmh=parameters.travel_speed_kmh,
+            travel_profile=self.travel_profile
         ))
         
         # Max deliveries constraint
@@ -253,6 +356,30 @@ class SchedulingEngine:
         
         return result
     
+    def _result_to_datetimes(self, result: SchedulingResult, clock: DayClock) -> None:
+        """Convert a minute-based result's schedule and conflicts to datetimes in place."""
+        converted: Dict[int, ScheduleEntry] = {}
+        
+        def convert(entry: ScheduleEntry) -> ScheduleEntry:
+            if id(entry) not in converted:
+                converted[id(entry)] = self._entry_to_datetimes(entry, clock)
+            return converted[id(entry)]
+        
+        result.schedule = [convert(entry) for entry in result.schedule]
+        for conflict in result.conflicts:
+            conflict.entries = [convert(entry) for entry in conflict.entries]
+    
+    @staticmethod
+    def _entry_to_datetimes(entry: ScheduleEntry, clock: DayClock) -> ScheduleEntry:
+        """Copy of a minute-based entry with datetime time slot."""
+        time_slot = entry.time_slot
+        return replace(entry, time_slot=TimeSlot(
+            start_time=clock.to_datetime(time_slot.start_time),
+            end_time=clock.to_datetime(time_slot.end_time),
+            capacity=time_slot.capacity,
+            reserved=time_slot.reserved
+        ))
+    
     def _generate_routes(self, 
                         schedule: List[ScheduleEntry],
                         schedule_date: date) -> List[DeliveryRoute]:
@@ -289,10 +416,15 @@ class SchedulingEngine:
                 if i > 0 and sorted_entries[i-1].location and entry.location:
                     # Travel segment
                     from ..time_utils import calculate_travel_time
-                    travel_time = calculate_travel_time(
-                        sorted_entries[i-1].location,
-                        entry.location
-                    )
+                    if self.travel_profile is not None:
+                        travel_time = self.travel_profile.travel_minutes(
+                            sorted_entries[i-1].location, entry.location, sorted_entries[i-1].end_time
+                        )
+                    else:
+                        travel_time = calculate_travel_time(
+                            sorted_entries[i-1].location,
+                            entry.location
+                        )
                     
                     segment = RouteSegment(
                         from_location=sorted_entries[i-1].location,
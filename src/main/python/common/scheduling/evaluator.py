@@ -0,0 +1,371 @@
+"""Fused constraint evaluator for scheduling metaheuristics."""
+from typing import List, Tuple, Optional, Dict, Any
+from datetime import datetime, timedelta
+import logging
+
+import numpy as np
+
+from ..time_utils import SchedulingConstraint, ScheduleEntry
+from ..availability import mask_windows
+from ..minutes import TimeValue, add_minutes
+from .constraints import (
+    TimeWindowConstraint,
+    CapacityConstraint,
+    DriverAvailabilityConstraint,
+    TravelTimeConstraint,
+    MaxDeliveriesConstraint,
+    WorkingHoursConstraint,
+    GeographicClusteringConstraint
+)
+from .travel_profile import HOUR_BUCKETS, TravelTimeProfile
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371
+MICROSECOND = timedelta(microseconds=1)
+MICROSECONDS_PER_MINUTE = 60_000_000
+
+
+def _sorted_lookup(keys: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted key array plus the original position of each key."""
+    keys = np.asarray(keys, dtype=np.int64)
+    order = np.argsort(keys, kind='stable')
+    return keys[order], order
+
+
+def _find(sorted_keys: np.ndarray, positions: np.ndarray,
+          query: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorised dict lookup: (found mask, position of each found key)."""
+    if not len(sorted_keys):
+        return np.zeros(len(query), dtype=bool), np.zeros(len(query), dtype=np.int64)
+    idx = np.minimum(np.searchsorted(sorted_keys, query), len(sorted_keys) - 1)
+    return sorted_keys[idx] == query, positions[idx]
+
+
+def _merged_time_windows(constraint: TimeWindowConstraint) -> Dict[int, List[Tuple[TimeValue, TimeValue]]]:
+    """Client windows as maximal runs of the constraint's availability masks."""
+    merged = {}
+    for client_id, compiled in constraint.masks.items():
+        if compiled is None:
+            merged[client_id] = constraint.time_windows[client_id]
+        else:
+            reference, mask = compiled
+            merged[client_id] = [(add_minutes(reference, start), add_minutes(reference, end))
+                                 for start, end in mask_windows(mask)]
+    return merged
+
+
+class _IntervalTable:
+    """Per-key lists of (start, end) periods padded into 2-D arrays."""
+
+    def __init__(self, periods_by_key: Dict[int, List[Tuple[datetime, datetime]]],
+                 to_micros):
+        self.keys, self.rows = _sorted_lookup(list(periods_by_key))
+        width = max((len(p) for p in periods_by_key.values()), default=0) or 1
+
+        # Padding columns are empty intervals that nothing fits into
+        self.starts = np.full((len(periods_by_key), width), np.iinfo(np.int64).max, dtype=np.int64)
+        self.ends = np.full((len(periods_by_key), width), np.iinfo(np.int64).min, dtype=np.int64)
+        for row, periods in enumerate(periods_by_key.values()):
+            for col, (period_start, period_end) in enumerate(periods):
+                self.starts[row, col] = to_micros(period_start)
+                self.ends[row, col] = to_micros(period_end)
+
+    def outside(self, keys: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> bool:
+        """Whether any row does not fit a period of its key (unknown keys always fit)."""
+        known, rows = _find(self.keys, self.rows, keys)
+        rows = rows[known]
+        fits = ((starts[known, None] >= self.starts[rows]) &
+                (ends[known, None] <= self.ends[rows])).any(axis=1)
+        return not fits.all()
+
+
+class ConstraintEvaluator:
+    """
+    Evaluates a list of scheduling constraints in one vectorised pass.
+
+    The built-in constraints are compiled into NumPy lookups once; each
+    candidate schedule is then flattened into arrays, grouped by driver and
+    sorted by start time a single time, and every constraint's cost is
+    computed from those shared arrays. Violation messages are only built by
+    check() when asked for, by delegating to the violated constraints.
+    Unknown constraint types fall back to their own cost().
+
+    Costs match the sum of constraint.cost(schedule) over the constraints.
+    """
+
+    def __init__(self, constraints: List[SchedulingConstraint]):
+        """
+        Compile constraints.
+
+        Args:
+            constraints: Constraints to evaluate
+        """
+        self.constraints = list(constraints)
+        self._origin: Optional[TimeValue] = None
+        self._compiled: List[Tuple[SchedulingConstraint, str, Any]] = []
+        self._fallback: List[SchedulingConstraint] = []
+
+        for constraint in self.constraints:
+            kind = type(constraint)
+            if kind is TimeWindowConstraint:
+                self._compiled.append((constraint, 'time_window',
+                                       _IntervalTable(_merged_time_windows(constraint), self._to_micros)))
+            elif kind is DriverAvailabilityConstraint:
+                self._compiled.append((constraint, 'driver_availability',
+                                       _IntervalTable(constraint.driver_availability, self._to_micros)))
+            elif kind is CapacityConstraint:
+                self._compiled.append((constraint, 'capacity', self._compile_capacity(constraint)))
+            elif kind in (TravelTimeConstraint, MaxDeliveriesConstraint,
+                          WorkingHoursConstraint, GeographicClusteringConstraint):
+                self._compiled.append((constraint, kind.__name__, None))
+            else:
+                self._fallback.append(constraint)
+
+    def _to_micros(self, moment: TimeValue) -> int:
+        """Exact integer microseconds since the evaluator's origin."""
+        if self._origin is None:
+            self._origin = moment
+        delta = moment - self._origin
+        if isinstance(delta, int):
+            return delta * MICROSECONDS_PER_MINUTE
+        return delta // MICROSECOND
+
+    def _compile_capacity(self, constraint: CapacityConstraint) -> Dict[str, Any]:
+        """Precompute demand per delivery and capacity per (vehicle, cylinder type)."""
+        cylinder_types = sorted({ct for ct, _ in constraint.delivery_demands.values()} |
+                                {ct for caps in constraint.vehicle_capacities.values() for ct in caps})
+        type_col = {ct: col for col, ct in enumerate(cylinder_types)}
+
+        # Missing cylinder types are unlimited, as in CapacityConstraint.check
+        capacity = np.full((len(constraint.vehicle_capacities), len(type_col)), np.inf)
+        for row, caps in enumerate(constraint.vehicle_capacities.values()):
+            for ct, cap in caps.items():
+                capacity[row, type_col[ct]] = cap
+
+        demands = list(constraint.delivery_demands.values())
+        return {
+            'vehicles': _sorted_lookup(list(constraint.vehicle_capacities)),
+            'deliveries': _sorted_lookup(list(constraint.delivery_demands)),
+            'demand_col': np.array([type_col[ct] for ct, _ in demands], dtype=np.int64),
+            'demand_qty': np.array([qty for _, qty in demands], dtype=float),
+            'capacity': capacity,
+        }
+
+    def _arrays(self, schedule: List[ScheduleEntry]) -> Dict[str, np.ndarray]:
+        """Flatten a schedule into column arrays sorted by (driver, start time)."""
+        n = len(schedule)
+        if self._origin is None:
+            self._origin = schedule[0].time_slot.start_time
+        origin = self._origin
+
+        if isinstance(origin, int):
+            # Minute offsets: plain int subtraction, scaled once below
+            columns = np.array([
+                (e.time_slot.start_time - origin, e.service_duration,
+                 e.driver_id, e.client_id, e.vehicle_id, e.delivery_id)
+                for e in schedule
+            ], dtype=np.int64).reshape(n, 6)
+            columns[:, 0] *= MICROSECONDS_PER_MINUTE
+        else:
+            columns = np.array([
+                ((e.time_slot.start_time - origin) // MICROSECOND, e.service_duration,
+                 e.driver_id, e.client_id, e.vehicle_id, e.delivery_id)
+                for e in schedule
+            ], dtype=np.int64).reshape(n, 6)
+        starts, durations, drivers = columns[:, 0], columns[:, 1], columns[:, 2]
+        has_location = np.fromiter((bool(e.location) for e in schedule), dtype=bool, count=n)
+        coords = np.array([e.location if e.location else (0.0, 0.0) for e in schedule],
+                          dtype=float).reshape(n, 2)
+
+        # Stable: ties keep schedule order, like sorted() in the constraints
+        order = np.lexsort((starts, drivers))
+        sorted_drivers = drivers[order]
+        group_start = np.ones(n, dtype=bool)
+        group_start[1:] = sorted_drivers[1:] != sorted_drivers[:-1]
+
+        return {
+            'starts': starts,
+            'ends': starts + durations * MICROSECONDS_PER_MINUTE,
+            'drivers': drivers,
+            'clients': columns[:, 3],
+            'vehicles': columns[:, 4],
+            'deliveries': columns[:, 5],
+            'has_location': has_location,
+            'coords': coords,
+            'order': order,
+            'group_start': group_start,
+        }
+
+    @staticmethod
+    def _distance_km(from_coords: np.ndarray, to_coords: np.ndarray) -> np.ndarray:
+        """Vectorised haversine distance of each (from, to) row."""
+        lat1, lon1 = from_coords[:, 0], from_coords[:, 1]
+        lat2, lon2 = to_coords[:, 0], to_coords[:, 1]
+        dlat = np.radians(lat2 - lat1)
+        dlon = np.radians(lon2 - lon1)
+        a = np.sin(dlat / 2) ** 2 + np.cos(np.radians(lat1)) * np.cos(np.radians(lat2)) * np.sin(dlon / 2) ** 2
+        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+        return EARTH_RADIUS_KM * c
+
+    @classmethod
+    def _travel_minutes(cls, from_coords: np.ndarray, to_coords: np.ndarray, speed_kmh: float) -> np.ndarray:
+        """Vectorised calculate_travel_time (haversine + 5 minute buffer)."""
+        return np.trunc((cls._distance_km(from_coords, to_coords) / speed_kmh) * 60) + 5
+
+    def _profile_minutes(self, profile: TravelTimeProfile, from_coords: np.ndarray, to_coords: np.ndarray,
+                         departures: np.ndarray) -> np.ndarray:
+        """Vectorised TravelTimeProfile.travel_minutes for legs leaving at departures (evaluator micros)."""
+        origin = self._origin
+        if isinstance(origin, int):
+            midnight_offset = origin * MICROSECONDS_PER_MINUTE
+        else:
+            midnight_offset = (origin - origin.replace(hour=0, minute=0, second=0, microsecond=0)) // MICROSECOND
+        buckets = ((midnight_offset + departures) // (60 * MICROSECONDS_PER_MINUTE)) % HOUR_BUCKETS
+        speeds = profile.speeds[profile.zones(from_coords), profile.zones(to_coords), buckets]
+        return np.trunc(self._distance_km(from_coords, to_coords) / speeds * 60) + profile.buffer_minutes
+
+    def _pairs(self, arrays: Dict[str, np.ndarray], located_only: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Consecutive (current, next) positions of the same driver in time order."""
+        order = arrays['order']
+        same_driver = ~arrays['group_start']
+        if located_only:
+            keep = arrays['has_location'][order]
+            order = order[keep]
+            drivers = arrays['drivers'][order]
+            same_driver = np.zeros(len(order), dtype=bool)
+            same_driver[1:] = drivers[1:] == drivers[:-1]
+
+        nxt = np.flatnonzero(same_driver[1:]) + 1
+        return order[nxt - 1], order[nxt]
+
+    def _violated(self, kind: str, constraint: SchedulingConstraint, compiled: Any,
+                  schedule: List[ScheduleEntry], arrays: Dict[str, np.ndarray]) -> bool:
+        """Whether a compiled constraint is violated by the candidate."""
+        if kind == 'time_window':
+            return compiled.outside(arrays['clients'], arrays['starts'], arrays['ends'])
+
+        if kind == 'driver_availability':
+            return compiled.outside(arrays['drivers'], arrays['starts'], arrays['ends'])
+
+        if kind == 'capacity':
+            capacity = compiled['capacity']
+            has_vehicle, rows = _find(*compiled['vehicles'], arrays['vehicles'])
+            has_demand, demand_idx = _find(*compiled['deliveries'], arrays['deliveries'])
+            counted = has_vehicle & has_demand
+            cells = rows[counted] * capacity.shape[1] + compiled['demand_col'][demand_idx[counted]]
+            loads = np.bincount(cells, weights=compiled['demand_qty'][demand_idx[counted]],
+                                minlength=capacity.size)
+            return bool((loads > capacity.ravel()).any())
+
+        if kind == 'TravelTimeConstraint':
+            current, following = self._pairs(arrays, located_only=False)
+            both = arrays['has_location'][current] & arrays['has_location'][following]
+            current, following = current[both], following[both]
+            if constraint.travel_profile is not None:
+                travel = self._profile_minutes(constraint.travel_profile, arrays['coords'][current],
+                                               arrays['coords'][following], arrays['ends'][current])
+            else:
+                travel = self._travel_minutes(arrays['coords'][current], arrays['coords'][following],
+                                              constraint.speed_kmh)
+            available = np.trunc((arrays['starts'][following] - arrays['ends'][current]) / 1e6 / 60)
+            return bool((available < travel + constraint.min_buffer_minutes).any())
+
+        if kind == 'MaxDeliveriesConstraint':
+            drivers, counts = np.unique(arrays['drivers'], return_counts=True)
+            limits = np.fromiter(
+                (constraint.max_deliveries_per_driver.get(d, constraint.default_max) for d in drivers.tolist()),
+                dtype=np.int64, count=len(drivers)
+            )
+            return bool((counts > limits).any())
+
+        if kind == 'WorkingHoursConstraint':
+            order, group_start = arrays['order'], arrays['group_start']
+            first = order[group_start]
+            last = order[np.append(group_start[1:], True)]
+            hours = (arrays['ends'][last] - arrays['starts'][first]) / 1e6 / 3600
+            return bool((hours > constraint.max_hours_per_day).any())
+
+        raise ValueError(f"Unknown compiled constraint: {kind}")
+
+    def _constraint_cost(self, kind: str, constraint: SchedulingConstraint, compiled: Any,
+                         schedule: List[ScheduleEntry], arrays: Dict[str, np.ndarray]) -> float:
+        if kind == 'GeographicClusteringConstraint':
+            current, following = self._pairs(arrays, located_only=True)
+            travel = self._travel_minutes(arrays['coords'][current], arrays['coords'][following], 30.0)
+            total_distance = float(((travel / 60) * 30.0).sum())
+            return constraint.weight * (total_distance / 100)
+
+        return constraint.weight if self._violated(kind, constraint, compiled, schedule, arrays) else 0.0
+
+    def costs(self, schedule: List[ScheduleEntry]) -> Dict[str, float]:
+        """
+        Cost of each constraint for a candidate schedule.
+
+        Args:
+            schedule: Candidate schedule
+
+        Returns:
+            Dict mapping constraint name to cost
+        """
+        result = {}
+        if schedule:
+            arrays = self._arrays(schedule)
+            for constraint, kind, compiled in self._compiled:
+                result[constraint.name] = self._constraint_cost(kind, constraint, compiled, schedule, arrays)
+        else:
+            for constraint, _, _ in self._compiled:
+                result[constraint.name] = constraint.cost(schedule)
+
+        for constraint in self._fallback:
+            result[constraint.name] = constraint.cost(schedule)
+        return result
+
+    def cost(self, schedule: List[ScheduleEntry]) -> float:
+        """
+        Total constraint penalty for a candidate schedule.
+
+        Args:
+            schedule: Candidate schedule
+
+        Returns:
+            Sum of constraint costs
+        """
+        return sum(self.costs(schedule).values())
+
+    def check(self, schedule: List[ScheduleEntry],
+              with_messages: bool = False) -> Tuple[bool, List[str]]:
+        """
+        Check all hard constraints.
+
+        Args:
+            schedule: Candidate schedule
+            with_messages: Build human-readable violation messages
+
+        Returns:
+            Tuple of (all_hard_satisfied, messages)
+        """
+        arrays = self._arrays(schedule) if schedule else None
+        violated = []
+
+        for constraint, kind, compiled in self._compiled:
+            if not constraint.is_hard:
+                continue
+            if arrays is None or kind == 'GeographicClusteringConstraint':
+                satisfied, _ = constraint.check(schedule)
+            else:
+                satisfied = not self._violated(kind, constraint, compiled, schedule, arrays)
+            if not satisfied:
+                violated.append(constraint)
+
+        for constraint in self._fallback:
+            if constraint.is_hard and not constraint.check(schedule)[0]:
+                violated.append(constraint)
+
+        messages = []
+        if with_messages:
+            for constraint in violated:
+                _, message = constraint.check(schedule)
+                messages.append(f"{constraint.name}: {message}")
+
+        return not violated, messages
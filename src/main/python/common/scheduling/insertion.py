@@ -0,0 +1,329 @@
+"""Incremental insertion of same-day deliveries into an existing day's routes."""
+from dataclasses import dataclass
+from typing import List, Dict, Optional, Tuple, Any
+from bisect import bisect_left
+import logging
+
+from ..time_utils import ScheduleEntry, TimeSlot
+from ..minutes import DayClock, TimeValue
+from .models import DeliveryRequest, DriverAvailability, SchedulingParameters
+from .ortools_scheduler import (
+    DEFAULT_DEPOT, TravelMatrix, haversine_travel_matrix, service_start_windows
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class InsertionOption:
+    """One feasible place for a new delivery in a driver's route."""
+    delivery_id: int
+    driver_id: int
+    vehicle_id: Optional[int]
+    position: int  # Index of the new stop in the driver's remaining route
+    detour_km: float
+    detour_minutes: int
+    service_start: Any  # Minutes or datetime, like the inputs
+    slack_minutes: int  # Smallest time-window slack left on the route after inserting
+
+
+class _RouteState:
+    """Cached timing of one driver's remaining route."""
+
+    def __init__(self, stops: List[int]):
+        self.stops = stops
+        self.starts: List[int] = []
+        self.latest: List[int] = []  # Latest start of each stop that keeps the rest of the route on time
+        self.latest_return = 0
+        self.load: Dict[str, int] = {}
+
+
+class InsertionPlanner:
+    """
+    Ranks and applies insertions of new deliveries into fixed routes.
+
+    The travel matrix over depots and stops is built once and only extended
+    when unseen deliveries are ranked. For every route it caches service
+    starts and the latest start of each stop that keeps all later stops
+    inside their windows and the driver inside their hours, so checking a
+    position is a constant-time comparison against that slack. Routes that
+    are already late are not rejected outright: an insertion may not make
+    any stop later than its current lateness.
+
+    Inputs use minutes since midnight or datetimes; options and schedules
+    come back in the same unit as the drivers' available hours.
+    """
+
+    def __init__(self,
+                 drivers: List[DriverAvailability],
+                 routes: Dict[int, List[DeliveryRequest]],
+                 parameters: SchedulingParameters,
+                 now: Optional[TimeValue] = None,
+                 locked_stops: Optional[Dict[int, int]] = None,
+                 buffer_minutes: int = 5,
+                 travel_matrix: Optional[TravelMatrix] = None):
+        """
+        Initialize planner.
+
+        Args:
+            drivers: Drivers with routes today; current_location is where
+                the remaining route starts (depot if unknown)
+            routes: Remaining (not yet completed) requests per driver_id, in visiting order
+            parameters: Scheduling parameters (date and travel speed)
+            now: Nothing starts before this time (default: start of each driver's hours)
+            locked_stops: Leading stops per driver_id that must stay first
+                (e.g. the delivery in progress)
+            buffer_minutes: Minimum gap between consecutive stops
+            travel_matrix: Distance/time matrix builder (default: haversine)
+        """
+        self.drivers = drivers
+        self.parameters = parameters
+        self.clock = DayClock(parameters.date)
+        self.buffer = buffer_minutes
+        self.travel_matrix = travel_matrix or haversine_travel_matrix
+        self.locked = locked_stops or {}
+        self.use_datetimes = any(
+            not isinstance(start, int) for driver in drivers for start, _ in driver.available_hours
+        )
+
+        self.requests: List[DeliveryRequest] = []
+        self.index: Dict[int, int] = {}
+        self.windows: List[List[Tuple[int, int]]] = []
+        self.window_starts: List[List[int]] = []
+        self.locations = [driver.current_location or DEFAULT_DEPOT for driver in drivers]
+        self.km: List[List[float]] = []
+        self.minutes: List[List[int]] = []
+        for driver in drivers:
+            self._add_requests(routes.get(driver.driver_id, []))
+        self._build_matrix()
+
+        self.hours: List[Tuple[int, int]] = []
+        self.routes = [
+            _RouteState([self.index[r.delivery_id] for r in routes.get(driver.driver_id, [])])
+            for driver in drivers
+        ]
+        self.set_now(now)
+
+    def set_now(self, now: Optional[TimeValue]) -> None:
+        """Move the planning time; route timings are recomputed, the matrix is kept."""
+        minute = self.clock.to_minutes(now, round_up=True) if now is not None else None
+        self.hours = []
+        for driver in self.drivers:
+            hours = sorted(self.clock.windows_to_minutes(driver.available_hours))
+            start = hours[0][0] if minute is None else max(hours[0][0], minute)
+            self.hours.append((start, hours[-1][1]))
+        self.routes = [self._route_state(v, state.stops) for v, state in enumerate(self.routes)]
+
+    def signature(self) -> Tuple[Tuple[int, Tuple[int, ...]], ...]:
+        """Drivers and delivery ids in route order, to tell whether the cached routes are current."""
+        return tuple(
+            (driver.driver_id, tuple(self.requests[i].delivery_id for i in state.stops))
+            for driver, state in zip(self.drivers, self.routes)
+        )
+
+    def rank(self, requests: List[DeliveryRequest], limit: int = 5) -> Dict[int, List[InsertionOption]]:
+        """
+        Cheapest feasible insertions of each request into the current routes.
+
+        Each request is ranked against the routes as they are; apply one
+        option and rank again to place several deliveries.
+
+        Args:
+            requests: New deliveries
+            limit: Options returned per delivery
+
+        Returns:
+            delivery_id -> options by detour km (ties: more slack first); empty if it fits nowhere
+        """
+        if self._add_requests(requests):
+            self._build_matrix()
+        return {request.delivery_id: self._options(self.index[request.delivery_id])[:limit] for request in requests}
+
+    def apply(self, delivery_id: int, driver_id: int, position: int) -> List[ScheduleEntry]:
+        """
+        Insert a ranked delivery into a driver's route.
+
+        Args:
+            delivery_id: Delivery passed to rank()
+            driver_id: Driver of the chosen option
+            position: Position of the chosen option
+
+        Returns:
+            The driver's updated remaining route as schedule entries
+
+        Raises:
+            ValueError: If the delivery is unknown, already routed, or no
+                longer fits at that position
+        """
+        if delivery_id not in self.index:
+            raise ValueError(f"Delivery {delivery_id} has not been ranked")
+        i = self.index[delivery_id]
+        if any(i in state.stops for state in self.routes):
+            raise ValueError(f"Delivery {delivery_id} is already routed")
+        v = next((v for v, driver in enumerate(self.drivers) if driver.driver_id == driver_id), None)
+        if v is None:
+            raise ValueError(f"Driver {driver_id} has no route")
+        if self._check(v, i, position) is None:
+            raise ValueError(f"Delivery {delivery_id} no longer fits at position {position} of driver {driver_id}")
+
+        state = self.routes[v]
+        self.routes[v] = self._route_state(v, state.stops[:position] + [i] + state.stops[position:])
+        return self.route_schedule(driver_id)
+
+    def route_schedule(self, driver_id: int) -> List[ScheduleEntry]:
+        """Schedule entries of a driver's remaining route."""
+        v = next(v for v, driver in enumerate(self.drivers) if driver.driver_id == driver_id)
+        driver = self.drivers[v]
+        schedule = []
+        for i, start in zip(self.routes[v].stops, self.routes[v].starts):
+            request = self.requests[i]
+            end = start + request.service_duration
+            schedule.append(ScheduleEntry(
+                delivery_id=request.delivery_id,
+                client_id=request.client_id,
+                driver_id=driver.driver_id,
+                vehicle_id=driver.vehicle_id or 1,
+                time_slot=TimeSlot(start_time=self._out(start), end_time=self._out(end)),
+                service_duration=request.service_duration,
+                priority=request.priority,
+                location=request.location
+            ))
+        return schedule
+
+    def _out(self, minute: int) -> TimeValue:
+        return self.clock.to_datetime(minute) if self.use_datetimes else minute
+
+    def _add_requests(self, requests: List[DeliveryRequest]) -> bool:
+        """Register unseen requests; True if the matrix needs new rows."""
+        added = False
+        for request in requests:
+            if request.delivery_id in self.index:
+                continue
+            self.index[request.delivery_id] = len(self.requests)
+            self.requests.append(request)
+            windows = service_start_windows(self.clock, request)
+            self.windows.append(windows)
+            self.window_starts.append([start for start, _ in windows])
+            self.locations.append(request.location)
+            added = True
+        return added
+
+    def _build_matrix(self) -> None:
+        km, minutes = self.travel_matrix(self.locations, self.parameters.travel_speed_kmh)
+        self.km = km.tolist()
+        self.minutes = minutes.tolist()
+
+    def _node(self, i: int) -> int:
+        return len(self.drivers) + i
+
+    def _travel(self, a: int, b: int) -> int:
+        """Minutes from node a to node b, with the buffer after a stop."""
+        return self.minutes[a][b] + (self.buffer if a >= len(self.drivers) else 0)
+
+    def _earliest_start(self, i: int, arrival: int) -> Optional[int]:
+        windows = self.windows[i]
+        k = max(0, bisect_left(self.window_starts[i], arrival) - 1)
+        for start, end in windows[k:]:
+            if arrival <= end:
+                return max(start, arrival)
+        return None
+
+    def _latest_start(self, i: int, start: int) -> int:
+        """End of the window that start falls in; late stops may not get later."""
+        for window_start, window_end in self.windows[i]:
+            if window_start <= start <= window_end:
+                return window_end
+        return start
+
+    def _route_state(self, v: int, stops: List[int]) -> _RouteState:
+        state = _RouteState(stops)
+        day_start, day_end = self.hours[v]
+        t, previous = day_start, v
+        for i in stops:
+            node = self._node(i)
+            arrival = t + self._travel(previous, node)
+            start = self._earliest_start(i, arrival)
+            start = arrival if start is None else start  # Already late: keep the arrival
+            state.starts.append(start)
+            t, previous = start + self.requests[i].service_duration, node
+            request = self.requests[i]
+            state.load[request.cylinder_type] = state.load.get(request.cylinder_type, 0) + request.quantity
+
+        state.latest_return = max(day_end, t + self._travel(previous, v))
+        latest, following = state.latest_return, v
+        state.latest = [0] * len(stops)
+        for k in range(len(stops) - 1, -1, -1):
+            i = stops[k]
+            node = self._node(i)
+            latest = min(
+                self._latest_start(i, state.starts[k]),
+                latest - self.requests[i].service_duration - self._travel(node, following)
+            )
+            state.latest[k] = latest
+            following = node
+        return state
+
+    def _fits_vehicle(self, v: int, i: int) -> bool:
+        driver, state, request = self.drivers[v], self.routes[v], self.requests[i]
+        if len(state.stops) >= driver.max_deliveries:
+            return False
+        if driver.vehicle_capacity:
+            limit = driver.vehicle_capacity.get(request.cylinder_type)
+            if limit is not None and state.load.get(request.cylinder_type, 0) + request.quantity > limit:
+                return False
+        return True
+
+    def _check(self, v: int, i: int, position: int) -> Optional[Tuple[int, int]]:
+        """(service start, slack left) of request i at route position, or None if infeasible."""
+        state = self.routes[v]
+        if position < self.locked.get(self.drivers[v].driver_id, 0) or position > len(state.stops):
+            return None
+        if not self._fits_vehicle(v, i):
+            return None
+
+        if position:
+            previous = self._node(state.stops[position - 1])
+            departure = state.starts[position - 1] + self.requests[state.stops[position - 1]].service_duration
+        else:
+            previous, departure = v, self.hours[v][0]
+        node = self._node(i)
+        start = self._earliest_start(i, departure + self._travel(previous, node))
+        if start is None:
+            return None
+
+        finish = start + self.requests[i].service_duration
+        if position < len(state.stops):
+            following = self._node(state.stops[position])
+            arrival = finish + self._travel(node, following)
+            slack = state.latest[position] - max(arrival, state.starts[position])
+        else:
+            slack = state.latest_return - (finish + self._travel(node, v))
+        if slack < 0:
+            return None
+        return start, min(slack, self._latest_start(i, start) - start)
+
+    def _options(self, i: int) -> List[InsertionOption]:
+        node = self._node(i)
+        request = self.requests[i]
+        options = []
+        for v, driver in enumerate(self.drivers):
+            path = [v] + [self._node(j) for j in self.routes[v].stops] + [v]
+            for position in range(len(path) - 1):
+                checked = self._check(v, i, position)
+                if checked is None:
+                    continue
+                a, b = path[position], path[position + 1]
+                start, slack = checked
+                options.append(InsertionOption(
+                    delivery_id=request.delivery_id,
+                    driver_id=driver.driver_id,
+                    vehicle_id=driver.vehicle_id,
+                    position=position,
+                    detour_km=round(self.km[a][node] + self.km[node][b] - self.km[a][b], 3),
+                    detour_minutes=(self._travel(a, node) + request.service_duration
+                                    + self._travel(node, b) - self._travel(a, b)),
+                    service_start=self._out(start),
+                    slack_minutes=slack
+                ))
+        options.sort(key=lambda option: (option.detour_km, -option.slack_minutes))
+        return options
@@ -0,0 +1,534 @@
+"""Adaptive large neighbourhood search (ruin-and-recreate) scheduler."""
+from typing import List, Dict, Optional, Tuple
+from bisect import bisect_left
+import logging
+import math
+import random
+import time as time_module
+
+from ..time_utils import ScheduleEntry, TimeSlot
+from ..minutes import DayClock
+from .models import (
+    DeliveryRequest, DriverAvailability, SchedulingParameters, SchedulingResult,
+    ProgressCallback, DEFAULT_MAX_ITERATIONS
+)
+from .constraints import SchedulingConstraint, TravelTimeConstraint, WorkingHoursConstraint
+from .algorithms import SchedulingAlgorithm
+from .evaluator import ConstraintEvaluator
+from .ortools_scheduler import (
+    DEFAULT_DEPOT, TravelMatrix, haversine_travel_matrix, service_start_windows
+)
+from .travel_profile import HOUR_BUCKETS, TravelTimeProfile
+
+logger = logging.getLogger(__name__)
+
+# Leaving a delivery out costs more than any detour (km); higher priority costs more
+UNASSIGNED_COST = 1000.0
+PRIORITY_COST = 100.0
+
+# Operator scores (Ropke & Pisinger): new best, improved current, accepted
+SCORE_BEST = 33.0
+SCORE_IMPROVED = 9.0
+SCORE_ACCEPTED = 13.0
+
+# Request indices visited by each driver, in order
+Routes = List[List[int]]
+
+
+class LNSScheduler(SchedulingAlgorithm):
+    """
+    Adaptive large neighbourhood search for the delivery VRPTW.
+
+    Each iteration ruins part of the current solution (random, worst-cost,
+    related/Shaw or whole-route removal) and recreates it with greedy or
+    regret-k insertion. Insertion costs are detours over the travel matrix;
+    a position is used only if the route stays feasible for time windows,
+    driver hours, max deliveries, cylinder capacity and working hours.
+    Operators are chosen by roulette wheel and their weights adapt every
+    segment to how often they found new best, improving or accepted
+    solutions. A candidate is accepted while it is within a threshold of
+    the best cost that shrinks to zero over the budget.
+
+    The run is budgeted by parameters.time_limit_seconds; when
+    parameters.max_iterations is set the run also stops there, whichever
+    is reached first. Without a time limit the iteration budget defaults
+    to DEFAULT_MAX_ITERATIONS.
+    """
+
+    RUIN_OPERATORS = ('random', 'worst', 'shaw', 'route')
+    RECREATE_OPERATORS = ('greedy', 'regret_2', 'regret_3')
+
+    def __init__(self,
+                 travel_matrix: Optional[TravelMatrix] = None,
+                 min_removal: float = 0.1,
+                 max_removal: float = 0.3,
+                 max_removed: int = 40,
+                 segment_length: int = 50,
+                 reaction_factor: float = 0.2,
+                 acceptance_threshold: float = 0.05,
+                 worst_randomness: float = 3.0,
+                 shaw_randomness: float = 6.0,
+                 travel_profile: Optional[TravelTimeProfile] = None):
+        """
+        Initialize LNS scheduler.
+
+        Args:
+            travel_matrix: Distance/time matrix builder (default: haversine)
+            min_removal: Smallest fraction of deliveries removed per ruin
+            max_removal: Largest fraction of deliveries removed per ruin
+            max_removed: Upper bound on deliveries removed per ruin
+            segment_length: Iterations between operator weight updates
+            reaction_factor: How fast weights follow recent operator scores
+            acceptance_threshold: Relative worsening over the best accepted at the start
+            worst_randomness: Determinism of worst-cost removal (higher is greedier)
+            shaw_randomness: Determinism of related removal (higher is greedier)
+            travel_profile: Time-of-day travel minutes, looked up at each departure (optional)
+        """
+        super().__init__("LNS Scheduler")
+        self.travel_matrix = travel_matrix or haversine_travel_matrix
+        self.travel_profile = travel_profile
+        self.min_removal = min_removal
+        self.max_removal = max_removal
+        self.max_removed = max_removed
+        self.segment_length = segment_length
+        self.reaction_factor = reaction_factor
+        self.acceptance_threshold = acceptance_threshold
+        self.worst_randomness = worst_randomness
+        self.shaw_randomness = shaw_randomness
+
+    def schedule(self,
+                delivery_requests: List[DeliveryRequest],
+                driver_availability: List[DriverAvailability],
+                parameters: SchedulingParameters,
+                constraints: List[SchedulingConstraint],
+                progress_callback: Optional[ProgressCallback] = None) -> SchedulingResult:
+        """Generate schedule by adaptive ruin and recreate."""
+        start_time = time_module.time()
+        drivers = [driver for driver in driver_availability if driver.available_hours]
+        requests = [request for request in delivery_requests if request.time_windows]
+
+        if not drivers or not requests:
+            return SchedulingResult(
+                schedule=[],
+                metrics={"total_deliveries": len(delivery_requests), "scheduled_deliveries": 0,
+                         "unscheduled_deliveries": len(delivery_requests)},
+                conflicts=[],
+                optimization_score=0,
+                computation_time=time_module.time() - start_time,
+                algorithm_used=self.name,
+                parameters_used=parameters,
+                success=not delivery_requests,
+                error_message="No drivers or deliveries to route" if delivery_requests else None
+            )
+
+        clock = DayClock(parameters.date)
+        use_datetimes = not isinstance(requests[0].time_windows[0][0], int)
+        model = _RoutingModel(drivers, requests, parameters, constraints, clock, self.travel_matrix,
+                              self.travel_profile)
+
+        # Start from the previous routes if given, else recreate from nothing
+        warm_plan = self._warm_start_plan(delivery_requests, driver_availability, parameters)
+        current: Routes = [[] for _ in drivers]
+        pending = list(range(len(requests)))
+        if warm_plan is not None:
+            pending = self._seed_routes(model, current, warm_plan.schedule, requests, drivers)
+        unassigned = model.recreate(current, pending, regret_k=2)
+        current_cost = model.cost(current, unassigned)
+        best, best_cost = [list(r) for r in current], current_cost
+
+        ruin_weights = [1.0] * len(self.RUIN_OPERATORS)
+        recreate_weights = [1.0] * len(self.RECREATE_OPERATORS)
+        ruin_scores = [0.0] * len(ruin_weights)
+        ruin_uses = [0] * len(ruin_weights)
+        recreate_scores = [0.0] * len(recreate_weights)
+        recreate_uses = [0] * len(recreate_weights)
+        operator_stats = {name: {"uses": 0, "best": 0} for name in self.RUIN_OPERATORS + self.RECREATE_OPERATORS}
+
+        iteration = 0
+        accepted = 0
+        reported_cost = None
+        stopped_early = False
+        trace = []
+
+        while True:
+            progress = self._progress(start_time, iteration, parameters)
+            if progress >= 1.0:
+                break
+
+            ruin_idx = random.choices(range(len(ruin_weights)), weights=ruin_weights)[0]
+            recreate_idx = random.choices(range(len(recreate_weights)), weights=recreate_weights)[0]
+            ruin_name = self.RUIN_OPERATORS[ruin_idx]
+            recreate_name = self.RECREATE_OPERATORS[recreate_idx]
+
+            candidate = [list(route) for route in current]
+            removed = self._ruin(model, ruin_name, candidate)
+            regret_k = 1 if recreate_name == 'greedy' else int(recreate_name.split('_')[1])
+            candidate_unassigned = model.recreate(candidate, removed + unassigned, regret_k)
+            candidate_cost = model.cost(candidate, candidate_unassigned)
+
+            score = 0.0
+            if candidate_cost < best_cost - 1e-9:
+                best, best_cost = [list(r) for r in candidate], candidate_cost
+                score = SCORE_BEST
+                operator_stats[ruin_name]["best"] += 1
+                operator_stats[recreate_name]["best"] += 1
+            elif candidate_cost < current_cost - 1e-9:
+                score = SCORE_IMPROVED
+            elif candidate_cost < best_cost * (1.0 + self.acceptance_threshold * (1.0 - progress)):
+                score = SCORE_ACCEPTED
+
+            if score:
+                current, unassigned, current_cost = candidate, candidate_unassigned, candidate_cost
+                accepted += 1
+
+            ruin_scores[ruin_idx] += score
+            ruin_uses[ruin_idx] += 1
+            recreate_scores[recreate_idx] += score
+            recreate_uses[recreate_idx] += 1
+            operator_stats[ruin_name]["uses"] += 1
+            operator_stats[recreate_name]["uses"] += 1
+
+            iteration += 1
+            if iteration % self.segment_length:
+                continue
+
+            # Adapt operator weights to their scores over the segment
+            for weights, scores, uses in ((ruin_weights, ruin_scores, ruin_uses),
+                                          (recreate_weights, recreate_scores, recreate_uses)):
+                for i in range(len(weights)):
+                    if uses[i]:
+                        weights[i] = max(0.1, (1 - self.reaction_factor) * weights[i]
+                                         + self.reaction_factor * scores[i] / uses[i])
+                    scores[i], uses[i] = 0.0, 0
+            trace.append({"iteration": iteration, "elapsed": round(time_module.time() - start_time, 4),
+                          "current_cost": current_cost, "best_cost": best_cost})
+
+            # Report the incumbent once per segment; the callback may stop the run early
+            improved = reported_cost is None or best_cost < reported_cost
+            reported_cost = best_cost
+            best_schedule = model.to_schedule(best, use_datetimes)
+            if self._report_progress(progress_callback, iteration, start_time, -best_cost,
+                                     best_schedule, len(delivery_requests), improved):
+                stopped_early = True
+                break
+
+        schedule = model.to_schedule(best, use_datetimes)
+        unscheduled = len(delivery_requests) - len(schedule)
+        evaluator = ConstraintEvaluator(constraints)
+        for name, weight in zip(self.RUIN_OPERATORS, ruin_weights):
+            operator_stats[name]["weight"] = round(weight, 3)
+        for name, weight in zip(self.RECREATE_OPERATORS, recreate_weights):
+            operator_stats[name]["weight"] = round(weight, 3)
+
+        metrics = {
+            "total_deliveries": len(delivery_requests),
+            "scheduled_deliveries": len(schedule),
+            "unscheduled_deliveries": unscheduled,
+            "drivers_used": len(set(e.driver_id for e in schedule)),
+            "total_distance": self._calculate_total_distance(schedule),
+            "average_utilization": self._calculate_utilization(schedule),
+            "route_km": round(model.cost(best, []), 3),
+            "iterations": iteration,
+            "acceptance_rate": accepted / iteration if iteration else 0.0,
+            "operators": operator_stats,
+            "trace": trace,
+            "stopped_early": stopped_early
+        }
+        if warm_plan is not None:
+            metrics["warm_start"] = warm_plan.stats
+
+        from ..time_utils import detect_conflicts
+        conflicts = detect_conflicts(schedule)
+
+        return SchedulingResult(
+            schedule=schedule,
+            metrics=metrics,
+            conflicts=conflicts,
+            optimization_score=self.evaluate_schedule(schedule, parameters) - evaluator.cost(schedule),
+            computation_time=time_module.time() - start_time,
+            algorithm_used=self.name,
+            parameters_used=parameters,
+            success=unscheduled == 0,
+            error_message=f"{unscheduled} deliveries could not be scheduled" if unscheduled else None
+        )
+
+    @staticmethod
+    def _progress(start_time: float, iteration: int, parameters: SchedulingParameters) -> float:
+        """Fraction of the time or iteration budget used, whichever is larger."""
+        progress = 0.0
+        if parameters.time_limit_seconds:
+            progress = (time_module.time() - start_time) / parameters.time_limit_seconds
+        if parameters.max_iterations:
+            progress = max(progress, iteration / parameters.max_iterations)
+        elif not parameters.time_limit_seconds:
+            progress = iteration / DEFAULT_MAX_ITERATIONS
+        return progress
+
+    @staticmethod
+    def _seed_routes(model: '_RoutingModel',
+                     routes: Routes,
+                     schedule: List[ScheduleEntry],
+                     requests: List[DeliveryRequest],
+                     drivers: List[DriverAvailability]) -> List[int]:
+        """Fill routes from a warm-start schedule; returns requests still to insert."""
+        request_index = {request.delivery_id: i for i, request in enumerate(requests)}
+        vehicle_index = {driver.driver_id: v for v, driver in enumerate(drivers)}
+        placed = set()
+        for entry in sorted(schedule, key=lambda e: e.time_slot.start_time):
+            i = request_index.get(entry.delivery_id)
+            v = vehicle_index.get(entry.driver_id)
+            if i is None or v is None or i in placed:
+                continue
+            if model.feasible(v, routes[v] + [i]):
+                routes[v].append(i)
+                placed.add(i)
+        return [i for i in range(len(requests)) if i not in placed]
+
+    def _removal_count(self, scheduled: int) -> int:
+        """Number of deliveries to remove this iteration."""
+        low = max(1, int(self.min_removal * scheduled))
+        high = max(low, min(self.max_removed, int(math.ceil(self.max_removal * scheduled))))
+        return random.randint(low, high)
+
+    def _ruin(self, model: '_RoutingModel', operator: str, routes: Routes) -> List[int]:
+        """Remove deliveries from routes in place with the given operator."""
+        scheduled = [i for route in routes for i in route]
+        if not scheduled:
+            return []
+        count = min(self._removal_count(len(scheduled)), len(scheduled))
+
+        if operator == 'route':
+            non_empty = [route for route in routes if route]
+            route = random.choice(non_empty)
+            removed = list(route)
+            route.clear()
+            return removed
+
+        if operator == 'random':
+            removed = random.sample(scheduled, count)
+        elif operator == 'worst':
+            savings = {}
+            for v, route in enumerate(routes):
+                for position, i in enumerate(route):
+                    savings[i] = model.removal_saving(v, route, position)
+            ranked = sorted(scheduled, key=lambda i: -savings[i])
+            removed = []
+            while len(removed) < count:
+                pick = ranked.pop(int(random.random() ** self.worst_randomness * len(ranked)))
+                removed.append(pick)
+        else:  # shaw
+            removed = [random.choice(scheduled)]
+            remaining = [i for i in scheduled if i != removed[0]]
+            while len(removed) < count and remaining:
+                reference = random.choice(removed)
+                remaining.sort(key=lambda i: model.relatedness(reference, i))
+                removed.append(remaining.pop(int(random.random() ** self.shaw_randomness * len(remaining))))
+
+        removed_set = set(removed)
+        for route in routes:
+            route[:] = [i for i in route if i not in removed_set]
+        return removed
+
+
+class _RoutingModel:
+    """Travel matrix, time windows and limits of one scheduling run, in minutes."""
+
+    def __init__(self,
+                 drivers: List[DriverAvailability],
+                 requests: List[DeliveryRequest],
+                 parameters: SchedulingParameters,
+                 constraints: List[SchedulingConstraint],
+                 clock: DayClock,
+                 travel_matrix: TravelMatrix,
+                 travel_profile: Optional[TravelTimeProfile] = None):
+        self.drivers = drivers
+        self.requests = requests
+        self.clock = clock
+        n_vehicles = len(drivers)
+        self.n_vehicles = n_vehicles
+
+        locations = [driver.current_location or DEFAULT_DEPOT for driver in drivers]
+        locations += [request.location for request in requests]
+        km, minutes = travel_matrix(locations, parameters.travel_speed_kmh)
+        buffer = next((c.min_buffer_minutes for c in constraints if isinstance(c, TravelTimeConstraint)), 0)
+        self.km = km.tolist()
+        self.minutes = minutes.tolist()
+        # n x n x hours travel minutes; legs then use the hour they depart in
+        self.layers = travel_profile.layers(locations)[1] if travel_profile is not None else None
+        self.buffer = buffer
+        self.max_km = max(1e-9, float(km.max()))
+
+        self.windows = [service_start_windows(clock, request) for request in requests]
+        self.window_starts = [[start for start, _ in windows] for windows in self.windows]
+        first_starts = [windows[0][0] for windows in self.windows if windows]
+        self.window_range = max(1, max(first_starts) - min(first_starts)) if first_starts else 1
+
+        self.hours = []
+        for driver in drivers:
+            hours = sorted(clock.windows_to_minutes(driver.available_hours))
+            self.hours.append((hours[0][0], hours[-1][1]))
+
+        max_hours = None
+        if not parameters.allow_overtime:
+            max_hours = next((c.max_hours_per_day for c in constraints if isinstance(c, WorkingHoursConstraint)), None)
+        self.max_span = int(max_hours * 60) if max_hours else None
+
+    def node(self, i: int) -> int:
+        return self.n_vehicles + i
+
+    def travel(self, a: int, b: int, departure: int) -> int:
+        """Travel minutes from node a to node b leaving at departure."""
+        if self.layers is None:
+            return self.minutes[a][b]
+        return int(self.layers[a, b, (departure // 60) % HOUR_BUCKETS])
+
+    def _earliest_start(self, i: int, arrival: int) -> Optional[int]:
+        """Earliest service start of request i at or after arrival."""
+        windows = self.windows[i]
+        k = max(0, bisect_left(self.window_starts[i], arrival) - 1)
+        for start, end in windows[k:]:
+            if arrival <= end:
+                return max(start, arrival)
+        return None
+
+    def timing(self, v: int, route: List[int]) -> Optional[List[int]]:
+        """Service start minutes along the route, or None if it is infeasible."""
+        day_start, day_end = self.hours[v]
+        t = day_start
+        previous = v
+        starts = []
+        minutes, layers = self.minutes, self.layers
+        for i in route:
+            node = self.node(i)
+            travel = minutes[previous][node] if layers is None \
+                else int(layers[previous, node, (t // 60) % HOUR_BUCKETS])
+            travel += self.buffer if previous >= self.n_vehicles else 0
+            start = self._earliest_start(i, t + travel)
+            if start is None:
+                return None
+            starts.append(start)
+            t = start + self.requests[i].service_duration
+            previous = node
+        end = t + (minutes[previous][v] if layers is None else int(layers[previous, v, (t // 60) % HOUR_BUCKETS]))
+        if end > day_end:
+            return None
+        if self.max_span and starts:
+            departure = starts[0] - self.travel(v, self.node(route[0]), day_start)
+            if end - departure > self.max_span:
+                return None
+        return starts
+
+    def feasible(self, v: int, route: List[int]) -> bool:
+        """Route meets max deliveries, cylinder capacity and timing."""
+        driver = self.drivers[v]
+        if len(route) > driver.max_deliveries:
+            return False
+        if driver.vehicle_capacity:
+            load: Dict[str, int] = {}
+            for i in route:
+                request = self.requests[i]
+                load[request.cylinder_type] = load.get(request.cylinder_type, 0) + request.quantity
+            for cylinder_type, quantity in load.items():
+                limit = driver.vehicle_capacity.get(cylinder_type)
+                if limit is not None and quantity > limit:
+                    return False
+        return self.timing(v, route) is not None
+
+    def route_km(self, v: int, route: List[int]) -> float:
+        path = [v] + [self.node(i) for i in route] + [v]
+        return sum(self.km[a][b] for a, b in zip(path, path[1:]))
+
+    def cost(self, routes: Routes, unassigned: List[int]) -> float:
+        """Route kilometres plus penalties for deliveries left out."""
+        return (sum(self.route_km(v, route) for v, route in enumerate(routes))
+                + sum(UNASSIGNED_COST + PRIORITY_COST * max(self.requests[i].priority, 0) for i in unassigned))
+
+    def removal_saving(self, v: int, route: List[int], position: int) -> float:
+        """Kilometres saved by removing route[position]."""
+        previous = self.node(route[position - 1]) if position else v
+        following = self.node(route[position + 1]) if position + 1 < len(route) else v
+        node = self.node(route[position])
+        return self.km[previous][node] + self.km[node][following] - self.km[previous][following]
+
+    def relatedness(self, i: int, j: int) -> float:
+        """Shaw relatedness: lower means closer in space and in time window."""
+        a, b = self.windows[i], self.windows[j]
+        time_gap = abs(a[0][0] - b[0][0]) / self.window_range if a and b else 1.0
+        return self.km[self.node(i)][self.node(j)] / self.max_km + time_gap
+
+    def best_insertion(self, v: int, route: List[int], i: int) -> Optional[Tuple[float, int]]:
+        """Cheapest feasible (detour km, position) of request i in route v."""
+        path = [v] + [self.node(j) for j in route] + [v]
+        node = self.node(i)
+        options = sorted(
+            (self.km[path[p]][node] + self.km[node][path[p + 1]] - self.km[path[p]][path[p + 1]], p)
+            for p in range(len(route) + 1)
+        )
+        for detour, position in options:
+            if self.feasible(v, route[:position] + [i] + route[position:]):
+                return detour, position
+        return None
+
+    def recreate(self, routes: Routes, pending: List[int], regret_k: int) -> List[int]:
+        """
+        Insert pending requests into routes in place; returns those that fit nowhere.
+
+        regret_k=1 inserts the cheapest insertion first (greedy); larger k
+        first inserts the request that would lose most by waiting, measured
+        over its k best routes.
+        """
+        pending = list(dict.fromkeys(pending))
+        random.shuffle(pending)  # Break ties differently each iteration
+        options = {i: [self.best_insertion(v, route, i) for v, route in enumerate(routes)] for i in pending}
+        unassigned = []
+
+        while pending:
+            choice = None
+            for i in pending:
+                feasible = sorted((option[0], option[1], v) for v, option in enumerate(options[i]) if option)
+                if not feasible:
+                    continue
+                if regret_k == 1:
+                    key = -feasible[0][0]
+                else:
+                    costs = [f[0] for f in feasible[:regret_k]]
+                    costs += [UNASSIGNED_COST] * (regret_k - len(costs))
+                    key = sum(c - costs[0] for c in costs[1:])
+                if choice is None or key > choice[0]:
+                    choice = (key, i, feasible[0])
+
+            if choice is None:
+                unassigned.extend(pending)
+                break
+
+            _, i, (_, position, v) = choice
+            routes[v].insert(position, i)
+            pending.remove(i)
+            del options[i]
+            for j in pending:
+                options[j][v] = self.best_insertion(v, routes[v], j)
+
+        return unassigned
+
+    def to_schedule(self, routes: Routes, use_datetimes: bool) -> List[ScheduleEntry]:
+        """Schedule entries for routes, in minutes or datetimes like the input."""
+        schedule = []
+        for v, route in enumerate(routes):
+            driver = self.drivers[v]
+            for i, start in zip(route, self.timing(v, route) or []):
+                request = self.requests[i]
+                end = start + request.service_duration
+                schedule.append(ScheduleEntry(
+                    delivery_id=request.delivery_id,
+                    client_id=request.client_id,
+                    driver_id=driver.driver_id,
+                    vehicle_id=driver.vehicle_id or 1,
+                    time_slot=TimeSlot(
+                        start_time=self.clock.to_datetime(start) if use_datetimes else start,
+                        end_time=self.clock.to_datetime(end) if use_datetimes else end
+                    ),
+                    service_duration=request.service_duration,
+                    priority=request.priority,
+                    location=request.location
+                ))
+        return schedule
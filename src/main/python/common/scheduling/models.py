@@ -1,7 +1,7 @@
 """Data models for scheduling system."""
 from dataclasses import dataclass, field
 from datetime import datetime, date
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Optional, Tuple, Any, Callable
 from enum import Enum
 
 
@@ -14,7 +14,7 @@ class OptimizationObjective(Enum):
     MAXIMIZE_UTILIZATION = "maximize_utilization"
 
 
-@dataclass
+@dataclass(slots=True)
 class DeliveryRequest:
     """Request for delivery scheduling."""
     delivery_id: int
@@ -29,7 +29,7 @@ class DeliveryRequest:
     preferred_driver_id: Optional[int] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class DriverAvailability:
     """Driver availability information."""
     driver_id: int
@@ -54,18 +54,30 @@ class VehicleInfo:
     current_location: Optional[Tuple[float, float]] = None
 
 
+@dataclass(slots=True)
+class WarmStartRoute:
+    """A driver's visit order on a comparable earlier day, used to seed scheduling."""
+    driver_id: int
+    client_ids: List[int]  # Clients in route sequence
+
+
+# Iteration budget of the iterative searches when no time limit is given
+DEFAULT_MAX_ITERATIONS = 1000
+
+
 @dataclass
 class SchedulingParameters:
     """Parameters for scheduling algorithm."""
     date: date
     optimization_objectives: List[OptimizationObjective]
     objective_weights: Dict[OptimizationObjective, float] = field(default_factory=dict)
-    max_iterations: int = 1000
+    max_iterations: Optional[int] = None  # None: iterative searches run to time_limit_seconds
     time_limit_seconds: int = 300
     allow_overtime: bool = False
     overtime_penalty: float = 2.0
     travel_speed_kmh: float = 30.0
     service_time_buffer: float = 1.1  # 10% buffer
+    warm_start: Optional[List[WarmStartRoute]] = None  # Previous routes to seed GA / SA
     
     def __post_init__(self):
         # Set default weights if not provided
@@ -104,6 +116,23 @@ class SchedulingResult:
 
 
 @dataclass
+class SchedulingProgress:
+    """Incumbent reported by an anytime scheduling run."""
+    algorithm: str
+    iteration: int
+    elapsed: float  # seconds
+    best_score: float
+    scheduled: int
+    unscheduled: int
+    schedule: List[Any]  # Best schedule so far (ScheduleEntry objects)
+    improved: bool = True  # Whether the incumbent changed since the last report
+
+
+# Called with each progress report; returning True asks the algorithm to stop early
+ProgressCallback = Callable[[SchedulingProgress], Optional[bool]]
+
+
+@dataclass(slots=True)
 class RouteSegment:
     """Segment of a delivery route."""
     from_location: Tuple[float, float]
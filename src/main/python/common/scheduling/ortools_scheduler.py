@@ -0,0 +1,333 @@
+"""Vehicle routing with time windows solved by OR-Tools, without external services."""
+from typing import List, Optional, Tuple, Callable, Sequence
+import logging
+import time as time_module
+
+import numpy as np
+from ortools.constraint_solver import pywrapcp, routing_enums_pb2
+
+from ..time_utils import ScheduleEntry, TimeSlot
+from ..minutes import DayClock
+from ..geo_utils import calculate_haversine_matrix
+from .models import (
+    DeliveryRequest, DriverAvailability, SchedulingParameters, SchedulingResult,
+    ProgressCallback
+)
+from .constraints import SchedulingConstraint, TravelTimeConstraint, WorkingHoursConstraint
+from .algorithms import SchedulingAlgorithm
+from .evaluator import ConstraintEvaluator
+from .travel_profile import TravelTimeProfile
+
+logger = logging.getLogger(__name__)
+
+# Start location for drivers without a current location (LuckyGas depot)
+DEFAULT_DEPOT = (22.7553, 121.1504)
+
+# Dropping a delivery costs more than any detour; higher priority costs more
+DROP_PENALTY = 1_000_000
+PRIORITY_PENALTY = 100_000
+
+# (locations, speed_kmh) -> (distance km, travel minutes) matrices
+TravelMatrix = Callable[[Sequence[Tuple[float, float]], float], Tuple[np.ndarray, np.ndarray]]
+
+
+def haversine_travel_matrix(locations: Sequence[Tuple[float, float]],
+                            speed_kmh: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Straight-line distances and travel minutes, matching calculate_travel_time.
+
+    Returns:
+        (distance km, travel minutes) n x n arrays
+    """
+    km = calculate_haversine_matrix(locations)
+    minutes = (km / speed_kmh * 60).astype(np.int64) + 5  # calculate_travel_time's traffic buffer
+    np.fill_diagonal(minutes, 0)
+    return km, minutes
+
+
+def service_start_windows(clock: DayClock, request: DeliveryRequest) -> List[Tuple[int, int]]:
+    """
+    Merged (earliest, latest) service start minutes so the service finishes inside a window.
+
+    Returns:
+        Sorted, non-overlapping windows; empty if the service fits no window
+    """
+    windows = []
+    for start, end in sorted(clock.windows_to_minutes(request.time_windows)):
+        end -= request.service_duration
+        if end < start:
+            continue
+        if windows and start <= windows[-1][1] + 1:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))  # Merge overlaps
+        else:
+            windows.append((start, end))
+    return windows
+
+
+def departure_ranges(clock: DayClock,
+                     drivers: List[DriverAvailability],
+                     requests: List[DeliveryRequest]) -> Tuple[List[int], List[int]]:
+    """
+    Earliest and latest minute each node can be left, for time-of-day travel
+    times on the static matrix of the time dimension.
+
+    Drivers leave at the start of their hours; a delivery is left after its
+    service, anywhere in its feasible start range.
+
+    Returns:
+        (earliest, latest) minutes since midnight, drivers first then requests
+    """
+    earliest, latest = [], []
+    for driver in drivers:
+        start = min(start for start, _ in clock.windows_to_minutes(driver.available_hours))
+        earliest.append(start)
+        latest.append(start)
+    for request in requests:
+        windows = service_start_windows(clock, request) or [(earliest[0], earliest[0])]
+        earliest.append(windows[0][0] + request.service_duration)
+        latest.append(min(windows[-1][1] + request.service_duration, 24 * 60 - 1))
+    return earliest, latest
+
+
+class ORToolsScheduler(SchedulingAlgorithm):
+    """
+    Builds a VRPTW from the delivery requests and drivers and solves it with
+    the OR-Tools routing solver under parameters.time_limit_seconds.
+
+    Each driver starts and ends at its current location. The model covers
+    time windows (including gaps between windows), service durations,
+    driver hours, max deliveries, per-cylinder vehicle capacities and the
+    travel time and working hours constraints in use. Deliveries that do
+    not fit are dropped and reported as unscheduled instead of failing the
+    whole run.
+    """
+
+    def __init__(self,
+                 travel_matrix: Optional[TravelMatrix] = None,
+                 first_solution_strategy: str = 'PATH_CHEAPEST_ARC',
+                 metaheuristic: str = 'GUIDED_LOCAL_SEARCH',
+                 travel_profile: Optional[TravelTimeProfile] = None):
+        """
+        Initialize OR-Tools scheduler.
+
+        Args:
+            travel_matrix: Distance/time matrix builder (default: haversine)
+            first_solution_strategy: FirstSolutionStrategy name
+            metaheuristic: LocalSearchMetaheuristic name
+            travel_profile: Time-of-day travel minutes for the time dimension (optional)
+        """
+        super().__init__("OR-Tools VRPTW Scheduler")
+        self.travel_matrix = travel_matrix or haversine_travel_matrix
+        self.travel_profile = travel_profile
+        self.first_solution_strategy = first_solution_strategy
+        self.metaheuristic = metaheuristic
+
+    def schedule(self,
+                delivery_requests: List[DeliveryRequest],
+                driver_availability: List[DriverAvailability],
+                parameters: SchedulingParameters,
+                constraints: List[SchedulingConstraint],
+                progress_callback: Optional[ProgressCallback] = None) -> SchedulingResult:
+        """Generate schedule by solving a VRPTW."""
+        start_time = time_module.time()
+        drivers = [driver for driver in driver_availability if driver.available_hours]
+        requests = [request for request in delivery_requests if request.time_windows]
+
+        if not drivers or not requests:
+            return SchedulingResult(
+                schedule=[],
+                metrics={"total_deliveries": len(delivery_requests), "scheduled_deliveries": 0,
+                         "unscheduled_deliveries": len(delivery_requests)},
+                conflicts=[],
+                optimization_score=0,
+                computation_time=time_module.time() - start_time,
+                algorithm_used=self.name,
+                parameters_used=parameters,
+                success=not delivery_requests,
+                error_message="No drivers or deliveries to route" if delivery_requests else None
+            )
+
+        # Solve in minutes since midnight; answer in the caller's time representation
+        clock = DayClock(parameters.date)
+        use_datetimes = not isinstance(requests[0].time_windows[0][0], int)
+        n_vehicles = len(drivers)
+
+        locations = [driver.current_location or DEFAULT_DEPOT for driver in drivers]
+        locations += [request.location for request in requests]
+        km, minutes = self.travel_matrix(locations, parameters.travel_speed_kmh)
+        if self.travel_profile is not None:
+            earliest, latest = departure_ranges(clock, drivers, requests)
+            minutes = self.travel_profile.departure_minutes(locations, earliest, latest)
+        buffer = next((c.min_buffer_minutes for c in constraints if isinstance(c, TravelTimeConstraint)), 0)
+
+        manager = pywrapcp.RoutingIndexManager(
+            len(locations), n_vehicles, list(range(n_vehicles)), list(range(n_vehicles))
+        )
+        routing = pywrapcp.RoutingModel(manager)
+
+        # Arc cost in metres; time transit is service at the origin plus travel
+        distance_index = routing.RegisterTransitMatrix(np.rint(km * 1000).astype(np.int64).tolist())
+        routing.SetArcCostEvaluatorOfAllVehicles(distance_index)
+
+        service = np.zeros(len(locations), dtype=np.int64)
+        service[n_vehicles:] = [request.service_duration for request in requests]
+        travel = np.asarray(minutes, dtype=np.int64) + service[:, None]
+        travel[n_vehicles:, n_vehicles:] += buffer
+        np.fill_diagonal(travel, 0)
+        time_index = routing.RegisterTransitMatrix(travel.tolist())
+
+        all_windows = [w for d in drivers for w in d.available_hours] + [w for r in requests for w in r.time_windows]
+        horizon = max(end for _, end in clock.windows_to_minutes(all_windows))
+        routing.AddDimension(time_index, horizon, horizon, False, 'Time')
+        time_dimension = routing.GetDimensionOrDie('Time')
+
+        max_hours = None
+        if not parameters.allow_overtime:
+            max_hours = next((c.max_hours_per_day for c in constraints if isinstance(c, WorkingHoursConstraint)), None)
+
+        for vehicle, driver in enumerate(drivers):
+            hours = sorted(clock.windows_to_minutes(driver.available_hours))
+            time_dimension.CumulVar(routing.Start(vehicle)).SetRange(hours[0][0], hours[-1][1])
+            time_dimension.CumulVar(routing.End(vehicle)).SetRange(hours[0][0], hours[-1][1])
+            if max_hours:
+                time_dimension.SetSpanUpperBoundForVehicle(int(max_hours * 60), vehicle)
+            routing.AddVariableMinimizedByFinalizer(time_dimension.CumulVar(routing.Start(vehicle)))
+            routing.AddVariableMinimizedByFinalizer(time_dimension.CumulVar(routing.End(vehicle)))
+
+        # Service must start and finish inside one of the delivery's windows
+        for i, request in enumerate(requests):
+            index = manager.NodeToIndex(n_vehicles + i)
+            windows = service_start_windows(clock, request)
+            routing.AddDisjunction([index], DROP_PENALTY + PRIORITY_PENALTY * max(request.priority, 0))
+            if not windows:
+                routing.ActiveVar(index).SetValue(0)  # No window fits the service
+                continue
+            cumul = time_dimension.CumulVar(index)
+            cumul.SetRange(windows[0][0], windows[-1][1])
+            for (_, gap_start), (gap_end, _) in zip(windows, windows[1:]):
+                cumul.RemoveInterval(gap_start + 1, gap_end - 1)
+
+        # Max deliveries per driver
+        count_index = routing.RegisterUnaryTransitVector([0] * n_vehicles + [1] * len(requests))
+        routing.AddDimensionWithVehicleCapacity(
+            count_index, 0, [driver.max_deliveries for driver in drivers], True, 'Deliveries'
+        )
+
+        # One capacity dimension per cylinder type that some vehicle limits
+        for cylinder_type in sorted({request.cylinder_type for request in requests}):
+            limits = [(driver.vehicle_capacity or {}).get(cylinder_type) for driver in drivers]
+            if all(limit is None for limit in limits):
+                continue
+            demand = [0] * n_vehicles + [
+                request.quantity if request.cylinder_type == cylinder_type else 0 for request in requests
+            ]
+            unlimited = sum(demand)
+            routing.AddDimensionWithVehicleCapacity(
+                routing.RegisterUnaryTransitVector(demand), 0,
+                [unlimited if limit is None else limit for limit in limits], True,
+                f'Capacity_{cylinder_type}'
+            )
+
+        def extract(next_of: Callable[[int], int], start_of: Callable[[int], int]) -> List[ScheduleEntry]:
+            schedule = []
+            for vehicle, driver in enumerate(drivers):
+                index = next_of(routing.Start(vehicle))
+                while not routing.IsEnd(index):
+                    request = requests[manager.IndexToNode(index) - n_vehicles]
+                    start = start_of(index)
+                    slot_start = clock.to_datetime(start) if use_datetimes else start
+                    slot_end = clock.to_datetime(start + request.service_duration) if use_datetimes \
+                        else start + request.service_duration
+                    schedule.append(ScheduleEntry(
+                        delivery_id=request.delivery_id,
+                        client_id=request.client_id,
+                        driver_id=driver.driver_id,
+                        vehicle_id=driver.vehicle_id or 1,
+                        time_slot=TimeSlot(start_time=slot_start, end_time=slot_end),
+                        service_duration=request.service_duration,
+                        priority=request.priority,
+                        location=request.location
+                    ))
+                    index = next_of(index)
+            return schedule
+
+        # Report each improving solution; the callback may stop the search
+        evaluator = ConstraintEvaluator(constraints)
+        solutions_seen = [0]
+        stopped_early = [False]
+        if progress_callback is not None:
+            def on_solution():
+                solutions_seen[0] += 1
+                schedule = extract(lambda i: routing.NextVar(i).Value(),
+                                   lambda i: time_dimension.CumulVar(i).Min())
+                score = self.evaluate_schedule(schedule, parameters) - evaluator.cost(schedule)
+                if self._report_progress(progress_callback, solutions_seen[0], start_time, score,
+                                         schedule, len(delivery_requests)):
+                    stopped_early[0] = True
+                    routing.solver().FinishCurrentSearch()
+            routing.AddAtSolutionCallback(on_solution)
+
+        search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+        search_parameters.first_solution_strategy = getattr(
+            routing_enums_pb2.FirstSolutionStrategy, self.first_solution_strategy
+        )
+        search_parameters.local_search_metaheuristic = getattr(
+            routing_enums_pb2.LocalSearchMetaheuristic, self.metaheuristic
+        )
+        remaining = parameters.time_limit_seconds - (time_module.time() - start_time)
+        search_parameters.time_limit.FromMilliseconds(max(1, int(remaining * 1000)))
+
+        assignment = routing.SolveWithParameters(search_parameters)
+        solver = routing.solver()
+        solver_stats = {
+            "status": routing_enums_pb2.RoutingSearchStatus.Value.Name(routing.status()),
+            "objective": assignment.ObjectiveValue() if assignment else None,
+            "solutions": solver.Solutions(),
+            "branches": solver.Branches(),
+            "wall_time_ms": solver.WallTime()
+        }
+
+        if assignment is None:
+            return SchedulingResult(
+                schedule=[],
+                metrics={"total_deliveries": len(delivery_requests), "scheduled_deliveries": 0,
+                         "unscheduled_deliveries": len(delivery_requests), "solver": solver_stats},
+                conflicts=[],
+                optimization_score=0,
+                computation_time=time_module.time() - start_time,
+                algorithm_used=self.name,
+                parameters_used=parameters,
+                success=False,
+                error_message=f"OR-Tools found no solution ({solver_stats['status']})"
+            )
+
+        schedule = extract(lambda i: assignment.Value(routing.NextVar(i)),
+                           lambda i: assignment.Min(time_dimension.CumulVar(i)))
+        unscheduled = len(delivery_requests) - len(schedule)
+        computation_time = time_module.time() - start_time
+
+        metrics = {
+            "total_deliveries": len(delivery_requests),
+            "scheduled_deliveries": len(schedule),
+            "unscheduled_deliveries": unscheduled,
+            "drivers_used": len(set(e.driver_id for e in schedule)),
+            "total_distance": self._calculate_total_distance(schedule),
+            "average_utilization": self._calculate_utilization(schedule),
+            "solver": solver_stats,
+            "stopped_early": stopped_early[0]
+        }
+
+        from ..time_utils import detect_conflicts
+        conflicts = detect_conflicts(schedule)
+
+        return SchedulingResult(
+            schedule=schedule,
+            metrics=metrics,
+            conflicts=conflicts,
+            optimization_score=self.evaluate_schedule(schedule, parameters) - evaluator.cost(schedule),
+            computation_time=computation_time,
+            algorithm_used=self.name,
+            parameters_used=parameters,
+            success=unscheduled == 0,
+            error_message=f"{unscheduled} deliveries could not be scheduled" if unscheduled else None
+        )
@@ -0,0 +1,195 @@
+"""Multi-start portfolio of scheduling algorithms run in parallel processes."""
+from typing import List, Dict, Optional, Tuple, Any
+from dataclasses import dataclass, replace
+from concurrent.futures import ProcessPoolExecutor, wait
+import multiprocessing
+import logging
+import os
+import random
+import time as time_module
+
+from .models import (
+    DeliveryRequest, DriverAvailability, SchedulingParameters, SchedulingResult,
+    ProgressCallback
+)
+from .constraints import SchedulingConstraint
+from .algorithms import (
+    SchedulingAlgorithm, GreedyScheduler, GeneticScheduler, SimulatedAnnealingScheduler
+)
+from .evaluator import ConstraintEvaluator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PortfolioMember:
+    """One algorithm/seed combination in the portfolio."""
+    name: str
+    scheduler: SchedulingAlgorithm
+    seed: int = 0
+
+
+def _run_member(member: PortfolioMember,
+                delivery_requests: List[DeliveryRequest],
+                driver_availability: List[DriverAvailability],
+                parameters: SchedulingParameters,
+                constraints: List[SchedulingConstraint],
+                deadline: float) -> Tuple[Optional[SchedulingResult], float]:
+    """
+    Run one member until the shared deadline (module level so workers can unpickle it).
+
+    Returns:
+        (result, elapsed seconds); result is None if the deadline had passed
+    """
+    start = time_module.time()
+    remaining = deadline - start
+    if remaining <= 0:
+        return None, 0.0
+
+    state = random.getstate()
+    random.seed(member.seed)
+    try:
+        result = member.scheduler.schedule(
+            delivery_requests, driver_availability,
+            replace(parameters, time_limit_seconds=remaining), constraints
+        )
+    finally:
+        random.setstate(state)
+    return result, time_module.time() - start
+
+
+class PortfolioScheduler(SchedulingAlgorithm):
+    """
+    Runs greedy, genetic and simulated annealing with several seeds in
+    parallel worker processes under one wall-clock deadline, and keeps the
+    best feasible result.
+
+    Members are re-scored with the same objective and constraint penalty so
+    results from different algorithms are comparable.
+    """
+
+    # Members run in other processes and report only once the portfolio ends
+    supports_early_stop = False
+
+    def __init__(self,
+                 members: Optional[List[PortfolioMember]] = None,
+                 seeds: int = 2,
+                 max_workers: Optional[int] = None,
+                 grace_seconds: float = 1.0):
+        """
+        Initialize portfolio scheduler.
+
+        Args:
+            members: Members to run (default: greedy once, GA and SA per seed)
+            seeds: Seeds per randomized algorithm for the default members
+            max_workers: Worker processes (default: CPU count; 1 runs in-process)
+            grace_seconds: Extra wait after the deadline before abandoning members
+        """
+        super().__init__("Portfolio Scheduler")
+        if members is None:
+            members = [PortfolioMember("greedy", GreedyScheduler())]
+            for seed in range(seeds):
+                members.append(PortfolioMember(f"genetic#{seed}", GeneticScheduler(), seed))
+                members.append(PortfolioMember(f"simulated_annealing#{seed}", SimulatedAnnealingScheduler(), seed))
+        self.members = members
+        self.max_workers = max_workers
+        self.grace_seconds = grace_seconds
+
+    def schedule(self,
+                delivery_requests: List[DeliveryRequest],
+                driver_availability: List[DriverAvailability],
+                parameters: SchedulingParameters,
+                constraints: List[SchedulingConstraint],
+                progress_callback: Optional[ProgressCallback] = None) -> SchedulingResult:
+        """
+        Generate schedule by running all members and keeping the best.
+
+        Members run in other processes, so progress is reported once with
+        the winning schedule.
+        """
+        start_time = time_module.time()
+        deadline = start_time + parameters.time_limit_seconds
+        args = (delivery_requests, driver_availability, parameters, constraints, deadline)
+
+        workers = min(self.max_workers or os.cpu_count() or 1, len(self.members))
+        outcomes: Dict[str, Tuple[str, Optional[SchedulingResult], float]] = {}
+
+        if workers <= 1:
+            for member in self.members:
+                result, elapsed = _run_member(member, *args)
+                outcomes[member.name] = ("ok" if result else "skipped", result, elapsed)
+        else:
+            # spawn: forking a multi-threaded API server process is unsafe
+            executor = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            try:
+                futures = {executor.submit(_run_member, member, *args): member for member in self.members}
+                timeout = max(0.0, deadline - time_module.time()) + self.grace_seconds
+                done, _ = wait(futures, timeout=timeout)
+                for future, member in futures.items():
+                    if future not in done:
+                        outcomes[member.name] = ("timeout", None, time_module.time() - start_time)
+                    elif future.exception() is not None:
+                        logger.warning(f"Portfolio member {member.name} failed: {future.exception()}")
+                        outcomes[member.name] = ("error", None, 0.0)
+                    else:
+                        result, elapsed = future.result()
+                        outcomes[member.name] = ("ok" if result else "skipped", result, elapsed)
+            finally:
+                executor.shutdown(wait=False, cancel_futures=True)
+
+        evaluator = ConstraintEvaluator(constraints)
+        report = []
+        best: Optional[Tuple[Tuple[bool, float], str, SchedulingResult]] = None
+
+        for member in self.members:
+            status, result, elapsed = outcomes[member.name]
+            entry: Dict[str, Any] = {
+                "member": member.name,
+                "algorithm": member.scheduler.name,
+                "seed": member.seed,
+                "status": status,
+                "time": elapsed
+            }
+            if result is not None:
+                score = self.evaluate_schedule(result.schedule, parameters) - evaluator.cost(result.schedule)
+                feasible = result.success and result.is_feasible
+                entry.update(score=score, feasible=feasible, scheduled=len(result.schedule))
+                if best is None or (feasible, score) > best[0]:
+                    best = ((feasible, score), member.name, result)
+            report.append(entry)
+
+        computation_time = time_module.time() - start_time
+
+        if best is None:
+            return SchedulingResult(
+                schedule=[],
+                metrics={"portfolio": report},
+                conflicts=[],
+                optimization_score=0,
+                computation_time=computation_time,
+                algorithm_used=self.name,
+                parameters_used=parameters,
+                success=False,
+                error_message="No portfolio member finished before the deadline"
+            )
+
+        (_, score), winner, result = best
+        self._report_progress(progress_callback, len(report), start_time, score,
+                              result.schedule, len(delivery_requests))
+        metrics = dict(result.metrics)
+        metrics["portfolio"] = report
+        metrics["portfolio_winner"] = winner
+
+        return SchedulingResult(
+            schedule=result.schedule,
+            metrics=metrics,
+            conflicts=result.conflicts,
+            optimization_score=score,
+            computation_time=computation_time,
+            algorithm_used=f"{self.name} ({result.algorithm_used})",
+            parameters_used=parameters,
+            success=result.success,
+            error_message=result.error_message
+        )
@@ -0,0 +1,300 @@
+"""Time-dependent travel times by zone pair and hour of day, learned from delivery history."""
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, time as dt_time
+from typing import Callable, Iterable, Optional, Sequence, Tuple, Union
+import logging
+import math
+import threading
+
+import numpy as np
+
+from ..geo_utils import calculate_haversine_distance, calculate_haversine_matrix
+
+logger = logging.getLogger(__name__)
+
+HOUR_BUCKETS = 24
+TRAVEL_BUFFER_MINUTES = 5  # calculate_travel_time's traffic buffer
+
+# Zone grid over Taitung County (south, west, north, east); ~10 km cells
+TAITUNG_BOUNDS = (21.9, 120.7, 23.5, 121.65)
+ZONE_DEGREES = 0.1
+
+# Observations a zone pair needs before it counts as much as its hour's average
+PRIOR_SAMPLES = 5.0
+MIN_OBSERVED_KM = 0.3  # Shorter legs are mostly parking and walking
+MIN_SPEED_KMH = 5.0
+MAX_SPEED_KMH = 90.0
+MAX_CACHED_LAYER_BYTES = 128 * 2 ** 20  # Cached layers beyond the newest are evicted above this
+
+TimeOfDay = Union[int, float, datetime, dt_time]
+
+
+@dataclass(frozen=True)
+class TravelObservation:
+    """One driven leg from delivery history."""
+    origin: Tuple[float, float]
+    destination: Tuple[float, float]
+    departure: int  # Minutes since midnight
+    minutes: float  # Observed travel minutes
+
+
+def hour_bucket(when: TimeOfDay) -> int:
+    """Hour bucket of minutes since midnight, a datetime or a time."""
+    if isinstance(when, (datetime, dt_time)):
+        return when.hour
+    return int(when // 60) % HOUR_BUCKETS
+
+
+def _grid(bounds: Tuple[float, float, float, float], zone_degrees: float) -> Tuple[int, int]:
+    rows = max(1, math.ceil((bounds[2] - bounds[0]) / zone_degrees - 1e-9))
+    cols = max(1, math.ceil((bounds[3] - bounds[1]) / zone_degrees - 1e-9))
+    return rows, cols
+
+
+class TravelTimeProfile:
+    """
+    Effective straight-line speeds by (origin zone, destination zone, hour).
+
+    speeds[i, j, b] is the speed in km/h that turns the haversine distance
+    of a leg from zone i to zone j, departing in hour b, into travel minutes
+    with the same rounding and traffic buffer as calculate_travel_time, so
+    a uniform profile reproduces haversine_travel_matrix. The (n, n, hours)
+    minute layers of a set of locations are computed once and cached as
+    int16 (48 MB at 1000 locations, bounded by MAX_CACHED_LAYER_BYTES), and
+    every lookup by (i, j, bucket) after that is O(1).
+    """
+
+    def __init__(self,
+                 speeds: np.ndarray,
+                 bounds: Tuple[float, float, float, float] = TAITUNG_BOUNDS,
+                 zone_degrees: float = ZONE_DEGREES,
+                 samples: Optional[np.ndarray] = None,
+                 buffer_minutes: int = TRAVEL_BUFFER_MINUTES):
+        """
+        Initialize travel time profile.
+
+        Args:
+            speeds: zones x zones x HOUR_BUCKETS speeds in km/h
+            bounds: (south, west, north, east) of the zone grid
+            zone_degrees: Zone size in degrees
+            samples: Observation counts behind each speed (optional)
+            buffer_minutes: Minutes added to every leg
+        """
+        self.bounds = tuple(float(v) for v in bounds)
+        self.zone_degrees = float(zone_degrees)
+        self.rows, self.cols = _grid(self.bounds, self.zone_degrees)
+        n_zones = self.rows * self.cols
+        self.speeds = np.asarray(speeds, dtype=np.float32)
+        if self.speeds.shape != (n_zones, n_zones, HOUR_BUCKETS):
+            raise ValueError(f"Expected speeds of shape {(n_zones, n_zones, HOUR_BUCKETS)}, "
+                             f"got {self.speeds.shape}")
+        self.samples = np.zeros(self.speeds.shape, dtype=np.uint16) if samples is None \
+            else np.asarray(samples, dtype=np.uint16)
+        self.buffer_minutes = int(buffer_minutes)
+        self._layers: "OrderedDict[tuple, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def n_zones(self) -> int:
+        return self.rows * self.cols
+
+    @classmethod
+    def uniform(cls,
+                speed_kmh: float = 30.0,
+                bounds: Tuple[float, float, float, float] = TAITUNG_BOUNDS,
+                zone_degrees: float = ZONE_DEGREES,
+                buffer_minutes: int = TRAVEL_BUFFER_MINUTES) -> 'TravelTimeProfile':
+        """Same speed everywhere at all hours (matches calculate_travel_time)."""
+        rows, cols = _grid(bounds, zone_degrees)
+        speeds = np.full((rows * cols, rows * cols, HOUR_BUCKETS), speed_kmh, dtype=np.float32)
+        return cls(speeds, bounds, zone_degrees, buffer_minutes=buffer_minutes)
+
+    @classmethod
+    def fit(cls,
+            observations: Iterable[TravelObservation],
+            default_speed_kmh: float = 30.0,
+            bounds: Tuple[float, float, float, float] = TAITUNG_BOUNDS,
+            zone_degrees: float = ZONE_DEGREES,
+            buffer_minutes: int = TRAVEL_BUFFER_MINUTES,
+            prior_samples: float = PRIOR_SAMPLES) -> 'TravelTimeProfile':
+        """
+        Learn speeds from observed legs.
+
+        Paces (minutes per km) are averaged rather than speeds, so the
+        profile predicts mean travel times. Each hour's pace is shrunk
+        towards the default speed and each zone pair's pace towards its
+        hour's, by prior_samples pseudo-observations, so sparse zone pairs
+        fall back smoothly instead of following a single noisy leg.
+
+        Args:
+            observations: Observed legs
+            default_speed_kmh: Speed where there is no history
+            bounds: (south, west, north, east) of the zone grid
+            zone_degrees: Zone size in degrees
+            buffer_minutes: Minutes added to every leg
+            prior_samples: Strength of the shrinkage
+
+        Returns:
+            Fitted profile
+        """
+        profile = cls.uniform(default_speed_kmh, bounds, zone_degrees, buffer_minutes)
+        observations = list(observations)
+        if not observations:
+            return profile
+
+        origins = np.array([o.origin for o in observations], dtype=float)
+        destinations = np.array([o.destination for o in observations], dtype=float)
+        km = np.array([calculate_haversine_distance(*o.origin, *o.destination) for o in observations])
+        driving = np.array([o.minutes for o in observations], dtype=float) - buffer_minutes
+        usable = (km >= MIN_OBSERVED_KM) & (driving > 0)
+        if not usable.any():
+            return profile
+
+        pace = np.clip(driving[usable] / km[usable], 60.0 / MAX_SPEED_KMH, 60.0 / MIN_SPEED_KMH)
+        buckets = np.array([hour_bucket(o.departure) for o in observations])[usable]
+        pairs = profile.zones(origins[usable]) * profile.n_zones + profile.zones(destinations[usable])
+        default_pace = 60.0 / default_speed_kmh
+
+        hour_n = np.bincount(buckets, minlength=HOUR_BUCKETS)
+        hour_pace = (np.bincount(buckets, weights=pace, minlength=HOUR_BUCKETS) + prior_samples * default_pace) \
+            / (hour_n + prior_samples)
+
+        cells = pairs * HOUR_BUCKETS + buckets
+        size = profile.n_zones * profile.n_zones * HOUR_BUCKETS
+        cell_n = np.bincount(cells, minlength=size).reshape(profile.speeds.shape)
+        cell_pace = np.bincount(cells, weights=pace, minlength=size).reshape(profile.speeds.shape)
+        cell_pace = (cell_pace + prior_samples * hour_pace) / (cell_n + prior_samples)
+
+        profile.speeds = (60.0 / cell_pace).astype(np.float32)
+        profile.samples = np.minimum(cell_n, np.iinfo(np.uint16).max).astype(np.uint16)
+        logger.info(f"Fitted travel profile from {int(usable.sum())} of {len(observations)} legs "
+                    f"over {int((cell_n > 0).sum())} zone-pair hours")
+        return profile
+
+    def zones(self, locations: Sequence[Tuple[float, float]]) -> np.ndarray:
+        """Zone index of each (lat, lng); points outside the grid use the nearest edge zone."""
+        points = np.asarray(locations, dtype=float).reshape(-1, 2)
+        row = np.clip(((points[:, 0] - self.bounds[0]) // self.zone_degrees).astype(np.int64), 0, self.rows - 1)
+        col = np.clip(((points[:, 1] - self.bounds[1]) // self.zone_degrees).astype(np.int64), 0, self.cols - 1)
+        return row * self.cols + col
+
+    def speed(self, origin_zone: int, destination_zone: int, bucket: int) -> float:
+        """Speed in km/h for a zone pair and hour bucket."""
+        return float(self.speeds[origin_zone, destination_zone, bucket])
+
+    def travel_minutes(self,
+                       from_location: Tuple[float, float],
+                       to_location: Tuple[float, float],
+                       departure: TimeOfDay) -> int:
+        """
+        Travel minutes of one leg, like calculate_travel_time at a time of day.
+
+        Args:
+            from_location: Starting location (lat, lon)
+            to_location: Destination location (lat, lon)
+            departure: Minutes since midnight, datetime or time
+
+        Returns:
+            Travel time in minutes
+        """
+        km = calculate_haversine_distance(*from_location, *to_location)
+        origin, destination = self.zones([from_location, to_location])
+        return int(km / self.speeds[origin, destination, hour_bucket(departure)] * 60) + self.buffer_minutes
+
+    def _hour_minutes(self, km: np.ndarray, zones: np.ndarray, bucket: int) -> np.ndarray:
+        """n x n travel minutes departing in one hour bucket."""
+        minutes = (km / self.speeds[zones[:, None], zones[None, :], bucket] * 60).astype(np.int64) \
+            + self.buffer_minutes
+        np.fill_diagonal(minutes, 0)
+        return minutes
+
+    def layers(self, locations: Sequence[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Distances and travel minutes at every hour for a set of locations (cached).
+
+        Returns:
+            (distance km n x n, int16 travel minutes n x n x HOUR_BUCKETS)
+        """
+        key = tuple((float(lat), float(lng)) for lat, lng in locations)
+        with self._lock:
+            cached = self._layers.get(key)
+            if cached is not None:
+                self._layers.move_to_end(key)
+                return cached
+
+        km = calculate_haversine_matrix(list(key))
+        zones = self.zones(key)
+        # One hour at a time, so no n x n x HOUR_BUCKETS float temporaries
+        limit = np.iinfo(np.int16).max
+        minutes = np.empty((len(key), len(key), HOUR_BUCKETS), dtype=np.int16)
+        for bucket in range(HOUR_BUCKETS):
+            minutes[:, :, bucket] = np.minimum(self._hour_minutes(km, zones, bucket), limit)
+
+        with self._lock:
+            self._layers[key] = (km, minutes)
+            while len(self._layers) > 1 and \
+                    sum(k.nbytes + m.nbytes for k, m in self._layers.values()) > MAX_CACHED_LAYER_BYTES:
+                self._layers.popitem(last=False)
+        return km, minutes
+
+    def departure_minutes(self,
+                          locations: Sequence[Tuple[float, float]],
+                          departures: Sequence[TimeOfDay],
+                          latest: Optional[Sequence[TimeOfDay]] = None) -> np.ndarray:
+        """
+        Travel minutes where every leg out of location i departs at departures[i].
+
+        Args:
+            locations: (lat, lng) of each node
+            departures: Departure (or earliest departure) from each node
+            latest: Latest departure from each node; legs then take the
+                slowest hour between the two, so the matrix never
+                underestimates whenever the leg is actually driven (optional)
+
+        Returns:
+            n x n travel minutes
+        """
+        _, minutes = self.layers(locations)
+        first = np.array([hour_bucket(d) for d in departures], dtype=np.int64)
+        index = np.arange(len(first))
+        if latest is None:
+            return minutes[index[:, None], index[None, :], first[:, None]].astype(np.int64)
+
+        last = np.array([hour_bucket(d) for d in latest], dtype=np.int64)
+        hours = np.arange(HOUR_BUCKETS)
+        span = (hours[None, :] >= first[:, None]) & (hours[None, :] <= last[:, None])
+        span[index, first] = True
+        return np.where(span[:, None, :], minutes, 0).max(axis=2).astype(np.int64)
+
+    def travel_matrix(self, departure: TimeOfDay) -> Callable[[Sequence[Tuple[float, float]], float],
+                                                                Tuple[np.ndarray, np.ndarray]]:
+        """
+        TravelMatrix builder for legs departing at one time of day.
+
+        The speed argument of the builder is ignored; speeds come from the
+        profile. Only the one hour is computed and nothing is cached, since
+        callers such as InsertionPlanner keep the matrix and grow the
+        location set between calls.
+        """
+        bucket = hour_bucket(departure)
+
+        def matrix(locations: Sequence[Tuple[float, float]], speed_kmh: float) -> Tuple[np.ndarray, np.ndarray]:
+            km = calculate_haversine_matrix(list(locations))
+            return km, self._hour_minutes(km, self.zones(locations), bucket)
+
+        return matrix
+
+    def save(self, path) -> None:
+        np.savez_compressed(
+            path, speeds=self.speeds, samples=self.samples, bounds=np.array(self.bounds),
+            zone_degrees=self.zone_degrees, buffer_minutes=self.buffer_minutes
+        )
+
+    @classmethod
+    def load(cls, path) -> 'TravelTimeProfile':
+        with np.load(path) as data:
+            return cls(
+                data['speeds'], tuple(data['bounds'].tolist()), float(data['zone_degrees']),
+                samples=data['samples'], buffer_minutes=int(data['buffer_minutes'])
+            )
@@ -0,0 +1,186 @@
+"""Seed schedules from a comparable earlier day's routes."""
+from typing import List, Dict, Optional, Tuple, Any
+from dataclasses import dataclass, field
+from collections import defaultdict, deque
+
+from ..time_utils import ScheduleEntry, TimeSlot, calculate_travel_time
+from ..minutes import add_minutes
+from .models import DeliveryRequest, DriverAvailability, WarmStartRoute
+
+# Cheapest positions tried per new delivery before giving up on it
+INSERTION_CANDIDATES = 10
+
+
+@dataclass
+class WarmStartPlan:
+    """Schedule rebuilt from previous routes plus the requests it could not place."""
+    schedule: List[ScheduleEntry]
+    unplaced: List[DeliveryRequest] = field(default_factory=list)
+    stats: Dict[str, int] = field(default_factory=dict)
+
+
+def _timed_route(driver: DriverAvailability,
+                 stops: List[DeliveryRequest],
+                 speed_kmh: float) -> Tuple[List[Tuple[DeliveryRequest, Any]], List[DeliveryRequest]]:
+    """
+    Time a driver's stops in order: each starts at the later of arrival and
+    its earliest usable time window.
+
+    Returns:
+        ([(request, start)], requests that no longer fit)
+    """
+    hours = sorted(driver.available_hours)
+    ready, shift_end = hours[0][0], hours[-1][1]
+    location = driver.current_location
+    timed, displaced = [], []
+
+    for request in stops:
+        arrival = ready
+        if location and request.location:
+            arrival = add_minutes(ready, calculate_travel_time(location, request.location, speed_kmh))
+        start = None
+        for window_start, window_end in sorted(request.time_windows):
+            candidate = max(arrival, window_start)
+            end = add_minutes(candidate, request.service_duration)
+            if end <= window_end and end <= shift_end:
+                start = candidate
+                break
+        if start is None:
+            displaced.append(request)
+            continue
+        timed.append((request, start))
+        ready = add_minutes(start, request.service_duration)
+        location = request.location or location
+
+    return timed, displaced
+
+
+def _detour(route: List[DeliveryRequest],
+            position: int,
+            request: DeliveryRequest,
+            origin: Optional[Tuple[float, float]],
+            speed_kmh: float) -> int:
+    """Extra travel minutes from inserting request before route[position]."""
+    def travel(a, b):
+        return calculate_travel_time(a, b, speed_kmh) if a and b else 0
+
+    previous = route[position - 1].location if position else origin
+    following = route[position].location if position < len(route) else None
+    return (travel(previous, request.location) + travel(request.location, following)
+            - travel(previous, following))
+
+
+def build_warm_start(delivery_requests: List[DeliveryRequest],
+                     driver_availability: List[DriverAvailability],
+                     routes: List[WarmStartRoute],
+                     speed_kmh: float = 30.0) -> WarmStartPlan:
+    """
+    Rebuild today's schedule from previous routes.
+
+    Clients on a previous route keep their driver and relative order;
+    clients that are no longer requested are dropped and the rest of the
+    route closes up. New requests (and stops whose time window no longer
+    fits) are placed by cheapest insertion, trying the INSERTION_CANDIDATES
+    smallest detours and re-timing only the affected driver.
+
+    Args:
+        delivery_requests: Today's requests
+        driver_availability: Today's drivers; routes of absent drivers are ignored
+        routes: Previous visit orders per driver
+        speed_kmh: Travel speed for timing and detours
+
+    Returns:
+        WarmStartPlan with the seeded schedule and unplaced requests
+    """
+    drivers = {driver.driver_id: driver for driver in driver_availability if driver.available_hours}
+    pending: Dict[int, deque] = defaultdict(deque)
+    for request in delivery_requests:
+        pending[request.client_id].append(request)
+
+    # Replay previous orders with today's requests
+    sequences: Dict[int, List[DeliveryRequest]] = {driver_id: [] for driver_id in drivers}
+    dropped = 0
+    for route in routes:
+        if route.driver_id not in drivers:
+            continue
+        for client_id in route.client_ids:
+            if pending.get(client_id):
+                sequences[route.driver_id].append(pending[client_id].popleft())
+            else:
+                dropped += 1
+
+    timed: Dict[int, List[Tuple[DeliveryRequest, Any]]] = {}
+    to_insert = [request for queue in pending.values() for request in queue]
+    for driver_id, stops in sequences.items():
+        timed[driver_id], displaced = _timed_route(drivers[driver_id], stops, speed_kmh)
+        sequences[driver_id] = [request for request, _ in timed[driver_id]]
+        to_insert.extend(displaced)
+    reused = sum(len(stops) for stops in sequences.values())
+
+    # Cheapest feasible insertion for new and displaced requests
+    to_insert.sort(key=lambda r: (-r.priority, min(tw[0] for tw in r.time_windows)))
+    unplaced = []
+    for request in to_insert:
+        candidates = sorted(
+            (_detour(stops, position, request, drivers[driver_id].current_location, speed_kmh),
+             driver_id, position)
+            for driver_id, stops in sequences.items()
+            if len(stops) < drivers[driver_id].max_deliveries
+            for position in range(len(stops) + 1)
+        )
+        for _, driver_id, position in candidates[:INSERTION_CANDIDATES]:
+            stops = sequences[driver_id]
+            trial = stops[:position] + [request] + stops[position:]
+            trial_timed, displaced = _timed_route(drivers[driver_id], trial, speed_kmh)
+            if not displaced:
+                sequences[driver_id] = trial
+                timed[driver_id] = trial_timed
+                break
+        else:
+            unplaced.append(request)
+
+    schedule = []
+    for driver_id, stops in timed.items():
+        driver = drivers[driver_id]
+        for request, start in stops:
+            schedule.append(ScheduleEntry(
+                delivery_id=request.delivery_id,
+                client_id=request.client_id,
+                driver_id=driver_id,
+                vehicle_id=driver.vehicle_id or 1,
+                time_slot=TimeSlot(start_time=start, end_time=add_minutes(start, request.service_duration)),
+                service_duration=request.service_duration,
+                priority=request.priority,
+                location=request.location
+            ))
+
+    return WarmStartPlan(
+        schedule=schedule,
+        unplaced=unplaced,
+        stats={
+            "reused": reused,
+            "inserted": len(to_insert) - len(unplaced),
+            "dropped": dropped,
+            "unplaced": len(unplaced)
+        }
+    )
+
+
+def routes_from_schedule(schedule: List[ScheduleEntry]) -> List[WarmStartRoute]:
+    """
+    Visit order per driver of an existing schedule (e.g. a greedy run).
+
+    Args:
+        schedule: Schedule entries
+
+    Returns:
+        One WarmStartRoute per driver, clients ordered by start time
+    """
+    by_driver: Dict[int, List[ScheduleEntry]] = defaultdict(list)
+    for entry in schedule:
+        by_driver[entry.driver_id].append(entry)
+    return [
+        WarmStartRoute(driver_id=driver_id,
+                       client_ids=[e.client_id for e in sorted(entries, key=lambda e: e.time_slot.start_time)])
+        for driver_id, entries in by_driver.items()
+    ]
@@ -7,6 +7,11 @@ import logging
 from collections import defaultdict
 import math
 
+from .minutes import add_minutes, minutes_between, format_time_value
+from .availability import (
+    HOURLY_FIELDS, client_availability_mask, mask_windows, minutes_to_time
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,7 +34,7 @@ class ConflictType(Enum):
     VEHICLE_UNAVAILABLE = "vehicle_unavailable"
 
 
-@dataclass
+@dataclass(slots=True)
 class TimeSlot:
     """Represents a time slot for scheduling."""
     start_time: datetime
@@ -40,12 +45,12 @@ class TimeSlot:
     
     def __post_init__(self):
         if not self.slot_id:
-            self.slot_id = f"{self.start_time.isoformat()}_{self.end_time.isoformat()}"
+            self.slot_id = f"{format_time_value(self.start_time)}_{format_time_value(self.end_time)}"
     
     @property
     def duration_minutes(self) -> int:
         """Get duration in minutes."""
-        return int((self.end_time - self.start_time).total_seconds() / 60)
+        return int(minutes_between(self.start_time, self.end_time))
     
     @property
     def is_available(self) -> bool:
@@ -68,7 +73,7 @@ class TimeSlot:
         return not (self.end_time <= other.start_time or self.start_time >= other.end_time)
 
 
-@dataclass
+@dataclass(slots=True)
 class ScheduleEntry:
     """Represents a scheduled delivery."""
     delivery_id: int
@@ -85,7 +90,7 @@ class ScheduleEntry:
     @property
     def end_time(self) -> datetime:
         """Calculate expected end time including service."""
-        return self.time_slot.start_time + timedelta(minutes=self.service_duration)
+        return add_minutes(self.time_slot.start_time, self.service_duration)
     
     def conflicts_with(self, other: 'ScheduleEntry') -> bool:
         """Check if this entry conflicts with another."""
@@ -94,7 +99,7 @@ class ScheduleEntry:
         return self.time_slot.overlaps_with(other.time_slot)
 
 
-@dataclass
+@dataclass(slots=True)
 class SchedulingConflict:
     """Represents a scheduling conflict."""
     conflict_type: ConflictType
@@ -130,40 +135,9 @@ def parse_client_time_windows(client: Any) -> List[Tuple[time, time]]:
         client: Client object with hour_X_Y boolean fields
         
     Returns:
-        List of time window tuples (start_time, end_time)
+        List of time window tuples (start_time, end_time), consecutive windows merged
     """
-    time_windows = []
-    
-    # Check for 2-hour slots first
-    two_hour_slots = [
-        (8, 10, 'hour_8_10'),
-        (10, 12, 'hour_10_12'),
-        (12, 14, 'hour_12_14'),
-        (14, 16, 'hour_14_16'),
-        (16, 18, 'hour_16_18'),
-        (18, 20, 'hour_18_20')
-    ]
-    
-    has_two_hour_slots = False
-    for _, _, field_name in two_hour_slots:
-        if hasattr(client, field_name):
-            has_two_hour_slots = True
-            break
-    
-    if has_two_hour_slots:
-        # Use 2-hour slots
-        for start_hour, end_hour, field_name in two_hour_slots:
-            if hasattr(client, field_name) and getattr(client, field_name):
-                time_windows.append((
-                    time(start_hour, 0),
-                    time(end_hour, 0)
-                ))
-    else:
-        # Use individual hour slots
-        time_windows = parse_client_hourly_windows(client)
-    
-    # Merge consecutive windows
-    return merge_consecutive_windows(time_windows)
+    return _mask_to_time_windows(client_availability_mask(client))
 
 
 def parse_client_hourly_windows(client: Any) -> List[Tuple[time, time]]:
@@ -176,48 +150,12 @@ def parse_client_hourly_windows(client: Any) -> List[Tuple[time, time]]:
     Returns:
         List of time window tuples (start_time, end_time)
     """
-    # Define all individual hour slots
-    hourly_slots = [
-        (8, 9, 'hour_8_9'),
-        (9, 10, 'hour_9_10'),
-        (10, 11, 'hour_10_11'),
-        (11, 12, 'hour_11_12'),
-        (12, 13, 'hour_12_13'),
-        (13, 14, 'hour_13_14'),
-        (14, 15, 'hour_14_15'),
-        (15, 16, 'hour_15_16'),
-        (16, 17, 'hour_16_17'),
-        (17, 18, 'hour_17_18'),
-        (18, 19, 'hour_18_19'),
-        (19, 20, 'hour_19_20')
-    ]
-    
-    # Find continuous available time periods
-    windows = []
-    start_hour = None
-    
-    for hour_start, hour_end, field_name in hourly_slots:
-        is_available = hasattr(client, field_name) and getattr(client, field_name, False)
-        
-        if is_available:
-            if start_hour is None:
-                start_hour = hour_start
-        else:
-            if start_hour is not None:
-                windows.append((
-                    time(start_hour, 0),
-                    time(hour_start, 0)
-                ))
-                start_hour = None
-    
-    # Handle case where availability extends to the last slot
-    if start_hour is not None:
-        windows.append((
-            time(start_hour, 0),
-            time(20, 0)  # Last slot ends at 20:00
-        ))
-    
-    return windows
+    return _mask_to_time_windows(client_availability_mask(client, HOURLY_FIELDS))
+
+
+def _mask_to_time_windows(mask: int) -> List[Tuple[time, time]]:
+    """Convert an availability mask into continuous (start_time, end_time) windows."""
+    return [(minutes_to_time(start), minutes_to_time(end)) for start, end in mask_windows(mask)]
 
 
 def merge_consecutive_windows(
@@ -553,41 +491,60 @@ def detect_conflicts(schedule: List[ScheduleEntry]) -> List[SchedulingConflict]:
         # Sort by start time
         sorted_entries = sorted(entries, key=lambda e: e.time_slot.start_time)
         
-        # Check for overlaps
+        # Check consecutive pairs
         for i in range(len(sorted_entries) - 1):
-            current = sorted_entries[i]
-            next_entry = sorted_entries[i + 1]
-            
-            if current.end_time > next_entry.time_slot.start_time:
-                conflict = SchedulingConflict(
-                    conflict_type=ConflictType.TIME_OVERLAP,
-                    entries=[current, next_entry],
-                    description=f"Driver {driver_id} has overlapping deliveries",
-                    severity=5,
-                    resolution_suggestions=[
-                        f"Reschedule delivery {next_entry.delivery_id} to a later time",
-                        f"Assign delivery {next_entry.delivery_id} to a different driver"
-                    ]
-                )
-                conflicts.append(conflict)
-            
-            # Check travel time between consecutive deliveries
-            if current.location and next_entry.location:
-                travel_time = calculate_travel_time(current.location, next_entry.location)
-                available_time = int((next_entry.time_slot.start_time - current.end_time).total_seconds() / 60)
-                
-                if available_time < travel_time:
-                    conflict = SchedulingConflict(
-                        conflict_type=ConflictType.TRAVEL_TIME_INSUFFICIENT,
-                        entries=[current, next_entry],
-                        description=f"Insufficient travel time between deliveries ({available_time} min < {travel_time} min required)",
-                        severity=4,
-                        resolution_suggestions=[
-                            f"Add {travel_time - available_time} minutes buffer between deliveries",
-                            "Consider geographic clustering for this driver's route"
-                        ]
-                    )
-                    conflicts.append(conflict)
+            conflicts.extend(check_consecutive_entries(sorted_entries[i], sorted_entries[i + 1]))
+    
+    return conflicts
+
+
+def check_consecutive_entries(
+    current: ScheduleEntry,
+    next_entry: ScheduleEntry
+) -> List[SchedulingConflict]:
+    """
+    Check two consecutive deliveries of the same driver for conflicts.
+    
+    Args:
+        current: Earlier schedule entry
+        next_entry: Following schedule entry of the same driver
+        
+    Returns:
+        List of overlap / travel time conflicts between the pair
+    """
+    conflicts = []
+    driver_id = current.driver_id
+    
+    if current.end_time > next_entry.time_slot.start_time:
+        conflict = SchedulingConflict(
+            conflict_type=ConflictType.TIME_OVERLAP,
+            entries=[current, next_entry],
+            description=f"Driver {driver_id} has overlapping deliveries",
+            severity=5,
+            resolution_suggestions=[
+                f"Reschedule delivery {next_entry.delivery_id} to a later time",
+                f"Assign delivery {next_entry.delivery_id} to a different driver"
+            ]
+        )
+        conflicts.append(conflict)
+    
+    # Check travel time between consecutive deliveries
+    if current.location and next_entry.location:
+        travel_time = calculate_travel_time(current.location, next_entry.location)
+        available_time = int(minutes_between(current.end_time, next_entry.time_slot.start_time))
+        
+        if available_time < travel_time:
+            conflict = SchedulingConflict(
+                conflict_type=ConflictType.TRAVEL_TIME_INSUFFICIENT,
+                entries=[current, next_entry],
+                description=f"Insufficient travel time between deliveries ({available_time} min < {travel_time} min required)",
+                severity=4,
+                resolution_suggestions=[
+                    f"Add {travel_time - available_time} minutes buffer between deliveries",
+                    "Consider geographic clustering for this driver's route"
+                ]
+            )
+            conflicts.append(conflict)
     
     return conflicts
 
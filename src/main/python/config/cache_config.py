@@ -0,0 +1,54 @@
+"""
+Response cache configuration
+Defines the cache backend and which read endpoints are cached, for how long,
+and which data tags invalidate them
+"""
+
+import os
+from dataclasses import dataclass
+from typing import List, Tuple
+
+
+@dataclass(frozen=True)
+class CacheRule:
+    """Cache rule for one GET endpoint"""
+    path_pattern: str  # 以 regex 比對完整路徑，具名群組可用於標籤
+    ttl_seconds: int
+    tags: Tuple[str, ...]  # 標籤可引用路徑參數，例如 "route:{route_id}"
+
+
+class CacheConfig:
+    """Manages response cache settings"""
+
+    def __init__(self):
+        self.enabled = os.getenv('CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+        # API 程序數；gunicorn 與 uvicorn 的 --workers 預設皆讀取 WEB_CONCURRENCY
+        self.workers = int(os.getenv('WEB_CONCURRENCY', '1'))
+        # 多個程序時快取必須共用，否則失效只會清除提交異動的那個程序
+        self.backend = os.getenv('CACHE_BACKEND', 'redis' if self.workers > 1 else 'memory').lower()  # memory | redis
+        self.redis_url = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        self.key_prefix = os.getenv('CACHE_KEY_PREFIX', 'luckygas:cache:')
+        self.max_entries = int(os.getenv('CACHE_MAX_ENTRIES', '1024'))
+
+    def get_rules(self) -> List[CacheRule]:
+        """
+        Get the per-route cache rules
+
+        Returns:
+            List of cache rules, first match wins
+        """
+        return [
+            # 區域列表幾乎不變
+            CacheRule(r'^/api/clients/districts/list$', 600, ('clients',)),
+            # 司機 / 車輛列表包含配送統計，配送異動時失效
+            CacheRule(r'^/api/drivers$', 60, ('drivers', 'vehicles', 'deliveries')),
+            CacheRule(r'^/api/drivers/available/list$', 60, ('drivers', 'vehicles', 'deliveries')),
+            CacheRule(r'^/api/vehicles$', 60, ('vehicles', 'drivers', 'deliveries')),
+            CacheRule(r'^/api/vehicles/available/list$', 60, ('vehicles', 'drivers', 'deliveries')),
+            # 路線地圖只在該路線或客戶座標變更時失效（route:* 為路線的批次異動）
+            CacheRule(r'^/api/routes/(?P<route_id>\d+)/map$', 300, ('route:{route_id}', 'route:*', 'clients')),
+        ]
+
+
+# Global configuration instance
+cache_config = CacheConfig()
@@ -174,6 +174,24 @@ class CloudConfig:
             'enabled': bool(os.getenv('TOMTOM_API_KEY'))
         }
     
+    @property
+    def local_routing_config(self) -> Dict[str, Any]:
+        """Local OSM road-network routing (optional)"""
+        return {
+            'graph_path': os.getenv('ROAD_GRAPH_PATH'),
+            'enabled': bool(os.getenv('ROAD_GRAPH_PATH'))
+        }
+    
+    @property
+    def travel_profile_config(self) -> Dict[str, Any]:
+        """Time-of-day travel profile learned from delivery history"""
+        return {
+            'enabled': os.getenv('TRAVEL_PROFILE_ENABLED', 'true').lower() == 'true',
+            'path': os.getenv('TRAVEL_PROFILE_PATH', 'data/travel_profile.npz'),
+            'refresh_hour': int(os.getenv('TRAVEL_PROFILE_REFRESH_HOUR', '2')),  # nightly, local time
+            'history_days': int(os.getenv('TRAVEL_PROFILE_HISTORY_DAYS', '90'))
+        }
+    
     @property
     def app_settings(self) -> Dict[str, Any]:
         """Application-level settings"""
@@ -84,7 +84,7 @@ class CORSConfig:
                 "Origin",
                 "X-CSRF-Token",
             ],
-            "expose_headers": ["X-Total-Count"],  # For pagination
+            "expose_headers": ["X-Total-Count", "ETag"],  # For pagination and conditional GET
             "max_age": 600,  # 10 minutes
         }
 
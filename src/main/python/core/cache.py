@@ -0,0 +1,356 @@
+"""
+Response cache backends
+In-process LRU by default, Redis when configured, and tag-based invalidation
+driven by ORM commits so every write path (services and routers) clears
+the affected entries
+"""
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models.database_schema import Client, Driver, Vehicle, Delivery, Route, RouteGeometry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedResponse:
+    """快取的回應內容"""
+    body: bytes
+    media_type: str
+    etag: str
+    headers: Dict[str, str] = field(default_factory=dict)  # 端點自行設定的回應標頭
+
+    @classmethod
+    def from_body(cls, body: bytes, media_type: str, headers: Optional[Dict[str, str]] = None) -> 'CachedResponse':
+        """由回應內容建立快取項目（ETag 為內容雜湊）"""
+        return cls(body=body, media_type=media_type, etag=f'"{hashlib.sha1(body).hexdigest()}"',
+                   headers=dict(headers or {}))
+
+    def to_bytes(self) -> bytes:
+        header = json.dumps({'media_type': self.media_type, 'etag': self.etag, 'headers': self.headers})
+        return header.encode('utf-8') + b'\n' + self.body
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'CachedResponse':
+        header, body = data.split(b'\n', 1)
+        meta = json.loads(header)
+        return cls(body=body, media_type=meta['media_type'], etag=meta['etag'], headers=meta.get('headers', {}))
+
+
+class MemoryCacheBackend:
+    """程序內 LRU 快取（含 TTL 與標籤索引）"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, tuple]' = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value, _ = item
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: CachedResponse, ttl: int, tags: Iterable[str] = ()):
+        tags = tuple(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, set()):
+                    if key in self._entries:
+                        self._remove(key)
+                        removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key: str):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class RedisCacheBackend:
+    """Redis 快取，多個 API 程序共用；連線失敗時視為未命中"""
+
+    # 標籤集合保留時間需長於任何快取規則的 TTL
+    TAG_TTL_SECONDS = 86400
+
+    def __init__(self, client, key_prefix: str = 'luckygas:cache:'):
+        self.client = client
+        self.key_prefix = key_prefix
+
+    @classmethod
+    def from_url(cls, url: str, key_prefix: str = 'luckygas:cache:') -> 'RedisCacheBackend':
+        import redis
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5), key_prefix)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        try:
+            data = self.client.get(self.key_prefix + key)
+        except Exception as e:
+            logger.warning(f"Redis cache get failed: {e}")
+            return None
+        return CachedResponse.from_bytes(data) if data is not None else None
+
+    def set(self, key: str, value: CachedResponse, ttl: int, tags: Iterable[str] = ()):
+        full_key = self.key_prefix + key
+        try:
+            self.client.set(full_key, value.to_bytes(), ex=ttl)
+            for tag in tags:
+                tag_key = self._tag_key(tag)
+                self.client.sadd(tag_key, full_key)
+                self.client.expire(tag_key, self.TAG_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"Redis cache set failed: {e}")
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removed = 0
+        try:
+            for tag in tags:
+                tag_key = self._tag_key(tag)
+                keys = list(self.client.smembers(tag_key))
+                if keys:
+                    removed += self.client.delete(*keys)
+                self.client.delete(tag_key)
+        except Exception as e:
+            logger.warning(f"Redis cache invalidation failed: {e}")
+        return removed
+
+    def clear(self):
+        logger.warning("RedisCacheBackend.clear() is not supported; entries expire by TTL")
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.key_prefix}tag:{tag}"
+
+
+class FakeRedis:
+    """
+    最小化的 Redis 替身，僅實作快取使用的指令
+    供測試與未啟動 Redis 的本機開發使用
+    """
+
+    def __init__(self):
+        self._data: Dict[str, tuple] = {}  # key -> (expires_at or None, value)
+
+    def _alive(self, name):
+        item = self._data.get(name)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[name]
+            return None
+        return item
+
+    @staticmethod
+    def _key(name):
+        return name.decode('utf-8') if isinstance(name, bytes) else name
+
+    def get(self, name):
+        item = self._alive(self._key(name))
+        return item[1] if item else None
+
+    def set(self, name, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        self._data[self._key(name)] = (time.monotonic() + ex if ex else None, value)
+        return True
+
+    def delete(self, *names):
+        removed = 0
+        for name in names:
+            if self._alive(self._key(name)) is not None:
+                del self._data[self._key(name)]
+                removed += 1
+        return removed
+
+    def sadd(self, name, *values):
+        item = self._alive(self._key(name))
+        members = item[1] if item else set()
+        before = len(members)
+        members.update(v.encode('utf-8') if isinstance(v, str) else v for v in values)
+        self._data[self._key(name)] = (item[0] if item else None, members)
+        return len(members) - before
+
+    def smembers(self, name):
+        item = self._alive(self._key(name))
+        return set(item[1]) if item else set()
+
+    def expire(self, name, seconds):
+        item = self._alive(self._key(name))
+        if item is None:
+            return False
+        self._data[self._key(name)] = (time.monotonic() + seconds, item[1])
+        return True
+
+
+class ResponseCache:
+    """回應快取入口，包裝實際的快取後端"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryCacheBackend()
+
+    def configure(self, backend):
+        """替換快取後端（例如啟動時改用 Redis、測試時改用 FakeRedis）"""
+        self.backend = backend
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        return self.backend.get(key)
+
+    def set(self, key: str, value: CachedResponse, ttl: int, tags: Iterable[str] = ()):
+        self.backend.set(key, value, ttl, tags)
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """
+        使帶有指定標籤的快取失效
+
+        Args:
+            *tags: 標籤，例如 "clients"、"route:12"
+
+        Returns:
+            int: 移除的快取筆數
+        """
+        if not tags:
+            return 0
+        removed = self.backend.invalidate_tags(tags)
+        if removed:
+            logger.debug(f"Invalidated {removed} cached responses for tags {tags}")
+        return removed
+
+    def clear(self):
+        self.backend.clear()
+
+
+def build_backend(config):
+    """
+    依設定建立快取後端；Redis 不可用時退回程序內 LRU
+
+    程序內 LRU 無法跨程序失效，多個 API 程序（config.workers > 1）時
+    不啟用，回應快取改為關閉
+
+    Args:
+        config: CacheConfig
+
+    Returns:
+        快取後端；不應啟用快取時為 None
+    """
+    if config.backend == 'redis':
+        try:
+            return RedisCacheBackend.from_url(config.redis_url, config.key_prefix)
+        except ImportError:
+            logger.warning("redis package not installed, falling back to the in-process response cache")
+    if config.workers > 1:
+        logger.warning(f"In-process response cache cannot be shared by {config.workers} workers; "
+                       f"response cache disabled (set CACHE_BACKEND=redis)")
+        return None
+    return MemoryCacheBackend(config.max_entries)
+
+
+# 批次 UPDATE / DELETE 無法得知影響的資料列，以此標籤清除所有單一路線的快取
+ALL_ROUTES_TAG = 'route:*'
+
+
+def tags_for_model(model: type) -> List[str]:
+    """批次異動某資料表時需失效的標籤"""
+    if issubclass(model, Client):
+        return ['clients']
+    if issubclass(model, Driver):
+        return ['drivers']
+    if issubclass(model, Vehicle):
+        return ['vehicles']
+    if issubclass(model, Delivery):
+        return ['deliveries']
+    if issubclass(model, Route):
+        return ['routes', ALL_ROUTES_TAG]
+    if issubclass(model, RouteGeometry):
+        return [ALL_ROUTES_TAG]
+    return []
+
+
+def tags_for_instance(instance) -> List[str]:
+    """資料異動時需失效的標籤"""
+    if isinstance(instance, Client):
+        return ['clients']
+    if isinstance(instance, Driver):
+        return ['drivers']
+    if isinstance(instance, Vehicle):
+        return ['vehicles']
+    if isinstance(instance, Delivery):
+        return ['deliveries']
+    if isinstance(instance, Route):
+        return ['routes', f'route:{instance.id}']
+    if isinstance(instance, RouteGeometry):
+        return [f'route:{instance.route_id}']
+    return []
+
+
+_PENDING_TAGS_KEY = 'response_cache_tags'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_invalidation_tags(session, flush_context):
+    pending = session.info.setdefault(_PENDING_TAGS_KEY, set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        pending.update(tags_for_instance(instance))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_invalidation_tags(orm_execute_state):
+    # query(...).update() / delete() 等批次語句不經過 flush
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    pending = orm_execute_state.session.info.setdefault(_PENDING_TAGS_KEY, set())
+    pending.update(tags_for_model(mapper.class_))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_tags(session):
+    pending = session.info.pop(_PENDING_TAGS_KEY, None)
+    if pending:
+        response_cache.invalidate_tags(*pending)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_tags(session):
+    session.info.pop(_PENDING_TAGS_KEY, None)
+
+
+# 全域回應快取實例
+response_cache = ResponseCache()
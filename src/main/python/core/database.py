@@ -49,6 +49,10 @@ class DatabaseManager:
             # 建立所有表格
             Base.metadata.create_all(bind=self.engine)
             
+            # 建立關鍵字搜尋索引
+            from services.search_service import search_index
+            search_index.install(self.engine)
+            
             # 建立 Session 工廠
             self.SessionLocal = sessionmaker(
                 autocommit=False,
@@ -0,0 +1,653 @@
+"""
+Local road-network routing
+Road distances and travel times on a preprocessed Taitung road graph built
+from an offline OpenStreetMap extract, with no network access and no
+per-element cost (成功線/南迴線 follow the real coastal and mountain roads)
+
+Build the graph once from an extract (.osm XML, or .osm.pbf with osmium):
+    python -m integrations.road_network taitung.osm taitung_roads.npz
+
+The graph is kept as CSR arrays and stored as a compressed .npz file.
+Point-to-point routes use bidirectional A*; matrices run one-to-many
+Dijkstra per origin and use the same interface as
+GoogleMapsClient.calculate_distance_matrix
+"""
+
+import argparse
+import heapq
+import logging
+import math
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, fields
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components, dijkstra
+from scipy.spatial import cKDTree
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from common.geo_utils import calculate_haversine_distance
+from config.cloud_config import cloud_config
+from integrations.google_maps_client import Location
+from models.database_schema import VehicleType
+
+try:
+    import osmium
+except ImportError:  # pragma: no cover - osmium is optional, .osm XML works without it
+    osmium = None
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000.0
+
+# 台東縣範圍（south, west, north, east），含綠島、蘭嶼
+TAITUNG_BBOX = (21.9, 120.7, 23.5, 121.65)
+
+# 可行駛的道路等級（*_link 併入主等級）
+ROAD_CLASSES = (
+    'motorway', 'trunk', 'primary', 'secondary', 'tertiary',
+    'unclassified', 'residential', 'living_street', 'service', 'track'
+)
+_CLASS_CODES = {name: code for code, name in enumerate(ROAD_CLASSES)}
+
+# 各車種在各道路等級的行駛速度（km/h），None 表示不可行駛
+SPEED_PROFILES: Dict[VehicleType, Dict[str, Optional[float]]] = {
+    VehicleType.CAR: {
+        'motorway': 90, 'trunk': 65, 'primary': 50, 'secondary': 45, 'tertiary': 40,
+        'unclassified': 30, 'residential': 25, 'living_street': 10, 'service': 15, 'track': 10
+    },
+    VehicleType.MOTORCYCLE: {  # 機車不可上國道/快速道路，小路較快
+        'motorway': None, 'trunk': 55, 'primary': 45, 'secondary': 40, 'tertiary': 40,
+        'unclassified': 35, 'residential': 30, 'living_street': 15, 'service': 20, 'track': 15
+    }
+}
+
+# 邊的通行權限位元
+ACCESS_CAR = 1
+ACCESS_MOTORCYCLE = 2
+_ACCESS_BITS = {VehicleType.CAR: ACCESS_CAR, VehicleType.MOTORCYCLE: ACCESS_MOTORCYCLE}
+_ACCESS_KEYS = {
+    ACCESS_CAR: ('access', 'vehicle', 'motor_vehicle', 'motorcar'),
+    ACCESS_MOTORCYCLE: ('access', 'vehicle', 'motor_vehicle', 'motorcycle')
+}
+_DENIED = {'no', 'private', 'agricultural', 'forestry', 'emergency', 'military'}
+
+MIN_EDGE_SECONDS = 0.01  # 長度為 0 的邊在稀疏矩陣中會被當成沒有邊
+MATRIX_CHUNK = 16  # 每批 Dijkstra 的起點數（記憶體約 3 x 8 bytes x 節點數 x 批次）
+MIN_COMPONENT_NODES = 50  # 小於此節點數的孤立路段不作為定位點
+
+
+@dataclass
+class RoadGraph:
+    """道路圖（CSR：節點 u 的出邊為 indices[indptr[u]:indptr[u + 1]]）"""
+    indptr: np.ndarray      # (n + 1,)
+    indices: np.ndarray     # (m,) 邊的終點
+    length_m: np.ndarray    # (m,) 邊長（公尺）
+    road_class: np.ndarray  # (m,) ROAD_CLASSES 索引
+    maxspeed: np.ndarray    # (m,) 速限 km/h，0 表示未標示
+    access: np.ndarray      # (m,) ACCESS_* 位元
+    lat: np.ndarray         # (n,)
+    lng: np.ndarray         # (n,)
+    osm_ids: np.ndarray     # (n,) 原始 OSM 節點 ID
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.lat)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.indices)
+
+    def tails(self) -> np.ndarray:
+        """每條邊的起點"""
+        return np.repeat(np.arange(self.n_nodes, dtype=np.int32), np.diff(self.indptr))
+
+    def save(self, path) -> None:
+        np.savez_compressed(path, **{f.name: getattr(self, f.name) for f in fields(self)})
+
+    @classmethod
+    def load(cls, path) -> 'RoadGraph':
+        with np.load(path) as data:
+            return cls(**{f.name: data[f.name] for f in fields(cls)})
+
+
+def _haversine_m(lat1, lng1, lat2, lng2):
+    """大圓距離（公尺），可傳入 NumPy 陣列"""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _road_class(highway: Optional[str]) -> Optional[int]:
+    if not highway:
+        return None
+    if highway.endswith('_link'):
+        highway = highway[:-len('_link')]
+    return _CLASS_CODES.get(highway)
+
+
+def _access(tags: Dict[str, str]) -> int:
+    """通行權限位元（越後面的標籤越具體，以最具體者為準）"""
+    flags = 0
+    for bit, keys in _ACCESS_KEYS.items():
+        value = None
+        for key in keys:
+            if key in tags:
+                value = tags[key]
+        if value not in _DENIED:
+            flags |= bit
+    return flags
+
+
+def _oneway(tags: Dict[str, str]) -> int:
+    """1 順向單行、-1 逆向單行、0 雙向"""
+    value = tags.get('oneway')
+    if value in ('yes', 'true', '1'):
+        return 1
+    if value in ('-1', 'reverse'):
+        return -1
+    if value == 'no':
+        return 0
+    if tags.get('junction') in ('roundabout', 'circular') or tags.get('highway') == 'motorway':
+        return 1
+    return 0
+
+
+def _maxspeed(value: Optional[str]) -> int:
+    if not value:
+        return 0
+    try:
+        speed = float(value.split(';')[0].split()[0])
+    except (ValueError, IndexError):
+        return 0
+    if 'mph' in value:
+        speed *= 1.609
+    return int(min(max(speed, 0), 255))
+
+
+def _read_osm_xml(path) -> Tuple[Dict[int, Tuple[float, float]], List[Tuple[List[int], Dict[str, str]]]]:
+    """讀取 .osm XML（節點座標與道路）"""
+    nodes: Dict[int, Tuple[float, float]] = {}
+    ways = []
+    for _, elem in ET.iterparse(str(path), events=('end',)):
+        if elem.tag == 'node':
+            nodes[int(elem.get('id'))] = (float(elem.get('lat')), float(elem.get('lon')))
+            elem.clear()
+        elif elem.tag == 'way':
+            tags = {tag.get('k'): tag.get('v') for tag in elem.iter('tag')}
+            if _road_class(tags.get('highway')) is not None:
+                ways.append(([int(nd.get('ref')) for nd in elem.iter('nd')], tags))
+            elem.clear()
+        elif elem.tag == 'relation':
+            elem.clear()
+    return nodes, ways
+
+
+def _read_osm_pbf(path) -> Tuple[Dict[int, Tuple[float, float]], List[Tuple[List[int], Dict[str, str]]]]:
+    """讀取 .osm.pbf（需要 osmium）"""
+    if osmium is None:
+        raise ImportError("Reading .osm.pbf extracts requires the optional 'osmium' package; "
+                          "install it or convert the extract to .osm XML")
+    nodes: Dict[int, Tuple[float, float]] = {}
+    ways = []
+    for obj in osmium.FileProcessor(str(path)):
+        if obj.is_node():
+            nodes[obj.id] = (obj.location.lat, obj.location.lon)
+        elif obj.is_way():
+            tags = {tag.k: tag.v for tag in obj.tags}
+            if _road_class(tags.get('highway')) is not None:
+                ways.append(([nd.ref for nd in obj.nodes], tags))
+    return nodes, ways
+
+
+def build_road_graph(path, bbox: Optional[Tuple[float, float, float, float]] = TAITUNG_BBOX) -> RoadGraph:
+    """
+    從 OSM 檔建立道路圖
+
+    Args:
+        path: .osm 或 .osm.pbf 檔
+        bbox: (south, west, north, east)，範圍外的路段捨棄；None 表示不裁切
+
+    Returns:
+        RoadGraph
+    """
+    reader = _read_osm_pbf if str(path).endswith('.pbf') else _read_osm_xml
+    nodes, ways = reader(path)
+
+    def inside(ref: int) -> bool:
+        if ref not in nodes:
+            return False
+        if bbox is None:
+            return True
+        lat, lng = nodes[ref]
+        return bbox[0] <= lat <= bbox[2] and bbox[1] <= lng <= bbox[3]
+
+    tails, heads, classes, speeds, access = [], [], [], [], []
+    for refs, tags in ways:
+        flags = _access(tags)
+        if not flags:
+            continue
+        road_class = _road_class(tags.get('highway'))
+        oneway = _oneway(tags)
+        limit = _maxspeed(tags.get('maxspeed'))
+        for a, b in zip(refs, refs[1:]):
+            if a == b or not (inside(a) and inside(b)):
+                continue
+            pairs = ((a, b),) if oneway > 0 else ((b, a),) if oneway < 0 else ((a, b), (b, a))
+            for u, v in pairs:
+                tails.append(u)
+                heads.append(v)
+                classes.append(road_class)
+                speeds.append(limit)
+                access.append(flags)
+
+    osm_ids = np.unique(np.array(tails + heads, dtype=np.int64))
+    tail_idx = np.searchsorted(osm_ids, np.array(tails, dtype=np.int64)).astype(np.int32)
+    head_idx = np.searchsorted(osm_ids, np.array(heads, dtype=np.int64)).astype(np.int32)
+    coords = np.array([nodes[ref] for ref in osm_ids.tolist()], dtype=float).reshape(-1, 2)
+    lat, lng = coords[:, 0], coords[:, 1]
+
+    order = np.lexsort((head_idx, tail_idx))
+    tail_idx, head_idx = tail_idx[order], head_idx[order]
+    indptr = np.zeros(len(osm_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tail_idx, minlength=len(osm_ids)), out=indptr[1:])
+
+    graph = RoadGraph(
+        indptr=indptr,
+        indices=head_idx,
+        length_m=_haversine_m(lat[tail_idx], lng[tail_idx], lat[head_idx], lng[head_idx]).astype(np.float32),
+        road_class=np.array(classes, dtype=np.uint8)[order],
+        maxspeed=np.array(speeds, dtype=np.uint8)[order],
+        access=np.array(access, dtype=np.uint8)[order],
+        lat=lat,
+        lng=lng,
+        osm_ids=osm_ids
+    )
+    logger.info(f"Built road graph with {graph.n_nodes} nodes and {graph.n_edges} edges from {path}")
+    return graph
+
+
+@dataclass
+class _Profile:
+    """單一車種可通行的子圖（平行邊只保留最快的一條）"""
+    matrix: csr_matrix        # 行駛秒數
+    meters: np.ndarray        # 與 matrix.data 對齊的邊長
+    keys: np.ndarray          # tail * n + head（已排序），用來查邊
+    forward: Tuple[List[int], List[int], List[float]]   # indptr, indices, seconds（Python list 供 A* 使用）
+    backward: Tuple[List[int], List[int], List[float]]
+    tree: cKDTree             # 可定位節點的平面座標
+    snap_nodes: np.ndarray
+    max_speed: float          # m/s，A* 估計值的上限速度
+    access_speed: float       # m/s，定位點到道路的接駁速度
+
+
+def _csr_lists(tails: np.ndarray, heads: np.ndarray, values: np.ndarray, n: int):
+    order = np.lexsort((heads, tails))
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tails, minlength=n), out=indptr[1:])
+    return indptr.tolist(), heads[order].tolist(), values[order].tolist()
+
+
+def _distance_text(meters: float) -> str:
+    return f"{meters / 1000:.1f} 公里" if meters >= 1000 else f"{int(round(meters))} 公尺"
+
+
+def _duration_text(seconds: float) -> str:
+    minutes = max(1, int(round(seconds / 60)))
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours} 小時 {minutes} 分鐘" if hours else f"{minutes} 分鐘"
+
+
+class LocalRoutingEngine:
+    """在本地道路圖上計算路徑與距離矩陣"""
+
+    def __init__(self, graph: RoadGraph, max_snap_meters: float = 2000.0):
+        """
+        Args:
+            graph: 道路圖
+            max_snap_meters: 地點離最近可行駛道路超過此距離時視為無法到達
+        """
+        self.graph = graph
+        self.max_snap_meters = max_snap_meters
+        self._lat = graph.lat.tolist()
+        self._lng = graph.lng.tolist()
+        self._scale = (math.cos(math.radians(float(np.mean(graph.lat)) if graph.n_nodes else 0.0)) * 111320.0,
+                       110574.0)
+        self._profiles: Dict[VehicleType, _Profile] = {}
+
+    def _profile(self, vehicle_type: Optional[VehicleType]) -> _Profile:
+        vehicle_type = VehicleType(vehicle_type) if vehicle_type is not None else VehicleType.CAR
+        if vehicle_type not in SPEED_PROFILES:
+            vehicle_type = VehicleType.CAR  # ALL：以汽車計算
+        if vehicle_type not in self._profiles:
+            self._profiles[vehicle_type] = self._build_profile(vehicle_type)
+        return self._profiles[vehicle_type]
+
+    def _build_profile(self, vehicle_type: VehicleType) -> _Profile:
+        graph, n = self.graph, self.graph.n_nodes
+        speeds_by_class = SPEED_PROFILES[vehicle_type]
+        kmh = np.array([speeds_by_class[name] or 0 for name in ROAD_CLASSES], dtype=float)[graph.road_class]
+        limit = graph.maxspeed.astype(float)
+        kmh = np.where(limit > 0, np.minimum(kmh, limit), kmh)
+        usable = (kmh > 0) & ((graph.access & _ACCESS_BITS[vehicle_type]) > 0)
+
+        tails = graph.tails()[usable]
+        heads = graph.indices[usable]
+        meters = graph.length_m[usable].astype(float)
+        seconds = np.maximum(meters / (kmh[usable] / 3.6), MIN_EDGE_SECONDS)
+
+        # 平行邊保留最快者；排序後即為 CSR 順序
+        order = np.lexsort((seconds, heads, tails))
+        tails, heads, meters, seconds = tails[order], heads[order], meters[order], seconds[order]
+        first = np.ones(len(tails), dtype=bool)
+        first[1:] = (tails[1:] != tails[:-1]) | (heads[1:] != heads[:-1])
+        tails, heads, meters, seconds = tails[first], heads[first], meters[first], seconds[first]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(tails, minlength=n), out=indptr[1:])
+        matrix = csr_matrix((seconds, heads, indptr), shape=(n, n))
+
+        # 只定位到夠大的強連通區塊（主島、綠島、蘭嶼），避免停在孤立的私人路段上
+        routable = np.zeros(n, dtype=bool)
+        if n:
+            _, labels = connected_components(matrix, directed=True, connection='strong')
+            sizes = np.bincount(labels)
+            keep = sizes >= min(MIN_COMPONENT_NODES, sizes.max())
+            routable = keep[labels] & (np.diff(indptr) > 0)
+        snap_nodes = np.nonzero(routable)[0]
+
+        return _Profile(
+            matrix=matrix,
+            meters=meters,
+            keys=tails.astype(np.int64) * n + heads,
+            forward=(indptr.tolist(), heads.tolist(), seconds.tolist()),
+            backward=_csr_lists(heads, tails, seconds, n),
+            tree=cKDTree(self._project(graph.lat[snap_nodes], graph.lng[snap_nodes])),
+            snap_nodes=snap_nodes,
+            max_speed=max(v for v in speeds_by_class.values() if v) / 3.6,
+            access_speed=speeds_by_class['service'] / 3.6
+        )
+
+    def _project(self, lat, lng) -> np.ndarray:
+        return np.column_stack([np.asarray(lng, dtype=float) * self._scale[0],
+                                np.asarray(lat, dtype=float) * self._scale[1]])
+
+    def _snap(self, profile: _Profile, points: Sequence[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        """最近的可行駛節點（-1 表示太遠）與接駁距離（公尺）"""
+        nodes = np.full(len(points), -1, dtype=np.int64)
+        offsets = np.zeros(len(points))
+        if not len(points) or not len(profile.snap_nodes):
+            return nodes, offsets
+        lat = np.array([p[0] for p in points], dtype=float)
+        lng = np.array([p[1] for p in points], dtype=float)
+        _, found = profile.tree.query(self._project(lat, lng))
+        candidates = profile.snap_nodes[found]
+        offsets = _haversine_m(lat, lng, self.graph.lat[candidates], self.graph.lng[candidates])
+        near = offsets <= self.max_snap_meters
+        nodes[near] = candidates[near]
+        return nodes, offsets
+
+    def _bidirectional(self, profile: _Profile, source: int, target: int) -> Optional[List[int]]:
+        """
+        雙向 A*（平均位勢 p(v) = (h_t(v) - h_s(v)) / 2，兩個方向的縮減權重皆非負，
+        可直接用雙向 Dijkstra 的停止條件）
+
+        Returns:
+            節點路徑；無法到達時為 None
+        """
+        if source == target:
+            return [source]
+        lat, lng = self._lat, self._lng
+        scale = 1000.0 / (2 * profile.max_speed)  # 公里 -> 秒的一半
+        potentials: Dict[int, float] = {}
+
+        def potential(v: int) -> float:
+            value = potentials.get(v)
+            if value is None:
+                to_target = calculate_haversine_distance(lat[v], lng[v], lat[target], lng[target])
+                from_source = calculate_haversine_distance(lat[source], lng[source], lat[v], lng[v])
+                value = potentials[v] = (to_target - from_source) * scale
+            return value
+
+        dist = ({source: 0.0}, {target: 0.0})
+        parent = ({source: -1}, {target: -1})
+        heaps = ([(0.0, source)], [(0.0, target)])
+        settled = (set(), set())
+        best, meet = math.inf, -1
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            d, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+            indptr, indices, seconds = profile.forward if side == 0 else profile.backward
+            mine, other, parents = dist[side], dist[1 - side], parent[side]
+            pu = potential(u)
+            for k in range(indptr[u], indptr[u + 1]):
+                v = indices[k]
+                # 順向 w - p(u) + p(v)；逆向走的是 v -> u 的邊：w - p(v) + p(u)
+                reduced = seconds[k] + (potential(v) - pu if side == 0 else pu - potential(v))
+                nd = d + max(reduced, 0.0)
+                if nd < mine.get(v, math.inf):
+                    mine[v] = nd
+                    parents[v] = u
+                    heapq.heappush(heaps[side], (nd, v))
+                    if v in other and nd + other[v] < best:
+                        best, meet = nd + other[v], v
+
+        if meet < 0:
+            return None
+        path = []
+        node = meet
+        while node >= 0:
+            path.append(node)
+            node = parent[0][node]
+        path.reverse()
+        node = parent[1][meet]
+        while node >= 0:
+            path.append(node)
+            node = parent[1][node]
+        return path
+
+    def route(
+        self,
+        origin: Tuple[float, float],
+        destination: Tuple[float, float],
+        vehicle_type: VehicleType = VehicleType.CAR
+    ) -> Optional[Dict[str, Any]]:
+        """
+        兩點間最快路徑
+
+        Args:
+            origin: (lat, lng)
+            destination: (lat, lng)
+            vehicle_type: 車種（決定速度與可行駛道路）
+
+        Returns:
+            distance_meters、duration_seconds 與 path [(lat, lng), ...]；無法到達時為 None
+        """
+        profile = self._profile(vehicle_type)
+        nodes, offsets = self._snap(profile, [origin, destination])
+        if (nodes < 0).any():
+            return None
+        path = self._bidirectional(profile, int(nodes[0]), int(nodes[1]))
+        if path is None:
+            return None
+
+        if len(path) > 1:
+            edges = np.searchsorted(profile.keys, np.array(path[:-1], dtype=np.int64) * self.graph.n_nodes
+                                    + np.array(path[1:], dtype=np.int64))
+            meters = float(profile.meters[edges].sum())
+            seconds = float(profile.matrix.data[edges].sum())
+        else:
+            meters = seconds = 0.0
+        access = float(offsets.sum())
+        return {
+            'distance_meters': int(round(meters + access)),
+            'duration_seconds': int(round(seconds + access / profile.access_speed)),
+            'path': [tuple(origin)] + [(self._lat[v], self._lng[v]) for v in path] + [tuple(destination)]
+        }
+
+    def _path_meters(self, profile: _Profile, predecessors: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """沿最短路徑樹由目的地往回走，加總路徑長度（只處理需要的目的地）"""
+        n = self.graph.n_nodes
+        rows = np.arange(predecessors.shape[0])[:, None]
+        current = np.repeat(targets[None, :], predecessors.shape[0], axis=0)
+        meters = np.zeros(current.shape)
+        while True:
+            parent = predecessors[rows, current]
+            step = parent >= 0
+            if not step.any():
+                return meters
+            edges = np.searchsorted(profile.keys, parent[step].astype(np.int64) * n + current[step])
+            meters[step] += profile.meters[edges]
+            current[step] = parent[step]
+
+    def travel_matrix(
+        self,
+        origins: Sequence[Tuple[float, float]],
+        destinations: Sequence[Tuple[float, float]],
+        vehicle_type: VehicleType = VehicleType.CAR
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        多對多距離與時間
+
+        Args:
+            origins: [(lat, lng), ...]
+            destinations: [(lat, lng), ...]
+            vehicle_type: 車種
+
+        Returns:
+            (公尺, 秒) 兩個 len(origins) x len(destinations) 陣列；無法到達為 inf
+        """
+        profile = self._profile(vehicle_type)
+        origin_nodes, origin_offsets = self._snap(profile, origins)
+        dest_nodes, dest_offsets = self._snap(profile, destinations)
+        meters = np.full((len(origins), len(destinations)), np.inf)
+        seconds = np.full((len(origins), len(destinations)), np.inf)
+        dest_ok = dest_nodes >= 0
+        dest_targets = dest_nodes[dest_ok]
+
+        sources = np.unique(origin_nodes[origin_nodes >= 0])
+        for start in range(0, len(sources), MATRIX_CHUNK):
+            block = sources[start:start + MATRIX_CHUNK]
+            times, predecessors = dijkstra(profile.matrix, directed=True, indices=block,
+                                           return_predecessors=True)
+            times = times[:, dest_targets]
+            lengths = self._path_meters(profile, predecessors, dest_targets)
+            # 未到達的目的地在 lengths 中為 0，以 times 為準
+            lengths[np.isinf(times)] = np.inf
+            for row, node in enumerate(block):
+                rows = np.nonzero(origin_nodes == node)[0][:, None]
+                meters[rows, dest_ok] = lengths[row]
+                seconds[rows, dest_ok] = times[row]
+
+        access = origin_offsets[:, None] + dest_offsets[None, :]
+        meters += access
+        seconds += access / profile.access_speed
+        if len(origins) and len(destinations):
+            same = (np.asarray(origins, dtype=float)[:, None, :] ==
+                    np.asarray(destinations, dtype=float)[None, :, :]).all(axis=2)
+            meters[same] = seconds[same] = 0.0
+        return meters, seconds
+
+    def calculate_distance_matrix(
+        self,
+        origins: List[Location],
+        destinations: List[Location],
+        departure_time: Optional[datetime] = None,
+        traffic_model: str = 'best_guess',
+        vehicle_type: VehicleType = VehicleType.CAR
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Calculate distance matrix (same format as GoogleMapsClient.calculate_distance_matrix)
+
+        Args:
+            origins: List of origin locations
+            destinations: List of destination locations
+            departure_time: Accepted for compatibility; the road graph has no traffic data
+            traffic_model: Accepted for compatibility
+            vehicle_type: Speed profile to route with
+
+        Returns:
+            Distance matrix results
+        """
+        meters, seconds = self.travel_matrix(
+            [(o.lat, o.lng) for o in origins],
+            [(d.lat, d.lng) for d in destinations],
+            vehicle_type
+        )
+        matrix = []
+        for i in range(len(origins)):
+            row = []
+            for j in range(len(destinations)):
+                if np.isinf(seconds[i, j]):
+                    row.append({'origin_index': i, 'destination_index': j,
+                                'status': 'ZERO_RESULTS', 'error': 'No route found'})
+                    continue
+                distance, duration = int(round(meters[i, j])), int(round(seconds[i, j]))
+                row.append({
+                    'origin_index': i,
+                    'destination_index': j,
+                    'distance_meters': distance,
+                    'distance_text': _distance_text(distance),
+                    'duration_seconds': duration,
+                    'duration_text': _duration_text(duration),
+                    'duration_in_traffic_seconds': duration,
+                    'duration_in_traffic_text': _duration_text(duration)
+                })
+            matrix.append(row)
+
+        return {
+            'matrix': matrix,
+            'origin_addresses': [o.formatted_address or o.address for o in origins],
+            'destination_addresses': [d.formatted_address or d.address for d in destinations]
+        }
+
+
+@lru_cache(maxsize=1)
+def _load_engine(path: str) -> LocalRoutingEngine:
+    graph = RoadGraph.load(path)
+    logger.info(f"Loaded road graph {path} ({graph.n_nodes} nodes, {graph.n_edges} edges)")
+    return LocalRoutingEngine(graph)
+
+
+def get_local_routing_engine(path: Optional[str] = None) -> Optional[LocalRoutingEngine]:
+    """
+    取得本地路網引擎（依設定的道路圖檔，載入一次後共用）
+
+    Args:
+        path: 道路圖 .npz；None 表示使用 ROAD_GRAPH_PATH 設定
+
+    Returns:
+        LocalRoutingEngine；未設定或檔案不存在時為 None
+    """
+    path = path or cloud_config.local_routing_config['graph_path']
+    if not path or not Path(path).exists():
+        return None
+    return _load_engine(str(path))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Build the local road graph from an OpenStreetMap extract")
+    parser.add_argument('source', help=".osm or .osm.pbf extract")
+    parser.add_argument('output', help="Output .npz file")
+    parser.add_argument('--bbox', default=','.join(str(v) for v in TAITUNG_BBOX),
+                        help="south,west,north,east (default: Taitung County)")
+    args = parser.parse_args(argv)
+
+    graph = build_road_graph(args.source, bbox=tuple(float(v) for v in args.bbox.split(',')))
+    graph.save(args.output)
+    print(f"{graph.n_nodes} nodes, {graph.n_edges} edges -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -334,9 +334,50 @@ class Route(Base):
     # 路線詳情 (JSON)
     route_details = Column(Text)  # 包含完整路線順序與細節
     
+    # 路線幾何（定案時計算一次）
+    geometry = relationship("RouteGeometry", back_populates="route", uselist=False, cascade="all, delete-orphan")
+    
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     __table_args__ = (
         Index('idx_route_date_area', 'route_date', 'area'),
-    )
\ No newline at end of file
+    )
+
+
+class RouteGeometry(Base):
+    """路線幾何（路線定案時計算一次的編碼折線）"""
+    __tablename__ = 'route_geometries'
+    
+    id = Column(Integer, primary_key=True)
+    route_id = Column(Integer, ForeignKey('routes.id'), nullable=False, unique=True)
+    route = relationship("Route", back_populates="geometry")
+    
+    # 計算時的停靠順序 (JSON 客戶ID列表)，順序改變才重新計算
+    stop_sequence = Column(Text, nullable=False)
+    
+    # 幾何資料 (Google encoded polyline)
+    polyline = Column(Text, nullable=False)  # 完整折線
+    simplified = Column(Text)  # 各縮放等級的簡化折線 (JSON {縮放等級: 折線})
+    point_count = Column(Integer, default=0)  # 完整折線點數
+    source = Column(String(20))  # road_network / google / straight
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class SchedulingJobRecord(Base):
+    """背景排程工作狀態（多個 API 程序共用，執行中的工作只在啟動它的程序計算）"""
+    __tablename__ = 'scheduling_jobs'
+    
+    job_id = Column(String(32), primary_key=True)
+    status = Column(String(20), nullable=False, default='running')  # running / completed / failed
+    stoppable = Column(Boolean, default=True)  # 演算法是否支援提前停止
+    stop_requested = Column(Boolean, default=False)
+    version = Column(Integer, default=0)  # 每次狀態變更遞增
+    
+    progress = Column(Text)  # 最新進度 (JSON)
+    result = Column(Text)  # 完成時的排程結果 (JSON)
+    error = Column(Text)
+    
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
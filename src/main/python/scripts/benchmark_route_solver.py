@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Benchmark the OR-Tools model used by CloudRouteOptimizationService
+
+Builds synthetic Taitung instances with a haversine distance/time matrix (no
+network access needed) and compares solve_vehicle_routing, which registers
+precomputed transit matrices and demand vectors, with the same model built
+from per-arc Python callbacks. Reports time to first solution and, for a
+fixed time budget, how many solutions/branches each setup explores.
+
+With --hints it instead compares time-to-target for a cold start against
+solution hints built from "yesterday's" routes (today's solution with 10%
+of the stops replaced) and from the greedy scheduler. The target is the
+cold run's final objective plus 1%.
+
+Usage:
+    python scripts/benchmark_route_solver.py [seconds] [stops ...]
+    python scripts/benchmark_route_solver.py --hints [seconds] [stops ...]
+"""
+
+import math
+import random
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+from ortools.constraint_solver import pywrapcp, routing_enums_pb2
+
+# Add parent directory to path to import from services
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from common.geo_utils import calculate_haversine_matrix
+from integrations.google_maps_client import Location
+from common.scheduling.models import WarmStartRoute
+from services.cloud_route_service import (
+    CYLINDER_TYPES, DAY_MINUTES, DeliveryNode, VehicleInfo, build_initial_routes,
+    greedy_hint_routes, solve_vehicle_routing
+)
+
+DEPOT = (22.7553, 121.1504)
+SPEED_KMH = 30.0
+
+
+def build_instance(stops: int, seed: int = 0):
+    """Stops within ~10 km of the depot, one vehicle per 12 stops"""
+    rng = random.Random(seed)
+    n_vehicles = math.ceil(stops / 12)
+    vehicles = [
+        VehicleInfo(
+            vehicle_id=v + 1,
+            driver_id=v + 1,
+            start_location=Location(address="depot", lat=DEPOT[0], lng=DEPOT[1]),
+            capacity={'50kg': 10, '20kg': 40, '16kg': 40, '10kg': 60, '4kg': 80},
+            max_duration=600
+        )
+        for v in range(n_vehicles)
+    ]
+    nodes = []
+    for i in range(stops):
+        start = rng.choice([480, 480, 480, 540, 660, 780])
+        demand = {cylinder_type: 0 for cylinder_type in CYLINDER_TYPES}
+        demand[rng.choice(('20kg', '16kg', '50kg'))] = rng.randint(1, 2)
+        nodes.append(DeliveryNode(
+            delivery_id=i + 1,
+            client_id=i + 1,
+            location=Location(address=f"stop {i + 1}", lat=DEPOT[0] + rng.uniform(-0.08, 0.08),
+                              lng=DEPOT[1] + rng.uniform(-0.08, 0.08)),
+            demand=demand,
+            service_time=10,
+            time_window=(start, min(start + rng.choice([180, 600]), 1080))
+        ))
+
+    points = [(v.start_location.lat, v.start_location.lng) for v in vehicles]
+    points += [(node.location.lat, node.location.lng) for node in nodes]
+    km = calculate_haversine_matrix(points)
+    distance_matrix = np.rint(km).astype(np.int64)
+    time_matrix = np.rint(km / SPEED_KMH * 60).astype(np.int64)
+    return vehicles, nodes, distance_matrix, time_matrix
+
+
+def solve_with_callbacks(vehicles, nodes, distance_matrix, time_matrix, time_limit_seconds, solution_limit=None):
+    """Same model as solve_vehicle_routing, but every transit is a Python callback"""
+    setup_start = time.perf_counter()
+    n_vehicles = len(vehicles)
+    depots = list(range(n_vehicles))
+    manager = pywrapcp.RoutingIndexManager(n_vehicles + len(nodes), n_vehicles, depots, depots)
+    routing = pywrapcp.RoutingModel(manager)
+
+    def distance_callback(from_index, to_index):
+        return int(distance_matrix[manager.IndexToNode(from_index)][manager.IndexToNode(to_index)])
+
+    def time_callback(from_index, to_index):
+        from_node = manager.IndexToNode(from_index)
+        service = nodes[from_node - n_vehicles].service_time if from_node >= n_vehicles else 0
+        return int(time_matrix[from_node][manager.IndexToNode(to_index)]) + service
+
+    distance_index = routing.RegisterTransitCallback(distance_callback)
+    routing.SetArcCostEvaluatorOfAllVehicles(distance_index)
+    routing.AddDimension(routing.RegisterTransitCallback(time_callback), 30, DAY_MINUTES, False, 'Time')
+    time_dimension = routing.GetDimensionOrDie('Time')
+    for vehicle_idx, vehicle in enumerate(vehicles):
+        time_dimension.SetSpanUpperBoundForVehicle(vehicle.max_duration, vehicle_idx)
+    for i, node in enumerate(nodes):
+        time_dimension.CumulVar(manager.NodeToIndex(n_vehicles + i)).SetRange(*node.time_window)
+
+    for cylinder_type in CYLINDER_TYPES:
+        if not any(node.demand.get(cylinder_type) for node in nodes):
+            continue
+
+        def demand_callback(from_index, cylinder_type=cylinder_type):
+            from_node = manager.IndexToNode(from_index)
+            if from_node < n_vehicles:
+                return 0
+            return nodes[from_node - n_vehicles].demand.get(cylinder_type, 0)
+
+        routing.AddDimensionWithVehicleCapacity(
+            routing.RegisterUnaryTransitCallback(demand_callback), 0,
+            [v.capacity.get(cylinder_type, 0) for v in vehicles], True, f'Capacity_{cylinder_type}'
+        )
+    routing.AddDimensionWithVehicleCapacity(distance_index, 0, [int(v.max_distance) for v in vehicles], True, 'Distance')
+
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = routing_enums_pb2.FirstSolutionStrategy.AUTOMATIC
+    search_parameters.local_search_metaheuristic = routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+    search_parameters.time_limit.seconds = int(time_limit_seconds)
+    if solution_limit:
+        search_parameters.solution_limit = solution_limit
+    setup_seconds = time.perf_counter() - setup_start
+
+    solve_start = time.perf_counter()
+    assignment = routing.SolveWithParameters(search_parameters)
+    return {
+        'objective': assignment.ObjectiveValue() if assignment else None,
+        'solutions': routing.solver().Solutions(),
+        'branches': routing.solver().Branches(),
+        'setup_seconds': setup_seconds,
+        'solve_seconds': time.perf_counter() - solve_start
+    }
+
+
+def main(seconds: int, sizes):
+    print(f"{'stops':>6} {'model':<10} {'setup s':>8} {'first s':>8} "
+          f"{'sols/' + str(seconds) + 's':>9} {'branches':>10} {'objective':>10}")
+    for stops in sizes:
+        instance = build_instance(stops)
+        for name, solve in (("callbacks", solve_with_callbacks), ("matrix", solve_vehicle_routing)):
+            def run(**kwargs):
+                result = solve(*instance, **kwargs)
+                return result.stats if hasattr(result, 'stats') else result
+
+            first = run(time_limit_seconds=120, solution_limit=1)
+            budget = run(time_limit_seconds=seconds)
+            print(f"{stops:>6} {name:<10} {first['setup_seconds']:>8.3f} {first['solve_seconds']:>8.2f} "
+                  f"{budget['solutions']:>9} {budget['branches']:>10} {budget['objective'] or '-':>10}", flush=True)
+
+
+def previous_day_routes(instance, seconds: int, seed: int = 1):
+    """Yesterday's plan: today's solution, 10% of the clients replaced by others"""
+    vehicles, nodes, distance_matrix, time_matrix = instance
+    solution = solve_vehicle_routing(*instance, time_limit_seconds=seconds)
+    rng = random.Random(seed)
+    gone = set(rng.sample([node.client_id for node in nodes], len(nodes) // 10))
+    routing, manager, assignment = solution.routing, solution.manager, solution.assignment
+    routes = []
+    for vehicle_idx, vehicle in enumerate(vehicles):
+        client_ids = []
+        index = assignment.Value(routing.NextVar(routing.Start(vehicle_idx)))
+        while not routing.IsEnd(index):
+            client_id = nodes[manager.IndexToNode(index) - len(vehicles)].client_id
+            client_ids.append(-client_id if client_id in gone else client_id)  # Not delivered today
+            index = assignment.Value(routing.NextVar(index))
+        routes.append(WarmStartRoute(driver_id=vehicle.driver_id, client_ids=client_ids))
+    return routes
+
+
+def time_to_target(improvements, target):
+    return next((seconds for seconds, objective in improvements if objective <= target), None)
+
+
+def compare_hints(seconds: int, sizes):
+    print(f"{'stops':>6} {'start':<10} {'hint s':>7} {'first obj':>10} {'final obj':>10} {'to target s':>12}")
+    for stops in sizes:
+        instance = build_instance(stops)
+        vehicles, nodes, distance_matrix, time_matrix = instance
+        cold = solve_vehicle_routing(*instance, time_limit_seconds=seconds, record_improvements=True)
+        target = cold.stats['objective'] * 1.01
+        runs = [("cold", None, 0.0, cold)]
+
+        hint_sources = (
+            ("previous", lambda: previous_day_routes(instance, seconds)),
+            ("greedy", lambda: greedy_hint_routes(vehicles, nodes, date.today()))
+        )
+        for name, source in hint_sources:
+            hint_routes = source()
+            hint_start = time.perf_counter()
+            initial_routes, _ = build_initial_routes(vehicles, nodes, distance_matrix, time_matrix, hint_routes)
+            hint_seconds = time.perf_counter() - hint_start
+            runs.append((name, initial_routes, hint_seconds, solve_vehicle_routing(
+                *instance, time_limit_seconds=seconds, initial_routes=initial_routes, record_improvements=True
+            )))
+
+        for name, initial_routes, hint_seconds, solution in runs:
+            improvements = solution.stats['improvements']
+            label = name if initial_routes is not None or name == "cold" else f"{name}(x)"  # x: no complete hint
+            reached = time_to_target(improvements, target)
+            print(f"{stops:>6} {label:<10} {hint_seconds:>7.3f} {improvements[0][1] if improvements else '-':>10} "
+                  f"{solution.stats['objective'] or '-':>10} "
+                  f"{'-' if reached is None else format(reached + hint_seconds, '.2f'):>12}", flush=True)
+
+
+if __name__ == "__main__":
+    hints = "--hints" in sys.argv[1:]
+    args = [int(arg) for arg in sys.argv[1:] if arg != "--hints"]
+    if hints:
+        compare_hints(args[0] if args else 10, args[1:] or [100, 300])
+    else:
+        main(args[0] if args else 10, args[1:] or [100, 300, 1000])
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark memory and construction time of the scheduling dataclasses
+
+Builds the objects a GA run allocates for one instance (population x
+deliveries schedule entries and time slots) with the slotted models and with
+__dict__-based twins of the same fields, and reports allocated MB and
+construction time for each.
+
+Usage:
+    python scripts/benchmark_scheduling_models.py [deliveries] [population]
+"""
+
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import MISSING, field, fields, make_dataclass
+from pathlib import Path
+
+# Add parent directory to path to import from common modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from common.time_utils import ScheduleEntry, TimeSlot
+
+
+def dict_twin(cls):
+    """Same fields and methods as cls, without __slots__"""
+    specs = []
+    for f in fields(cls):
+        if f.default is not MISSING:
+            specs.append((f.name, f.type, field(default=f.default)))
+        elif f.default_factory is not MISSING:
+            specs.append((f.name, f.type, field(default_factory=f.default_factory)))
+        else:
+            specs.append((f.name, f.type))
+    namespace = {name: value for name, value in vars(cls).items()
+                 if callable(value) or isinstance(value, property)}
+    namespace.pop('__init__', None)
+    return make_dataclass(cls.__name__, specs, namespace={
+        name: value for name, value in namespace.items()
+        if not name.startswith('__') or name == '__post_init__'
+    })
+
+
+def build(entry_cls, slot_cls, deliveries, population):
+    """Population x deliveries entries, like GeneticScheduler._chromosome_to_schedule"""
+    rng = random.Random(0)
+    schedules = []
+    for _ in range(population):
+        schedule = []
+        for delivery_id in range(deliveries):
+            start = 480 + rng.randrange(600)
+            schedule.append(entry_cls(
+                delivery_id=delivery_id,
+                client_id=delivery_id,
+                driver_id=rng.randrange(12),
+                vehicle_id=1,
+                time_slot=slot_cls(start_time=start, end_time=start + 30),
+                service_duration=30,
+                priority=0,
+                location=(22.75, 121.15)
+            ))
+        schedules.append(schedule)
+    return schedules
+
+
+def measure(entry_cls, slot_cls, deliveries, population, repeat: int = 3):
+    elapsed = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        build(entry_cls, slot_cls, deliveries, population)
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    tracemalloc.start()
+    schedules = build(entry_cls, slot_cls, deliveries, population)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del schedules
+    return elapsed, size
+
+
+def main(deliveries: int, population: int):
+    print(f"{deliveries} deliveries x {population} chromosomes ({deliveries * population} entries)")
+    print(f"{'model':<10} {'build ms':>10} {'MB':>8}")
+    variants = (
+        ("dict", dict_twin(ScheduleEntry), dict_twin(TimeSlot)),
+        ("slots", ScheduleEntry, TimeSlot),
+    )
+    for name, entry_cls, slot_cls in variants:
+        elapsed, size = measure(entry_cls, slot_cls, deliveries, population)
+        print(f"{name:<10} {elapsed * 1000:>10.1f} {size / 2 ** 20:>8.1f}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [1000, 50][len(args):]))
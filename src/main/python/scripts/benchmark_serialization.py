@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark API response serialization for large delivery lists
+
+Compares the Pydantic path (model_validate + response_model re-validation +
+stdlib json) against RowSerializer + orjson, and reports bytes on the wire
+uncompressed, with GZip and with Brotli.
+
+Usage:
+    python scripts/benchmark_serialization.py [rows ...]
+"""
+
+import gzip
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path to import from api modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from api.schemas.delivery import DeliveryListResponse, DeliveryResponse
+from api.utils.serialization import dumps, row_serializer
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def build_rows(count: int):
+    """Build delivery rows shaped like build_delivery_response output"""
+    now = datetime(2025, 7, 1, 8, 0)
+    rows = []
+    for i in range(count):
+        rows.append({
+            "id": i + 1,
+            "order_number": f"ORD-{i + 1:06d}",
+            "client_id": 1000 + i,
+            "scheduled_date": date.today() + timedelta(days=i % 7),
+            "scheduled_time_slot": "09:00-11:00",
+            "gas_quantity": 2,
+            "unit_price": 650.0,
+            "delivery_fee": 0.0,
+            "total_amount": 1300.0,
+            "delivery_address": f"台東縣台東市中興路二段{i % 500}號",
+            "delivery_district": "台東市",
+            "payment_method": "cash",
+            "payment_status": "pending",
+            "status": "pending",
+            "driver_id": i % 12 + 1,
+            "vehicle_id": i % 12 + 1,
+            "client_name": f"客戶{i}",
+            "client_phone": "089-123456",
+            "driver_name": "陳志明",
+            "vehicle_plate": "ABC-1234",
+            "requires_empty_cylinder_return": True,
+            "empty_cylinders_to_return": 2,
+            "empty_cylinders_returned": 2,
+            "created_at": now,
+            "updated_at": now,
+        })
+    return rows
+
+
+def pydantic_path(rows):
+    items = [DeliveryResponse.model_validate(row) for row in rows]
+    response = DeliveryListResponse(items=items, total=len(items), page=1, page_size=len(items), total_pages=1)
+    # FastAPI 會依 response_model 再驗證一次後以標準 json 輸出
+    content = DeliveryListResponse.model_validate(response.model_dump()).model_dump(mode="json")
+    return json.dumps(content, ensure_ascii=False).encode("utf-8")
+
+
+def fast_path(rows):
+    serialize = row_serializer(DeliveryResponse)
+    return dumps({
+        "items": [serialize(row) for row in rows],
+        "total": len(rows),
+        "page": 1,
+        "page_size": len(rows),
+        "total_pages": 1
+    })
+
+
+def timed(func, rows, repeat: int = 3):
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func(rows)
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+
+def main(sizes):
+    print(f"{'rows':>6} {'path':<10} {'serialize ms':>13} {'raw KB':>9} {'gzip KB':>9} {'br KB':>9}")
+    for size in sizes:
+        rows = build_rows(size)
+        for name, func in (("pydantic", pydantic_path), ("fast", fast_path)):
+            elapsed, body = timed(func, rows)
+            gz = len(gzip.compress(body, compresslevel=6))
+            br = len(brotli.compress(body, quality=4)) if brotli else None
+            print(f"{size:>6} {name:<10} {elapsed * 1000:>13.1f} {len(body) / 1024:>9.1f} "
+                  f"{gz / 1024:>9.1f} {(br / 1024 if br else float('nan')):>9.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000])
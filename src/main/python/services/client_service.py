@@ -1,10 +1,11 @@
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
+from sqlalchemy import and_, func
 import logging
 
 from models.database_schema import Client, PaymentMethod, VehicleType
+from services.search_service import search_index
 from utils.date_converter import TaiwanDateConverter
 
 logger = logging.getLogger(__name__)
@@ -157,15 +158,7 @@ class ClientService:
             
             # 關鍵字搜尋
             if search_term:
-                search_pattern = f"%{search_term}%"
-                query = query.filter(
-                    or_(
-                        Client.client_code.ilike(search_pattern),
-                        Client.invoice_title.ilike(search_pattern),
-                        Client.short_name.ilike(search_pattern),
-                        Client.address.ilike(search_pattern)
-                    )
-                )
+                query = query.filter(search_index.filter_clause(self.db, Client, search_term))
             
             # 區域篩選
             if area:
@@ -11,6 +11,7 @@ import numpy as np
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
 import asyncio
+import time as time_module
 from sqlalchemy.orm import Session
 
 import sys
@@ -19,15 +20,31 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from models.database_schema import Client, Delivery, Driver, Vehicle, Route, DeliveryStatus, VehicleType
 from integrations.google_maps_client import GoogleMapsClient, Location
+from integrations.road_network import get_local_routing_engine
 from config.cloud_config import cloud_config
-from common.geo_utils import calculate_haversine_distance
 from common.time_utils import parse_client_time_windows, calculate_service_time
 from common.vehicle_utils import calculate_required_vehicle_type
+from common.scheduling.models import (
+    DeliveryRequest, DriverAvailability, SchedulingParameters, OptimizationObjective, WarmStartRoute
+)
+from common.scheduling.algorithms import GreedyScheduler
+from common.scheduling.warm_start import routes_from_schedule
+from services.planning_snapshot import planning_snapshot_query
+from services.previous_routes import load_previous_routes
+from services.route_repair import ActiveRoute, active_routes
+from services.route_geometry import trace_geometry
+from services.same_day_insertion import ACTIVE_ROUTE_STATUSES
 
 logger = logging.getLogger(__name__)
 
+# 鋼瓶規格（每種規格一個容量維度）
+CYLINDER_TYPES = ('50kg', '20kg', '16kg', '10kg', '4kg')
+DAY_MINUTES = 24 * 60
+MAX_WAIT_MINUTES = 30  # Slack of the time dimension
+DEPOT_LOCATION = Location(address="Depot", lat=22.7553, lng=121.1504)
 
-@dataclass
+
+@dataclass(slots=True)
 class DeliveryNode:
     """Represents a delivery point in route optimization"""
     delivery_id: int
@@ -68,6 +85,343 @@ class OptimizedRoute:
     departure_times: List[datetime]
     route_polyline: str
     warnings: List[str] = None
+    solver_stats: Optional[Dict[str, Any]] = None  # Shared by all routes of one solve
+
+
+@dataclass
+class RoutingSolution:
+    """OR-Tools assignment together with the model it belongs to"""
+    manager: Any
+    routing: Any
+    assignment: Any  # None when no solution was found
+    stats: Dict[str, Any]
+
+
+class _HintChecker:
+    """Replays routes against the model's time, capacity and distance rules"""
+
+    def __init__(self, vehicles, nodes, distance_matrix, time_matrix):
+        n_vehicles = len(vehicles)
+        self.n_vehicles = n_vehicles
+        self.distance = np.asarray(distance_matrix, dtype=np.int64).tolist()
+        service = [0] * n_vehicles + [node.service_time for node in nodes]
+        self.travel = [
+            [int(t) + service[i] for t in row]
+            for i, row in enumerate(np.asarray(time_matrix, dtype=np.int64).tolist())
+        ]
+        self.windows = [(0, DAY_MINUTES)] * n_vehicles + [node.time_window for node in nodes]
+        self.demand = [{}] * n_vehicles + [node.demand for node in nodes]
+        self.vehicles = vehicles
+
+    def route_distance(self, vehicle_idx: int, route: List[int]) -> int:
+        path = [vehicle_idx] + route + [vehicle_idx]
+        return sum(self.distance[a][b] for a, b in zip(path, path[1:]))
+
+    def feasible(self, vehicle_idx: int, route: List[int]) -> bool:
+        vehicle = self.vehicles[vehicle_idx]
+        capacity = vehicle.capacity or {}
+        for cylinder_type in CYLINDER_TYPES:
+            if sum(self.demand[n].get(cylinder_type) or 0 for n in route) > capacity.get(cylinder_type, 0):
+                return False
+        if self.route_distance(vehicle_idx, route) > vehicle.max_distance:
+            return False
+
+        # Earliest/latest cumul at each stop, waiting at most MAX_WAIT_MINUTES per arc
+        path = [vehicle_idx] + route + [vehicle_idx]
+        bounds = [(0, DAY_MINUTES)]
+        for a, b in zip(path, path[1:]):
+            lo, hi = bounds[-1]
+            start, end = self.windows[b] if b >= self.n_vehicles else (0, DAY_MINUTES)
+            lo, hi = max(lo + self.travel[a][b], start), min(hi + self.travel[a][b] + MAX_WAIT_MINUTES, end)
+            if lo > hi:
+                return False
+            bounds.append((lo, hi))
+
+        # Leave as late as possible for the earliest return to get the shortest span
+        latest = bounds[-1][0]
+        for (lo, hi), a, b in zip(reversed(bounds[:-1]), reversed(path[:-1]), reversed(path[1:])):
+            latest = min(hi, latest - self.travel[a][b])
+        return bounds[-1][0] - latest <= vehicle.max_duration
+
+
+def build_initial_routes(
+    vehicles: List[VehicleInfo],
+    nodes: List[DeliveryNode],
+    distance_matrix: np.ndarray,
+    time_matrix: np.ndarray,
+    hint_routes: List[WarmStartRoute]
+) -> Tuple[Optional[List[List[int]]], Dict[str, int]]:
+    """
+    Turn per-driver client orders into a complete, feasible set of routes
+
+    Stops keep the hinted order on the hinted driver's vehicle; a stop that
+    breaks the vehicle's time windows, capacity, distance or duration is
+    displaced. Displaced and new nodes are then inserted at their cheapest
+    feasible position. OR-Tools only accepts an initial assignment that
+    visits every node, so the result is None when some node fits nowhere.
+
+    Args:
+        vehicles: Vehicles, in model order
+        nodes: Delivery nodes, in model order
+        distance_matrix: Matrix used by the model (vehicle starts then nodes)
+        time_matrix: Matrix used by the model
+        hint_routes: Visit order per driver (e.g. previous day, greedy schedule)
+
+    Returns:
+        (routes of matrix indices per vehicle or None, stats)
+    """
+    n_vehicles = len(vehicles)
+    checker = _HintChecker(vehicles, nodes, distance_matrix, time_matrix)
+    vehicle_of_driver = {vehicle.driver_id: idx for idx, vehicle in enumerate(vehicles)}
+    nodes_of_client: Dict[int, List[int]] = {}
+    for i, node in enumerate(nodes):
+        nodes_of_client.setdefault(node.client_id, []).append(n_vehicles + i)
+
+    routes: List[List[int]] = [[] for _ in vehicles]
+    placed = set()
+    stats = {'reused': 0, 'inserted': 0, 'dropped': 0, 'unplaced': 0}
+    for hint in hint_routes:
+        vehicle_idx = vehicle_of_driver.get(hint.driver_id)
+        if vehicle_idx is None:
+            continue
+        for client_id in hint.client_ids:
+            candidates = [n for n in nodes_of_client.get(client_id, []) if n not in placed]
+            if not candidates:
+                stats['dropped'] += 1  # Not delivered today
+                continue
+            for node in candidates:
+                if checker.feasible(vehicle_idx, routes[vehicle_idx] + [node]):
+                    routes[vehicle_idx].append(node)
+                    placed.add(node)
+                    stats['reused'] += 1
+
+    # Tightest time windows first, they have the fewest feasible positions
+    distance = checker.distance
+    pending = [n for n in range(n_vehicles, n_vehicles + len(nodes)) if n not in placed]
+    pending.sort(key=lambda n: (checker.windows[n][1] - checker.windows[n][0], checker.windows[n][0]))
+    for node in pending:
+        options = []
+        for vehicle_idx, route in enumerate(routes):
+            path = [vehicle_idx] + route + [vehicle_idx]
+            for pos in range(len(route) + 1):
+                a, b = path[pos], path[pos + 1]
+                options.append((distance[a][node] + distance[node][b] - distance[a][b], vehicle_idx, pos))
+        options.sort()
+        for _, vehicle_idx, pos in options:  # First feasible is the cheapest
+            route = routes[vehicle_idx][:pos] + [node] + routes[vehicle_idx][pos:]
+            if checker.feasible(vehicle_idx, route):
+                routes[vehicle_idx] = route
+                stats['inserted'] += 1
+                break
+        else:
+            stats['unplaced'] += 1
+
+    return (None if stats['unplaced'] else routes), stats
+
+
+def solve_vehicle_routing(
+    vehicles: List[VehicleInfo],
+    nodes: List[DeliveryNode],
+    distance_matrix: np.ndarray,
+    time_matrix: np.ndarray,
+    time_limit_seconds: int,
+    solution_limit: Optional[int] = None,
+    initial_routes: Optional[List[List[int]]] = None,
+    record_improvements: bool = False
+) -> RoutingSolution:
+    """
+    Build and solve the OR-Tools model for vehicles and delivery nodes
+
+    Matrix rows/columns are the vehicle start locations followed by the
+    nodes. All transits are registered as precomputed integer matrices and
+    vectors, so the solver evaluates arcs natively instead of calling back
+    into Python.
+
+    With initial_routes the search starts from that assignment (see
+    build_initial_routes), so guided local search spends the budget
+    improving it instead of constructing a first solution. A hint the
+    model rejects falls back to the default first solution strategy.
+
+    Args:
+        vehicles: Vehicles; each starts and ends at its own location
+        nodes: Delivery nodes
+        distance_matrix: Integer distances in km
+        time_matrix: Integer travel times in minutes
+        time_limit_seconds: Search time limit
+        solution_limit: Stop after this many solutions (optional)
+        initial_routes: Matrix indices visited by each vehicle, in order (optional)
+        record_improvements: Record (seconds, objective) of each improving solution
+
+    Returns:
+        RoutingSolution with solver statistics
+    """
+    setup_start = time_module.perf_counter()
+    n_vehicles = len(vehicles)
+    n_locations = n_vehicles + len(nodes)  # Vehicle starts + deliveries
+    depot_indices = list(range(n_vehicles))  # First n indices are depots
+
+    manager = pywrapcp.RoutingIndexManager(
+        n_locations,
+        n_vehicles,
+        depot_indices,
+        depot_indices  # Vehicles return to their start location
+    )
+    routing = pywrapcp.RoutingModel(manager)
+
+    # Distance: arc cost and per-vehicle distance limit
+    distance = np.asarray(distance_matrix, dtype=np.int64)
+    distance_index = routing.RegisterTransitMatrix(distance.tolist())
+    routing.SetArcCostEvaluatorOfAllVehicles(distance_index)
+
+    # Time: travel plus service time at the origin node
+    service = np.zeros(n_locations, dtype=np.int64)
+    service[n_vehicles:] = [node.service_time for node in nodes]
+    travel = np.asarray(time_matrix, dtype=np.int64) + service[:, None]
+    time_index = routing.RegisterTransitMatrix(travel.tolist())
+
+    # Cumuls are minutes from midnight; max_duration bounds each route's span
+    routing.AddDimension(
+        time_index,
+        MAX_WAIT_MINUTES,  # Waiting allowed per arc (the hint check uses the same slack)
+        DAY_MINUTES,
+        False,  # Don't force start cumul to zero
+        'Time'
+    )
+    time_dimension = routing.GetDimensionOrDie('Time')
+    for vehicle_idx, vehicle in enumerate(vehicles):
+        time_dimension.SetSpanUpperBoundForVehicle(vehicle.max_duration, vehicle_idx)
+
+    # Add time window constraints
+    for i, node in enumerate(nodes):
+        index = manager.NodeToIndex(n_vehicles + i)
+        time_dimension.CumulVar(index).SetRange(node.time_window[0], node.time_window[1])
+
+    # One demand vector per cylinder type (depots have no demand)
+    demand = np.zeros((len(CYLINDER_TYPES), n_locations), dtype=np.int64)
+    for i, node in enumerate(nodes):
+        demand[:, n_vehicles + i] = [node.demand.get(t) or 0 for t in CYLINDER_TYPES]
+
+    for type_idx, cylinder_type in enumerate(CYLINDER_TYPES):
+        if not demand[type_idx].any():
+            continue  # Nothing of this type to carry
+        demand_index = routing.RegisterUnaryTransitVector(demand[type_idx].tolist())
+        capacities = [(v.capacity or {}).get(cylinder_type, 0) for v in vehicles]
+
+        routing.AddDimensionWithVehicleCapacity(
+            demand_index,
+            0,  # No slack
+            capacities,
+            True,  # Start cumul to zero
+            f'Capacity_{cylinder_type}'
+        )
+
+    # Add distance constraint
+    routing.AddDimensionWithVehicleCapacity(
+        distance_index,
+        0,  # No slack
+        [int(v.max_distance) for v in vehicles],
+        True,
+        'Distance'
+    )
+
+    # Set search parameters
+    search_parameters = pywrapcp.DefaultRoutingSearchParameters()
+    search_parameters.first_solution_strategy = (
+        routing_enums_pb2.FirstSolutionStrategy.AUTOMATIC
+    )
+    search_parameters.local_search_metaheuristic = (
+        routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
+    )
+    search_parameters.time_limit.seconds = int(time_limit_seconds)
+    if solution_limit:
+        search_parameters.solution_limit = solution_limit
+
+    improvements = []
+    if record_improvements:
+        def on_solution():
+            objective = routing.CostVar().Value()
+            if not improvements or objective < improvements[-1][1]:
+                improvements.append((round(time_module.perf_counter() - solve_start, 4), objective))
+        routing.AddAtSolutionCallback(on_solution)
+
+    hint = None
+    if initial_routes is not None:
+        routing.CloseModelWithParameters(search_parameters)
+        hint = routing.ReadAssignmentFromRoutes(
+            [[manager.NodeToIndex(node) for node in route] for route in initial_routes],
+            True  # Ignore inactive indices
+        )
+        if hint is None:
+            logger.warning("Initial routes are not feasible for the model; solving without hint")
+    setup_seconds = time_module.perf_counter() - setup_start
+
+    # Solve
+    solve_start = time_module.perf_counter()
+    if hint is not None:
+        assignment = routing.SolveFromAssignmentWithParameters(hint, search_parameters)
+    else:
+        assignment = routing.SolveWithParameters(search_parameters)
+    solver = routing.solver()
+
+    stats = {
+        'status': routing_enums_pb2.RoutingSearchStatus.Value.Name(routing.status()),
+        'objective': assignment.ObjectiveValue() if assignment else None,
+        'solutions': solver.Solutions(),
+        'branches': solver.Branches(),
+        'failures': solver.Failures(),
+        'setup_seconds': round(setup_seconds, 4),
+        'solve_seconds': round(time_module.perf_counter() - solve_start, 4),
+        'wall_time_ms': solver.WallTime(),
+        'hint': None if initial_routes is None else ('applied' if hint is not None else 'rejected')
+    }
+    if record_improvements:
+        stats['improvements'] = improvements
+    return RoutingSolution(manager, routing, assignment, stats)
+
+
+def greedy_hint_routes(
+    vehicles: List[VehicleInfo],
+    nodes: List[DeliveryNode],
+    schedule_date: date
+) -> List[WarmStartRoute]:
+    """
+    Visit orders per driver from the greedy scheduler, as a solution hint
+
+    Times stay in minutes from midnight; each vehicle works max_duration
+    from the earliest time window.
+    """
+    shift_start = min((node.time_window[0] for node in nodes), default=480)
+    requests = []
+    for node in nodes:
+        cylinder_type, quantity = max(node.demand.items(), key=lambda item: item[1] or 0)
+        requests.append(DeliveryRequest(
+            delivery_id=node.delivery_id,
+            client_id=node.client_id,
+            location=(node.location.lat, node.location.lng),
+            time_windows=[node.time_window],
+            service_duration=node.service_time,
+            cylinder_type=cylinder_type,
+            quantity=quantity or 0
+        ))
+    drivers = [
+        DriverAvailability(
+            driver_id=vehicle.driver_id,
+            employee_id=str(vehicle.driver_id),
+            name=str(vehicle.driver_id),
+            available_hours=[(shift_start, shift_start + vehicle.max_duration)],
+            current_location=(vehicle.start_location.lat, vehicle.start_location.lng),
+            max_deliveries=len(nodes),
+            vehicle_id=vehicle.vehicle_id,
+            vehicle_capacity=vehicle.capacity
+        )
+        for vehicle in vehicles
+    ]
+    parameters = SchedulingParameters(
+        date=schedule_date,
+        optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE]
+    )
+    result = GreedyScheduler().schedule(requests, drivers, parameters, [])
+    return routes_from_schedule(result.schedule)
 
 
 class CloudRouteOptimizationService:
@@ -76,6 +430,7 @@ class CloudRouteOptimizationService:
     def __init__(self, session: Session):
         self.session = session
         self.maps_client = GoogleMapsClient()
+        self.road_network = get_local_routing_engine()  # None unless ROAD_GRAPH_PATH is set
         self.config = cloud_config.app_settings
         
     async def optimize_routes(
@@ -90,7 +445,9 @@ class CloudRouteOptimizationService:
         Args:
             delivery_date: Date to optimize routes for
             vehicles: List of available vehicles with their info
-            constraints: Additional constraints (area, time windows, etc.)
+            constraints: Additional constraints (area, time windows, etc.);
+                warm_start='previous' seeds the solver with the last comparable
+                day's routes, warm_start='greedy' with a greedy schedule
             
         Returns:
             List of optimized routes
@@ -111,9 +468,18 @@ class CloudRouteOptimizationService:
                 vehicles, delivery_nodes
             )
             
+            # Seed the solver with a known plan if requested
+            initial_routes = None
+            hint_routes = self._hint_routes(delivery_date, vehicles, delivery_nodes, constraints)
+            if hint_routes:
+                initial_routes, hint_stats = build_initial_routes(
+                    vehicles, delivery_nodes, distance_matrix, time_matrix, hint_routes
+                )
+                logger.info(f"Solution hint: {hint_stats}")
+            
             # Run optimization
             solution = self._run_optimization(
-                vehicles, delivery_nodes, distance_matrix, time_matrix
+                vehicles, delivery_nodes, distance_matrix, time_matrix, initial_routes
             )
             
             # Build optimized routes
@@ -133,20 +499,15 @@ class CloudRouteOptimizationService:
         constraints: Optional[Dict[str, Any]] = None
     ) -> List[Delivery]:
         """Get pending deliveries for optimization"""
-        query = self.session.query(Delivery).join(Client).filter(
-            Delivery.scheduled_date == delivery_date.date(),
-            Delivery.status.in_([DeliveryStatus.PENDING, DeliveryStatus.ASSIGNED])
-        )
-        
-        # Apply area constraint if specified
-        if constraints and 'area' in constraints:
-            query = query.filter(Client.area == constraints['area'])
-        
-        # Apply client priority if specified
-        if constraints and 'priority_clients' in constraints:
-            query = query.filter(Client.id.in_(constraints['priority_clients']))
-        
-        deliveries = query.all()
+        constraints = constraints or {}
+        
+        # Clients are eager-loaded with planning columns only (see _prepare_delivery_nodes)
+        deliveries = planning_snapshot_query(
+            self.session,
+            delivery_date=delivery_date.date(),
+            area=constraints.get('area'),
+            client_ids=constraints.get('priority_clients')
+        ).all()
         logger.info(f"Found {len(deliveries)} deliveries to optimize")
         
         return deliveries
@@ -213,9 +574,20 @@ class CloudRouteOptimizationService:
         distance_matrix = np.zeros((n_locations, n_locations), dtype=int)
         time_matrix = np.zeros((n_locations, n_locations), dtype=int)
         
-        # Calculate matrices using Google Maps Distance Matrix API
-        # Process in chunks to avoid API limits
-        chunk_size = 10
+        # Calculate matrices on the local road network when a road graph is
+        # configured (one call), otherwise with the Google Maps Distance Matrix
+        # API in chunks to avoid API limits
+        if self.road_network:
+            chunk_size = max(n_locations, 1)
+            only_motorcycles = bool(vehicles) and all(
+                v.vehicle_type == VehicleType.MOTORCYCLE for v in vehicles
+            )
+            options = {'vehicle_type': VehicleType.MOTORCYCLE if only_motorcycles else VehicleType.CAR}
+            matrix_client = self.road_network
+        else:
+            chunk_size = 10
+            options = {}
+            matrix_client = self.maps_client
         
         for i in range(0, n_locations, chunk_size):
             origins = all_locations[i:i+chunk_size]
@@ -223,9 +595,10 @@ class CloudRouteOptimizationService:
             for j in range(0, n_locations, chunk_size):
                 destinations = all_locations[j:j+chunk_size]
                 
-                matrix_result = self.maps_client.calculate_distance_matrix(
+                matrix_result = matrix_client.calculate_distance_matrix(
                     origins, destinations,
-                    departure_time=datetime.now().replace(hour=8, minute=0)
+                    departure_time=datetime.now().replace(hour=8, minute=0),
+                    **options
                 )
                 
                 if matrix_result:
@@ -247,120 +620,63 @@ class CloudRouteOptimizationService:
         vehicles: List[VehicleInfo],
         nodes: List[DeliveryNode],
         distance_matrix: np.ndarray,
-        time_matrix: np.ndarray
-    ) -> Any:
-        """Run OR-Tools optimization algorithm"""
-        # Create routing model
-        n_vehicles = len(vehicles)
-        n_locations = len(vehicles) + len(nodes)  # Vehicle starts + deliveries
-        depot_indices = list(range(n_vehicles))  # First n indices are depots
-        
-        manager = pywrapcp.RoutingIndexManager(
-            n_locations,
-            n_vehicles,
-            depot_indices,
-            depot_indices  # Vehicles return to their start location
-        )
-        
-        routing = pywrapcp.RoutingModel(manager)
-        
-        # Create distance callback
-        def distance_callback(from_index, to_index):
-            from_node = manager.IndexToNode(from_index)
-            to_node = manager.IndexToNode(to_index)
-            return int(distance_matrix[from_node][to_node])
-        
-        distance_callback_index = routing.RegisterTransitCallback(distance_callback)
-        routing.SetArcCostEvaluatorOfAllVehicles(distance_callback_index)
-        
-        # Create time callback
-        def time_callback(from_index, to_index):
-            from_node = manager.IndexToNode(from_index)
-            to_node = manager.IndexToNode(to_index)
-            return int(time_matrix[from_node][to_node])
-        
-        time_callback_index = routing.RegisterTransitCallback(time_callback)
-        
-        # Add time dimension
-        routing.AddDimension(
-            time_callback_index,
-            30,  # Allow 30 minutes waiting time
-            [v.max_duration for v in vehicles],  # Maximum time per vehicle
-            False,  # Don't force start cumul to zero
-            'Time'
+        time_matrix: np.ndarray,
+        initial_routes: Optional[List[List[int]]] = None
+    ) -> RoutingSolution:
+        """Run OR-Tools optimization algorithm, optionally from initial routes"""
+        solution = solve_vehicle_routing(
+            vehicles, nodes, distance_matrix, time_matrix,
+            time_limit_seconds=self.config['max_route_calculation_time'],
+            initial_routes=initial_routes
         )
         
-        time_dimension = routing.GetDimensionOrDie('Time')
+        if solution.assignment:
+            logger.info(f"Optimization completed. Total cost: {solution.stats['objective']}, stats: {solution.stats}")
+        else:
+            logger.warning(f"No solution found: {solution.stats}")
         
-        # Add time window constraints
-        for i, node in enumerate(nodes):
-            index = manager.NodeToIndex(n_vehicles + i)
-            time_dimension.CumulVar(index).SetRange(node.time_window[0], node.time_window[1])
-        
-        # Add capacity constraints for each cylinder type
-        for cylinder_type in ['50kg', '20kg', '16kg', '10kg', '4kg']:
-            def demand_callback(from_index):
-                from_node = manager.IndexToNode(from_index)
-                if from_node < n_vehicles:
-                    return 0  # Depots have no demand
-                node = nodes[from_node - n_vehicles]
-                return node.demand.get(cylinder_type, 0)
-            
-            demand_callback_index = routing.RegisterUnaryTransitCallback(demand_callback)
-            
-            capacities = [v.capacity.get(cylinder_type, 0) for v in vehicles]
-            
-            routing.AddDimensionWithVehicleCapacity(
-                demand_callback_index,
-                0,  # No slack
-                capacities,
-                True,  # Start cumul to zero
-                f'Capacity_{cylinder_type}'
+        return solution
+    
+    def _hint_routes(
+        self,
+        delivery_date: datetime,
+        vehicles: List[VehicleInfo],
+        nodes: List[DeliveryNode],
+        constraints: Optional[Dict[str, Any]] = None
+    ) -> List[WarmStartRoute]:
+        """Visit orders per driver to seed the solver with (constraints['warm_start'])"""
+        constraints = constraints or {}
+        source = constraints.get('warm_start')
+        
+        if source == 'previous':
+            source_date, routes = load_previous_routes(
+                self.session, delivery_date.date(), [v.driver_id for v in vehicles],
+                area=constraints.get('area')
             )
+            logger.info(f"Using routes of {source_date} as solution hint" if routes else "No previous routes for hint")
+            return routes
         
-        # Add distance constraint
-        routing.AddDimension(
-            distance_callback_index,
-            0,  # No slack
-            [int(v.max_distance) for v in vehicles],
-            True,
-            'Distance'
-        )
-        
-        # Set search parameters
-        search_parameters = pywrapcp.DefaultRoutingSearchParameters()
-        search_parameters.first_solution_strategy = (
-            routing_enums_pb2.FirstSolutionStrategy.AUTOMATIC
-        )
-        search_parameters.local_search_metaheuristic = (
-            routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH
-        )
-        search_parameters.time_limit.seconds = self.config['max_route_calculation_time']
-        
-        # Solve
-        solution = routing.SolveWithParameters(search_parameters)
+        if source == 'greedy':
+            return greedy_hint_routes(vehicles, nodes, delivery_date.date())
         
-        if solution:
-            logger.info(f"Optimization completed. Total cost: {solution.ObjectiveValue()}")
-        else:
-            logger.warning("No solution found")
-        
-        return solution
+        return []
     
     async def _build_routes(
         self,
-        solution: Any,
+        solution: RoutingSolution,
         vehicles: List[VehicleInfo],
         nodes: List[DeliveryNode],
         distance_matrix: np.ndarray,
         time_matrix: np.ndarray
     ) -> List[OptimizedRoute]:
         """Build optimized routes from OR-Tools solution"""
-        if not solution:
+        if not solution or not solution.assignment:
             return []
         
         manager = solution.manager
         routing = solution.routing
+        assignment = solution.assignment
+        time_dimension = routing.GetDimensionOrDie('Time')
         routes = []
         
         for vehicle_idx in range(len(vehicles)):
@@ -368,6 +684,7 @@ class CloudRouteOptimizationService:
             index = routing.Start(vehicle_idx)
             
             delivery_sequence = []
+            waypoints = []
             arrival_times = []
             departure_times = []
             route_distance = 0
@@ -380,29 +697,31 @@ class CloudRouteOptimizationService:
                 if node_index >= len(vehicles):  # Not a depot
                     delivery_node = nodes[node_index - len(vehicles)]
                     delivery_sequence.append(delivery_node.delivery_id)
+                    waypoints.append(delivery_node.location)
                     
                     # Calculate arrival/departure times
-                    time_var = solution.Min(routing.GetDimensionOrDie('Time').CumulVar(index))
+                    time_var = assignment.Min(time_dimension.CumulVar(index))
                     arrival_time = datetime.now().replace(hour=0, minute=0) + timedelta(minutes=time_var)
                     departure_time = arrival_time + timedelta(minutes=delivery_node.service_time)
                     
                     arrival_times.append(arrival_time)
                     departure_times.append(departure_time)
                 
-                next_index = solution.Value(routing.NextVar(index))
+                next_index = assignment.Value(routing.NextVar(index))
                 route_distance += distance_matrix[node_index][manager.IndexToNode(next_index)]
                 route_duration += time_matrix[node_index][manager.IndexToNode(next_index)]
                 
                 index = next_index
             
             if delivery_sequence:  # Only create route if it has deliveries
-                # Get route polyline from Google Maps
-                waypoints = [nodes[d-1].location for d in delivery_sequence]
-                route_result = self.maps_client.calculate_route(
-                    vehicle.start_location,
-                    vehicle.start_location,  # Return to start
-                    waypoints=waypoints,
-                    optimize_waypoints=False  # Keep OR-Tools order
+                # Preview geometry from the local road network (straight legs
+                # without one); directions are fetched once, when the route is
+                # saved (services.route_geometry)
+                start = (vehicle.start_location.lat, vehicle.start_location.lng)
+                polyline, _ = trace_geometry(
+                    [start] + [(w.lat, w.lng) for w in waypoints] + [start],  # Return to start
+                    road_network=self.road_network,
+                    vehicle_type=vehicle.vehicle_type if isinstance(vehicle.vehicle_type, VehicleType) else VehicleType.CAR
                 )
                 
                 route = OptimizedRoute(
@@ -414,8 +733,9 @@ class CloudRouteOptimizationService:
                     total_cost=route_distance * vehicle.cost_per_km,
                     arrival_times=arrival_times,
                     departure_times=departure_times,
-                    route_polyline=route_result['overview_polyline'] if route_result else '',
-                    warnings=[]
+                    route_polyline=polyline,
+                    warnings=[],
+                    solver_stats=solution.stats
                 )
                 
                 routes.append(route)
@@ -428,8 +748,11 @@ class CloudRouteOptimizationService:
         
         return routes
     
-    def _time_to_minutes(self, t: time) -> int:
-        """Convert time to minutes from midnight"""
+    def _time_to_minutes(self, t) -> int:
+        """Convert time (or an "HH:MM" string) to minutes from midnight"""
+        if isinstance(t, str):
+            hour, minute = t.split(':')[:2]
+            return int(hour) * 60 + int(minute)
         return t.hour * 60 + t.minute
     
     def _get_required_vehicle_type(self, demand: Dict[str, int]) -> VehicleType:
@@ -452,104 +775,121 @@ class CloudRouteOptimizationService:
         self,
         route_id: int,
         current_location: Location,
-        completed_deliveries: List[int]
-    ) -> OptimizedRoute:
+        completed_deliveries: List[int],
+        now: Optional[datetime] = None
+    ) -> Optional[OptimizedRoute]:
         """
         Recalculate route from current position (dynamic re-routing)
         
+        The route's stops, travel matrix and time-window slack stay cached
+        between calls (services.route_repair.active_routes), so re-routing
+        is a bounded 2-opt / Or-opt repair from the GPS position without
+        external calls. Only the first call for a route, or one after stops
+        were added to it, geocodes and fetches a distance matrix; directions
+        are fetched only when the repaired sequence changes.
+        
         Args:
             route_id: Current route ID
             current_location: Current vehicle location
             completed_deliveries: List of already completed delivery IDs
+            now: Current time (default: now)
             
         Returns:
-            Updated optimized route
+            Updated optimized route, or None when nothing is left
         """
         # Get original route
         route = self.session.query(Route).filter(Route.id == route_id).first()
         if not route:
             raise ValueError(f"Route {route_id} not found")
         
-        # Get remaining deliveries
-        remaining_deliveries = []
-        for delivery in route.deliveries:
-            if delivery.id not in completed_deliveries:
-                remaining_deliveries.append(delivery)
+        # Get remaining deliveries in planned order
+        completed = set(completed_deliveries)
+        remaining_deliveries = [
+            delivery for delivery in planning_snapshot_query(
+                self.session, delivery_date=route.route_date, statuses=ACTIVE_ROUTE_STATUSES
+            ).filter(Delivery.driver_id == route.driver_id).order_by(Delivery.route_sequence, Delivery.id)
+            if delivery.id not in completed
+        ]
         
         if not remaining_deliveries:
             logger.info("No remaining deliveries")
+            active_routes.discard(route_id)
             return None
         
-        # Create vehicle info with current location as start
-        vehicle_info = VehicleInfo(
-            vehicle_id=route.vehicle_id,
-            driver_id=route.driver_id,
-            start_location=current_location,
-            capacity={'50kg': 50, '20kg': 100, '16kg': 100, '10kg': 200, '4kg': 300},
-            max_distance=100,  # Reduced for remaining route
-            max_duration=300   # Reduced for remaining route
-        )
-        
-        # Re-optimize for remaining deliveries
-        nodes = await self._prepare_delivery_nodes(remaining_deliveries)
-        
-        # Simple nearest neighbor for quick re-routing
-        optimized_sequence = self._nearest_neighbor_route(current_location, nodes)
-        
-        # Calculate route details
-        route_result = self.maps_client.calculate_route(
-            current_location,
-            vehicle_info.start_location,  # Return to depot
-            waypoints=[nodes[i].location for i in optimized_sequence]
+        # Matrix rows and slack of the route stay in memory while it is driven
+        state = active_routes.get(route_id)
+        if state is None or not state.covers(d.id for d in remaining_deliveries):
+            state = await self._build_active_route(route_id, remaining_deliveries)
+            active_routes.put(state)
+        
+        now = now or datetime.now()
+        result = state.repair(
+            (current_location.lat, current_location.lng),
+            now.hour * 60 + now.minute,
+            remaining=[d.id for d in remaining_deliveries if d.id in state.index]
         )
         
-        if route_result:
-            return OptimizedRoute(
-                vehicle_id=vehicle_info.vehicle_id,
-                driver_id=vehicle_info.driver_id,
-                delivery_sequence=[nodes[i].delivery_id for i in optimized_sequence],
-                total_distance=route_result['total_distance_meters'] / 1000,
-                total_duration=route_result['total_duration_in_traffic_seconds'] / 60,
-                total_cost=0,  # Recalculated routes don't affect cost
-                arrival_times=[],  # Would need to calculate based on current time
-                departure_times=[],
-                route_polyline=route_result['overview_polyline'],
-                warnings=['Route recalculated due to deviation']
+        # Geometry only when the sequence differs from the one last drawn
+        polyline = state.geometry_for(result.sequence)
+        if polyline is None:
+            waypoints = [
+                Location(address="", lat=float(state.points[state.index[d]][0]), lng=float(state.points[state.index[d]][1]))
+                for d in result.sequence
+            ]
+            route_result = self.maps_client.calculate_route(
+                current_location,
+                DEPOT_LOCATION,  # Return to depot
+                waypoints=waypoints,
+                optimize_waypoints=False  # Keep the repaired order
             )
-        
-        return None
+            polyline = route_result['overview_polyline'] if route_result else ''
+            state.set_geometry(result.sequence, polyline)
+        
+        warnings = []
+        if result.changed:
+            warnings.append('Route recalculated due to deviation')
+        if result.late_minutes:
+            warnings.append(f'Remaining stops {result.late_minutes} minutes late in total')
+        
+        midnight = datetime.combine(now.date(), time(0, 0))
+        services = [state.service[state.index[d]] for d in result.sequence]
+        return OptimizedRoute(
+            vehicle_id=route.vehicle_id,
+            driver_id=route.driver_id,
+            delivery_sequence=result.sequence,
+            total_distance=result.total_km,
+            total_duration=result.total_minutes,
+            total_cost=0,  # Recalculated routes don't affect cost
+            arrival_times=[midnight + timedelta(minutes=start) for start in result.starts],
+            departure_times=[
+                midnight + timedelta(minutes=start + service) for start, service in zip(result.starts, services)
+            ],
+            route_polyline=polyline,
+            warnings=warnings,
+            solver_stats={
+                'moves': result.moves,
+                'seconds': result.seconds,
+                'changed': result.changed,
+                'late_minutes': result.late_minutes
+            }
+        )
     
-    def _nearest_neighbor_route(
-        self,
-        start: Location,
-        nodes: List[DeliveryNode]
-    ) -> List[int]:
-        """Simple nearest neighbor algorithm for quick routing"""
-        unvisited = list(range(len(nodes)))
-        sequence = []
-        current = start
-        
-        while unvisited:
-            # Find nearest unvisited node
-            min_dist = float('inf')
-            nearest = -1
-            
-            for idx in unvisited:
-                dist = calculate_haversine_distance(
-                    current.lat, current.lng,
-                    nodes[idx].location.lat, nodes[idx].location.lng
-                )
-                
-                if dist < min_dist:
-                    min_dist = dist
-                    nearest = idx
-            
-            if nearest >= 0:
-                sequence.append(nearest)
-                current = nodes[nearest].location
-                unvisited.remove(nearest)
-        
-        return sequence
+    async def _build_active_route(self, route_id: int, deliveries: List[Delivery]) -> ActiveRoute:
+        """Geocode the route's stops and fetch their matrix once"""
+        nodes = await self._prepare_delivery_nodes(deliveries)
+        depot = VehicleInfo(vehicle_id=0, driver_id=0, start_location=DEPOT_LOCATION)
+        distance_matrix, time_matrix = await self._calculate_matrices([depot], nodes)
+        
+        return ActiveRoute(
+            route_id=route_id,
+            depot=(DEPOT_LOCATION.lat, DEPOT_LOCATION.lng),
+            delivery_ids=[node.delivery_id for node in nodes],
+            locations=[(node.location.lat, node.location.lng) for node in nodes],
+            windows=[node.time_window for node in nodes],
+            service_times=[node.service_time for node in nodes],
+            distance_matrix=distance_matrix,
+            time_matrix=time_matrix
+        )
     
     async def preview_routes_for_schedule(
         self,
@@ -600,8 +940,10 @@ class CloudRouteOptimizationService:
         """Optimize routes for deliveries on a specific date"""
         try:
             # Get deliveries
-            deliveries = self.session.query(Delivery).filter(
-                Delivery.id.in_(delivery_ids)
+            deliveries = planning_snapshot_query(
+                self.session,
+                statuses=None,
+                delivery_ids=delivery_ids
             ).all()
             
             if not deliveries:
@@ -1,11 +1,12 @@
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, func
 import json
 import logging
 
 from models.database_schema import Driver, Delivery, Vehicle
+from services.search_service import search_index
 
 logger = logging.getLogger(__name__)
 
@@ -162,14 +163,7 @@ class DriverService:
             
             # 關鍵字搜尋
             if search_term:
-                search_pattern = f"%{search_term}%"
-                query = query.filter(
-                    or_(
-                        Driver.name.ilike(search_pattern),
-                        Driver.phone.ilike(search_pattern),
-                        Driver.employee_id.ilike(search_pattern)
-                    )
-                )
+                query = query.filter(search_index.filter_clause(self.db, Driver, search_term))
             
             # 駕照類型篩選
             if license_type:
@@ -0,0 +1,103 @@
+"""
+Planning snapshot query builder
+Loads a day's deliveries together with the handful of client columns that
+scheduling and routing actually read, in two queries instead of one lazy
+client load (of all ~80 columns) per delivery
+"""
+from datetime import date
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Query, Session, joinedload, load_only, selectinload
+
+from models.database_schema import Client, Delivery, DeliveryStatus
+
+# 排程 / 路線規劃會讀取的客戶欄位
+PLANNING_CLIENT_COLUMNS = (
+    Client.id,
+    Client.client_code,
+    Client.invoice_title,
+    Client.short_name,
+    Client.name,
+    Client.address,
+    Client.district,
+    Client.latitude,
+    Client.longitude,
+    Client.area,
+    Client.client_type,  # 服務時間（商業 / 住宅）
+    Client.vehicle_type,
+    Client.needs_same_day_delivery,
+    Client.is_active,
+    Client.hour_8_9,
+    Client.hour_9_10,
+    Client.hour_10_11,
+    Client.hour_11_12,
+    Client.hour_12_13,
+    Client.hour_13_14,
+    Client.hour_14_15,
+    Client.hour_15_16,
+    Client.hour_16_17,
+    Client.hour_17_18,
+    Client.hour_18_19,
+    Client.hour_19_20,
+)
+
+# 尚未完成、可重新規劃的配送狀態
+PLANNABLE_STATUSES = (DeliveryStatus.PENDING, DeliveryStatus.ASSIGNED)
+
+
+def planning_client_loader(strategy: str = 'selectin'):
+    """
+    取得 Delivery.client 的載入選項（僅載入規劃所需欄位）
+
+    Args:
+        strategy: 'selectin'（第二個 IN 查詢）或 'joined'（同一查詢 LEFT JOIN）
+
+    Returns:
+        SQLAlchemy loader option
+    """
+    loader = joinedload(Delivery.client) if strategy == 'joined' else selectinload(Delivery.client)
+    return loader.options(load_only(*PLANNING_CLIENT_COLUMNS))
+
+
+def planning_snapshot_query(
+    session: Session,
+    delivery_date: Optional[date] = None,
+    statuses: Optional[Iterable[DeliveryStatus]] = PLANNABLE_STATUSES,
+    area: Optional[str] = None,
+    client_ids: Optional[Iterable[int]] = None,
+    delivery_ids: Optional[Iterable[int]] = None,
+    strategy: str = 'selectin'
+) -> Query:
+    """
+    建立規劃快照查詢：配送單 + 精簡客戶資料
+
+    Args:
+        session: 資料庫 Session
+        delivery_date: 配送日期
+        statuses: 配送狀態篩選，None 表示不篩選
+        area: 客戶區域篩選
+        client_ids: 限定客戶
+        delivery_ids: 限定配送單
+        strategy: 客戶載入策略（'selectin' 或 'joined'）
+
+    Returns:
+        Query: 尚未執行的查詢，可再加上排序或其他條件
+    """
+    query = session.query(Delivery).options(planning_client_loader(strategy))
+
+    if delivery_date is not None:
+        query = query.filter(Delivery.scheduled_date == delivery_date)
+
+    if statuses is not None:
+        query = query.filter(Delivery.status.in_(list(statuses)))
+
+    if area:
+        query = query.join(Delivery.client).filter(Client.area == area)
+
+    if client_ids:
+        query = query.filter(Delivery.client_id.in_(list(client_ids)))
+
+    if delivery_ids:
+        query = query.filter(Delivery.id.in_(list(delivery_ids)))
+
+    return query
@@ -0,0 +1,110 @@
+"""
+Previous routes loader
+Finds the most recent comparable day (same weekday, same area, today's
+drivers) and returns each driver's visit order as WarmStartRoute objects, so
+the genetic / simulated annealing schedulers can start from yesterday's
+plan instead of from scratch
+"""
+import json
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from common.scheduling.models import WarmStartRoute
+from models.database_schema import Client, Delivery, Route
+
+logger = logging.getLogger(__name__)
+
+
+def _comparable_dates(schedule_date: date, lookback_weeks: int) -> List[date]:
+    """同星期幾的過去日期（由近到遠）"""
+    return [schedule_date - timedelta(weeks=k) for k in range(1, lookback_weeks + 1)]
+
+
+def _route_client_ids(route: Route) -> List[int]:
+    """route_details 中依 sequence 排序的客戶 ID"""
+    if not route.route_details:
+        return []
+    try:
+        points = json.loads(route.route_details).get('points', [])
+    except (ValueError, AttributeError):
+        return []
+    points = [p for p in points if p.get('client_id') is not None]
+    points.sort(key=lambda p: p.get('sequence') or 0)
+    return [p['client_id'] for p in points]
+
+
+def load_previous_routes(
+    session: Session,
+    schedule_date: date,
+    driver_ids: Iterable[int],
+    area: Optional[str] = None,
+    lookback_weeks: int = 8
+) -> Tuple[Optional[date], List[WarmStartRoute]]:
+    """
+    載入最近一個可比較日期的路線順序
+
+    以 Route.route_details 為主；沒有路線明細的司機改用當天
+    Delivery.driver_id / route_sequence 還原順序
+
+    Args:
+        session: 資料庫 Session
+        schedule_date: 排程日期
+        driver_ids: 今天可用的司機
+        area: 區域篩選（Route.area / Client.area）
+        lookback_weeks: 最多往回找幾週
+
+    Returns:
+        (來源日期, 各司機路線)，找不到時為 (None, [])
+    """
+    driver_ids = list(driver_ids)
+    dates = _comparable_dates(schedule_date, lookback_weeks)
+    if not driver_ids:
+        return None, []
+
+    route_query = session.query(Route).filter(
+        Route.route_date.in_(dates),
+        Route.driver_id.in_(driver_ids)
+    )
+    delivery_query = session.query(Delivery).filter(
+        Delivery.scheduled_date.in_(dates),
+        Delivery.driver_id.in_(driver_ids),
+        Delivery.route_sequence.isnot(None)
+    )
+    if area:
+        route_query = route_query.filter(Route.area == area)
+        delivery_query = delivery_query.join(Delivery.client).filter(Client.area == area)
+
+    latest_route = route_query.with_entities(func.max(Route.route_date)).scalar()
+    latest_delivery = delivery_query.with_entities(func.max(Delivery.scheduled_date)).scalar()
+    candidates = [d for d in (latest_route, latest_delivery) if d is not None]
+    if not candidates:
+        return None, []
+    source_date = max(candidates)
+
+    # 路線明細
+    orders: Dict[int, List[int]] = defaultdict(list)
+    for route in route_query.filter(Route.route_date == source_date).order_by(Route.id):
+        orders[route.driver_id].extend(_route_client_ids(route))
+
+    # 沒有明細的司機：以配送單順序補上
+    missing = [driver_id for driver_id in driver_ids if not orders.get(driver_id)]
+    if missing:
+        rows = session.query(Delivery.driver_id, Delivery.client_id).filter(
+            Delivery.scheduled_date == source_date,
+            Delivery.driver_id.in_(missing),
+            Delivery.route_sequence.isnot(None)
+        )
+        if area:
+            rows = rows.join(Delivery.client).filter(Client.area == area)
+        for driver_id, client_id in rows.order_by(Delivery.driver_id, Delivery.route_sequence):
+            orders[driver_id].append(client_id)
+
+    routes = [WarmStartRoute(driver_id=driver_id, client_ids=client_ids)
+              for driver_id, client_ids in orders.items() if client_ids]
+    logger.info(f"Warm start from {source_date}: {len(routes)} routes")
+    return source_date, routes
@@ -0,0 +1,353 @@
+"""
+Cluster-first, route-second decomposition
+Splits the day's delivery points into driver-sized clusters (capacity-
+balanced k-means or sweep), orders each cluster independently, optionally
+in worker processes, and then repairs the cluster boundaries by moving or
+exchanging points with a neighbouring route when that shortens the plan.
+Clustering is O(n·k) and routing is quadratic only within a cluster, so
+planning time grows roughly linearly with the number of daily stops.
+"""
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+from common.availability import overlaps
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEGREE_LAT = 110.57
+KM_PER_DEGREE_LNG = 111.32
+
+# 少於此點數時在本程序內排序（啟動子程序的成本高於平行的收益）
+PARALLEL_MIN_POINTS = 400
+
+# 時間窗口相容的下一站距離打折（與原最近鄰居演算法相同）
+COMPATIBLE_DISTANCE_FACTOR = 0.8
+
+# 離第二近中心的距離比例高於此值視為邊界點
+BOUNDARY_RATIO = 0.8
+
+
+@dataclass
+class ClusterInput:
+    """一個群集的排序輸入（可序列化給子程序）"""
+    xy: np.ndarray  # 平面座標（公里）
+    priority: List[float]
+    availability: List[int]  # 可配送時段位元遮罩
+
+
+def project(coords: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """
+    緯經度轉為平面座標（公里），以中心緯度做等距圓柱投影
+
+    Args:
+        coords: [(緯度, 經度)]
+
+    Returns:
+        n x 2 陣列 (x 東向, y 北向)
+    """
+    latlng = np.asarray(coords, dtype=float).reshape(-1, 2)
+    if not len(latlng):
+        return np.zeros((0, 2))
+    lat0 = np.radians(latlng[:, 0].mean())
+    return np.column_stack((
+        latlng[:, 1] * KM_PER_DEGREE_LNG * np.cos(lat0),
+        latlng[:, 0] * KM_PER_DEGREE_LAT
+    ))
+
+
+def _capacitated_assign(distances: np.ndarray, capacity: int) -> np.ndarray:
+    """Assign points to centers, most constrained (largest regret) first."""
+    n, k = distances.shape
+    order = np.argsort(distances, axis=1)
+    if k > 1:
+        sorted_distances = np.take_along_axis(distances, order[:, :2], axis=1)
+        regret = sorted_distances[:, 1] - sorted_distances[:, 0]
+    else:
+        regret = np.zeros(n)
+
+    labels = np.empty(n, dtype=int)
+    load = np.zeros(k, dtype=int)
+    for point in np.argsort(-regret, kind='stable'):
+        for center in order[point]:
+            if load[center] < capacity:
+                break
+        else:
+            center = int(np.argmin(load))  # 容量不足時放到最空的群集
+        labels[point] = center
+        load[center] += 1
+    return labels
+
+
+def balanced_kmeans(xy: np.ndarray, n_clusters: int, capacity: int,
+                    iterations: int = 10, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    容量平衡 k-means
+
+    Starts from scikit-learn's k-means centers and alternates a capacitated
+    assignment (each cluster holds at most capacity points) with center
+    updates until the centers stop moving.
+
+    Args:
+        xy: 平面座標（公里）
+        n_clusters: 群集數
+        capacity: 每群最多點數
+        iterations: 最多迭代次數
+        seed: 亂數種子
+
+    Returns:
+        (labels, centers)
+    """
+    n = len(xy)
+    n_clusters = max(1, min(n_clusters, n))
+    if n_clusters == 1:
+        return np.zeros(n, dtype=int), xy.mean(axis=0, keepdims=True)
+
+    capacity = max(capacity, math.ceil(n / n_clusters))
+    centers = KMeans(n_clusters=n_clusters, n_init=3, random_state=seed).fit(xy).cluster_centers_
+    labels = np.zeros(n, dtype=int)
+    for _ in range(iterations):
+        distances = np.linalg.norm(xy[:, None, :] - centers[None, :, :], axis=2)
+        labels = _capacitated_assign(distances, capacity)
+        updated = np.array([
+            xy[labels == c].mean(axis=0) if np.any(labels == c) else centers[c]
+            for c in range(n_clusters)
+        ])
+        if np.allclose(updated, centers, atol=1e-3):
+            break
+        centers = updated
+    return labels, centers
+
+
+def sweep_clusters(xy: np.ndarray, n_clusters: int,
+                   origin: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    掃描法分群：依相對 origin 的角度排序後切成大小相近的扇形
+
+    The sweep starts at the widest angular gap so no cluster straddles it.
+
+    Args:
+        xy: 平面座標（公里）
+        n_clusters: 群集數
+        origin: 掃描中心（預設為所有點的重心）
+
+    Returns:
+        (labels, centers)
+    """
+    n = len(xy)
+    n_clusters = max(1, min(n_clusters, n))
+    origin = xy.mean(axis=0) if origin is None else origin
+    angles = np.arctan2(xy[:, 1] - origin[1], xy[:, 0] - origin[0])
+    order = np.argsort(angles)
+    if n > 1:
+        gaps = np.diff(np.append(angles[order], angles[order[0]] + 2 * np.pi))
+        order = np.roll(order, -(int(np.argmax(gaps)) + 1))
+
+    labels = np.empty(n, dtype=int)
+    for cluster, chunk in enumerate(np.array_split(order, n_clusters)):
+        labels[chunk] = cluster
+    centers = np.array([xy[labels == c].mean(axis=0) for c in range(n_clusters)])
+    return labels, centers
+
+
+def _path_length(xy: np.ndarray, order: List[int]) -> float:
+    if len(order) < 2:
+        return 0.0
+    steps = xy[order[1:]] - xy[order[:-1]]
+    return float(np.hypot(steps[:, 0], steps[:, 1]).sum())
+
+
+def _two_opt(xy: np.ndarray, order: List[int], max_passes: int = 5) -> List[int]:
+    """Improve an open path with 2-opt, keeping the first stop fixed."""
+    order = list(order)
+    n = len(order)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = xy[order[i - 1]], xy[order[i]]
+            for j in range(i + 1, n):
+                c = xy[order[j]]
+                d = xy[order[j + 1]] if j + 1 < n else None
+                before = np.hypot(*(a - b)) + (np.hypot(*(c - d)) if d is not None else 0.0)
+                after = np.hypot(*(a - c)) + (np.hypot(*(b - d)) if d is not None else 0.0)
+                if after < before - 1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    b = xy[order[i]]
+                    improved = True
+        if not improved:
+            break
+    return order
+
+
+def order_cluster(cluster: ClusterInput) -> List[int]:
+    """
+    群集內排序：從優先度最高的點出發的最近鄰居（時間窗口相容者優先），再以 2-opt 改善
+
+    Module level so worker processes can unpickle it.
+
+    Returns:
+        群集內索引的配送順序
+    """
+    n = len(cluster.priority)
+    if n == 0:
+        return []
+    xy = cluster.xy
+    start = max(range(n), key=lambda i: cluster.priority[i])
+    order = [start]
+    unvisited = set(range(n)) - {start}
+    while unvisited:
+        current = order[-1]
+        candidates = list(unvisited)
+        distances = np.hypot(*(xy[candidates] - xy[current]).T)
+        for idx, point in enumerate(candidates):
+            if overlaps(cluster.availability[current], cluster.availability[point]):
+                distances[idx] *= COMPATIBLE_DISTANCE_FACTOR
+        nearest = candidates[int(np.argmin(distances))]
+        order.append(nearest)
+        unvisited.remove(nearest)
+    return _two_opt(xy, order)
+
+
+def order_clusters(clusters: List[ClusterInput], max_workers: Optional[int] = None) -> List[List[int]]:
+    """
+    排序所有群集；點數夠多時使用子程序平行處理
+
+    Args:
+        clusters: 各群集輸入
+        max_workers: 子程序數（預設 CPU 數；1 表示在本程序執行）
+
+    Returns:
+        各群集的配送順序（群集內索引）
+    """
+    total = sum(len(cluster.priority) for cluster in clusters)
+    workers = min(max_workers or os.cpu_count() or 1, len(clusters))
+    if workers <= 1 or (max_workers is None and total < PARALLEL_MIN_POINTS):
+        return [order_cluster(cluster) for cluster in clusters]
+
+    # spawn: forking a multi-threaded API server process is unsafe
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return list(executor.map(order_cluster, clusters))
+
+
+def _insertion(xy: np.ndarray, route: List[int], point: int) -> Tuple[float, int]:
+    """Cheapest (extra km, position) for inserting point into an open path."""
+    if not route:
+        return 0.0, 0
+    p = xy[point]
+    stops = xy[route]
+    to_point = np.hypot(*(stops - p).T)
+    # Before the first stop is not allowed: it is the route's priority start
+    costs = to_point.copy()  # Append after route[i] when i is the last stop
+    if len(route) > 1:
+        legs = np.hypot(*(stops[1:] - stops[:-1]).T)
+        costs[:-1] = to_point[:-1] + to_point[1:] - legs
+    position = int(np.argmin(costs))
+    return float(costs[position]), position + 1
+
+
+def _removal_gain(xy: np.ndarray, route: List[int], position: int) -> float:
+    """Km saved by removing route[position] from an open path."""
+    point = xy[route[position]]
+    gain = 0.0
+    if position > 0:
+        gain += np.hypot(*(point - xy[route[position - 1]]))
+    if position + 1 < len(route):
+        gain += np.hypot(*(point - xy[route[position + 1]]))
+    if 0 < position < len(route) - 1:
+        gain -= np.hypot(*(xy[route[position - 1]] - xy[route[position + 1]]))
+    return float(gain)
+
+
+def _exchange(xy: np.ndarray, routes: List[List[int]], own: int, position: int,
+              other: int, distances: np.ndarray) -> bool:
+    """Swap routes[own][position] with the best boundary point of routes[other] if it saves distance."""
+    route, target = routes[own], routes[other]
+    point = route[position]
+    without_point = route[:position] + route[position + 1:]
+    best = None
+    for target_position in range(1, len(target)):
+        candidate = target[target_position]
+        if distances[candidate, other] < BOUNDARY_RATIO * distances[candidate, own]:
+            continue
+        without_candidate = target[:target_position] + target[target_position + 1:]
+        cost_in_target, insert_in_target = _insertion(xy, without_candidate, point)
+        cost_in_own, insert_in_own = _insertion(xy, without_point, candidate)
+        delta = (_removal_gain(xy, route, position) + _removal_gain(xy, target, target_position)
+                 - cost_in_target - cost_in_own)
+        if delta > 1e-9 and (best is None or delta > best[0]):
+            best = (delta, target_position, insert_in_target, insert_in_own)
+    if best is None:
+        return False
+
+    _, target_position, insert_in_target, insert_in_own = best
+    candidate = target.pop(target_position)
+    target.insert(insert_in_target, point)
+    route.pop(position)
+    route.insert(insert_in_own, candidate)
+    return True
+
+
+def repair_boundaries(xy: np.ndarray, routes: List[List[int]], centers: np.ndarray,
+                      capacity: int, max_passes: int = 3) -> int:
+    """
+    邊界修補：把靠近其他群集的點移到鄰近路線，或與該路線的邊界點交換，只在總距離縮短時進行
+
+    Only points whose own center is not clearly the nearest (distance ratio
+    to the second nearest center above BOUNDARY_RATIO) are considered, and
+    a route's first stop stays put. A point moves when the neighbouring
+    route has room; otherwise it is exchanged with one of that route's
+    boundary points facing back. Routes are modified in place.
+
+    Args:
+        xy: 平面座標（公里）
+        routes: 各路線的點索引（全域索引）
+        centers: 各群集中心
+        capacity: 每條路線最多點數
+
+    Returns:
+        移動或交換的點數
+    """
+    if len(routes) < 2:
+        return 0
+    distances = np.linalg.norm(xy[:, None, :] - centers[None, :, :], axis=2)
+    nearest_two = np.argsort(distances, axis=1)[:, :2]
+    moves = 0
+    for _ in range(max_passes):
+        moved = False
+        for own, route in enumerate(routes):
+            position = 1
+            while position < len(route):
+                point = route[position]
+                other = next(int(c) for c in nearest_two[point] if c != own)
+                if distances[point, own] < BOUNDARY_RATIO * distances[point, other]:
+                    position += 1
+                    continue
+                gain = _removal_gain(xy, route, position)
+                if len(routes[other]) < capacity:
+                    cost, insert_at = _insertion(xy, routes[other], point)
+                    if cost < gain - 1e-9:
+                        route.pop(position)
+                        routes[other].insert(insert_at, point)
+                        moves += 1
+                        moved = True
+                        continue
+                elif _exchange(xy, routes, own, position, other, distances):
+                    moves += 2
+                    moved = True
+                    continue
+                position += 1
+        if not moved:
+            break
+    return moves
+
+
+def plan_length(xy: np.ndarray, routes: List[List[int]]) -> float:
+    """所有路線的總長度（公里）"""
+    return sum(_path_length(xy, route) for route in routes)
@@ -0,0 +1,209 @@
+"""
+Route geometry store
+路線定案（建立、規劃或修改停靠點）時計算一次路線幾何，存成 encoded
+polyline 並預先產生各地圖縮放等級的 Douglas-Peucker 簡化版本；地圖 API
+只讀取儲存的折線，不再重新呼叫路徑規劃
+"""
+import json
+import logging
+import math
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from common.geo_utils import decode_polyline, encode_polyline, simplify_polyline
+from integrations.google_maps_client import GoogleMapsClient, Location
+from integrations.road_network import get_local_routing_engine
+from models.database_schema import Route, RouteGeometry, Vehicle, VehicleType
+
+logger = logging.getLogger(__name__)
+
+DEPOT = (22.7553, 121.1504)  # 路線起訖點（LuckyGas 倉庫）
+
+# 預先簡化的縮放等級（容許誤差為該等級的 1 像素）；更大的縮放使用完整折線
+ZOOM_LEVELS = (10, 12, 14, 16)
+METERS_PER_PIXEL_ZOOM_0 = 156543.03392  # 256px 圖磚在赤道的解析度
+
+
+def pixel_meters(zoom: int, lat: float = DEPOT[0]) -> float:
+    """縮放等級 zoom 時 1 像素代表的公尺數"""
+    return METERS_PER_PIXEL_ZOOM_0 * math.cos(math.radians(lat)) / 2 ** zoom
+
+
+def simplification_levels(points: Sequence[Tuple[float, float]]) -> Dict[int, str]:
+    """
+    各縮放等級的簡化折線
+
+    Args:
+        points: 完整折線 (lat, lng)
+
+    Returns:
+        {縮放等級: encoded polyline}
+    """
+    lat = sum(p[0] for p in points) / len(points) if points else DEPOT[0]
+    return {
+        zoom: encode_polyline(simplify_polyline(points, pixel_meters(zoom, lat)))
+        for zoom in ZOOM_LEVELS
+    }
+
+
+def route_stops(route: Route) -> List[Tuple[int, float, float]]:
+    """路線停靠點 (client_id, lat, lng)，略過沒有座標的點"""
+    if not route.route_details:
+        return []
+    points = json.loads(route.route_details).get('points', [])
+    return [
+        (point['client_id'], float(point['lat']), float(point['lng']))
+        for point in points if point.get('lat') and point.get('lng')
+    ]
+
+
+def stop_sequence(stops: Sequence[Tuple[int, float, float]]) -> str:
+    """幾何對應的停靠順序（存於 RouteGeometry.stop_sequence）"""
+    return json.dumps([client_id for client_id, _, _ in stops])
+
+
+@lru_cache(maxsize=1)
+def get_maps_client() -> Optional[GoogleMapsClient]:
+    """Google Maps client；未設定 API key 時為 None"""
+    try:
+        return GoogleMapsClient()
+    except ValueError:
+        return None
+
+
+def trace_geometry(
+    points: Sequence[Tuple[float, float]],
+    road_network=None,
+    maps_client: Optional[GoogleMapsClient] = None,
+    vehicle_type: VehicleType = VehicleType.CAR
+) -> Tuple[str, str]:
+    """
+    依序經過各點的路線幾何
+
+    優先使用本地路網（不需外部呼叫），其次呼叫一次 Google Directions，
+    都無法取得時以直線連接
+
+    Args:
+        points: 依序經過的 (lat, lng)，含起訖點
+        road_network: LocalRoutingEngine（可選）
+        maps_client: GoogleMapsClient（可選）
+        vehicle_type: 車種
+
+    Returns:
+        (encoded polyline, 來源 road_network / google / straight)
+    """
+    if len(points) >= 2 and road_network is not None:
+        path = []
+        for origin, destination in zip(points, points[1:]):
+            leg = road_network.route(origin, destination, vehicle_type)
+            if leg is None:
+                path = None
+                break
+            path.extend(leg['path'][1:] if path else leg['path'])
+        if path:
+            return encode_polyline(path), 'road_network'
+
+    if len(points) >= 2 and maps_client is not None:
+        stops = [Location(address="", lat=lat, lng=lng) for lat, lng in points]
+        result = maps_client.calculate_route(
+            stops[0], stops[-1], waypoints=stops[1:-1], optimize_waypoints=False
+        )
+        if result:
+            return result['overview_polyline'], 'google'
+
+    return encode_polyline(points), 'straight'
+
+
+class RouteGeometryStore:
+    """路線幾何的計算與讀取"""
+
+    def __init__(self, session: Session, road_network=None, maps_client: Optional[GoogleMapsClient] = None):
+        """
+        Args:
+            session: 資料庫 Session
+            road_network: LocalRoutingEngine（可選）
+            maps_client: GoogleMapsClient（可選）
+        """
+        self.session = session
+        self.road_network = road_network
+        self.maps_client = maps_client
+
+    @classmethod
+    def default(cls, session: Session) -> 'RouteGeometryStore':
+        """使用設定的本地路網與 Google Maps"""
+        return cls(session, road_network=get_local_routing_engine(), maps_client=get_maps_client())
+
+    def finalize(self, route: Route) -> Optional[RouteGeometry]:
+        """
+        計算並儲存路線幾何；停靠順序未改變時沿用已儲存的幾何
+
+        由呼叫端 commit
+
+        Args:
+            route: 路線
+
+        Returns:
+            RouteGeometry；路線沒有可定位的停靠點時為 None
+        """
+        stops = route_stops(route)
+        sequence = stop_sequence(stops)
+        geometry = route.geometry
+        if geometry is not None and geometry.stop_sequence == sequence:
+            return geometry
+
+        if not stops:
+            route.geometry = None
+            return None
+
+        vehicle = self.session.get(Vehicle, route.vehicle_id) if route.vehicle_id else None
+        vehicle_type = vehicle.vehicle_type if vehicle and vehicle.vehicle_type else VehicleType.CAR
+        points = [DEPOT] + [(lat, lng) for _, lat, lng in stops] + [DEPOT]
+        polyline, source = trace_geometry(points, self.road_network, self.maps_client, vehicle_type)
+
+        points = decode_polyline(polyline)
+        if geometry is None:
+            geometry = RouteGeometry()
+            route.geometry = geometry
+        geometry.stop_sequence = sequence
+        geometry.polyline = polyline
+        geometry.simplified = json.dumps(simplification_levels(points))
+        geometry.point_count = len(points)
+        geometry.source = source
+        geometry.created_at = datetime.utcnow()
+
+        logger.info(f"Route {route.id} geometry from {source}: {len(points)} points")
+        return geometry
+
+    def get(self, route: Route) -> Optional[RouteGeometry]:
+        """
+        已儲存的幾何
+
+        舊路線沒有幾何，或停靠順序已被其他流程改寫時，重新計算一次並儲存
+        """
+        geometry = route.geometry
+        if geometry is not None and geometry.stop_sequence == stop_sequence(route_stops(route)):
+            return geometry
+        geometry = self.finalize(route)
+        self.session.commit()
+        return geometry
+
+
+def polyline_for_zoom(geometry: RouteGeometry, zoom: int) -> str:
+    """
+    縮放等級 zoom 使用的折線：誤差不超過 1 像素的最精簡版本
+
+    Args:
+        geometry: 路線幾何
+        zoom: 地圖縮放等級
+
+    Returns:
+        encoded polyline
+    """
+    levels = json.loads(geometry.simplified or '{}')
+    for level in ZOOM_LEVELS:
+        if level >= zoom and str(level) in levels:
+            return levels[str(level)]
+    return geometry.polyline
@@ -4,6 +4,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from datetime import datetime, date, time, timedelta
 from typing import List, Dict, Tuple, Optional
+import math
 import numpy as np
 from dataclasses import dataclass
 import json
@@ -14,13 +15,17 @@ from sqlalchemy import and_
 from models.database_schema import Client, Delivery, Driver, Vehicle, Route, VehicleType, DeliveryStatus
 from services.prediction_service import GasPredictionService
 from common.geo_utils import calculate_haversine_distance, validate_coordinates
-from common.time_utils import parse_client_time_windows, calculate_service_time
+from common.time_utils import calculate_service_time
+from common.availability import client_availability_mask, mask_from_hour_windows, mask_windows
 from common.vehicle_utils import calculate_required_vehicle_type
+from services.route_clustering import (
+    ClusterInput, balanced_kmeans, order_clusters, plan_length, project, repair_boundaries, sweep_clusters
+)
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class DeliveryPoint:
     """配送點資料結構"""
     client_id: int
@@ -34,9 +39,14 @@ class DeliveryPoint:
     demand: Dict[str, int] = None  # 需求量 {'50kg': 1, '20kg': 2, ...}
     priority: float = 1.0  # 優先度
     vehicle_restriction: VehicleType = VehicleType.ALL  # 車輛限制
+    availability: Optional[int] = None  # 可配送時段位元遮罩（每分鐘一個位元）
 
+    def __post_init__(self):
+        if self.availability is None:
+            self.availability = mask_from_hour_windows(self.time_windows)
 
-@dataclass
+
+@dataclass(slots=True)
 class RouteSegment:
     """路線段資料結構"""
     from_point: DeliveryPoint
@@ -73,6 +83,11 @@ class RouteOptimizationService:
             'G-南迴線': (22.5477, 120.9486),  # 南迴地區
         }
         
+        # 先分群再排序的設定
+        self.max_stops_per_route = 25  # 每位司機一天的配送點數上限
+        self.clustering_method = 'kmeans'  # 'kmeans'（容量平衡）或 'sweep'
+        self.max_workers = None  # 排序子程序數（None: 依點數與 CPU 數決定）
+        
     def geocode_address(self, address: str) -> Tuple[float, float]:
         """
         地址轉換為座標（簡化版本）
@@ -159,7 +174,8 @@ class RouteOptimizationService:
                 continue
             
             # 解析營業時間
-            time_windows = [(tw[0].hour, tw[1].hour) for tw in parse_client_time_windows(client)]
+            availability = client_availability_mask(client)
+            time_windows = [(start // 60, end // 60) for start, end in mask_windows(availability)]
             
             # 建立配送點
             lat, lng = self.geocode_address(client.address)
@@ -171,6 +187,7 @@ class RouteOptimizationService:
                 lat=lat,
                 lng=lng,
                 time_windows=time_windows,
+                availability=availability,
                 service_time=15 if client.cylinder_50kg else 10,  # 50kg需要更多時間
                 demand=self._estimate_demand(client),
                 priority=item['priority_score'],
@@ -200,7 +217,8 @@ class RouteOptimizationService:
                        available_drivers: List[Driver]) -> List[Route]:
         """
         優化路線
-        使用最近鄰居演算法的改良版本
+        先分群再排序：將配送點分成司機可負擔的群集，各群集獨立排序後修補邊界，
+        每個群集配一組車輛與司機
         
         Args:
             delivery_date: 配送日期
@@ -216,47 +234,89 @@ class RouteOptimizationService:
             logger.info("No delivery points for optimization")
             return []
         
-        # 按區域分組
-        area_groups = self._group_by_area(delivery_points)
+        crews = list(zip(available_vehicles, available_drivers))
+        if not crews:
+            logger.warning("No vehicles/drivers available for route optimization")
+            return []
         
-        routes = []
-        vehicle_idx = 0
-        driver_idx = 0
+        clusters = self._cluster_deliveries(delivery_points, len(crews))
         
-        for area, points in area_groups.items():
-            if vehicle_idx >= len(available_vehicles) or driver_idx >= len(available_drivers):
-                logger.warning(f"Not enough vehicles/drivers for area {area}")
-                break
-            
-            vehicle = available_vehicles[vehicle_idx]
-            driver = available_drivers[driver_idx]
-            
-            # 建立路線
-            route_points = self._optimize_area_route(points, vehicle.vehicle_type)
-            
-            if route_points:
-                route = self._create_route(
-                    delivery_date, area, route_points, vehicle, driver
+        # 需要汽車的點最多的群集先分配汽車
+        clusters.sort(key=lambda c: sum(p.vehicle_restriction == VehicleType.CAR for p in c), reverse=True)
+        crews.sort(key=lambda crew: crew[0].vehicle_type != VehicleType.CAR)
+        
+        routes = []
+        for route_points, (vehicle, driver) in zip(clusters, crews):
+            # 過濾適合車輛類型的點
+            suitable_points = [
+                p for p in route_points
+                if p.vehicle_restriction == VehicleType.ALL or p.vehicle_restriction == vehicle.vehicle_type
+            ]
+            if len(suitable_points) < len(route_points):
+                logger.warning(
+                    f"{len(route_points) - len(suitable_points)} points need another vehicle type than {vehicle.plate_number}"
                 )
-                routes.append(route)
-                
-                vehicle_idx += 1
-                driver_idx += 1
+            if not suitable_points:
+                continue
+            
+            center = (
+                sum(p.lat for p in suitable_points) / len(suitable_points),
+                sum(p.lng for p in suitable_points) / len(suitable_points)
+            )
+            route = self._create_route(
+                delivery_date, self._determine_area(*center), suitable_points, vehicle, driver
+            )
+            routes.append(route)
         
         return routes
     
-    def _group_by_area(self, points: List[DeliveryPoint]) -> Dict[str, List[DeliveryPoint]]:
-        """按區域分組配送點"""
-        area_groups = {}
-        
-        for point in points:
-            # 根據座標判斷區域
-            area = self._determine_area(point.lat, point.lng)
-            if area not in area_groups:
-                area_groups[area] = []
-            area_groups[area].append(point)
-        
-        return area_groups
+    def _cluster_deliveries(self, points: List[DeliveryPoint], n_routes: int) -> List[List[DeliveryPoint]]:
+        """
+        將配送點分群並排序
+        容量平衡 k-means（或掃描法）分成最多 n_routes 個群集，各群集以最近鄰居加
+        2-opt 排序（點數多時平行處理），最後把邊界點移到較近的路線
+        
+        Args:
+            points: 配送點
+            n_routes: 可用的車輛/司機組數
+            
+        Returns:
+            List[List[DeliveryPoint]]: 各路線依配送順序排列的點
+        """
+        xy = project([(p.lat, p.lng) for p in points])
+        n_clusters = max(1, min(n_routes, math.ceil(len(points) / self.max_stops_per_route)))
+        capacity = max(self.max_stops_per_route, math.ceil(len(points) / n_clusters))
+        if capacity > self.max_stops_per_route:
+            logger.warning(
+                f"{len(points)} points exceed {n_routes} routes x {self.max_stops_per_route} stops; "
+                f"routes will have up to {capacity} stops"
+            )
+        
+        if self.clustering_method == 'sweep':
+            labels, centers = sweep_clusters(xy, n_clusters)
+        else:
+            labels, centers = balanced_kmeans(xy, n_clusters, capacity)
+        
+        members = [np.flatnonzero(labels == c).tolist() for c in range(len(centers))]
+        cluster_inputs = [
+            ClusterInput(
+                xy=xy[indices],
+                priority=[points[i].priority for i in indices],
+                availability=[points[i].availability for i in indices]
+            )
+            for indices in members
+        ]
+        orders = order_clusters(cluster_inputs, self.max_workers)
+        routes = [[indices[i] for i in order] for indices, order in zip(members, orders)]
+        
+        length = plan_length(xy, routes)
+        moved = repair_boundaries(xy, routes, centers, capacity)
+        logger.info(
+            f"Clustered {len(points)} points into {len(routes)} routes ({self.clustering_method}); "
+            f"boundary repair moved {moved} points, {length:.1f} -> {plan_length(xy, routes):.1f} km"
+        )
+        
+        return [[points[i] for i in route] for route in routes if route]
     
     def _determine_area(self, lat: float, lng: float) -> str:
         """根據座標判斷區域"""
@@ -271,77 +331,6 @@ class RouteOptimizationService:
         
         return closest_area
     
-    def _optimize_area_route(self, points: List[DeliveryPoint], 
-                           vehicle_type: VehicleType) -> List[DeliveryPoint]:
-        """
-        優化單一區域內的路線
-        使用改良的最近鄰居演算法
-        """
-        if not points:
-            return []
-        
-        # 過濾適合車輛類型的點
-        suitable_points = [
-            p for p in points 
-            if p.vehicle_restriction == VehicleType.ALL or 
-               p.vehicle_restriction == vehicle_type
-        ]
-        
-        if not suitable_points:
-            return []
-        
-        # 按優先度排序
-        suitable_points.sort(key=lambda p: p.priority, reverse=True)
-        
-        # 使用最近鄰居演算法建立路線
-        route = []
-        unvisited = suitable_points.copy()
-        
-        # 從優先度最高的點開始
-        current = unvisited.pop(0)
-        route.append(current)
-        
-        while unvisited:
-            # 找最近的未訪問點
-            min_distance = float('inf')
-            nearest = None
-            nearest_idx = -1
-            
-            for idx, point in enumerate(unvisited):
-                distance = self.calculate_distance(
-                    (current.lat, current.lng),
-                    (point.lat, point.lng)
-                )
-                
-                # 考慮時間窗口
-                if self._is_time_window_compatible(current, point):
-                    # 時間窗口相容的點有優先權
-                    distance *= 0.8
-                
-                if distance < min_distance:
-                    min_distance = distance
-                    nearest = point
-                    nearest_idx = idx
-            
-            if nearest:
-                current = nearest
-                route.append(current)
-                unvisited.pop(nearest_idx)
-            else:
-                break
-        
-        return route
-    
-    def _is_time_window_compatible(self, point1: DeliveryPoint, 
-                                  point2: DeliveryPoint) -> bool:
-        """檢查兩個配送點的時間窗口是否相容"""
-        for window1 in point1.time_windows:
-            for window2 in point2.time_windows:
-                # 檢查是否有重疊
-                if not (window1[1] <= window2[0] or window2[1] <= window1[0]):
-                    return True
-        return False
-    
     def _create_route(self, date: date, area: str, points: List[DeliveryPoint],
                      vehicle: Vehicle, driver: Driver) -> Route:
         """建立路線記錄"""
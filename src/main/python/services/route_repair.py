@@ -0,0 +1,338 @@
+"""
+Incremental route repair
+Keeps every active route's stops, travel matrix rows and time-window slack
+in memory, so a driver who deviates or finishes stops can be re-sequenced
+from the current GPS position with a bounded 2-opt / Or-opt search in
+milliseconds, without geocoding, distance matrix or directions calls.
+Geometry is cached per route and only needs refetching when the repaired
+sequence differs from the one it was drawn for
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from common.geo_utils import calculate_haversine_matrix
+
+logger = logging.getLogger(__name__)
+
+MAX_SEGMENT = 10  # 2-opt 反轉段 / Or-opt 移動距離上限
+MAX_CHAIN = 3  # Or-opt 一次移動的連續站數上限
+
+
+@dataclass
+class RepairResult:
+    """Repaired remaining route of one driver"""
+    sequence: List[int]  # Delivery IDs in order
+    changed: bool  # Differs from the planned order
+    arrivals: List[int]  # Minutes since midnight
+    starts: List[int]  # Service starts, minutes since midnight
+    total_km: float  # GPS position -> stops -> depot
+    total_minutes: int
+    late_minutes: int
+    moves: int
+    seconds: float
+
+
+@dataclass
+class _Timing:
+    """Cached schedule of the current order (positions 0..m-1)"""
+    arrivals: List[int] = field(default_factory=list)
+    starts: List[int] = field(default_factory=list)
+    late: List[int] = field(default_factory=list)
+    drive: List[int] = field(default_factory=list)  # Minutes driven from position 0 to k
+    back: List[int] = field(default_factory=list)  # Same, driving the order backwards
+    latest: List[int] = field(default_factory=list)  # Latest arrival that adds no lateness downstream
+    suffix_late: List[int] = field(default_factory=list)  # Lateness from position k to the end
+
+
+class ActiveRoute:
+    """
+    In-memory state of one route being driven
+
+    Matrix index 0 is the depot (where the route ends), 1..n the route's
+    stops in the order given at construction. Rows from a GPS position are
+    estimated from straight-line distance scaled by the route's own
+    road/straight-line ratio, so no matrix call is needed while driving.
+    """
+
+    def __init__(
+        self,
+        route_id: int,
+        depot: Tuple[float, float],
+        delivery_ids: Sequence[int],
+        locations: Sequence[Tuple[float, float]],
+        windows: Sequence[Tuple[int, int]],
+        service_times: Sequence[int],
+        distance_matrix: np.ndarray,
+        time_matrix: np.ndarray
+    ):
+        """
+        Args:
+            route_id: Route ID
+            depot: (lat, lng) the route returns to
+            delivery_ids: Stops in planned order
+            locations: (lat, lng) of each stop
+            windows: (start, end) minutes since midnight of each stop
+            service_times: Minutes at each stop
+            distance_matrix: km between depot + stops, (n+1) x (n+1)
+            time_matrix: Minutes between depot + stops, (n+1) x (n+1)
+        """
+        self.route_id = route_id
+        self.delivery_ids = list(delivery_ids)
+        self.index = {delivery_id: k + 1 for k, delivery_id in enumerate(self.delivery_ids)}
+        self.points = np.asarray([depot] + list(locations), dtype=float)
+        self.windows = [(0, 24 * 60)] + [tuple(w) for w in windows]
+        self.service = [0] + list(service_times)
+        self.km = np.asarray(distance_matrix, dtype=float)
+        self.minutes = np.asarray(time_matrix, dtype=float)
+        self.sequence = list(self.delivery_ids)  # Planned order of what is left
+        self.polyline: Optional[str] = None
+        self.polyline_sequence: Optional[List[int]] = None
+
+        # Road distance / minutes per straight-line km, for rows from a GPS position
+        straight = calculate_haversine_matrix(self.points)
+        mask = (straight > 0.05) & (self.km < 999999)
+        self.road_factor = float(self.km[mask].sum() / straight[mask].sum()) if mask.any() and self.km[mask].sum() else 1.3
+        self.minutes_per_km = float(self.minutes[mask].sum() / straight[mask].sum()) if mask.any() and self.minutes[mask].sum() else 2.0
+
+    def covers(self, delivery_ids: Iterable[int]) -> bool:
+        """Whether every delivery has a cached matrix row"""
+        return all(delivery_id in self.index for delivery_id in delivery_ids)
+
+    def geometry_for(self, sequence: List[int]) -> Optional[str]:
+        """Cached polyline if it was drawn for this order (finished stops aside)"""
+        if self.polyline_sequence is None:
+            return None
+        left = set(sequence)
+        drawn = [d for d in self.polyline_sequence if d in left]
+        return self.polyline if drawn == sequence else None
+
+    def set_geometry(self, sequence: List[int], polyline: str):
+        self.polyline = polyline
+        self.polyline_sequence = list(sequence)
+
+    def repair(
+        self,
+        position: Tuple[float, float],
+        now: int,
+        remaining: Optional[Iterable[int]] = None,
+        max_segment: int = MAX_SEGMENT,
+        max_chain: int = MAX_CHAIN,
+        time_budget: float = 0.05
+    ) -> RepairResult:
+        """
+        Re-sequence the remaining stops from a GPS position
+
+        Starts from the planned order (minus finished stops) and applies
+        improving 2-opt reversals and Or-opt chain moves, shortest first,
+        until none improves or the time budget runs out. A move improves if
+        it reduces total lateness, or keeps lateness and reduces driving
+        minutes. Moves are checked against the cached slack: only the
+        changed segment is re-timed, and later stops only when the new
+        arrival exceeds their latest on-time arrival.
+
+        Args:
+            position: Current (lat, lng) of the vehicle
+            now: Current minute since midnight
+            remaining: Deliveries still to visit (default: the planned sequence)
+            max_segment: Longest reversal / farthest chain move
+            max_chain: Longest chain moved by Or-opt
+            time_budget: Seconds to search
+
+        Returns:
+            RepairResult; the route's planned sequence is updated to it
+        """
+        started = time.perf_counter()
+        remaining = set(self.sequence if remaining is None else remaining)
+        planned = [d for d in self.sequence if d in remaining]
+        planned += [d for d in self.delivery_ids if d in remaining and d not in planned]
+        nodes = [self.index[d] for d in planned]
+
+        # Local matrix: 0 = GPS position, 1..m = stops, m+1 = depot
+        m = len(nodes)
+        local = [0] + nodes + [0]
+        minutes = self.minutes[np.ix_(local, local)]
+        straight = calculate_haversine_matrix(np.vstack([position, self.points[local[1:]]]))[0]
+        minutes[0, :] = np.rint(straight * self.minutes_per_km)
+        minutes[:, 0] = 0
+        self._t = minutes.astype(int).tolist()
+        self._window = [None] + [self.windows[n] for n in nodes] + [None]
+        self._service = [0] + [self.service[n] for n in nodes] + [0]
+        self._now = now
+
+        order = list(range(1, m + 1))
+        timing = self._timing(order)
+        moves = 0
+        improved = True
+        while improved and time.perf_counter() - started < time_budget:
+            improved = False
+            for move in self._moves(m, max_segment, max_chain):
+                candidate = self._try(order, timing, *move)
+                if candidate is not None:
+                    order = candidate
+                    timing = self._timing(order)
+                    moves += 1
+                    improved = True
+                if time.perf_counter() - started >= time_budget:
+                    break
+
+        sequence = [planned[k - 1] for k in order]
+        path_km = self.km[np.ix_(local, local)]
+        km, end = 0.0, now
+        if order:
+            km = straight[order[0]] * self.road_factor + path_km[order[-1]][m + 1]
+            km += sum(path_km[a][b] for a, b in zip(order, order[1:]))
+            end = timing.starts[-1] + self._service[order[-1]] + self._t[order[-1]][m + 1]
+        self.sequence = sequence
+        return RepairResult(
+            sequence=sequence,
+            changed=sequence != planned,
+            arrivals=timing.arrivals,
+            starts=timing.starts,
+            total_km=round(float(km), 3),
+            total_minutes=int(end - now),
+            late_minutes=sum(timing.late),
+            moves=moves,
+            seconds=time.perf_counter() - started
+        )
+
+    def _moves(self, m: int, max_segment: int, max_chain: int):
+        """Candidate moves, smallest first: ('or', i, length, target) and ('2opt', i, j)"""
+        for span in range(1, max_segment + 1):
+            for length in range(1, min(max_chain, m) + 1):
+                for i in range(m - length + 1):
+                    for target in (i - span, i + length + span - 1):
+                        if 0 <= target < m and not i <= target < i + length:
+                            yield ('or', i, length, target)
+            for i in range(m - span):
+                yield ('2opt', i, i + span)
+
+    def _segment(self, order: List[int], kind: str, i: int, j: int, target: int) -> Tuple[List[int], int, int]:
+        """Nodes of the changed positions [lo, hi] after the move"""
+        if kind == '2opt':
+            return order[i:j + 1][::-1], i, j
+        chain = order[i:i + j]
+        if target < i:
+            return chain + order[target:i], target, i + j - 1
+        return order[i + j:target + 1] + chain, i, target
+
+    def _try(self, order: List[int], timing: _Timing, kind: str, i: int, j: int, target: int = -1) -> Optional[List[int]]:
+        """The new order if the move improves lateness, then driving minutes"""
+        t, drive = self._t, timing.drive
+        depot = len(order) + 1
+        segment, lo, hi = self._segment(order, kind, i, j, target)
+        previous = order[lo - 1] if lo > 0 else 0
+        following = order[hi + 1] if hi + 1 < len(order) else depot
+
+        # Driving minutes over the changed positions, from prefix sums of the current order
+        old_drive = drive[hi] - drive[lo] + t[previous][order[lo]] + t[order[hi]][following]
+        if kind == '2opt':
+            inner = timing.back[hi] - timing.back[lo]
+        else:
+            inner = sum(t[a][b] for a, b in zip(segment, segment[1:]))
+        new_drive = inner + t[previous][segment[0]] + t[segment[-1]][following]
+        if not timing.suffix_late[0] and new_drive >= old_drive:
+            return None  # On time already: only shorter driving can improve
+
+        # Re-time the changed segment from the unchanged departure before it
+        clock = timing.starts[lo - 1] + self._service[previous] if lo > 0 else self._now
+        new_late = 0
+        for node in segment:
+            clock, late = self._visit(node, clock + t[previous][node])
+            new_late += late
+            clock += self._service[node]
+            previous = node
+        old_late = timing.suffix_late[lo] - timing.suffix_late[hi + 1]
+
+        # Later stops: unchanged unless the new arrival eats into their slack
+        if hi + 1 < len(order):
+            arrival = clock + t[previous][order[hi + 1]]
+            if arrival > timing.latest[hi + 1] or timing.suffix_late[hi + 1]:
+                for k in range(hi + 1, len(order)):
+                    if arrival == timing.arrivals[k]:
+                        break
+                    start, late = self._visit(order[k], arrival)
+                    new_late += late
+                    old_late += timing.late[k]
+                    if k + 1 < len(order):
+                        arrival = start + self._service[order[k]] + t[order[k]][order[k + 1]]
+
+        if new_late > old_late or (new_late == old_late and new_drive >= old_drive):
+            return None
+        return order[:lo] + segment + order[hi + 1:]
+
+    def _visit(self, node: int, arrival: int) -> Tuple[int, int]:
+        """(service start, minutes late) at a stop"""
+        window_start, window_end = self._window[node]
+        start = max(arrival, window_start)
+        return start, max(0, start - window_end)
+
+    def _timing(self, order: List[int]) -> _Timing:
+        timing = _Timing()
+        clock, previous = self._now, 0
+        for node in order:
+            arrival = clock + self._t[previous][node]
+            start, late = self._visit(node, arrival)
+            timing.arrivals.append(arrival)
+            timing.starts.append(start)
+            timing.late.append(late)
+            clock, previous = start + self._service[node], node
+
+        timing.drive, timing.back = [0], [0]
+        for a, b in zip(order, order[1:]):
+            timing.drive.append(timing.drive[-1] + self._t[a][b])
+            timing.back.append(timing.back[-1] + self._t[b][a])
+
+        # Latest arrival at each stop that keeps every later stop as late as it is now
+        timing.latest = [0] * len(order)
+        timing.suffix_late = [0] * (len(order) + 1)
+        latest = None
+        for k in range(len(order) - 1, -1, -1):
+            node = order[k]
+            own = max(self._window[node][1], timing.starts[k])
+            if latest is not None:
+                own = min(own, latest - self._service[node] - self._t[node][order[k + 1]])
+            timing.latest[k] = own
+            latest = own
+            timing.suffix_late[k] = timing.suffix_late[k + 1] + timing.late[k]
+        return timing
+
+
+class ActiveRouteCache:
+    """In-process cache of ActiveRoute states, least recently used evicted first"""
+
+    def __init__(self, max_routes: int = 500):
+        self.max_routes = max_routes
+        self._routes: "OrderedDict[int, ActiveRoute]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, route_id: int) -> Optional[ActiveRoute]:
+        with self._lock:
+            state = self._routes.get(route_id)
+            if state is not None:
+                self._routes.move_to_end(route_id)
+            return state
+
+    def put(self, state: ActiveRoute):
+        with self._lock:
+            self._routes[state.route_id] = state
+            self._routes.move_to_end(state.route_id)
+            while len(self._routes) > self.max_routes:
+                self._routes.popitem(last=False)
+
+    def discard(self, route_id: int):
+        with self._lock:
+            self._routes.pop(route_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+
+# Global cache instance
+active_routes = ActiveRouteCache()
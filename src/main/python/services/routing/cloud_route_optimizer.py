@@ -14,7 +14,7 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 from domain.services.route_optimizer import IRouteOptimizer, OptimizationRequest, OptimizationResult
 from services.cloud_route_service import CloudRouteOptimizationService, DeliveryNode, VehicleInfo, Location
 from models.database_schema import Client
-from common.time_utils import parse_client_time_windows
+from common.availability import client_availability_mask, mask_windows
 
 logger = logging.getLogger(__name__)
 
@@ -171,11 +171,11 @@ class CloudRouteOptimizer(IRouteOptimizer):
                 continue
             
             # Parse time windows
-            time_windows = parse_client_time_windows(client)
+            time_windows = mask_windows(client_availability_mask(client))
             if time_windows:
-                # Convert to minutes from midnight
-                tw_start = time_windows[0][0].hour * 60
-                tw_end = time_windows[-1][1].hour * 60
+                # Minutes from midnight
+                tw_start = time_windows[0][0]
+                tw_end = time_windows[-1][1]
             else:
                 # Default time window 8 AM - 6 PM
                 tw_start = 8 * 60
@@ -0,0 +1,183 @@
+"""
+Same-day insertion service
+Loads a day's active routes (assigned deliveries in route_sequence order,
+where each driver is now) for common.scheduling.InsertionPlanner, and
+writes an applied insertion back to the deliveries and the driver's Route
+"""
+import json
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from common.time_utils import ScheduleEntry
+from models.database_schema import Client, Delivery, DeliveryStatus, Route
+from services.planning_snapshot import planning_snapshot_query
+from services.route_geometry import RouteGeometryStore
+
+logger = logging.getLogger(__name__)
+
+# 路線上尚未完成的配送狀態
+ACTIVE_ROUTE_STATUSES = (DeliveryStatus.ASSIGNED, DeliveryStatus.IN_PROGRESS)
+
+
+@dataclass
+class DayRoutes:
+    """當天各司機的剩餘路線"""
+    deliveries: Dict[int, List[Delivery]] = field(default_factory=dict)  # 依 route_sequence 排序
+    start_locations: Dict[int, Tuple[float, float]] = field(default_factory=dict)  # 最後完成的客戶位置
+    locked_stops: Dict[int, int] = field(default_factory=dict)  # 開頭配送中的站數（不可插在前面）
+    vehicle_ids: Dict[int, Optional[int]] = field(default_factory=dict)
+    next_sequence: Dict[int, int] = field(default_factory=dict)  # 剩餘第一站的 route_sequence
+
+    def signature(self) -> Tuple:
+        """路線內容的指紋，用來判斷快取的規劃器是否仍有效"""
+        return tuple(
+            (driver_id,
+             tuple(d.id for d in self.deliveries[driver_id]),
+             self.start_locations.get(driver_id),
+             self.locked_stops.get(driver_id, 0))
+            for driver_id in sorted(self.deliveries)
+        )
+
+
+def load_day_routes(
+    session: Session,
+    schedule_date: date,
+    driver_ids: Optional[Iterable[int]] = None
+) -> DayRoutes:
+    """
+    載入當天已分配司機的路線
+
+    Args:
+        session: 資料庫 Session
+        schedule_date: 配送日期
+        driver_ids: 限定司機，None 表示全部
+
+    Returns:
+        DayRoutes（沒有剩餘配送的司機不列入）
+    """
+    query = planning_snapshot_query(
+        session,
+        delivery_date=schedule_date,
+        statuses=ACTIVE_ROUTE_STATUSES + (DeliveryStatus.COMPLETED,)
+    ).filter(Delivery.driver_id.isnot(None))
+    if driver_ids is not None:
+        query = query.filter(Delivery.driver_id.in_(list(driver_ids)))
+
+    by_driver: Dict[int, List[Delivery]] = defaultdict(list)
+    for delivery in query.order_by(Delivery.driver_id, Delivery.route_sequence, Delivery.id):
+        by_driver[delivery.driver_id].append(delivery)
+
+    routes = DayRoutes()
+    for driver_id, deliveries in by_driver.items():
+        remaining = [d for d in deliveries if d.status in ACTIVE_ROUTE_STATUSES]
+        if not remaining:
+            continue
+        completed = [d for d in deliveries if d.status == DeliveryStatus.COMPLETED]
+        if completed and completed[-1].client and completed[-1].client.latitude is not None:
+            client = completed[-1].client
+            routes.start_locations[driver_id] = (client.latitude, client.longitude)
+        in_progress = [k for k, d in enumerate(remaining) if d.status == DeliveryStatus.IN_PROGRESS]
+        routes.deliveries[driver_id] = remaining
+        routes.locked_stops[driver_id] = in_progress[-1] + 1 if in_progress else 0
+        routes.vehicle_ids[driver_id] = next((d.vehicle_id for d in deliveries if d.vehicle_id), None)
+        routes.next_sequence[driver_id] = max((d.route_sequence or 0 for d in completed), default=0) + 1
+
+    logger.info(f"Loaded {sum(len(d) for d in routes.deliveries.values())} routed deliveries "
+                f"for {len(routes.deliveries)} drivers on {schedule_date}")
+    return routes
+
+
+def same_day_candidates(
+    session: Session,
+    schedule_date: date,
+    delivery_ids: Optional[Iterable[int]] = None
+) -> List[Delivery]:
+    """
+    取得待插入的當天訂單
+
+    Args:
+        session: 資料庫 Session
+        schedule_date: 配送日期
+        delivery_ids: 指定配送單；None 表示需要當天配送的客戶之未分配訂單
+
+    Returns:
+        尚未分配司機的待配送訂單
+    """
+    query = planning_snapshot_query(
+        session,
+        delivery_date=schedule_date,
+        statuses=(DeliveryStatus.PENDING,),
+        delivery_ids=delivery_ids
+    ).filter(Delivery.driver_id.is_(None))
+    if delivery_ids is None:
+        query = query.join(Delivery.client).filter(Client.needs_same_day_delivery == True)
+    return query.order_by(Delivery.id).all()
+
+
+def apply_insertion(
+    session: Session,
+    schedule_date: date,
+    routes: DayRoutes,
+    driver_id: int,
+    schedule: List[ScheduleEntry]
+) -> None:
+    """
+    將插入結果寫回配送單、路線與路線幾何（不 commit）
+
+    Args:
+        session: 資料庫 Session
+        schedule_date: 配送日期
+        routes: 插入前載入的 DayRoutes
+        driver_id: 插入的司機
+        schedule: 該司機插入後的剩餘路線（InsertionPlanner.apply 的結果）
+    """
+    deliveries = {
+        d.id: d for d in session.query(Delivery).filter(
+            Delivery.id.in_([entry.delivery_id for entry in schedule])
+        )
+    }
+    first_sequence = routes.next_sequence.get(driver_id, 1)
+    for offset, entry in enumerate(schedule):
+        delivery = deliveries[entry.delivery_id]
+        delivery.route_sequence = first_sequence + offset
+        if delivery.driver_id != driver_id:
+            delivery.driver_id = driver_id
+            delivery.vehicle_id = routes.vehicle_ids.get(driver_id)
+            delivery.status = DeliveryStatus.ASSIGNED
+
+    route = session.query(Route).filter(
+        Route.route_date == schedule_date,
+        Route.driver_id == driver_id
+    ).order_by(Route.id.desc()).first()
+    if route is None:
+        return
+
+    remaining = {deliveries[entry.delivery_id].client_id for entry in schedule}
+    points = []
+    if route.route_details:
+        try:
+            points = json.loads(route.route_details).get('points', [])
+        except (ValueError, AttributeError):
+            points = []
+    # 已完成的站點保留，剩餘站點依新順序重建
+    points = [p for p in points if p.get('client_id') not in remaining and
+              (p.get('sequence') or 0) < first_sequence]
+    for offset, entry in enumerate(schedule):
+        client = deliveries[entry.delivery_id].client
+        points.append({
+            'client_id': client.id,
+            'name': client.short_name or client.invoice_title,
+            'address': client.address,
+            'lat': client.latitude or 0,
+            'lng': client.longitude or 0,
+            'sequence': first_sequence + offset,
+            'estimated_arrival': entry.time_slot.start_time.isoformat()
+        })
+    route.route_details = json.dumps({'points': points}, ensure_ascii=False)
+    route.total_clients = len(points)
+    RouteGeometryStore.default(session).finalize(route)
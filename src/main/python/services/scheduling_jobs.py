@@ -0,0 +1,328 @@
+"""
+Background scheduling jobs
+Runs SchedulingEngine in a worker thread and keeps the latest incumbent
+(best score, scheduled / unscheduled counts) so the API can report progress
+by polling or server-sent events, and stop a run early once the planner is
+satisfied with the current plan
+
+With a shared store (the database) configured, job state and the stop flag
+are mirrored there, so any API worker can serve a job started by another;
+the run itself stays in the worker that started it
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from contextlib import closing
+from datetime import date, datetime, timedelta, time as dt_time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from common.scheduling.models import SchedulingProgress
+from models.database_schema import SchedulingJobRecord
+
+logger = logging.getLogger(__name__)
+
+SHARED_SYNC_SECONDS = 1.0  # 執行中的工作寫入進度 / 檢查停止旗標的最短間隔
+SHARED_POLL_SECONDS = 0.5  # 其他程序的工作：等待狀態變更時輪詢資料庫的間隔
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    return str(value)
+
+
+def _to_json(value: Any) -> Optional[str]:
+    return None if value is None else json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+def _from_json(value: Optional[str]) -> Any:
+    return None if value is None else json.loads(value)
+
+
+class SchedulingJob:
+    """State of one background scheduling run"""
+
+    def __init__(self, job_id: str, store: Optional['SchedulingJobStore'] = None, stoppable: bool = True):
+        self.job_id = job_id
+        self.status = "running"  # running | completed | failed
+        self.progress: Optional[Dict[str, Any]] = None
+        self.response: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.stoppable = stoppable
+        self.stop_requested = threading.Event()
+        # 每次狀態變更遞增，SSE 以此判斷是否有新事件
+        self.version = 0
+        self._changed = threading.Condition()
+        self._store = store
+        self._synced_version = 0
+        self._synced_at = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.status != "running"
+
+    def on_progress(self, progress: SchedulingProgress) -> bool:
+        """Progress callback for the engine; returns True when a stop was requested"""
+        if progress.improved or self.progress is None:
+            self._update(progress={
+                "algorithm": progress.algorithm,
+                "iteration": progress.iteration,
+                "elapsed": round(progress.elapsed, 3),
+                "best_score": progress.best_score,
+                "scheduled": progress.scheduled,
+                "unscheduled": progress.unscheduled
+            })
+        self._sync()
+        return self.stop_requested.is_set()
+
+    def request_stop(self):
+        """Ask the run to finish with its best plan so far"""
+        self.stop_requested.set()
+        if self._store is not None:
+            self._store.request_stop(self.job_id)
+
+    def finish(self, response: Dict[str, Any]):
+        self._update(status="completed", response=response, finished_at=time.time())
+        self._sync(force=True)
+
+    def fail(self, error: str):
+        self._update(status="failed", error=error, finished_at=time.time())
+        self._sync(force=True)
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Block until the job changes past version (or timeout); returns the current version"""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stop_requested": self.stop_requested.is_set(),
+            "progress": self.progress,
+            "result": self.response,
+            "error": self.error
+        }
+
+    def _update(self, **changes):
+        with self._changed:
+            for name, value in changes.items():
+                setattr(self, name, value)
+            self.version += 1
+            self._changed.notify_all()
+
+    def _sync(self, force: bool = False):
+        """Mirror the state to the shared store and pick up stop requests from other workers"""
+        if self._store is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._synced_at < SHARED_SYNC_SECONDS:
+            return
+        self._synced_at = now
+        try:
+            if self.version != self._synced_version:
+                self._store.save(self)
+                self._synced_version = self.version
+            if not force and self._store.stop_requested(self.job_id):
+                self.stop_requested.set()
+        except Exception as e:
+            logger.warning(f"Could not sync scheduling job {self.job_id}: {e}")
+
+
+class SharedSchedulingJob:
+    """A job started by another API worker, read from the shared store"""
+
+    def __init__(self, record: SchedulingJobRecord, store: 'SchedulingJobStore'):
+        self._store = store
+        self.job_id = record.job_id
+        self._load(record)
+
+    @property
+    def done(self) -> bool:
+        return self.status != "running"
+
+    def request_stop(self):
+        self._store.request_stop(self.job_id)
+        self.stop_requested = True
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Poll the shared store until the job changes past version (or timeout)"""
+        deadline = time.monotonic() + timeout
+        while self.version == version and time.monotonic() < deadline:
+            time.sleep(min(SHARED_POLL_SECONDS, max(0.0, deadline - time.monotonic())))
+            record = self._store.load(self.job_id)
+            if record is not None:
+                self._load(record)
+        return self.version
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "stop_requested": self.stop_requested,
+            "progress": self.progress,
+            "result": self.response,
+            "error": self.error
+        }
+
+    def _load(self, record: SchedulingJobRecord):
+        self.status = record.status
+        self.stoppable = bool(record.stoppable)
+        self.stop_requested = bool(record.stop_requested)
+        self.version = record.version or 0
+        self.progress = _from_json(record.progress)
+        self.response = _from_json(record.result)
+        self.error = record.error
+
+
+class SchedulingJobStore:
+    """排程工作狀態的資料庫存放，讓任一 API 程序都能查詢與停止工作"""
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def create(self, job: SchedulingJob):
+        with closing(self.session_factory()) as session:
+            session.add(SchedulingJobRecord(
+                job_id=job.job_id, status=job.status, stoppable=job.stoppable, version=job.version
+            ))
+            session.commit()
+
+    def save(self, job: SchedulingJob):
+        with closing(self.session_factory()) as session:
+            session.query(SchedulingJobRecord).filter(SchedulingJobRecord.job_id == job.job_id).update({
+                SchedulingJobRecord.status: job.status,
+                SchedulingJobRecord.version: job.version,
+                SchedulingJobRecord.progress: _to_json(job.progress),
+                SchedulingJobRecord.result: _to_json(job.response),
+                SchedulingJobRecord.error: job.error,
+                SchedulingJobRecord.finished_at:
+                    datetime.utcfromtimestamp(job.finished_at) if job.finished_at else None
+            }, synchronize_session=False)
+            session.commit()
+
+    def load(self, job_id: str) -> Optional[SchedulingJobRecord]:
+        with closing(self.session_factory()) as session:
+            record = session.get(SchedulingJobRecord, job_id)
+            if record is not None:
+                session.expunge(record)
+            return record
+
+    def request_stop(self, job_id: str):
+        with closing(self.session_factory()) as session:
+            session.query(SchedulingJobRecord).filter(SchedulingJobRecord.job_id == job_id).update(
+                {SchedulingJobRecord.stop_requested: True}, synchronize_session=False
+            )
+            session.commit()
+
+    def stop_requested(self, job_id: str) -> bool:
+        with closing(self.session_factory()) as session:
+            flag = session.query(SchedulingJobRecord.stop_requested).filter(
+                SchedulingJobRecord.job_id == job_id
+            ).scalar()
+            return bool(flag)
+
+    def prune(self, retention_seconds: float):
+        """
+        Drop finished jobs past retention; runs that outlived it lost their
+        worker (restart) and are marked failed
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=retention_seconds)
+        with closing(self.session_factory()) as session:
+            session.query(SchedulingJobRecord).filter(
+                SchedulingJobRecord.status != "running", SchedulingJobRecord.finished_at < cutoff
+            ).delete(synchronize_session=False)
+            session.query(SchedulingJobRecord).filter(
+                SchedulingJobRecord.status == "running", SchedulingJobRecord.created_at < cutoff
+            ).update({
+                SchedulingJobRecord.status: "failed",
+                SchedulingJobRecord.error: "Scheduling job was interrupted",
+                SchedulingJobRecord.version: SchedulingJobRecord.version + 1,
+                SchedulingJobRecord.finished_at: datetime.utcnow()
+            }, synchronize_session=False)
+            session.commit()
+
+
+class SchedulingJobRegistry:
+    """Registry of background scheduling jobs (in-process, optionally shared)"""
+
+    def __init__(self,
+                 max_jobs: int = 50,
+                 retention_seconds: float = 3600.0,
+                 session_factory: Optional[Callable[[], Session]] = None):
+        self.max_jobs = max_jobs
+        self.retention_seconds = retention_seconds
+        self.store: Optional[SchedulingJobStore] = None
+        self._jobs: Dict[str, SchedulingJob] = {}
+        self._lock = threading.Lock()
+        self.configure(session_factory)
+
+    def configure(self, session_factory: Optional[Callable[[], Session]]):
+        """共用狀態的資料庫 Session 工廠；多個 API 程序時必須設定（None: 僅限本程序）"""
+        self.store = SchedulingJobStore(session_factory) if session_factory is not None else None
+
+    def start(self, run: Callable[[SchedulingJob], Dict[str, Any]], stoppable: bool = True) -> SchedulingJob:
+        """
+        Start a job in a daemon thread
+
+        Args:
+            run: Called with the job; passes job.on_progress to the engine and
+                returns the response payload
+            stoppable: Whether the algorithm can end early on request
+
+        Returns:
+            The new job
+        """
+        job = SchedulingJob(uuid.uuid4().hex, store=self.store, stoppable=stoppable)
+        with self._lock:
+            self._prune()
+            self._jobs[job.job_id] = job
+        if self.store is not None:
+            self.store.prune(self.retention_seconds)
+            self.store.create(job)
+
+        def target():
+            try:
+                job.finish(run(job))
+            except Exception as e:
+                logger.error(f"Scheduling job {job.job_id} failed: {e}", exc_info=True)
+                job.fail(str(e))
+
+        threading.Thread(target=target, name=f"scheduling-{job.job_id[:8]}", daemon=True).start()
+        return job
+
+    def get(self, job_id: str):
+        """
+        Job by id: the running job if this worker started it, else its
+        state in the shared store
+
+        Returns:
+            SchedulingJob, SharedSchedulingJob or None
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or self.store is None:
+            return job
+        record = self.store.load(job_id)
+        return SharedSchedulingJob(record, self.store) if record is not None else None
+
+    def _prune(self):
+        """Drop expired finished jobs, then the oldest finished ones beyond max_jobs"""
+        now = time.time()
+        finished: List[SchedulingJob] = sorted(
+            (job for job in self._jobs.values() if job.done), key=lambda job: job.finished_at
+        )
+        for job in finished:
+            if now - job.finished_at > self.retention_seconds or len(self._jobs) >= self.max_jobs:
+                del self._jobs[job.job_id]
+
+
+# Global registry instance（API 啟動時以 configure() 設定共用的資料庫）
+scheduling_jobs = SchedulingJobRegistry()
@@ -0,0 +1,354 @@
+"""
+Full-text search index for client and driver keyword search
+SQLite: FTS5 virtual tables kept in sync by ORM write hooks; code-like
+keywords (C1001) also match mid-word fragments with ILIKE
+PostgreSQL: pg_trgm GIN indexes so ILIKE lookups no longer scan the table
+"""
+import re
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Integer, column, event, func, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.orm import Session
+
+from models.database_schema import Client, Driver
+
+logger = logging.getLogger(__name__)
+
+# CJK 統一表意文字（含擴充 A 與相容字）
+_CJK_CHARS = '㐀-䶿一-鿿豈-﫿'
+_TOKEN_PATTERN = re.compile(f'[{_CJK_CHARS}]+|[0-9a-z]+')
+_CJK_RUN = re.compile(f'^[{_CJK_CHARS}]+$')
+# 只含數字與電話分隔符號的關鍵字（0912-345、(089) 123）
+_PHONE_PATTERN = re.compile(r'^[\d\s\-()+.]*\d[\d\s\-()+.]*$')
+# 單一英數代碼（C1001、D-01）：FTS 只做詞首比對，另以 ILIKE 比對字中片段（1001 → C1001）
+_CODE_PATTERN = re.compile(r'^[0-9a-z][0-9a-z\-_./]*$', re.IGNORECASE)
+
+
+def segment_text(value: Optional[str]) -> List[str]:
+    """
+    將文字切分為索引用詞彙
+
+    中文連續字串切成單字與相鄰雙字（bigram），英數字保留為完整詞，
+    讓「台東」「中興路」等地址片段不需斷詞字典也能命中
+
+    Args:
+        value: 原始文字
+
+    Returns:
+        List[str]: 詞彙列表
+    """
+    if not value:
+        return []
+
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(str(value).lower()):
+        if _CJK_RUN.match(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def build_match_expression(keyword: Optional[str]) -> Optional[str]:
+    """
+    將使用者關鍵字轉為 FTS5 MATCH 查詢
+
+    中文以雙字詞比對（單一中文字則以單字比對），英數字以前綴比對，
+    所有詞彙必須同時命中；電話格式的關鍵字與索引一樣只保留數字
+
+    Args:
+        keyword: 搜尋關鍵字
+
+    Returns:
+        Optional[str]: MATCH 查詢字串，無有效詞彙時回傳 None
+    """
+    if not keyword:
+        return None
+    if _PHONE_PATTERN.match(keyword.strip()):
+        keyword = _digits_only(keyword)
+
+    terms = []
+    for run in _TOKEN_PATTERN.findall(keyword.lower()):
+        if _CJK_RUN.match(run):
+            if len(run) == 1:
+                terms.append(f'"{run}"')
+            else:
+                terms.extend(f'"{run[i:i + 2]}"' for i in range(len(run) - 1))
+        else:
+            terms.append(f'"{run}"*')
+
+    if not terms:
+        return None
+    return ' AND '.join(dict.fromkeys(terms))
+
+
+def is_code_like(keyword: Optional[str]) -> bool:
+    """關鍵字是否為單一英數代碼（需要字中片段比對）"""
+    return bool(keyword) and bool(_CODE_PATTERN.match(keyword.strip()))
+
+
+def _digits_only(value: Optional[str]) -> Optional[str]:
+    """電話號碼移除分隔符號，讓 0912345678 與 0912-345-678 都能命中"""
+    if not value:
+        return value
+    return re.sub(r'\D', '', value)
+
+
+# 各實體的索引定義：欄位名稱 → (取值函式, bm25 權重)
+_INDEX_SPECS: Dict[type, Dict[str, Any]] = {
+    Client: {
+        'table': 'client_search_index',
+        'fields': {
+            'name': (lambda c: ' '.join(filter(None, [c.name, c.short_name, c.invoice_title])), 10.0),
+            'address': (lambda c: c.address, 4.0),
+            'client_code': (lambda c: c.client_code, 8.0),
+            'contact': (lambda c: c.contact_person, 2.0),
+        },
+        'source_sql': (
+            "SELECT id, name, short_name, invoice_title, address, client_code, contact_person "
+            "FROM clients"
+        ),
+        'ilike_columns': lambda: [Client.name, Client.short_name, Client.invoice_title,
+                                  Client.address, Client.client_code, Client.contact_person],
+    },
+    Driver: {
+        'table': 'driver_search_index',
+        'fields': {
+            'name': (lambda d: d.name, 10.0),
+            'employee_id': (lambda d: d.employee_id, 8.0),
+            'phone': (lambda d: _digits_only(d.phone), 4.0),
+        },
+        'source_sql': "SELECT id, name, employee_id, phone FROM drivers",
+        'ilike_columns': lambda: [Driver.name, Driver.employee_id, Driver.phone],
+    },
+}
+
+# PostgreSQL 三元組索引（欄位會以 ILIKE '%kw%' 查詢）
+_TRGM_INDEXES = [
+    ('idx_clients_name_trgm', 'clients', 'name'),
+    ('idx_clients_short_name_trgm', 'clients', 'short_name'),
+    ('idx_clients_invoice_title_trgm', 'clients', 'invoice_title'),
+    ('idx_clients_address_trgm', 'clients', 'address'),
+    ('idx_clients_client_code_trgm', 'clients', 'client_code'),
+    ('idx_clients_contact_person_trgm', 'clients', 'contact_person'),
+    ('idx_drivers_name_trgm', 'drivers', 'name'),
+    ('idx_drivers_employee_id_trgm', 'drivers', 'employee_id'),
+    ('idx_drivers_phone_trgm', 'drivers', 'phone'),
+]
+
+
+class _Row:
+    """以欄位名稱存取原始查詢結果，讓重建索引可共用取值函式"""
+
+    def __init__(self, mapping):
+        self.__dict__.update(mapping)
+
+
+class SearchIndex:
+    """客戶與司機關鍵字搜尋索引"""
+
+    def __init__(self):
+        self.dialect: Optional[str] = None
+        self._fts_engines = set()
+        self._listeners_registered = False
+
+    # 安裝
+    def install(self, engine: Engine):
+        """
+        建立搜尋索引結構並註冊寫入同步
+
+        Args:
+            engine: SQLAlchemy 引擎
+        """
+        self.dialect = engine.dialect.name
+
+        try:
+            if self.dialect == 'sqlite':
+                self._install_fts(engine)
+            elif self.dialect == 'postgresql':
+                self._install_trgm(engine)
+        except (OperationalError, ProgrammingError) as e:
+            # FTS5 / pg_trgm 不可用時退回 ILIKE 掃描
+            logger.warning(f"Search index unavailable, falling back to ILIKE: {e}")
+
+    def _install_fts(self, engine: Engine):
+        """建立 FTS5 虛擬表，空表時回填既有資料"""
+        with engine.begin() as conn:
+            for spec in _INDEX_SPECS.values():
+                columns = ', '.join(spec['fields'].keys())
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {spec['table']} "
+                    f"USING fts5({columns}, tokenize='unicode61')"
+                ))
+
+        self._fts_engines.add(engine)
+        self._register_listeners()
+
+        for model, spec in _INDEX_SPECS.items():
+            with engine.connect() as conn:
+                indexed = conn.execute(text(f"SELECT count(*) FROM {spec['table']}")).scalar()
+            if not indexed:
+                self.rebuild(engine, model)
+
+    def _install_trgm(self, engine: Engine):
+        """建立 pg_trgm GIN 索引"""
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            for index_name, table_name, column_name in _TRGM_INDEXES:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {index_name} "
+                    f"ON {table_name} USING gin ({column_name} gin_trgm_ops)"
+                ))
+        logger.info("pg_trgm search indexes ready")
+
+    def rebuild(self, engine: Engine, model: type) -> int:
+        """
+        由來源資料表重建 FTS 索引
+
+        Args:
+            engine: SQLAlchemy 引擎
+            model: Client 或 Driver
+
+        Returns:
+            int: 已索引筆數
+        """
+        spec = _INDEX_SPECS[model]
+        with engine.begin() as conn:
+            conn.execute(text(f"DELETE FROM {spec['table']}"))
+            rows = conn.execute(text(spec['source_sql'])).mappings().all()
+            for row in rows:
+                self._write_row(conn, spec, row['id'], _Row(row))
+
+        logger.info(f"Rebuilt {spec['table']}: {len(rows)} rows")
+        return len(rows)
+
+    # 寫入同步
+    def _register_listeners(self):
+        """於 ORM flush 時同步索引（同一交易內完成）"""
+        if self._listeners_registered:
+            return
+
+        for model in _INDEX_SPECS:
+            event.listen(model, 'after_insert', self._on_upsert)
+            event.listen(model, 'after_update', self._on_upsert)
+            event.listen(model, 'after_delete', self._on_delete)
+        self._listeners_registered = True
+
+    def _on_upsert(self, mapper, connection, target):
+        if connection.engine not in self._fts_engines:
+            return
+        spec = _INDEX_SPECS[mapper.class_]
+        connection.execute(text(f"DELETE FROM {spec['table']} WHERE rowid = :id"), {'id': target.id})
+        self._write_row(connection, spec, target.id, target)
+
+    def _on_delete(self, mapper, connection, target):
+        if connection.engine not in self._fts_engines:
+            return
+        spec = _INDEX_SPECS[mapper.class_]
+        connection.execute(text(f"DELETE FROM {spec['table']} WHERE rowid = :id"), {'id': target.id})
+
+    def _write_row(self, connection, spec: Dict[str, Any], row_id: int, source: Any):
+        values = {'rowid': row_id}
+        for field_name, (extract, _) in spec['fields'].items():
+            values[field_name] = ' '.join(segment_text(extract(source)))
+
+        columns = ', '.join(values.keys())
+        params = ', '.join(f':{name}' for name in values.keys())
+        connection.execute(
+            text(f"INSERT INTO {spec['table']} ({columns}) VALUES ({params})"),
+            values
+        )
+
+    # 查詢
+    def uses_fts(self, db: Session) -> bool:
+        """目前 Session 綁定的引擎是否已建立 FTS 索引"""
+        return db.get_bind() in self._fts_engines
+
+    def filter_clause(self, db: Session, model: type, keyword: str):
+        """
+        取得關鍵字篩選條件
+
+        Args:
+            db: 資料庫 Session
+            model: Client 或 Driver
+            keyword: 搜尋關鍵字
+
+        Returns:
+            SQLAlchemy 篩選條件
+        """
+        spec = _INDEX_SPECS[model]
+
+        if self.uses_fts(db):
+            expression = build_match_expression(keyword)
+            if expression:
+                matches = text(
+                    f"SELECT rowid FROM {spec['table']} WHERE {spec['table']} MATCH :expression"
+                ).bindparams(expression=expression).columns(column('rowid', Integer))
+                if is_code_like(keyword):
+                    # 代碼片段（1001 → C1001）不在詞首，補上 ILIKE 比對
+                    return or_(model.id.in_(matches), self._ilike_clause(spec, keyword))
+                return model.id.in_(matches)
+
+        # PostgreSQL 由 pg_trgm 索引加速；其他資料庫維持 ILIKE
+        return self._ilike_clause(spec, keyword)
+
+    def _ilike_clause(self, spec: Dict[str, Any], keyword: str):
+        pattern = f"%{keyword.strip()}%"
+        return or_(*[col.ilike(pattern) for col in spec['ilike_columns']()])
+
+    def rank(self, db: Session, model: type, keyword: str, limit: int = 10) -> List[Tuple[int, float]]:
+        """
+        依相關度排序取得符合的資料 ID
+
+        Args:
+            db: 資料庫 Session
+            model: Client 或 Driver
+            keyword: 搜尋關鍵字
+            limit: 最多回傳筆數
+
+        Returns:
+            List[Tuple[int, float]]: (ID, 相關度分數)，分數越高越相關
+        """
+        spec = _INDEX_SPECS[model]
+
+        if self.uses_fts(db):
+            expression = build_match_expression(keyword)
+            if not expression:
+                return []
+            weights = ', '.join(str(weight) for _, weight in spec['fields'].values())
+            rows = db.execute(
+                text(
+                    f"SELECT rowid, bm25({spec['table']}, {weights}) AS score "
+                    f"FROM {spec['table']} WHERE {spec['table']} MATCH :expression "
+                    f"ORDER BY score LIMIT :limit"
+                ),
+                {'expression': expression, 'limit': limit}
+            ).all()
+            # bm25 越小越相關，轉為正向分數
+            ranked = [(row_id, -score) for row_id, score in rows]
+            if is_code_like(keyword) and len(ranked) < limit:
+                # 字中片段命中的代碼排在詞首命中之後
+                found = [row_id for row_id, _ in ranked]
+                extra = db.query(model.id).filter(
+                    self._ilike_clause(spec, keyword), model.id.notin_(found)
+                ).order_by(model.id).limit(limit - len(ranked)).all()
+                ranked.extend((row_id, 0.0) for (row_id,) in extra)
+            return ranked
+
+        columns = spec['ilike_columns']()
+        query = db.query(model.id).filter(self.filter_clause(db, model, keyword))
+
+        if self.dialect == 'postgresql':
+            score = func.greatest(*[func.similarity(func.coalesce(col, ''), keyword) for col in columns])
+            rows = query.add_columns(score.label('score')).order_by(score.desc()).limit(limit).all()
+            return [(row_id, float(row_score)) for row_id, row_score in rows]
+
+        return [(row_id, 0.0) for (row_id,) in query.limit(limit).all()]
+
+
+# 全域搜尋索引實例
+search_index = SearchIndex()
@@ -0,0 +1,251 @@
+"""
+Travel time profiles
+Learns time-of-day travel times from completed deliveries (the gaps
+between a driver's consecutive actual_delivery_time stamps) into a
+common.scheduling.TravelTimeProfile, saves it to disk and rebuilds it every
+night, so planning only ever reads the precomputed profile
+
+With several API workers one of them (holding a lock file next to the
+profile) rebuilds it; the others reload the saved file once it changes
+"""
+import asyncio
+import logging
+import os
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import IO, Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from common.scheduling.travel_profile import TravelObservation, TravelTimeProfile
+from common.time_utils import calculate_service_time
+from models.database_schema import Client, Delivery, DeliveryStatus
+
+try:
+    import fcntl
+except ImportError:  # Windows: 無檔案鎖，每個程序各自重新計算
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+MAX_LEG_MINUTES = 180  # 更長的間隔視為休息，不是行車
+BREAK_FACTOR = 3  # 超過預估行車時間 3 倍 + 30 分鐘也視為休息
+
+
+def load_travel_observations(session: Session, since: date, until: date) -> List[TravelObservation]:
+    """
+    載入歷史行車紀錄
+
+    相鄰兩筆完成配送（同司機同日）的 actual_delivery_time 間隔，扣除第二站
+    的預估服務時間即為行車時間；有預估時間（estimated_duration_minutes）
+    時，遠超過預估的間隔視為休息而略過
+
+    Args:
+        session: 資料庫 Session
+        since: 起始配送日期
+        until: 結束配送日期（含）
+
+    Returns:
+        TravelObservation 列表
+    """
+    rows = session.query(
+        Delivery.driver_id, Delivery.scheduled_date, Delivery.actual_delivery_time,
+        Delivery.estimated_duration_minutes, Client.latitude, Client.longitude, Client.client_type
+    ).join(Client, Delivery.client_id == Client.id).filter(
+        Delivery.status == DeliveryStatus.COMPLETED,
+        Delivery.actual_delivery_time.isnot(None),
+        Delivery.driver_id.isnot(None),
+        Delivery.scheduled_date >= since,
+        Delivery.scheduled_date <= until
+    ).order_by(Delivery.driver_id, Delivery.scheduled_date, Delivery.actual_delivery_time)
+
+    observations = []
+    previous = None
+    for driver_id, day, delivered_at, planned, lat, lng, client_type in rows:
+        here = (lat, lng) if lat is not None and lng is not None else None
+        if previous and previous[:2] == (driver_id, day) and previous[3] and here:
+            service = calculate_service_time(
+                "20kg", 1, "commercial" if client_type == "business" else "residential"
+            )
+            minutes = (delivered_at - previous[2]).total_seconds() / 60 - service
+            limit = min(MAX_LEG_MINUTES, BREAK_FACTOR * planned + 30) if planned else MAX_LEG_MINUTES
+            if 0 < minutes <= limit:
+                departed = previous[2]
+                observations.append(TravelObservation(
+                    origin=previous[3],
+                    destination=here,
+                    departure=departed.hour * 60 + departed.minute,
+                    minutes=minutes
+                ))
+        previous = (driver_id, day, delivered_at, here)
+
+    logger.info(f"Loaded {len(observations)} observed legs from {since} to {until}")
+    return observations
+
+
+def build_travel_profile(
+    session: Session,
+    history_days: int = 90,
+    today: Optional[date] = None,
+    default_speed_kmh: float = 30.0
+) -> TravelTimeProfile:
+    """
+    由最近的配送紀錄計算行車時間模型
+
+    Args:
+        session: 資料庫 Session
+        history_days: 使用最近幾天的紀錄
+        today: 基準日（預設今天，不含當天）
+        default_speed_kmh: 沒有紀錄時的速度
+
+    Returns:
+        TravelTimeProfile
+    """
+    today = today or date.today()
+    observations = load_travel_observations(session, today - timedelta(days=history_days), today - timedelta(days=1))
+    return TravelTimeProfile.fit(observations, default_speed_kmh=default_speed_kmh)
+
+
+class TravelProfileStore:
+    """目前使用中的行車時間模型（規劃只讀取，不等待重新計算）"""
+
+    def __init__(self):
+        self._profile: Optional[TravelTimeProfile] = None
+        self._lock = threading.Lock()
+        self.version = 0  # 每次更換模型遞增，快取以此判斷是否過期
+
+    def current(self) -> Optional[TravelTimeProfile]:
+        return self._profile
+
+    def _set(self, profile: Optional[TravelTimeProfile]):
+        with self._lock:
+            self._profile = profile
+            self.version += 1
+
+    def load(self, path) -> Optional[TravelTimeProfile]:
+        """載入已儲存的模型；檔案不存在時維持現狀"""
+        if not path or not Path(path).exists():
+            return self._profile
+        self._set(TravelTimeProfile.load(path))
+        logger.info(f"Loaded travel profile from {path}")
+        return self._profile
+
+    def refresh(self, session: Session, path=None, history_days: int = 90,
+                today: Optional[date] = None) -> TravelTimeProfile:
+        """重新計算、儲存（先寫各自的暫存檔再替換）並啟用新模型"""
+        profile = build_travel_profile(session, history_days, today)
+        if path:
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temporary = tempfile.mkstemp(dir=path.parent, prefix=f"{path.stem}.", suffix=".tmp.npz")
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    profile.save(file)
+                os.replace(temporary, path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+        self._set(profile)
+        return profile
+
+    def clear(self):
+        self._set(None)
+
+
+# 全域行車時間模型
+travel_profiles = TravelProfileStore()
+
+
+def seconds_until(hour: int, now: Optional[datetime] = None) -> float:
+    """距離下一次 hour 點整的秒數"""
+    now = now or datetime.now()
+    target = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def acquire_refresh_lock(path) -> Optional[IO]:
+    """
+    取得模型重新計算的檔案鎖（不等待）
+
+    Args:
+        path: 模型檔路徑；鎖檔為同目錄的 <檔名>.lock
+
+    Returns:
+        持有鎖的開啟檔案（關閉即釋放）；其他程序持有時為 None
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock = open(path.with_name(f"{path.name}.lock"), "a")
+    if fcntl is None:
+        return lock
+    try:
+        fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock.close()
+        return None
+    return lock
+
+
+def _modified_at(path) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+async def refresh_nightly(
+    session_factory: Callable[[], Session],
+    path=None,
+    hour: int = 2,
+    history_days: int = 90,
+    poll_seconds: float = 300.0
+):
+    """
+    每晚 hour 點重新計算行車時間模型（在 worker thread 執行，不阻塞事件迴圈）
+
+    多個 worker 時只有取得檔案鎖的一個重新計算，其他每 poll_seconds 檢查
+    模型檔，有更新時重新載入；持有者結束後由下一個取得鎖的 worker 接手
+
+    Args:
+        session_factory: 建立資料庫 Session
+        path: 模型檔路徑（None: 不儲存，各 worker 自行計算）
+        hour: 執行時間（整點）
+        history_days: 使用最近幾天的紀錄
+        poll_seconds: 非負責的 worker 檢查模型檔的間隔
+    """
+    def run():
+        session = session_factory()
+        try:
+            travel_profiles.refresh(session, path, history_days)
+        finally:
+            session.close()
+
+    lock = None
+    loaded_at = _modified_at(path) if path else None
+    try:
+        while True:
+            if path and lock is None:
+                lock = acquire_refresh_lock(path)
+            if path and lock is None:
+                await asyncio.sleep(poll_seconds)
+                modified_at = _modified_at(path)
+                if modified_at is not None and modified_at != loaded_at:
+                    try:
+                        await asyncio.to_thread(travel_profiles.load, path)
+                        loaded_at = modified_at
+                    except Exception as e:
+                        logger.error(f"Travel profile reload failed: {e}")
+                continue
+            await asyncio.sleep(seconds_until(hour))
+            try:
+                await asyncio.to_thread(run)
+                loaded_at = _modified_at(path) if path else None
+            except Exception as e:
+                logger.error(f"Travel profile refresh failed: {e}")
+    finally:
+        if lock is not None:
+            lock.close()
@@ -2222,7 +2222,7 @@ async function handleSchedulingFormSubmit(e) {
             }
         },
         algorithm: { required: true, type: 'name' },
-        time_limit_seconds: { required: true, type: 'quantity', options: { min: 1, max: 300 } },
+        time_limit_seconds: { required: true, type: 'quantity', options: { min: 1, max: 60 } },
         travel_speed_kmh: { required: true, type: 'quantity', options: { min: 10, max: 100 } },
         max_deliveries_per_route: { required: true, type: 'quantity', options: { min: 1, max: 100 } },
         min_deliveries_per_route: { required: true, type: 'quantity', options: { min: 1, max: 50 } }
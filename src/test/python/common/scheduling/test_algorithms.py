@@ -8,7 +8,7 @@ from src.main.python.common.scheduling.algorithms import (
 )
 from src.main.python.common.scheduling.models import (
     DeliveryRequest, DriverAvailability, SchedulingParameters,
-    OptimizationObjective
+    OptimizationObjective, DEFAULT_MAX_ITERATIONS
 )
 from src.main.python.common.scheduling.constraints import (
     TimeWindowConstraint, MaxDeliveriesConstraint,
@@ -324,6 +324,99 @@ class TestSchedulingAlgorithms(unittest.TestCase):
             scheduler.initial_temperature
         )
     
+    def test_simulated_annealing_uses_budget(self):
+        """Annealing runs to the iteration budget and records a trace."""
+        scheduler = SimulatedAnnealingScheduler(adapt_window=20, restart_windows=3)
+        parameters = SchedulingParameters(
+            date=self.test_date,
+            optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE],
+            max_iterations=400,
+            time_limit_seconds=30
+        )
+        
+        result = scheduler.schedule(self.complex_requests, self.drivers, parameters, [])
+        
+        self.assertEqual(result.metrics['iterations'], 400)
+        self.assertLessEqual(result.metrics['initial_temperature'], scheduler.initial_temperature)
+        self.assertEqual(len(result.metrics['trace']), 400 // 20)
+        self.assertEqual(result.metrics['trace'][-1]['best_score'], result.optimization_score)
+        self.assertGreaterEqual(result.metrics['restarts'], 0)
+    
+    def test_simulated_annealing_runs_to_time_limit(self):
+        """Without max_iterations the time limit alone ends the run."""
+        scheduler = SimulatedAnnealingScheduler(adapt_window=20)
+        parameters = SchedulingParameters(
+            date=self.test_date,
+            optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE],
+            time_limit_seconds=1
+        )
+        
+        result = scheduler.schedule(self.complex_requests, self.drivers, parameters, [])
+        
+        self.assertIsNone(parameters.max_iterations)
+        self.assertGreater(result.metrics['iterations'], DEFAULT_MAX_ITERATIONS)
+        self.assertGreaterEqual(result.computation_time, 1.0)
+    
+    def test_progress_callback_stops_early(self):
+        """Returning True from the progress callback ends the run with the incumbent."""
+        for scheduler in (GeneticScheduler(population_size=10, generations=50),
+                          SimulatedAnnealingScheduler(adapt_window=20)):
+            reports = []
+            
+            def stop_on_second(progress):
+                reports.append(progress)
+                return len(reports) >= 2
+            
+            result = scheduler.schedule(
+                self.complex_requests, self.drivers, self.parameters, [], stop_on_second
+            )
+            
+            self.assertTrue(result.success)
+            self.assertTrue(result.metrics['stopped_early'])
+            self.assertEqual(len(reports), 2)
+            self.assertEqual(reports[-1].algorithm, scheduler.name)
+            self.assertEqual(reports[-1].scheduled, len(reports[-1].schedule))
+            self.assertEqual(reports[-1].scheduled + reports[-1].unscheduled,
+                             len(self.complex_requests))
+    
+    def test_simulated_annealing_neighbor_copy_on_write(self):
+        """Neighbor generation never mutates the current solution's entries."""
+        scheduler = SimulatedAnnealingScheduler()
+        current = GreedyScheduler().schedule(
+            self.complex_requests, self.drivers, self.parameters, []
+        ).schedule
+        snapshot = [(e.driver_id, e.time_slot.start_time, e.time_slot.end_time) for e in current]
+        
+        for _ in range(200):
+            neighbor = scheduler._generate_neighbor(current, self.complex_requests)
+            self.assertEqual(len(neighbor), len(current))
+        
+        self.assertEqual(
+            [(e.driver_id, e.time_slot.start_time, e.time_slot.end_time) for e in current],
+            snapshot
+        )
+        # Slotted entries carry no per-instance __dict__
+        self.assertFalse(hasattr(current[0], '__dict__'))
+    
+    def test_schedule_move_apply_and_undo(self):
+        """Undoing a proposed move restores the exact original entries."""
+        scheduler = SimulatedAnnealingScheduler()
+        current = GreedyScheduler().schedule(
+            self.complex_requests, self.drivers, self.parameters, []
+        ).schedule
+        original = list(current)
+        drivers = sorted(set(e.driver_id for e in current))
+        
+        for _ in range(200):
+            move = scheduler._propose_move(current, drivers)
+            if move is None:
+                continue
+            move.apply(current)
+            changed = [i for i in range(len(current)) if current[i] is not original[i]]
+            self.assertEqual(changed, sorted(index for index, _, _ in move.changes))
+            move.undo(current)
+            self.assertTrue(all(a is b for a, b in zip(current, original)))
+    
     def test_algorithm_constraint_handling(self):
         """Test that algorithms respect constraints."""
         # Create tight constraint
@@ -0,0 +1,118 @@
+"""Unit tests for indexed conflict resolution."""
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from src.main.python.common.time_utils import ScheduleEntry, TimeSlot, detect_conflicts
+from src.main.python.common.scheduling import conflicts as conflicts_module
+from src.main.python.common.scheduling.conflicts import ConflictResolver, ScheduleIndex
+from src.main.python.common.scheduling.models import DeliveryRequest, DriverAvailability
+
+
+class TestConflictResolver(unittest.TestCase):
+    """Test ScheduleIndex and ConflictResolver."""
+
+    def setUp(self):
+        """Set up an overlapping schedule for two drivers."""
+        self.base_date = datetime(2024, 1, 15)
+        self.schedule = []
+        self.requests = {}
+
+        # Driver 10 gets every delivery, each starting 20 minutes after the last
+        for i in range(6):
+            start = self.base_date.replace(hour=9) + timedelta(minutes=20 * i)
+            self.schedule.append(ScheduleEntry(
+                delivery_id=i + 1,
+                client_id=100 + i,
+                driver_id=10,
+                vehicle_id=1,
+                time_slot=TimeSlot(start_time=start, end_time=start + timedelta(minutes=30)),
+                service_duration=30,
+                location=(25.0330, 121.5654)
+            ))
+            self.requests[i + 1] = DeliveryRequest(
+                delivery_id=i + 1,
+                client_id=100 + i,
+                location=(25.0330, 121.5654),
+                time_windows=[(self.base_date.replace(hour=8), self.base_date.replace(hour=17))],
+                service_duration=30,
+                cylinder_type="20kg",
+                quantity=1
+            )
+
+        self.schedule.append(ScheduleEntry(
+            delivery_id=99,
+            client_id=199,
+            driver_id=11,
+            vehicle_id=2,
+            time_slot=TimeSlot(
+                start_time=self.base_date.replace(hour=15),
+                end_time=self.base_date.replace(hour=15, minute=30)
+            ),
+            service_duration=30,
+            location=(25.0478, 121.5170)
+        ))
+
+        self.drivers = {
+            driver_id: DriverAvailability(
+                driver_id=driver_id,
+                employee_id=f"D{driver_id}",
+                name=f"Driver {driver_id}",
+                available_hours=[(self.base_date.replace(hour=8), self.base_date.replace(hour=18))]
+            )
+            for driver_id in (10, 11)
+        }
+
+    def test_index_keeps_driver_timelines_sorted(self):
+        """Moves update timelines, loads and neighbours."""
+        index = ScheduleIndex(self.schedule)
+
+        new_start = self.base_date.replace(hour=16)
+        index.move(1, time_slot=TimeSlot(new_start, new_start + timedelta(minutes=30)), driver_id=11)
+
+        self.assertEqual(index.driver_loads[10], 5)
+        self.assertEqual(index.driver_loads[11], 2)
+        previous, following = index.neighbours(1)
+        self.assertEqual(previous.delivery_id, 99)
+        self.assertIsNone(following)
+
+        starts = [start for start, _ in index.timelines[10]]
+        self.assertEqual(starts, sorted(starts))
+        self.assertTrue(index.has_overlap(10, self.schedule[2].time_slot, exclude_delivery_id=2))
+
+    def test_conflict_persists_matches_full_detection(self):
+        """Neighbour re-check agrees with a full detect_conflicts pass."""
+        index = ScheduleIndex(self.schedule)
+        original = detect_conflicts(self.schedule)
+        self.assertTrue(original)
+
+        for conflict in original:
+            self.assertTrue(index.conflict_persists(conflict))
+
+        # Spread driver 10's deliveries out so nothing overlaps any more
+        for i in range(1, 7):
+            start = self.base_date.replace(hour=8) + timedelta(hours=i)
+            index.move(i, time_slot=TimeSlot(start, start + timedelta(minutes=30)))
+
+        self.assertEqual(detect_conflicts(self.schedule), [])
+        for conflict in original:
+            self.assertFalse(index.conflict_persists(conflict))
+
+    def test_resolve_conflicts_without_full_redetection(self):
+        """Resolution never re-runs detection over the whole schedule."""
+        resolver = ConflictResolver(self.requests, self.drivers)
+        found = detect_conflicts(self.schedule)
+
+        with mock.patch.object(conflicts_module, "check_consecutive_entries",
+                               wraps=conflicts_module.check_consecutive_entries) as checker:
+            schedule, remaining = resolver.resolve_conflicts(self.schedule, found)
+
+        self.assertEqual(len(schedule), len(self.schedule))
+        self.assertLess(len(remaining), len(found))
+        # At most one neighbour pair check per resolution attempt
+        self.assertLessEqual(checker.call_count, len(found) * 10)
+        self.assertFalse(hasattr(conflicts_module, "detect_conflicts"))
+
+
+if __name__ == '__main__':
+    unittest.main()
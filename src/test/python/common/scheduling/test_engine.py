@@ -188,6 +188,31 @@ class TestSchedulingEngine(unittest.TestCase):
         self.assertEqual(result.algorithm_used, "Simulated Annealing Scheduler")
         self.assertIn('iterations', result.metrics)
     
+    def test_progress_converts_each_incumbent_once(self):
+        """Reports carry datetime schedules; unchanged incumbents are not converted again."""
+        parameters = SchedulingParameters(
+            date=self.test_date,
+            optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE],
+            max_iterations=2000,
+            time_limit_seconds=10
+        )
+        reports = []
+        
+        self.engine.generate_schedule(
+            self.delivery_requests,
+            self.driver_availability,
+            self.vehicles,
+            parameters,
+            algorithm='simulated_annealing',
+            progress_callback=reports.append
+        )
+        
+        self.assertTrue(any(not progress.improved for progress in reports))
+        for previous, progress in zip(reports, reports[1:]):
+            self.assertTrue(all(isinstance(entry.time_slot.start_time, datetime) for entry in progress.schedule))
+            if not progress.improved:
+                self.assertTrue(all(a is b for a, b in zip(previous.schedule, progress.schedule)))
+    
     def test_optimize_existing_schedule(self):
         """Test optimizing an existing schedule."""
         # Create existing schedule
@@ -222,7 +247,8 @@ class TestSchedulingEngine(unittest.TestCase):
         
         parameters = SchedulingParameters(
             date=self.test_date,
-            optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE]
+            optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE],
+            time_limit_seconds=2
         )
         
         result = self.engine.optimize_existing_schedule(
@@ -0,0 +1,112 @@
+"""Unit tests for the fused constraint evaluator."""
+import unittest
+import random
+from datetime import datetime, timedelta
+
+from src.main.python.common.time_utils import ScheduleEntry, TimeSlot, SchedulingConstraint
+from src.main.python.common.scheduling.constraints import (
+    TimeWindowConstraint,
+    CapacityConstraint,
+    DriverAvailabilityConstraint,
+    TravelTimeConstraint,
+    MaxDeliveriesConstraint,
+    WorkingHoursConstraint,
+    GeographicClusteringConstraint
+)
+from src.main.python.common.scheduling.evaluator import ConstraintEvaluator
+
+
+class AlwaysViolated(SchedulingConstraint):
+    """Custom constraint the evaluator does not know how to compile."""
+
+    def __init__(self):
+        super().__init__(name="Always Violated", is_hard=True, weight=3.0)
+        self.calls = 0
+
+    def check(self, schedule):
+        self.calls += 1
+        return False, "always"
+
+
+class TestConstraintEvaluator(unittest.TestCase):
+    """Test ConstraintEvaluator against the individual constraints."""
+
+    def setUp(self):
+        """Set up constraints over a Taitung-sized problem."""
+        self.rng = random.Random(7)
+        self.base_date = datetime(2024, 1, 15)
+        morning = (self.base_date.replace(hour=8), self.base_date.replace(hour=12))
+        afternoon = (self.base_date.replace(hour=13), self.base_date.replace(hour=18))
+
+        self.constraints = [
+            TimeWindowConstraint({100 + c: [morning, afternoon] for c in range(40)}),
+            DriverAvailabilityConstraint({d: [(morning[0], afternoon[0])] for d in range(4)}),
+            TravelTimeConstraint(min_buffer_minutes=5, speed_kmh=30.0),
+            MaxDeliveriesConstraint({1: 5}, default_max=20),
+            WorkingHoursConstraint(max_hours_per_day=8.0),
+            CapacityConstraint(
+                {v: {"20kg": 40, "16kg": 20} for v in range(5)},
+                {i: (self.rng.choice(["20kg", "16kg"]), self.rng.randint(1, 4)) for i in range(200)}
+            ),
+            GeographicClusteringConstraint(max_distance_between_deliveries=15.0)
+        ]
+
+    def random_schedule(self, size: int, drivers: int) -> list:
+        """Random schedule, some entries without a location."""
+        schedule = []
+        for i in range(size):
+            start = self.base_date.replace(hour=8) + timedelta(minutes=self.rng.randrange(0, 600))
+            location = None if self.rng.random() < 0.1 else (
+                22.7553 + self.rng.uniform(-0.1, 0.1), 121.1504 + self.rng.uniform(-0.1, 0.1)
+            )
+            schedule.append(ScheduleEntry(
+                delivery_id=i,
+                client_id=100 + i % 50,
+                driver_id=self.rng.randrange(drivers),
+                vehicle_id=self.rng.randrange(6),
+                time_slot=TimeSlot(start_time=start, end_time=start + timedelta(minutes=30)),
+                service_duration=self.rng.choice([15, 30, 45]),
+                location=location
+            ))
+        return schedule
+
+    def test_costs_match_individual_constraints(self):
+        """Fused costs equal each constraint's own cost()."""
+        evaluator = ConstraintEvaluator(self.constraints)
+
+        for size in (0, 1, 2, 10, 60, 200):
+            for _ in range(10):
+                schedule = self.random_schedule(size, drivers=self.rng.choice([1, 3, 6]))
+                costs = evaluator.costs(schedule)
+
+                for constraint in self.constraints:
+                    self.assertAlmostEqual(costs[constraint.name], constraint.cost(schedule), places=9)
+                self.assertAlmostEqual(
+                    evaluator.cost(schedule), sum(c.cost(schedule) for c in self.constraints), places=9
+                )
+
+    def test_check_builds_messages_only_when_asked(self):
+        """Messages come from the violated constraints on request."""
+        evaluator = ConstraintEvaluator(self.constraints)
+        schedule = self.random_schedule(120, drivers=2)
+
+        satisfied, messages = evaluator.check(schedule)
+        expected = all(c.check(schedule)[0] for c in self.constraints if c.is_hard)
+        self.assertEqual(satisfied, expected)
+        self.assertEqual(messages, [])
+
+        satisfied, messages = evaluator.check(schedule, with_messages=True)
+        self.assertFalse(satisfied)
+        self.assertTrue(any(m.startswith("Time Window Constraint: ") for m in messages))
+
+    def test_unknown_constraints_fall_back_to_cost(self):
+        """Custom constraints are still evaluated through their own cost()."""
+        custom = AlwaysViolated()
+        evaluator = ConstraintEvaluator([custom])
+
+        self.assertEqual(evaluator.cost(self.random_schedule(5, drivers=1)), 3.0)
+        self.assertEqual(custom.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
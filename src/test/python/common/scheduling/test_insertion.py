@@ -0,0 +1,189 @@
+"""Unit tests for same-day insertion into existing routes."""
+import random
+import unittest
+from datetime import datetime, date
+
+from src.main.python.common.scheduling.insertion import InsertionPlanner
+from src.main.python.common.scheduling.engine import SchedulingEngine
+from src.main.python.common.scheduling.models import (
+    DeliveryRequest, DriverAvailability, VehicleInfo,
+    SchedulingParameters, OptimizationObjective
+)
+from src.main.python.common.scheduling.ortools_scheduler import haversine_travel_matrix
+
+DEPOT = (22.7553, 121.1504)
+
+
+def request(delivery_id, location, window=(480, 1020), cylinder_type="20kg", quantity=1):
+    return DeliveryRequest(
+        delivery_id=delivery_id,
+        client_id=100 + delivery_id,
+        location=location,
+        time_windows=[window],
+        service_duration=10,
+        cylinder_type=cylinder_type,
+        quantity=quantity
+    )
+
+
+class TestInsertionPlanner(unittest.TestCase):
+    """Test ranking and applying insertions of new deliveries."""
+
+    def setUp(self):
+        """Two drivers: one heading north, one heading east of the depot."""
+        self.parameters = SchedulingParameters(
+            date=date(2024, 1, 15),
+            optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE]
+        )
+        self.drivers = [
+            DriverAvailability(
+                driver_id=10 + d,
+                employee_id=f"EMP00{d}",
+                name=f"Driver {d}",
+                available_hours=[(480, 1080)],
+                current_location=DEPOT,
+                vehicle_id=d + 1,
+                vehicle_capacity={"20kg": 10}
+            )
+            for d in range(2)
+        ]
+        self.routes = {
+            10: [request(k + 1, (DEPOT[0] + 0.01 * (k + 1), DEPOT[1])) for k in range(4)],
+            11: [request(k + 11, (DEPOT[0], DEPOT[1] + 0.01 * (k + 1))) for k in range(4)]
+        }
+
+    def planner(self, **kwargs):
+        return InsertionPlanner(self.drivers, self.routes, self.parameters, **kwargs)
+
+    def test_ranks_cheapest_position_first(self):
+        """A stop next to the northbound stops goes on the northbound route."""
+        new = request(99, (DEPOT[0] + 0.025, DEPOT[1] + 0.001))
+
+        options = self.planner().rank([new])[99]
+
+        self.assertEqual(len(options), 5)
+        self.assertEqual(options[0].driver_id, 10)
+        self.assertIn(options[0].position, (2, 4))  # Between stops 2 and 3, or on the way back
+        self.assertLess(options[0].detour_km, 0.5)
+        self.assertEqual([o.detour_km for o in options], sorted(o.detour_km for o in options))
+
+    def test_time_window_and_capacity_limit_positions(self):
+        """Late windows push the stop back; a full vehicle gets no options."""
+        self.drivers[0].vehicle_capacity = {"20kg": 4}
+        new = request(99, (DEPOT[0] + 0.025, DEPOT[1]), window=(900, 960))
+
+        options = self.planner().rank([new], limit=20)[99]
+
+        self.assertTrue(options)
+        self.assertTrue(all(o.driver_id == 11 for o in options))
+        for option in options:
+            self.assertGreaterEqual(option.service_start, 900)
+            self.assertLessEqual(option.service_start, 950)
+        self.assertEqual(self.planner().rank([request(98, DEPOT, window=(470, 475))])[98], [])
+
+    def test_apply_shifts_later_stops(self):
+        """Applying an option inserts the stop and delays the rest of the route."""
+        planner = self.planner()
+        before = {e.delivery_id: e.time_slot.start_time for e in planner.route_schedule(10)}
+        new = request(99, (DEPOT[0] + 0.015, DEPOT[1] + 0.004))
+        best = planner.rank([new])[99][0]
+
+        schedule = planner.apply(99, best.driver_id, best.position)
+
+        order = [1, 2, 3, 4]
+        order.insert(best.position, 99)
+        self.assertEqual([e.delivery_id for e in schedule], order)
+        self.assertEqual(schedule[best.position].time_slot.start_time, best.service_start)
+        for entry in schedule[:best.position]:
+            self.assertEqual(entry.time_slot.start_time, before[entry.delivery_id])
+        for entry in schedule[best.position + 1:]:
+            self.assertGreater(entry.time_slot.start_time, before[entry.delivery_id])
+        self.assertEqual(planner.signature()[0], (10, tuple(order)))
+        with self.assertRaises(ValueError):
+            planner.apply(99, 11, 0)
+
+    def test_now_and_locked_stops(self):
+        """Nothing starts before now and nothing goes ahead of a locked stop."""
+        planner = self.planner(now=720, locked_stops={10: 1, 11: 4})
+        new = request(99, DEPOT)
+
+        options = planner.rank([new], limit=20)[99]
+
+        self.assertTrue(options)
+        for option in options:
+            self.assertGreaterEqual(option.service_start, 720)
+            self.assertGreaterEqual(option.position, 1 if option.driver_id == 10 else 4)
+        with self.assertRaises(ValueError):
+            planner.apply(99, 10, 0)
+
+    def test_options_are_feasible(self):
+        """Every ranked option keeps all windows and driver hours when replayed in full."""
+        rng = random.Random(7)
+        for _ in range(20):
+            routes = {}
+            for driver in self.drivers:
+                stops = []
+                for k in range(rng.randint(0, 8)):
+                    start = rng.choice([480, 540, 660, 780])
+                    stops.append(request(
+                        len(stops) + 100 * driver.driver_id,
+                        (DEPOT[0] + rng.uniform(-0.05, 0.05), DEPOT[1] + rng.uniform(-0.05, 0.05)),
+                        window=(start, start + rng.choice([120, 600]))
+                    ))
+                routes[driver.driver_id] = stops
+            start = rng.choice([480, 600, 780])
+            new = request(9999, (DEPOT[0] + rng.uniform(-0.05, 0.05), DEPOT[1] + rng.uniform(-0.05, 0.05)),
+                          window=(start, start + 120))
+            planner = InsertionPlanner(self.drivers, routes, self.parameters)
+            for option in planner.rank([new], limit=50)[9999]:
+                route = list(routes[option.driver_id])
+                route.insert(option.position, new)
+                self.assertTrue(self._replay(route, routes[option.driver_id]))
+
+    def _replay(self, route, original):
+        """Route stays within windows (or no later than before) and hours."""
+        km, minutes = haversine_travel_matrix([DEPOT] + [r.location for r in route], 30.0)
+        original_starts = self._starts(original)
+        t, previous = 480, 0
+        for k, r in enumerate(route, start=1):
+            arrival = t + minutes[previous][k] + (5 if previous else 0)
+            start = max(arrival, r.time_windows[0][0])
+            allowed = max(r.time_windows[0][1] - r.service_duration, original_starts.get(r.delivery_id, -1))
+            if start > allowed:
+                return False
+            t, previous = start + r.service_duration, k
+        return t + minutes[previous][0] + 5 <= 1080
+
+    def _starts(self, route):
+        km, minutes = haversine_travel_matrix([DEPOT] + [r.location for r in route], 30.0)
+        starts, t, previous = {}, 480, 0
+        for k, r in enumerate(route, start=1):
+            starts[r.delivery_id] = max(t + minutes[previous][k] + (5 if previous else 0), r.time_windows[0][0])
+            t, previous = starts[r.delivery_id] + r.service_duration, k
+        return starts
+
+    def test_engine_planner_with_datetimes(self):
+        """The engine fills capacities from vehicles and keeps datetimes."""
+        day = datetime(2024, 1, 15)
+        drivers = [
+            DriverAvailability(
+                driver_id=d.driver_id, employee_id=d.employee_id, name=d.name,
+                available_hours=[(day.replace(hour=8), day.replace(hour=18))],
+                current_location=DEPOT, vehicle_id=d.vehicle_id
+            )
+            for d in self.drivers
+        ]
+        vehicles = [VehicleInfo(vehicle_id=1, plate_number="ABC-1", capacity={"20kg": 4}),
+                    VehicleInfo(vehicle_id=2, plate_number="ABC-2", capacity={"20kg": 10})]
+        new = request(99, (DEPOT[0] + 0.025, DEPOT[1]), window=(day.replace(hour=8), day.replace(hour=17)))
+
+        planner = SchedulingEngine().insertion_planner(self.routes, drivers, vehicles, self.parameters)
+        options = planner.rank([new])[99]
+
+        self.assertTrue(options)
+        self.assertTrue(all(o.driver_id == 11 for o in options))
+        self.assertIsInstance(options[0].service_start, datetime)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+"""Unit tests for the adaptive large neighbourhood search scheduler."""
+import random
+import unittest
+from dataclasses import replace
+from datetime import datetime, date
+
+from src.main.python.common.minutes import DayClock
+from src.main.python.common.scheduling.lns import LNSScheduler, _RoutingModel
+from src.main.python.common.scheduling.engine import SchedulingEngine
+from src.main.python.common.scheduling.ortools_scheduler import haversine_travel_matrix
+from src.main.python.common.scheduling.models import (
+    DeliveryRequest, DriverAvailability, SchedulingParameters, OptimizationObjective
+)
+from src.main.python.common.scheduling.constraints import TravelTimeConstraint
+
+
+class TestLNSScheduler(unittest.TestCase):
+    """Test ruin-and-recreate scheduling."""
+
+    def setUp(self):
+        """Set up 24 deliveries around Taitung and three drivers."""
+        random.seed(7)
+        day = datetime(2024, 1, 15)
+        rng = random.Random(0)
+        self.requests = [
+            DeliveryRequest(
+                delivery_id=i + 1,
+                client_id=100 + i,
+                location=(22.75 + rng.uniform(-0.05, 0.05), 121.15 + rng.uniform(-0.05, 0.05)),
+                time_windows=[(day.replace(hour=h), day.replace(hour=h + 4))],
+                service_duration=10,
+                cylinder_type="20kg",
+                quantity=1,
+                priority=i % 3
+            )
+            for i, h in enumerate([8, 10, 13] * 8)
+        ]
+        self.drivers = [
+            DriverAvailability(
+                driver_id=10 + d,
+                employee_id=f"EMP00{d}",
+                name=f"Driver {d}",
+                available_hours=[(day.replace(hour=8), day.replace(hour=18))],
+                current_location=(22.7553, 121.1504),
+                vehicle_id=d + 1,
+                vehicle_capacity={"20kg": 12}
+            )
+            for d in range(3)
+        ]
+        self.parameters = SchedulingParameters(
+            date=date(2024, 1, 15),
+            optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE],
+            max_iterations=200,
+            time_limit_seconds=5
+        )
+        self.scheduler = LNSScheduler(segment_length=20)
+
+    def model(self, requests=None, drivers=None):
+        return _RoutingModel(drivers or self.drivers, requests or self.requests, self.parameters, [],
+                             DayClock(self.parameters.date), haversine_travel_matrix)
+
+    def test_schedules_within_windows(self):
+        """All deliveries are served inside their windows without conflicts."""
+        result = self.scheduler.schedule(
+            self.requests, self.drivers, self.parameters, [TravelTimeConstraint(min_buffer_minutes=5)]
+        )
+
+        self.assertTrue(result.success)
+        self.assertEqual(len(result.schedule), 24)
+        self.assertEqual(result.conflicts, [])
+        by_id = {r.delivery_id: r for r in self.requests}
+        for entry in result.schedule:
+            start, end = by_id[entry.delivery_id].time_windows[0]
+            self.assertLessEqual(start, entry.time_slot.start_time)
+            self.assertLessEqual(entry.end_time, end)
+        self.assertLessEqual(result.metrics['iterations'], 200)
+        self.assertEqual(set(result.metrics['operators']),
+                         set(LNSScheduler.RUIN_OPERATORS + LNSScheduler.RECREATE_OPERATORS))
+
+    def test_search_improves_initial_solution(self):
+        """The best route length never gets worse than the regret construction."""
+        result = self.scheduler.schedule(self.requests, self.drivers, self.parameters, [])
+
+        trace = result.metrics['trace']
+        self.assertGreater(len(trace), 1)
+        best = [point['best_cost'] for point in trace]
+        self.assertEqual(best, sorted(best, reverse=True))
+        self.assertAlmostEqual(result.metrics['route_km'], best[-1], places=3)
+
+    def test_ruin_operators_remove_deliveries(self):
+        """Every ruin operator removes deliveries and leaves the rest routed."""
+        model = self.model()
+        for operator in LNSScheduler.RUIN_OPERATORS:
+            routes = [[], [], []]
+            self.assertEqual(model.recreate(routes, list(range(24)), regret_k=2), [])
+            removed = self.scheduler._ruin(model, operator, routes)
+
+            remaining = [i for route in routes for i in route]
+            self.assertTrue(removed, operator)
+            self.assertEqual(sorted(removed + remaining), list(range(24)), operator)
+            for v, route in enumerate(routes):
+                self.assertTrue(model.feasible(v, route), operator)
+
+    def test_recreate_respects_limits(self):
+        """Insertion leaves out what capacity and max deliveries cannot take."""
+        drivers = [
+            replace(self.drivers[0], vehicle_capacity={"20kg": 5}),
+            replace(self.drivers[1], max_deliveries=4),
+            replace(self.drivers[2], available_hours=[])
+        ]
+        result = self.scheduler.schedule(self.requests, drivers, self.parameters, [])
+
+        self.assertFalse(result.success)
+        self.assertEqual(len(result.schedule), 9)
+        self.assertEqual(result.metrics['unscheduled_deliveries'], 15)
+        self.assertLessEqual(sum(1 for e in result.schedule if e.driver_id == 10), 5)
+        self.assertLessEqual(sum(1 for e in result.schedule if e.driver_id == 11), 4)
+
+    def test_time_limit_and_early_stop(self):
+        """The run ends at the time limit, or when the callback asks it to."""
+        parameters = replace(self.parameters, max_iterations=10**9, time_limit_seconds=1)
+        result = self.scheduler.schedule(self.requests, self.drivers, parameters, [])
+        self.assertLess(result.computation_time, 2)
+
+        progress = []
+        result = self.scheduler.schedule(self.requests, self.drivers, parameters, [],
+                                         progress_callback=lambda p: progress.append(p) or True)
+        self.assertEqual(len(progress), 1)
+        self.assertTrue(result.metrics['stopped_early'])
+        self.assertEqual(result.metrics['iterations'], 20)
+
+    def test_engine_registration(self):
+        """The engine exposes the scheduler as 'lns'."""
+        result = SchedulingEngine().generate_schedule(
+            self.requests, self.drivers, [], self.parameters, algorithm='lns'
+        )
+
+        self.assertEqual(result.algorithm_used, "LNS Scheduler")
+        self.assertEqual(len(result.schedule), 24)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""Unit tests for the OR-Tools VRPTW scheduler."""
+import unittest
+from dataclasses import replace
+from datetime import datetime, date
+
+from src.main.python.common.scheduling.ortools_scheduler import ORToolsScheduler
+from src.main.python.common.scheduling.engine import SchedulingEngine
+from src.main.python.common.scheduling.models import (
+    DeliveryRequest, DriverAvailability, VehicleInfo,
+    SchedulingParameters, OptimizationObjective
+)
+from src.main.python.common.scheduling.constraints import TravelTimeConstraint
+
+
+class TestORToolsScheduler(unittest.TestCase):
+    """Test the offline OR-Tools routing scheduler."""
+
+    def setUp(self):
+        """Set up deliveries around Taitung and two drivers."""
+        day = datetime(2024, 1, 15)
+        self.requests = [
+            DeliveryRequest(
+                delivery_id=i + 1,
+                client_id=100 + i,
+                location=(22.75 + (i % 4) * 0.01, 121.14 + (i // 4) * 0.01),
+                time_windows=[(day.replace(hour=8), day.replace(hour=17))],
+                service_duration=15,
+                cylinder_type="20kg",
+                quantity=1,
+                priority=i % 3
+            )
+            for i in range(8)
+        ]
+        # Two windows with a lunch gap
+        self.requests[0] = replace(self.requests[0], time_windows=[
+            (day.replace(hour=9), day.replace(hour=9, minute=30)),
+            (day.replace(hour=14), day.replace(hour=15))
+        ])
+        self.drivers = [
+            DriverAvailability(
+                driver_id=10 + d,
+                employee_id=f"EMP00{d}",
+                name=f"Driver {d}",
+                available_hours=[(day.replace(hour=8), day.replace(hour=18))],
+                current_location=(22.7553, 121.1504),
+                vehicle_id=d + 1,
+                vehicle_capacity={"20kg": 10}
+            )
+            for d in range(2)
+        ]
+        self.parameters = SchedulingParameters(
+            date=date(2024, 1, 15),
+            optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE],
+            time_limit_seconds=2
+        )
+        self.scheduler = ORToolsScheduler()
+
+    def test_schedules_within_windows(self):
+        """Every delivery is served inside one of its windows without overlaps."""
+        result = self.scheduler.schedule(
+            self.requests, self.drivers, self.parameters, [TravelTimeConstraint(min_buffer_minutes=5)]
+        )
+
+        self.assertTrue(result.success)
+        self.assertEqual(len(result.schedule), 8)
+        self.assertEqual(result.metrics['unscheduled_deliveries'], 0)
+        self.assertGreaterEqual(result.metrics['solver']['solutions'], 1)
+        by_id = {r.delivery_id: r for r in self.requests}
+        for entry in result.schedule:
+            self.assertIsInstance(entry.time_slot.start_time, datetime)
+            self.assertTrue(any(
+                start <= entry.time_slot.start_time and entry.end_time <= end
+                for start, end in by_id[entry.delivery_id].time_windows
+            ))
+        self.assertEqual(result.conflicts, [])
+
+    def test_minute_inputs_give_minute_outputs(self):
+        """Minutes since midnight in, minutes since midnight out."""
+        requests = [replace(r, time_windows=[(480, 1020)]) for r in self.requests]
+        drivers = [replace(d, available_hours=[(480, 1080)]) for d in self.drivers]
+
+        result = self.scheduler.schedule(requests, drivers, self.parameters, [])
+
+        self.assertEqual(len(result.schedule), 8)
+        for entry in result.schedule:
+            self.assertIsInstance(entry.time_slot.start_time, int)
+            self.assertGreaterEqual(entry.time_slot.start_time, 480)
+            self.assertLessEqual(entry.end_time, 1020)
+
+    def test_capacity_limits_drop_deliveries(self):
+        """Deliveries beyond capacity and max deliveries are reported as unscheduled."""
+        drivers = [
+            replace(self.drivers[0], vehicle_capacity={"20kg": 3}),
+            replace(self.drivers[1], max_deliveries=2)
+        ]
+
+        result = self.scheduler.schedule(self.requests, drivers, self.parameters, [])
+
+        self.assertFalse(result.success)
+        self.assertEqual(len(result.schedule), 5)
+        self.assertEqual(result.metrics['unscheduled_deliveries'], 3)
+        self.assertLessEqual(sum(1 for e in result.schedule if e.driver_id == 10), 3)
+        self.assertLessEqual(sum(1 for e in result.schedule if e.driver_id == 11), 2)
+
+    def test_progress_callback_stops_search(self):
+        """Returning True from the progress callback finishes the search."""
+        progress = []
+        parameters = replace(self.parameters, time_limit_seconds=10)
+
+        result = self.scheduler.schedule(
+            self.requests, self.drivers, parameters, [],
+            progress_callback=lambda p: progress.append(p) or True
+        )
+
+        self.assertEqual(len(progress), 1)
+        self.assertTrue(result.metrics['stopped_early'])
+        self.assertEqual(len(result.schedule), 8)
+        self.assertLess(result.computation_time, 5)
+
+    def test_engine_registration(self):
+        """The engine exposes the solver as 'ortools' and fills vehicle capacity."""
+        engine = SchedulingEngine()
+        drivers = [replace(d, vehicle_capacity=None) for d in self.drivers]
+        vehicles = [
+            VehicleInfo(vehicle_id=d.vehicle_id, plate_number=f"ABC-{d.vehicle_id}", capacity={"20kg": 4})
+            for d in drivers
+        ]
+
+        result = engine.generate_schedule(
+            self.requests, drivers, vehicles, self.parameters, algorithm='ortools'
+        )
+
+        self.assertEqual(result.algorithm_used, "OR-Tools VRPTW Scheduler")
+        self.assertEqual(len(result.schedule), 8)
+        for driver_id in (10, 11):
+            self.assertEqual(sum(1 for e in result.schedule if e.driver_id == driver_id), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""Unit tests for the portfolio scheduler."""
+import unittest
+from datetime import datetime, date
+
+from src.main.python.common.scheduling.algorithms import (
+    GreedyScheduler, GeneticScheduler, SimulatedAnnealingScheduler
+)
+from src.main.python.common.scheduling.portfolio import PortfolioScheduler, PortfolioMember
+from src.main.python.common.scheduling.engine import SchedulingEngine
+from src.main.python.common.scheduling.models import (
+    DeliveryRequest, DriverAvailability, SchedulingParameters,
+    OptimizationObjective
+)
+from src.main.python.common.scheduling.constraints import TimeWindowConstraint
+
+
+class TestPortfolioScheduler(unittest.TestCase):
+    """Test running several algorithms and keeping the best result."""
+    
+    def setUp(self):
+        """Set up a small instance."""
+        self.requests = [
+            DeliveryRequest(
+                delivery_id=i + 1,
+                client_id=100 + i,
+                location=(22.75 + i * 0.01, 121.15 + (i % 3) * 0.01),
+                time_windows=[(datetime(2024, 1, 15, 8, 0), datetime(2024, 1, 15, 17, 0))],
+                service_duration=30,
+                cylinder_type="20kg",
+                quantity=1
+            )
+            for i in range(8)
+        ]
+        self.drivers = [
+            DriverAvailability(
+                driver_id=10 + d,
+                employee_id=f"EMP00{d}",
+                name=f"Driver {d}",
+                available_hours=[(datetime(2024, 1, 15, 8, 0), datetime(2024, 1, 15, 18, 0))]
+            )
+            for d in range(2)
+        ]
+        self.parameters = SchedulingParameters(
+            date=date(2024, 1, 15),
+            optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE],
+            max_iterations=200,
+            time_limit_seconds=20
+        )
+        self.constraints = [TimeWindowConstraint({r.delivery_id: r.time_windows for r in self.requests})]
+        self.members = [
+            PortfolioMember("greedy", GreedyScheduler()),
+            PortfolioMember("genetic#0", GeneticScheduler(population_size=10, generations=5), 0),
+            PortfolioMember("simulated_annealing#0", SimulatedAnnealingScheduler(), 0),
+            PortfolioMember("simulated_annealing#1", SimulatedAnnealingScheduler(), 1)
+        ]
+    
+    def assert_best_of_members(self, result):
+        """Winner has the highest feasible score among the reported members."""
+        report = result.metrics['portfolio']
+        self.assertEqual([m['member'] for m in report], [m.name for m in self.members])
+        self.assertTrue(all(m['status'] == 'ok' for m in report))
+        
+        best = max(report, key=lambda m: (m['feasible'], m['score']))
+        self.assertEqual(result.metrics['portfolio_winner'], best['member'])
+        self.assertEqual(result.optimization_score, best['score'])
+        self.assertTrue(result.algorithm_used.startswith("Portfolio Scheduler ("))
+    
+    def test_in_process_portfolio(self):
+        """With one worker members run sequentially in this process."""
+        scheduler = PortfolioScheduler(members=self.members, max_workers=1)
+        result = scheduler.schedule(self.requests, self.drivers, self.parameters, self.constraints)
+        
+        self.assertTrue(result.success)
+        self.assert_best_of_members(result)
+    
+    def test_parallel_portfolio(self):
+        """Members run in worker processes and report their timings."""
+        scheduler = PortfolioScheduler(members=self.members, max_workers=2)
+        result = scheduler.schedule(self.requests, self.drivers, self.parameters, self.constraints)
+        
+        self.assert_best_of_members(result)
+        self.assertTrue(all(m['time'] >= 0 for m in result.metrics['portfolio']))
+    
+    def test_engine_registers_portfolio(self):
+        """The engine exposes the portfolio as an algorithm."""
+        self.assertIsInstance(SchedulingEngine().algorithms['portfolio'], PortfolioScheduler)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+"""Unit tests for time-of-day travel time profiles."""
+import random
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime, date
+from pathlib import Path
+
+import numpy as np
+
+from src.main.python.common.time_utils import calculate_travel_time
+from src.main.python.common.time_utils import ScheduleEntry, TimeSlot
+from src.main.python.common.scheduling.constraints import TravelTimeConstraint
+from src.main.python.common.scheduling.engine import SchedulingEngine
+from src.main.python.common.scheduling.evaluator import ConstraintEvaluator
+from src.main.python.common.scheduling.ortools_scheduler import haversine_travel_matrix
+from src.main.python.common.scheduling import travel_profile
+from src.main.python.common.scheduling.travel_profile import (
+    HOUR_BUCKETS, TravelObservation, TravelTimeProfile
+)
+from src.main.python.common.scheduling.models import (
+    DeliveryRequest, DriverAvailability, SchedulingParameters, OptimizationObjective
+)
+
+DEPOT = (22.7553, 121.1504)
+TOWN = (22.7553, 121.1504)
+COAST = (23.0987, 121.3674)  # 成功, a few zones north-east
+
+
+def leg(origin, destination, hour, speed_kmh, km):
+    """Observed leg of km at speed_kmh departing at hour."""
+    return TravelObservation(origin, destination, hour * 60, km / speed_kmh * 60 + 5)
+
+
+class TestTravelTimeProfile(unittest.TestCase):
+    """Test fitting, lookups and scheduling with travel profiles."""
+
+    def test_uniform_profile_matches_fixed_speed(self):
+        """A uniform profile gives the same minutes as calculate_travel_time."""
+        rng = random.Random(1)
+        points = [(22.75 + rng.uniform(-0.3, 0.3), 121.15 + rng.uniform(-0.2, 0.2)) for _ in range(15)]
+        profile = TravelTimeProfile.uniform(30.0)
+
+        km, minutes = profile.travel_matrix(9 * 60)(points, 30.0)
+        expected_km, expected_minutes = haversine_travel_matrix(points, 30.0)
+
+        np.testing.assert_allclose(km, expected_km)
+        np.testing.assert_array_equal(minutes, expected_minutes)
+        self.assertEqual(profile.travel_minutes(points[0], points[1], datetime(2024, 1, 15, 9)),
+                         calculate_travel_time(points[0], points[1], 30.0))
+
+    def test_fit_learns_slow_hours_and_shrinks_sparse_pairs(self):
+        """Rush hour in town is slow; a single odd leg barely moves its zone pair."""
+        town_b = (TOWN[0] + 0.03, TOWN[1])
+        observations = [leg(TOWN, town_b, 8, 12.0, 3.3) for _ in range(60)]
+        observations += [leg(TOWN, town_b, 14, 36.0, 3.3) for _ in range(60)]
+        observations.append(leg(COAST, TOWN, 14, 90.0, 40.0))
+
+        profile = TravelTimeProfile.fit(observations)
+        town, coast = profile.zones([TOWN, COAST])
+
+        self.assertAlmostEqual(profile.speed(town, town, 8), 12.0, delta=1.5)
+        self.assertAlmostEqual(profile.speed(town, town, 14), 36.0, delta=1.5)
+        self.assertGreater(profile.speed(coast, town, 14), 30.0)
+        self.assertLess(profile.speed(coast, town, 14), 60.0)
+        self.assertEqual(int(profile.samples[town, town, 8]), 60)
+        # Hours without history keep the default speed
+        self.assertAlmostEqual(profile.speed(coast, coast, 3), 30.0, places=3)
+        self.assertGreater(profile.travel_minutes(TOWN, town_b, 8 * 60 + 30),
+                           profile.travel_minutes(TOWN, town_b, 14 * 60))
+
+    def test_layers_are_cached_and_indexed_by_departure(self):
+        """Each row of a departure matrix uses the hour its legs leave in."""
+        speeds = np.full((1, 1, HOUR_BUCKETS), 30.0)
+        speeds[0, 0, 8] = 10.0
+        profile = TravelTimeProfile(speeds, bounds=(22.0, 121.0, 23.0, 122.0), zone_degrees=1.0)
+        points = [DEPOT, (DEPOT[0] + 0.05, DEPOT[1]), (DEPOT[0], DEPOT[1] + 0.05)]
+
+        km, minutes = profile.layers(points)
+        self.assertIs(profile.layers(list(points))[1], minutes)
+        self.assertEqual(minutes.shape, (3, 3, HOUR_BUCKETS))
+        self.assertEqual(minutes.dtype, np.int16)
+        self.assertEqual(int(minutes[0, 1, 8]), int(km[0, 1] / 10.0 * 60) + 5)
+
+        departure = profile.departure_minutes(points, [8 * 60, 12 * 60, 8 * 60 + 59])
+        np.testing.assert_array_equal(departure[0], minutes[0, :, 8])
+        np.testing.assert_array_equal(departure[1], minutes[1, :, 12])
+        np.testing.assert_array_equal(departure[2], minutes[2, :, 8])
+        # With a latest departure, rows take the slowest hour in between
+        ranged = profile.departure_minutes(points, [7 * 60, 9 * 60, 12 * 60], [9 * 60, 10 * 60, 12 * 60])
+        np.testing.assert_array_equal(ranged[0], minutes[0, :, 8])
+        np.testing.assert_array_equal(ranged[1], minutes[1, :, 9])
+        np.testing.assert_array_equal(ranged[2], minutes[2, :, 12])
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "profile.npz"
+            profile.save(path)
+            loaded = TravelTimeProfile.load(path)
+        np.testing.assert_array_equal(loaded.speeds, profile.speeds)
+        self.assertEqual((loaded.bounds, loaded.zone_degrees), (profile.bounds, profile.zone_degrees))
+        with self.assertRaises(ValueError):
+            TravelTimeProfile(np.zeros((2, 2, HOUR_BUCKETS)))
+    
+    def test_single_hour_matrices_skip_the_layer_cache(self):
+        """travel_matrix computes one hour only; cached layers are bounded by bytes."""
+        profile = TravelTimeProfile.fit([leg(TOWN, COAST, 8, 20.0, 40.0)] * 10)
+        points = [DEPOT, COAST, (DEPOT[0] + 0.05, DEPOT[1])]
+        
+        km, minutes = profile.travel_matrix(8 * 60)(points, 30.0)
+        self.assertEqual(len(profile._layers), 0)
+        layer_km, layers = profile.layers(points)
+        np.testing.assert_array_equal(km, layer_km)
+        np.testing.assert_array_equal(minutes, layers[:, :, 8])
+        
+        with mock.patch.object(travel_profile, "MAX_CACHED_LAYER_BYTES", 1):
+            profile.layers(points[:2])
+        self.assertEqual(list(profile._layers), [tuple(points[:2])])
+
+    def test_evaluator_agrees_with_constraint_check(self):
+        """The vectorised evaluator uses the profile at each leg's departure hour."""
+        day = datetime(2024, 1, 15)
+        profile = TravelTimeProfile.uniform(30.0)
+        profile.speeds[:, :, 9] = 5.0
+        far = (DEPOT[0] + 0.05, DEPOT[1])
+
+        def schedule(hour):
+            first = day.replace(hour=hour)
+            second = first.replace(minute=40)
+            return [
+                ScheduleEntry(delivery_id=1, client_id=1, driver_id=1, vehicle_id=1,
+                              time_slot=TimeSlot(start_time=first, end_time=first.replace(minute=15)),
+                              location=DEPOT, service_duration=15),
+                ScheduleEntry(delivery_id=2, client_id=2, driver_id=1, vehicle_id=1,
+                              time_slot=TimeSlot(start_time=second, end_time=second.replace(minute=55)),
+                              location=far, service_duration=15),
+            ]
+
+        for constraint in (TravelTimeConstraint(travel_profile=profile), TravelTimeConstraint()):
+            evaluator = ConstraintEvaluator([constraint])
+            for hour in (9, 14):
+                satisfied, _ = constraint.check(schedule(hour))
+                self.assertEqual(evaluator.cost(schedule(hour)), 0.0 if satisfied else constraint.weight)
+                self.assertEqual(evaluator.check(schedule(hour))[0], satisfied)
+        self.assertFalse(TravelTimeConstraint(travel_profile=profile).check(schedule(9))[0])
+        self.assertTrue(TravelTimeConstraint(travel_profile=profile).check(schedule(14))[0])
+
+    def test_schedulers_leave_time_for_slow_hours(self):
+        """OR-Tools and LNS schedules hold up under the profile's travel times."""
+        day = datetime(2024, 1, 15)
+        rng = random.Random(4)
+        requests = [
+            DeliveryRequest(
+                delivery_id=i + 1, client_id=100 + i,
+                location=(DEPOT[0] + rng.uniform(-0.04, 0.04), DEPOT[1] + rng.uniform(-0.04, 0.04)),
+                time_windows=[(day.replace(hour=8), day.replace(hour=17))],
+                service_duration=10, cylinder_type="20kg", quantity=1
+            )
+            for i in range(12)
+        ]
+        drivers = [
+            DriverAvailability(
+                driver_id=1, employee_id="EMP001", name="Driver 1",
+                available_hours=[(day.replace(hour=8), day.replace(hour=18))],
+                current_location=DEPOT, vehicle_id=1, vehicle_capacity={"20kg": 20}
+            )
+        ]
+        parameters = SchedulingParameters(
+            date=date(2024, 1, 15),
+            optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE],
+            max_iterations=100, time_limit_seconds=2
+        )
+        profile = TravelTimeProfile.uniform(30.0)
+        profile.speeds[:, :, 8:11] = 8.0  # Morning traffic
+
+        for algorithm in ("ortools", "lns"):
+            result = SchedulingEngine(travel_profile=profile).generate_schedule(
+                requests, drivers, [], parameters, algorithm=algorithm
+            )
+            self.assertTrue(result.success, algorithm)
+            self.assertEqual(len(result.schedule), 12, algorithm)
+            self.assertEqual(result.conflicts, [], algorithm)
+            entries = sorted(result.schedule, key=lambda e: e.time_slot.start_time)
+            for current, following in zip(entries, entries[1:]):
+                gap = (following.time_slot.start_time - current.end_time).total_seconds() / 60
+                self.assertGreaterEqual(
+                    gap, profile.travel_minutes(current.location, following.location, current.end_time), algorithm
+                )
+
+
+if __name__ == '__main__':
+    unittest.main()
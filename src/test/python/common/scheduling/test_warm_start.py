@@ -0,0 +1,156 @@
+"""Unit tests for warm-starting schedulers from previous routes."""
+import unittest
+from dataclasses import replace
+from datetime import datetime, date
+
+from src.main.python.common.scheduling.algorithms import (
+    GeneticScheduler, SimulatedAnnealingScheduler
+)
+from src.main.python.common.scheduling.warm_start import build_warm_start, routes_from_schedule
+from src.main.python.common.scheduling.models import (
+    DeliveryRequest, DriverAvailability, SchedulingParameters,
+    OptimizationObjective, WarmStartRoute
+)
+
+
+class TestWarmStart(unittest.TestCase):
+    """Test seeding schedules from a comparable earlier day."""
+
+    def setUp(self):
+        """Set up two drivers and yesterday's routes."""
+        day = datetime(2024, 1, 15)
+        self.requests = [
+            DeliveryRequest(
+                delivery_id=i + 1,
+                client_id=100 + i,
+                location=(22.75 + i * 0.01, 121.15),
+                time_windows=[(day.replace(hour=8), day.replace(hour=17))],
+                service_duration=20,
+                cylinder_type="20kg",
+                quantity=1
+            )
+            for i in range(8)
+        ]
+        self.drivers = [
+            DriverAvailability(
+                driver_id=10 + d,
+                employee_id=f"EMP00{d}",
+                name=f"Driver {d}",
+                available_hours=[(day.replace(hour=8), day.replace(hour=18))]
+            )
+            for d in range(2)
+        ]
+        # Client 199 was delivered last week but not today; 106/107 are new
+        self.routes = [
+            WarmStartRoute(driver_id=10, client_ids=[102, 100, 199, 101]),
+            WarmStartRoute(driver_id=11, client_ids=[105, 104, 103])
+        ]
+        self.parameters = SchedulingParameters(
+            date=date(2024, 1, 15),
+            optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE],
+            max_iterations=100,
+            time_limit_seconds=20,
+            warm_start=self.routes
+        )
+
+    def order(self, schedule, driver_id):
+        entries = sorted((e for e in schedule if e.driver_id == driver_id),
+                         key=lambda e: e.time_slot.start_time)
+        return [e.client_id for e in entries]
+
+    def test_build_keeps_previous_order(self):
+        """Drivers keep last week's clients in order; removed clients are dropped."""
+        plan = build_warm_start(self.requests, self.drivers, self.routes)
+
+        self.assertEqual(plan.stats, {"reused": 6, "inserted": 2, "dropped": 1, "unplaced": 0})
+        self.assertEqual(len(plan.schedule), 8)
+        kept_10 = [c for c in self.order(plan.schedule, 10) if c in (100, 101, 102)]
+        kept_11 = [c for c in self.order(plan.schedule, 11) if c in (103, 104, 105)]
+        self.assertEqual(kept_10, [102, 100, 101])
+        self.assertEqual(kept_11, [105, 104, 103])
+
+        # Stops on a route never overlap
+        for driver_id in (10, 11):
+            entries = sorted((e for e in plan.schedule if e.driver_id == driver_id),
+                             key=lambda e: e.time_slot.start_time)
+            for first, second in zip(entries, entries[1:]):
+                self.assertLessEqual(first.end_time, second.time_slot.start_time)
+
+    def test_build_reinserts_stops_that_no_longer_fit(self):
+        """A stop whose window moved is displaced and re-inserted where it fits."""
+        early = datetime(2024, 1, 15, 8, 0), datetime(2024, 1, 15, 8, 30)
+        self.requests[0] = replace(self.requests[0], time_windows=[early])
+
+        plan = build_warm_start(self.requests[:3], self.drivers[:1], [self.routes[0]])
+
+        self.assertEqual(plan.stats, {"reused": 2, "inserted": 1, "dropped": 1, "unplaced": 0})
+        self.assertEqual(self.order(plan.schedule, 10), [100, 102, 101])
+        entry = next(e for e in plan.schedule if e.client_id == 100)
+        self.assertLessEqual(entry.end_time, early[1])
+
+    def test_build_ignores_absent_drivers(self):
+        """Routes of drivers not working today are re-inserted to the others."""
+        plan = build_warm_start(self.requests, self.drivers[1:], self.routes)
+
+        self.assertEqual(plan.stats["reused"], 3)
+        self.assertEqual({e.driver_id for e in plan.schedule}, {11})
+        self.assertEqual(len(plan.schedule) + len(plan.unplaced), len(self.requests))
+
+    def test_simulated_annealing_starts_from_previous_routes(self):
+        """Annealing reports warm start stats and keeps every delivery scheduled."""
+        scheduler = SimulatedAnnealingScheduler()
+        result = scheduler.schedule(self.requests, self.drivers, self.parameters, [])
+
+        self.assertEqual(result.metrics['warm_start']['reused'], 6)
+        self.assertEqual(len(result.schedule), 8)
+
+    def test_simulated_annealing_inserts_unplaced_requests(self):
+        """Requests the warm start could not place are still scheduled by annealing."""
+        day = datetime(2024, 1, 15)
+        drivers = [replace(d, available_hours=[(day.replace(hour=8), day.replace(hour=9))])
+                   for d in self.drivers]
+        plan = build_warm_start(self.requests, drivers, self.routes)
+        self.assertGreater(len(plan.unplaced), 0)
+
+        seed = SimulatedAnnealingScheduler()._insert_unplaced(plan.schedule, plan.unplaced, drivers)
+        self.assertEqual(sorted(e.delivery_id for e in seed), [r.delivery_id for r in self.requests])
+        for driver_id in (10, 11):
+            entries = sorted((e for e in seed if e.driver_id == driver_id),
+                             key=lambda e: e.time_slot.start_time)
+            for first, second in zip(entries, entries[1:]):
+                self.assertLessEqual(first.end_time, second.time_slot.start_time)
+
+        result = SimulatedAnnealingScheduler().schedule(self.requests, drivers, self.parameters, [])
+        self.assertEqual(result.metrics['warm_start']['unplaced'], len(plan.unplaced))
+        self.assertEqual(len(result.schedule), 8)
+        self.assertEqual(result.metrics['unscheduled_deliveries'], 0)
+
+    def test_genetic_population_is_seeded(self):
+        """The seed chromosome leads the initial population."""
+        scheduler = GeneticScheduler(population_size=10, generations=3)
+        plan = build_warm_start(self.requests, self.drivers, self.routes)
+        population = scheduler._generate_initial_population(
+            self.requests, self.drivers, self.parameters, plan
+        )
+
+        self.assertEqual(len(population), 10)
+        self.assertEqual(
+            population[0]['assignments'],
+            {e.delivery_id: (e.driver_id, e.time_slot.start_time) for e in plan.schedule}
+        )
+
+        result = scheduler.schedule(self.requests, self.drivers, self.parameters, [])
+        self.assertIn('warm_start', result.metrics)
+
+    def test_routes_from_schedule(self):
+        """A schedule turns back into per-driver visit orders."""
+        plan = build_warm_start(self.requests, self.drivers, self.routes)
+        routes = {route.driver_id: route.client_ids for route in routes_from_schedule(plan.schedule)}
+
+        self.assertEqual(routes[10], self.order(plan.schedule, 10))
+        self.assertEqual(routes[11], self.order(plan.schedule, 11))
+        self.assertEqual(sorted(routes[10] + routes[11]), list(range(100, 108)))
+
+
+if __name__ == '__main__':
+    unittest.main()
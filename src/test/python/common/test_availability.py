@@ -0,0 +1,98 @@
+"""Unit tests for availability bitmasks."""
+import unittest
+from datetime import datetime, time
+
+from src.main.python.common.availability import (
+    HOURLY_FIELDS,
+    available_hours,
+    client_availability_mask,
+    earliest_fit,
+    fits,
+    fits_interval,
+    intersect,
+    mask_from_hour_windows,
+    mask_windows,
+    overlaps,
+    windows_mask
+)
+from src.main.python.common.time_utils import parse_client_time_windows
+from src.main.python.common.scheduling.constraints import TimeWindowConstraint
+
+
+class MockClient:
+    """Mock client for testing."""
+    def __init__(self, **kwargs):
+        for key, value in kwargs.items():
+            setattr(self, key, value)
+
+
+class TestAvailabilityMask(unittest.TestCase):
+    """Test availability bitmask operations."""
+
+    def setUp(self):
+        """Client open 8-10 and 13-16."""
+        self.client = MockClient(hour_8_9=True, hour_9_10=True, hour_13_14=True,
+                                 hour_14_15=True, hour_15_16=True)
+        self.mask = client_availability_mask(self.client)
+
+    def test_client_mask_matches_parsed_windows(self):
+        """Mask runs are the merged client windows."""
+        self.assertEqual(mask_windows(self.mask), [(480, 600), (780, 960)])
+        self.assertEqual(parse_client_time_windows(self.client),
+                         [(time(8, 0), time(10, 0)), (time(13, 0), time(16, 0))])
+        self.assertEqual(available_hours(client_availability_mask(self.client, HOURLY_FIELDS)),
+                         [8, 9, 13, 14, 15])
+
+    def test_fits_and_earliest_fit(self):
+        """Intervals must lie inside one continuous run."""
+        self.assertTrue(fits(self.mask, 480, 600))
+        self.assertFalse(fits(self.mask, 570, 790))
+        self.assertFalse(fits(self.mask, 960, 961))
+
+        self.assertEqual(earliest_fit(self.mask, 30), 480)
+        self.assertEqual(earliest_fit(self.mask, 150), 780)
+        self.assertEqual(earliest_fit(self.mask, 30, not_before=590), 780)
+        self.assertIsNone(earliest_fit(self.mask, 200))
+
+    def test_overlap_and_intersection(self):
+        """Overlap is any shared minute."""
+        afternoon = mask_from_hour_windows([(15, 18)])
+        evening = mask_from_hour_windows([(16, 20)])
+
+        self.assertTrue(overlaps(self.mask, afternoon))
+        self.assertFalse(overlaps(self.mask, evening))
+        self.assertEqual(mask_windows(intersect(self.mask, afternoon)), [(900, 960)])
+
+    def test_datetime_windows(self):
+        """Datetime windows convert relative to the earliest midnight."""
+        day = datetime(2024, 1, 15)
+        day_start, mask = windows_mask([
+            (day.replace(hour=8), day.replace(hour=9)),
+            (day.replace(hour=9), day.replace(hour=10, minute=30))
+        ])
+
+        self.assertEqual(day_start, day)
+        self.assertTrue(fits_interval(day_start, mask, day.replace(hour=8, minute=45, second=30),
+                                      day.replace(hour=10, minute=30)))
+        self.assertFalse(fits_interval(day_start, mask, day.replace(hour=7, minute=59),
+                                       day.replace(hour=8, minute=30)))
+        self.assertIsNone(windows_mask([(day.replace(hour=8, second=5), day.replace(hour=9))]))
+
+    def test_time_window_constraint_uses_masks(self):
+        """Adjacent windows behave as one continuous availability."""
+        day = datetime(2024, 1, 15)
+        constraint = TimeWindowConstraint({
+            100: [(day.replace(hour=8), day.replace(hour=9)), (day.replace(hour=9), day.replace(hour=10))],
+            101: [(day.replace(hour=8, second=30), day.replace(hour=9))]
+        })
+
+        self.assertTrue(constraint.fits(100, day.replace(hour=8, minute=30), day.replace(hour=9, minute=30)))
+        self.assertFalse(constraint.fits(100, day.replace(hour=9, minute=30), day.replace(hour=10, minute=1)))
+        # Windows that are not minute-aligned keep the datetime comparison
+        self.assertIsNone(constraint.masks[101])
+        self.assertFalse(constraint.fits(101, day.replace(hour=8), day.replace(hour=8, minute=30)))
+        self.assertTrue(constraint.fits(999, day, day))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+"""Unit tests for minute-offset time values."""
+import unittest
+from datetime import date, datetime
+
+from src.main.python.common.minutes import DayClock, add_minutes, minutes_between
+
+
+class TestDayClock(unittest.TestCase):
+    """Test conversions between datetimes and minute offsets."""
+
+    def setUp(self):
+        """Clock for one scheduling day."""
+        self.clock = DayClock(date(2024, 1, 15))
+
+    def test_round_trip(self):
+        """Datetimes map to minutes since midnight and back."""
+        moment = datetime(2024, 1, 15, 9, 30)
+        self.assertEqual(self.clock.to_minutes(moment), 570)
+        self.assertEqual(self.clock.to_datetime(570), moment)
+        self.assertEqual(self.clock.to_minutes(570), 570)
+        self.assertIs(self.clock.to_datetime(moment), moment)
+
+    def test_windows_round_inwards(self):
+        """Partial minutes never widen a window."""
+        windows = [(datetime(2024, 1, 15, 8, 0, 30), datetime(2024, 1, 15, 10, 0, 30))]
+        self.assertEqual(self.clock.windows_to_minutes(windows), [(481, 600)])
+
+    def test_helpers_accept_both_representations(self):
+        """add_minutes and minutes_between work on ints and datetimes."""
+        self.assertEqual(add_minutes(480, 45), 525)
+        self.assertEqual(add_minutes(datetime(2024, 1, 15, 8), 45), datetime(2024, 1, 15, 8, 45))
+        self.assertEqual(minutes_between(480, 525), 45)
+        self.assertEqual(minutes_between(datetime(2024, 1, 15, 8), datetime(2024, 1, 15, 8, 45)), 45)
+
+
+if __name__ == '__main__':
+    unittest.main()
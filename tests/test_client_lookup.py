@@ -0,0 +1,78 @@
+"""
+Test batched client lookup
+Ensures route details are resolved with a handful of queries instead of one per stop
+"""
+
+import json
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import event
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from api.routers.routes import parse_route_details
+from api.utils.client_lookup import ClientLookup
+from core.database import DatabaseManager
+from models.database_schema import Client, Route
+
+
+@pytest.fixture
+def db():
+    manager = DatabaseManager("sqlite:///:memory:")
+    manager.initialize()
+    session = manager.get_session()
+    session.add_all([
+        Client(id=i, client_code=f"C{i:04d}", invoice_title=f"客戶{i}", address="台東市",
+               latitude=22.75, longitude=121.15, hour_9_10=True)
+        for i in range(1, 301)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def statements(db):
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            executed.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    yield executed
+    event.remove(db.get_bind(), "before_cursor_execute", record)
+
+
+def _route_with_points(count):
+    points = [
+        {"client_id": i, "lat": 22.75, "lng": 121.15, "sequence": i,
+         "estimated_arrival": datetime(2025, 7, 1, 9, 0).isoformat()}
+        for i in range(1, count + 1)
+    ]
+    return Route(route_date=date(2025, 7, 1), route_name="r", area="台東市",
+                 route_details=json.dumps({"points": points}))
+
+
+def test_parse_route_details_batches_client_queries(db, statements):
+    points = parse_route_details(_route_with_points(300), db)
+
+    assert len(points) == 300
+    assert points[0].time_windows == [{"start": 9, "end": 10}]
+    assert len(statements) == 1
+
+
+def test_lookup_caches_hits_and_misses(db, statements):
+    lookup = ClientLookup(db)
+    clients = lookup.get_many([1, 2, 9999])
+
+    assert set(clients) == {1, 2}
+    assert lookup.get(1).client_code == "C0001"
+    assert lookup.get(9999) is None
+    assert lookup.get(None) is None
+    assert lookup.query_count == 1
+    assert len(statements) == 1
@@ -0,0 +1,157 @@
+"""
+Test the OR-Tools model behind CloudRouteOptimizationService
+Ensures the matrix-registered model respects time windows and each cylinder
+type's own capacity, reports solver statistics, and starts from solution
+hints built from earlier routes
+"""
+
+from datetime import date
+
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from common.geo_utils import calculate_haversine_distance, calculate_haversine_matrix
+from integrations.google_maps_client import Location
+from common.scheduling.models import WarmStartRoute
+import services.cloud_route_service as cloud_route_service
+from services.cloud_route_service import (
+    DeliveryNode, VehicleInfo, build_initial_routes, greedy_hint_routes, solve_vehicle_routing
+)
+
+DEPOT = Location(address="depot", lat=22.7553, lng=121.1504)
+DATE = date(2025, 7, 14)
+
+
+def _instance(demands, windows=None):
+    vehicles = [
+        VehicleInfo(vehicle_id=v + 1, driver_id=v + 1, start_location=DEPOT,
+                    capacity={'50kg': 2, '20kg': 10, '16kg': 10, '10kg': 10, '4kg': 10})
+        for v in range(2)
+    ]
+    nodes = [
+        DeliveryNode(
+            delivery_id=i + 1,
+            client_id=i + 1,
+            location=Location(address=f"stop {i}", lat=22.75 + 0.01 * i, lng=121.15),
+            demand=demand,
+            service_time=10,
+            time_window=(windows or {}).get(i, (480, 1080))
+        )
+        for i, demand in enumerate(demands)
+    ]
+    points = [(DEPOT.lat, DEPOT.lng)] * len(vehicles) + [(n.location.lat, n.location.lng) for n in nodes]
+    km = calculate_haversine_matrix(points)
+    return vehicles, nodes, np.rint(km).astype(int), np.rint(km * 2).astype(int)
+
+
+def _routes(solution):
+    routing, manager, assignment = solution.routing, solution.manager, solution.assignment
+    routes = []
+    for vehicle_idx in range(routing.vehicles()):
+        index = assignment.Value(routing.NextVar(routing.Start(vehicle_idx)))
+        stops = []
+        while not routing.IsEnd(index):
+            stops.append(manager.IndexToNode(index))
+            index = assignment.Value(routing.NextVar(index))
+        routes.append(stops)
+    return routes
+
+
+def test_haversine_matrix_matches_scalar():
+    points = [(22.75, 121.15), (22.8, 121.2), (23.0, 121.0)]
+    matrix = calculate_haversine_matrix(points)
+    assert matrix.shape == (3, 3)
+    assert np.allclose(matrix, matrix.T)
+    assert abs(matrix[0, 2] - calculate_haversine_distance(*points[0], *points[2])) < 1e-9
+
+
+def test_each_cylinder_type_uses_its_own_capacity():
+    # Four 50kg stops, two per vehicle at most; 4kg demand would fit on one vehicle
+    demands = [{'50kg': 1, '4kg': 1}] * 4
+    solution = solve_vehicle_routing(*_instance(demands), time_limit_seconds=5, solution_limit=20)
+
+    assert solution.assignment is not None
+    assert sorted(len(stops) for stops in _routes(solution)) == [2, 2]
+
+
+def test_time_windows_and_solver_stats():
+    vehicles, nodes, distance, travel = _instance(
+        [{'20kg': 1}] * 3, windows={0: (600, 620), 2: (480, 500)}
+    )
+    solution = solve_vehicle_routing(vehicles, nodes, distance, travel, time_limit_seconds=5, solution_limit=20)
+
+    time_dimension = solution.routing.GetDimensionOrDie('Time')
+    for stops in _routes(solution):
+        for node in stops:
+            arrival = solution.assignment.Min(time_dimension.CumulVar(solution.manager.NodeToIndex(node)))
+            start, end = nodes[node - len(vehicles)].time_window
+            assert start <= arrival <= end
+
+    stats = solution.stats
+    assert stats['status'] in ('ROUTING_SUCCESS', 'ROUTING_PARTIAL_SUCCESS_LOCAL_OPTIMUM_NOT_REACHED')
+    assert stats['objective'] == solution.assignment.ObjectiveValue()
+    assert stats['solutions'] >= 1 and stats['branches'] > 0
+    assert {'setup_seconds', 'solve_seconds', 'wall_time_ms', 'failures'} <= set(stats)
+
+
+def test_waiting_slack_matches_hint_check(monkeypatch):
+    monkeypatch.setattr(cloud_route_service, "MAX_WAIT_MINUTES", 45)
+    vehicles, nodes, distance, travel = _instance([{'20kg': 1}] * 2)
+    solution = solve_vehicle_routing(vehicles, nodes, distance, travel, time_limit_seconds=1, solution_limit=1)
+
+    time_dimension = solution.routing.GetDimensionOrDie('Time')
+    index = solution.manager.NodeToIndex(len(vehicles))
+    assert time_dimension.SlackVar(index).Max() == 45
+
+
+def test_initial_routes_follow_hint_order():
+    # Client 99 is not delivered today, client 4 is new
+    instance = _instance([{'20kg': 1}] * 4)
+    hints = [WarmStartRoute(driver_id=1, client_ids=[3, 99, 1]), WarmStartRoute(driver_id=2, client_ids=[2])]
+    routes, stats = build_initial_routes(*instance, hints)
+
+    assert stats == {'reused': 3, 'inserted': 1, 'dropped': 1, 'unplaced': 0}
+    assert [n for n in routes[0] if n != 5] == [4, 2]  # Matrix index = 2 vehicles + node position
+    assert 3 in routes[1]
+    assert sorted(n for route in routes for n in route) == [2, 3, 4, 5]
+
+
+def test_hint_stops_that_break_capacity_are_moved():
+    # Vehicle 1 carries two 50kg cylinders; the third hinted stop moves to vehicle 2
+    instance = _instance([{'50kg': 1}] * 3)
+    routes, stats = build_initial_routes(*instance, [WarmStartRoute(driver_id=1, client_ids=[1, 2, 3])])
+
+    assert stats['reused'] == 2 and stats['inserted'] == 1
+    assert routes == [[2, 3], [4]]
+
+
+def test_solve_from_hint_starts_at_hint_objective():
+    instance = _instance([{'20kg': 1}] * 6)
+    routes, _ = build_initial_routes(*instance, greedy_hint_routes(instance[0], instance[1], DATE))
+    distance = instance[2]
+    hint_cost = sum(
+        distance[a][b]
+        for vehicle_idx, route in enumerate(routes)
+        for a, b in zip([vehicle_idx] + route, route + [vehicle_idx])
+    )
+
+    solution = solve_vehicle_routing(*instance, time_limit_seconds=2, initial_routes=routes,
+                                     record_improvements=True)
+
+    assert solution.stats['hint'] == 'applied'
+    assert solution.stats['improvements'][0][1] == hint_cost
+    assert solution.stats['objective'] <= hint_cost
+
+
+def test_rejected_hint_falls_back_to_cold_start():
+    instance = _instance([{'20kg': 1}] * 3)
+    solution = solve_vehicle_routing(*instance, time_limit_seconds=2, solution_limit=10,
+                                     initial_routes=[[2], []])  # Misses two nodes
+
+    assert solution.stats['hint'] == 'rejected'
+    assert solution.assignment is not None
+    assert sorted(n for stops in _routes(solution) for n in stops) == [2, 3, 4]
@@ -0,0 +1,96 @@
+"""
+Test planning snapshot query builder
+Ensures a day's deliveries and their clients load in two queries with only
+the planning columns populated
+"""
+
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from api.routers.scheduling import SchedulingRequest, _build_scheduling_inputs
+from common.time_utils import parse_client_time_windows
+from core.database import DatabaseManager
+from models.database_schema import Client, Delivery, DeliveryStatus, Driver, Vehicle, VehicleType
+from services.planning_snapshot import planning_snapshot_query
+
+PLAN_DATE = date(2025, 7, 1)
+
+
+@pytest.fixture
+def db():
+    manager = DatabaseManager("sqlite:///:memory:")
+    manager.initialize()
+    session = manager.get_session()
+    for i in range(1, 51):
+        client = Client(id=i, client_code=f"C{i:04d}", invoice_title=f"客戶{i}", address="台東市",
+                        area="A-瑞光" if i % 2 else "B-四維", latitude=22.75, longitude=121.15,
+                        hour_9_10=True, tax_id="12345678")
+        session.add(client)
+        session.add(Delivery(client_id=i, scheduled_date=PLAN_DATE, status=DeliveryStatus.PENDING))
+    session.add(Delivery(client_id=1, scheduled_date=PLAN_DATE, status=DeliveryStatus.COMPLETED))
+    session.commit()
+    session.expunge_all()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def statements(db):
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.get_bind(), "before_cursor_execute", record)
+    yield executed
+    event.remove(db.get_bind(), "before_cursor_execute", record)
+
+
+def test_snapshot_loads_day_in_two_queries(db, statements):
+    deliveries = planning_snapshot_query(db, delivery_date=PLAN_DATE).all()
+
+    for delivery in deliveries:
+        assert delivery.client.latitude == 22.75
+        assert parse_client_time_windows(delivery.client)
+
+    assert len(deliveries) == 50
+    assert len(statements) == 2
+    # 非規劃欄位不會載入
+    assert "tax_id" not in deliveries[0].client.__dict__
+
+
+def test_snapshot_filters_area_and_status(db):
+    deliveries = planning_snapshot_query(db, delivery_date=PLAN_DATE, area="A-瑞光").all()
+    assert len(deliveries) == 25
+    assert all(d.client.area == "A-瑞光" for d in deliveries)
+
+    everything = planning_snapshot_query(db, delivery_date=PLAN_DATE, statuses=None).all()
+    assert len(everything) == 51
+
+
+def test_joined_strategy_uses_single_query(db, statements):
+    deliveries = planning_snapshot_query(db, delivery_date=PLAN_DATE, strategy="joined").all()
+    assert all(d.client.address for d in deliveries)
+    assert len(statements) == 1
+
+
+def test_scheduling_inputs_do_not_lazy_load_clients(db, statements):
+    db.add_all([Driver(id=1, name="司機甲", employee_id="E1"),
+                Vehicle(id=1, plate_number="AAA-1", vehicle_type=VehicleType.CAR)])
+    db.commit()
+    db.expunge_all()
+    statements.clear()
+
+    inputs = _build_scheduling_inputs(SchedulingRequest(schedule_date=PLAN_DATE), db)
+
+    deliveries, delivery_requests = inputs[0], inputs[1]
+    assert len(delivery_requests) == len(deliveries) == 50
+    # Snapshot (2) plus drivers and vehicles: no query per client
+    assert len(statements) == 4
@@ -0,0 +1,78 @@
+"""
+Test previous routes loader
+Ensures warm start picks the most recent same-weekday routes for today's
+drivers and area, falling back to delivery route_sequence when a route has
+no details
+"""
+
+import json
+from datetime import date, timedelta
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from core.database import DatabaseManager
+from models.database_schema import Client, Delivery, DeliveryStatus, Route
+from services.previous_routes import load_previous_routes
+
+PLAN_DATE = date(2025, 7, 14)  # Monday
+
+
+def _details(client_ids):
+    return json.dumps({"points": [
+        {"client_id": client_id, "sequence": idx + 1} for idx, client_id in enumerate(client_ids)
+    ]})
+
+
+@pytest.fixture
+def db():
+    manager = DatabaseManager("sqlite:///:memory:")
+    manager.initialize()
+    session = manager.get_session()
+    for i in range(1, 11):
+        session.add(Client(id=i, client_code=f"C{i:04d}", invoice_title=f"客戶{i}", address="台東市",
+                           area="A-瑞光" if i <= 6 else "B-四維", latitude=22.75, longitude=121.15))
+    last_week = PLAN_DATE - timedelta(weeks=1)
+    two_weeks = PLAN_DATE - timedelta(weeks=2)
+    session.add_all([
+        # Most recent Monday: driver 1 has details, driver 2 only sequenced deliveries
+        Route(route_date=last_week, area="A-瑞光", driver_id=1, route_details=_details([3, 1, 2])),
+        Route(route_date=two_weeks, area="A-瑞光", driver_id=1, route_details=_details([1, 2, 3])),
+        # Not a Monday
+        Route(route_date=PLAN_DATE - timedelta(days=1), area="A-瑞光", driver_id=1,
+              route_details=_details([2, 3, 1])),
+        # Other area
+        Route(route_date=last_week, area="B-四維", driver_id=3, route_details=_details([7, 8])),
+    ])
+    for sequence, client_id in enumerate([6, 4, 5], start=1):
+        session.add(Delivery(client_id=client_id, scheduled_date=last_week, driver_id=2,
+                             route_sequence=sequence, status=DeliveryStatus.COMPLETED))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_loads_latest_same_weekday_routes(db):
+    source_date, routes = load_previous_routes(db, PLAN_DATE, [1, 2], area="A-瑞光")
+
+    assert source_date == PLAN_DATE - timedelta(weeks=1)
+    orders = {route.driver_id: route.client_ids for route in routes}
+    assert orders == {1: [3, 1, 2], 2: [6, 4, 5]}
+
+
+def test_filters_drivers_and_area(db):
+    _, routes = load_previous_routes(db, PLAN_DATE, [3], area="A-瑞光")
+    assert routes == []
+
+    source_date, routes = load_previous_routes(db, PLAN_DATE, [3], area="B-四維")
+    assert source_date == PLAN_DATE - timedelta(weeks=1)
+    assert [route.client_ids for route in routes] == [[7, 8]]
+
+
+def test_no_comparable_day(db):
+    assert load_previous_routes(db, PLAN_DATE + timedelta(days=2), [1, 2]) == (None, [])
+    assert load_previous_routes(db, PLAN_DATE, []) == (None, [])
@@ -0,0 +1,189 @@
+"""
+Test response cache layer
+Ensures cached GET endpoints return ETags, answer If-None-Match with 304,
+and are invalidated when the underlying data is committed
+"""
+
+from datetime import date
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from api.middleware import ResponseCacheMiddleware
+from config.cache_config import CacheConfig, CacheRule
+from core.cache import (
+    CachedResponse, FakeRedis, MemoryCacheBackend, RedisCacheBackend, ResponseCache, build_backend,
+    response_cache
+)
+from core.database import DatabaseManager
+from models.database_schema import Client, Route
+
+
+def _make_app(cache):
+    app = FastAPI()
+    calls = {"count": 0}
+
+    @app.get("/api/routes/{route_id}/map")
+    async def route_map(route_id: int, response: Response):
+        calls["count"] += 1
+        response.headers["X-Route-Version"] = str(calls["count"])
+        return {"route_id": route_id, "version": calls["count"]}
+
+    @app.get("/api/uncached")
+    async def uncached():
+        calls["count"] += 1
+        return {"version": calls["count"]}
+
+    app.add_middleware(
+        ResponseCacheMiddleware,
+        cache=cache,
+        rules=[CacheRule(r'^/api/routes/(?P<route_id>\d+)/map$', 300, ('route:{route_id}', 'route:*'))]
+    )
+    return app, calls
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request):
+    if request.param == "memory":
+        return ResponseCache(MemoryCacheBackend(max_entries=16))
+    return ResponseCache(RedisCacheBackend(FakeRedis()))
+
+
+def test_cached_get_returns_etag_and_304(cache):
+    app, calls = _make_app(cache)
+    client = TestClient(app)
+
+    first = client.get("/api/routes/1/map")
+    assert first.status_code == 200
+    assert first.headers["X-Cache"] == "MISS"
+    etag = first.headers["ETag"]
+
+    second = client.get("/api/routes/1/map")
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.json() == first.json()
+    assert calls["count"] == 1
+    # 端點自行設定的標頭隨快取重播
+    assert first.headers["X-Route-Version"] == second.headers["X-Route-Version"] == "1"
+    assert second.headers["content-type"] == "application/json"
+
+    not_modified = client.get("/api/routes/1/map", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+
+def test_tag_invalidation_only_affects_tagged_route(cache):
+    app, calls = _make_app(cache)
+    client = TestClient(app)
+
+    client.get("/api/routes/1/map")
+    client.get("/api/routes/2/map")
+    cache.invalidate_tags("route:1")
+
+    assert client.get("/api/routes/1/map").headers["X-Cache"] == "MISS"
+    assert client.get("/api/routes/2/map").headers["X-Cache"] == "HIT"
+
+
+def test_unmatched_paths_are_not_cached(cache):
+    app, calls = _make_app(cache)
+    client = TestClient(app)
+
+    client.get("/api/uncached")
+    response = client.get("/api/uncached")
+    assert response.json()["version"] == 2
+    assert "ETag" not in response.headers
+
+
+def test_multiple_workers_never_use_the_in_process_cache(monkeypatch):
+    monkeypatch.delenv("CACHE_BACKEND", raising=False)
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    assert isinstance(build_backend(CacheConfig()), MemoryCacheBackend)
+
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    assert CacheConfig().backend == "redis"
+    monkeypatch.setenv("CACHE_BACKEND", "memory")
+    assert build_backend(CacheConfig()) is None
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(max_entries=2)
+    entry = CachedResponse.from_body(b"{}", "application/json")
+    backend.set("a", entry, 60)
+    backend.set("b", entry, 60)
+    backend.get("a")
+    backend.set("c", entry, 60)
+
+    assert backend.get("a") is not None
+    assert backend.get("b") is None
+    assert backend.get("c") is not None
+
+
+def test_commit_invalidates_model_tags():
+    manager = DatabaseManager("sqlite:///:memory:")
+    manager.initialize()
+    session = manager.get_session()
+    entry = CachedResponse.from_body(b"[]", "application/json")
+    original_backend = response_cache.backend
+    response_cache.configure(MemoryCacheBackend())
+
+    try:
+        client = Client(client_code="C1", invoice_title="測試", address="台東市")
+        session.add(client)
+        session.commit()
+
+        response_cache.set("districts", entry, 60, ["clients"])
+        response_cache.set("route", entry, 60, ["route:99"])
+
+        # 未提交的異動不會清除快取
+        client.district = "台東市"
+        session.flush()
+        assert response_cache.get("districts") is not None
+        session.rollback()
+        assert response_cache.get("districts") is not None
+
+        client.district = "台東市"
+        session.commit()
+        assert response_cache.get("districts") is None
+        assert response_cache.get("route") is not None
+    finally:
+        response_cache.configure(original_backend)
+        session.close()
+
+
+def test_bulk_statements_invalidate_model_tags():
+    manager = DatabaseManager("sqlite:///:memory:")
+    manager.initialize()
+    session = manager.get_session()
+    entry = CachedResponse.from_body(b"[]", "application/json")
+    original_backend = response_cache.backend
+    response_cache.configure(MemoryCacheBackend())
+
+    try:
+        session.add(Client(client_code="C1", invoice_title="測試", address="台東市"))
+        session.add(Route(route_date=date(2025, 7, 1), route_name="r", area="台東市"))
+        session.commit()
+
+        response_cache.set("districts", entry, 60, ["clients"])
+        response_cache.set("route", entry, 60, ["route:1", "route:*"])
+
+        # query(...).update() / delete() 不經過 flush
+        session.query(Client).filter(Client.client_code == "C1").update({"district": "台東市"})
+        session.rollback()
+        assert response_cache.get("districts") is not None
+
+        session.query(Client).filter(Client.client_code == "C1").update({"district": "台東市"})
+        session.commit()
+        assert response_cache.get("districts") is None
+        assert response_cache.get("route") is not None
+
+        session.query(Route).delete()
+        session.commit()
+        assert response_cache.get("route") is None
+    finally:
+        response_cache.configure(original_backend)
+        session.close()
@@ -0,0 +1,106 @@
+"""
+Test response serialization and compression pipeline
+Ensures large responses are compressed, small ones are not, and the fast
+serializer matches the Pydantic JSON shape
+"""
+
+import gzip
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from api.middleware import CompressionMiddleware
+from api.schemas.route import RouteResponse
+from api.utils.serialization import FastJSONResponse, dumps, row_serializer
+
+
+def _make_app():
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/large")
+    async def large():
+        return {"items": [{"id": i, "address": "台東市中興路"} for i in range(500)]}
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/cookies")
+    async def cookies(response: Response):
+        response.headers["Vary"] = "Origin"
+        response.set_cookie("a", "1")
+        response.set_cookie("b", "2")
+        return {"items": [{"id": i, "address": "台東市中興路"} for i in range(500)]}
+
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+    return app
+
+
+def test_large_response_is_gzipped():
+    client = TestClient(_make_app())
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    # httpx 會自動解壓縮
+    assert len(response.json()["items"]) == 500
+
+
+def test_compression_keeps_vary_and_repeated_headers():
+    client = TestClient(_make_app())
+    response = client.get("/cookies", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Origin, Accept-Encoding"
+    assert len(response.headers.get_list("set-cookie")) == 2
+    assert len(response.json()["items"]) == 500
+
+
+def test_small_response_is_not_compressed():
+    client = TestClient(_make_app())
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+    assert response.json() == {"ok": True}
+
+
+def test_identity_when_client_does_not_accept_encoding():
+    client = TestClient(_make_app())
+    response = client.get("/large", headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+
+
+def test_dumps_handles_decimal_and_dates():
+    body = dumps({"price": Decimal("650.0"), "day": date(2025, 7, 1), "at": datetime(2025, 7, 1, 8, 30)})
+    assert json.loads(body) == {"price": "650.0", "day": "2025-07-01", "at": "2025-07-01T08:30:00"}
+
+
+def test_row_serializer_matches_pydantic_output():
+    row = {
+        "id": 1,
+        "route_date": date(2025, 7, 1),
+        "route_name": "台東市-A",
+        "area": "台東市",
+        "driver_id": 3,
+        "total_clients": 12,
+        "total_distance_km": 18.5,
+        "estimated_duration_minutes": 240,
+        "is_optimized": True,
+        "optimization_score": 0.8,
+        "created_at": datetime(2025, 7, 1, 7, 0),
+        "updated_at": datetime(2025, 7, 1, 7, 30),
+        "_sa_instance_state": object(),
+    }
+
+    fast = json.loads(dumps(row_serializer(RouteResponse)(row)))
+    expected = RouteResponse.model_validate(row).model_dump(mode="json")
+    assert fast == expected
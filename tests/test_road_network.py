@@ -0,0 +1,182 @@
+"""
+Test local road-network routing
+Ensures OSM extracts become a CSR road graph that honours oneway and access
+tags, bidirectional A* matches plain Dijkstra, car and motorcycle profiles
+differ where they should, and matrices use the Google Maps response format
+"""
+
+import random
+
+import numpy as np
+import pytest
+from scipy.sparse.csgraph import dijkstra
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from integrations.google_maps_client import Location
+from integrations.road_network import (
+    LocalRoutingEngine, RoadGraph, build_road_graph, get_local_routing_engine
+)
+from models.database_schema import VehicleType
+from services import cloud_route_service
+
+# A-B-C along the south street, D-E-F along the north street, a motorway
+# from A to C, a oneway C -> F and a private lane B-E
+NODES = {
+    1: (22.75, 121.10), 2: (22.75, 121.11), 3: (22.75, 121.12),
+    4: (22.76, 121.10), 5: (22.76, 121.11), 6: (22.76, 121.12),
+    8: (22.7505, 121.105), 9: (22.7505, 121.115),
+    20: (22.90, 121.30), 21: (22.901, 121.30),
+}
+WAYS = [
+    ([1, 2, 3], {"highway": "residential"}),
+    ([4, 5, 6], {"highway": "residential"}),
+    ([1, 4], {"highway": "residential"}),
+    ([3, 6], {"highway": "residential", "oneway": "yes"}),
+    ([1, 8, 9, 3], {"highway": "motorway"}),
+    ([2, 5], {"highway": "service", "access": "private"}),
+    ([5, 2], {"highway": "footway"}),
+    ([20, 21], {"highway": "residential"}),
+]
+
+
+def _write_osm(path, nodes, ways):
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>', '<osm version="0.6">']
+    for node_id, (lat, lng) in nodes.items():
+        lines.append(f'<node id="{node_id}" lat="{lat}" lon="{lng}"/>')
+    for way_id, (refs, tags) in enumerate(ways, start=100):
+        lines.append(f'<way id="{way_id}">')
+        lines += [f'<nd ref="{ref}"/>' for ref in refs]
+        lines += [f'<tag k="{k}" v="{v}"/>' for k, v in tags.items()]
+        lines.append('</way>')
+    lines.append('</osm>')
+    path.write_text("\n".join(lines), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def graph(tmp_path):
+    return build_road_graph(_write_osm(tmp_path / "town.osm", NODES, WAYS))
+
+
+def _edges(graph):
+    ids = graph.osm_ids
+    return {(int(ids[u]), int(ids[v])) for u, v in zip(graph.tails(), graph.indices)}
+
+
+def test_builds_graph_from_osm(graph, tmp_path):
+    edges = _edges(graph)
+
+    assert (3, 6) in edges and (6, 3) not in edges
+    assert (1, 8) in edges and (8, 1) not in edges
+    assert (2, 5) not in edges and (5, 2) not in edges
+    assert (1, 2) in edges and (2, 1) in edges
+    assert np.all(np.diff(graph.indptr) >= 0) and graph.indptr[-1] == graph.n_edges
+
+    graph.save(tmp_path / "town.npz")
+    loaded = RoadGraph.load(tmp_path / "town.npz")
+    assert _edges(loaded) == edges
+    np.testing.assert_array_equal(loaded.length_m, graph.length_m)
+
+
+def test_profiles_oneway_and_matrix_format(graph):
+    engine = LocalRoutingEngine(graph)
+    a, c, f = NODES[1], NODES[3], NODES[6]
+
+    car = engine.route(a, c, VehicleType.CAR)
+    motorcycle = engine.route(a, c, VehicleType.MOTORCYCLE)
+    assert (NODES[8][0], NODES[8][1]) in car["path"]
+    assert NODES[2] in motorcycle["path"]
+    assert car["duration_seconds"] < motorcycle["duration_seconds"]
+
+    # F -> C cannot use the oneway and goes around by the north and west streets
+    assert engine.route(c, f)["distance_meters"] < engine.route(f, c)["distance_meters"]
+
+    places = [Location(address="A", lat=a[0], lng=a[1]), Location(address="F", lat=f[0], lng=f[1]),
+              Location(address="遠方", lat=22.9005, lng=121.30)]
+    result = engine.calculate_distance_matrix(places, places, vehicle_type=VehicleType.MOTORCYCLE)
+
+    assert result["origin_addresses"] == ["A", "F", "遠方"]
+    element = result["matrix"][0][1]
+    assert element["origin_index"] == 0 and element["destination_index"] == 1
+    assert element["duration_in_traffic_seconds"] == element["duration_seconds"] > 0
+    assert element["distance_meters"] == engine.route(a, f, VehicleType.MOTORCYCLE)["distance_meters"]
+    assert element["distance_text"].endswith("公里") and element["duration_text"].endswith("分鐘")
+    assert result["matrix"][0][0]["distance_meters"] == 0
+    # The isolated street is too small to route to
+    assert result["matrix"][0][2] == {"origin_index": 0, "destination_index": 2,
+                                      "status": "ZERO_RESULTS", "error": "No route found"}
+
+
+def test_bidirectional_search_matches_dijkstra(tmp_path):
+    rng = random.Random(3)
+    size = 12
+    nodes = {r * size + c + 1: (22.7 + 0.004 * r, 121.1 + 0.004 * c) for r in range(size) for c in range(size)}
+    classes = ["primary", "secondary", "residential", "service", "trunk"]
+    ways = []
+    for r in range(size):
+        for c in range(size):
+            here = r * size + c + 1
+            for there in ([here + 1] if c < size - 1 else []) + ([here + size] if r < size - 1 else []):
+                if rng.random() < 0.15:
+                    continue
+                tags = {"highway": rng.choice(classes)}
+                if rng.random() < 0.2:
+                    tags["oneway"] = rng.choice(["yes", "-1"])
+                if rng.random() < 0.1:
+                    tags["maxspeed"] = "20"
+                ways.append(([here, there], tags))
+    graph = build_road_graph(_write_osm(tmp_path / "grid.osm", nodes, ways), bbox=None)
+    engine = LocalRoutingEngine(graph)
+    profile = engine._profile(VehicleType.CAR)
+    points = [(float(graph.lat[v]), float(graph.lng[v])) for v in profile.snap_nodes]
+    nodes_by_point = {p: v for v, p in zip(profile.snap_nodes, points)}
+    sample = rng.sample(points, 12)
+
+    meters, seconds = engine.travel_matrix(sample, sample)
+    exact = dijkstra(profile.matrix, indices=[nodes_by_point[p] for p in sample])
+
+    for i, origin in enumerate(sample):
+        for j, destination in enumerate(sample):
+            expected = exact[i][nodes_by_point[destination]]
+            assert seconds[i][j] == pytest.approx(expected)
+            route = engine.route(origin, destination)
+            assert route["duration_seconds"] == round(expected)
+            assert route["distance_meters"] == round(meters[i][j])
+
+
+def test_engine_loads_from_configured_path(graph, tmp_path, monkeypatch):
+    monkeypatch.delenv("ROAD_GRAPH_PATH", raising=False)
+    assert get_local_routing_engine() is None
+
+    graph.save(tmp_path / "roads.npz")
+    monkeypatch.setenv("ROAD_GRAPH_PATH", str(tmp_path / "roads.npz"))
+    engine = get_local_routing_engine()
+    assert engine is get_local_routing_engine()
+    assert engine.graph.n_edges == graph.n_edges
+
+
+@pytest.mark.asyncio
+async def test_route_service_uses_local_matrix(graph, monkeypatch):
+    class NoMapsClient:
+        def calculate_distance_matrix(self, *args, **kwargs):
+            raise AssertionError("The local road network should be used")
+
+    monkeypatch.setattr(cloud_route_service, "GoogleMapsClient", NoMapsClient)
+    service = cloud_route_service.CloudRouteOptimizationService(session=None)
+    service.road_network = LocalRoutingEngine(graph)
+    depot = cloud_route_service.VehicleInfo(vehicle_id=1, driver_id=1,
+                                            start_location=Location(address="A", lat=NODES[1][0], lng=NODES[1][1]))
+    node = cloud_route_service.DeliveryNode(
+        delivery_id=1, client_id=1, location=Location(address="C", lat=NODES[3][0], lng=NODES[3][1]),
+        demand={}, service_time=10, time_window=(480, 1020)
+    )
+
+    distance, minutes = await service._calculate_matrices([depot], [node])
+
+    assert distance.shape == (2, 2) and distance[0][0] == 0
+    assert distance[0][1] == 2 and distance[1][0] == 2  # km, by motorway out and the street back
+    assert 0 < minutes[0][1] < minutes[1][0]
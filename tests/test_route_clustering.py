@@ -0,0 +1,99 @@
+"""
+Test cluster-first, route-second decomposition
+Ensures clusters respect the per-driver stop limit, boundary repair only
+shortens the plan, and parallel ordering matches in-process ordering
+"""
+
+import random
+
+import numpy as np
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from services.route_clustering import (
+    ClusterInput, balanced_kmeans, order_clusters, plan_length, project, repair_boundaries, sweep_clusters
+)
+from services.route_optimization_service import DeliveryPoint, RouteOptimizationService
+
+
+def _coords(n, seed=0):
+    rng = random.Random(seed)
+    return [(22.75 + rng.uniform(-0.1, 0.1), 121.15 + rng.uniform(-0.08, 0.08)) for _ in range(n)]
+
+
+def test_balanced_kmeans_respects_capacity():
+    xy = project(_coords(230))
+    labels, centers = balanced_kmeans(xy, n_clusters=10, capacity=25)
+
+    assert len(centers) == 10
+    assert np.bincount(labels, minlength=10).max() <= 25
+    assert np.bincount(labels).sum() == 230
+
+
+def test_sweep_clusters_are_even_sectors():
+    xy = project(_coords(101))
+    labels, centers = sweep_clusters(xy, n_clusters=4)
+
+    assert sorted(np.bincount(labels).tolist()) == [25, 25, 25, 26]
+    assert centers.shape == (4, 2)
+
+
+def test_boundary_repair_moves_misplaced_point():
+    # Two rows of stops 10 km apart; the last stop of route 0 sits on route 1's row
+    xy = np.array([[x, 0.0] for x in range(5)] + [[x, 10.0] for x in range(5)] + [[5.0, 10.0]])
+    routes = [[0, 1, 2, 3, 4, 10], [5, 6, 7, 8, 9]]
+    centers = np.array([[2.0, 0.0], [2.0, 10.0]])
+    before = plan_length(xy, routes)
+
+    moved = repair_boundaries(xy, routes, centers, capacity=6)
+
+    assert moved == 1
+    assert routes == [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9, 10]]
+    assert plan_length(xy, routes) < before
+
+
+def test_boundary_repair_exchanges_when_full():
+    xy = np.array([[0.0, 0.0], [1.0, 0.0], [1.0, 10.0], [0.0, 10.0], [2.0, 10.0], [2.0, 0.0]])
+    routes = [[0, 1, 2], [3, 4, 5]]
+    centers = np.array([[1.0, 0.0], [1.0, 10.0]])
+    before = plan_length(xy, routes)
+
+    moved = repair_boundaries(xy, routes, centers, capacity=3)
+
+    assert moved == 2
+    assert sorted(routes[0]) == [0, 1, 5] and sorted(routes[1]) == [2, 3, 4]
+    assert plan_length(xy, routes) < before
+
+
+def test_parallel_ordering_matches_in_process():
+    xy = project(_coords(60))
+    clusters = [
+        ClusterInput(xy=xy[i:i + 20], priority=[1.0] * 20, availability=[(1 << 1440) - 1] * 20)
+        for i in range(0, 60, 20)
+    ]
+
+    in_process = order_clusters(clusters, max_workers=1)
+    parallel = order_clusters(clusters, max_workers=2)
+
+    assert parallel == in_process
+    assert all(sorted(order) == list(range(20)) for order in in_process)
+
+
+def test_service_clusters_cover_every_point_once():
+    service = RouteOptimizationService(session=None)
+    points = [
+        DeliveryPoint(client_id=i, client_code=f"C{i:04d}", name="", address="", lat=lat, lng=lng,
+                      time_windows=[(8, 12)] if i % 2 else [(13, 18)], priority=i % 5)
+        for i, (lat, lng) in enumerate(_coords(120, seed=1))
+    ]
+
+    routes = service._cluster_deliveries(points, n_routes=10)
+
+    assert len(routes) == 5  # 120 stops / 25 per driver
+    assert max(len(route) for route in routes) <= service.max_stops_per_route
+    assert sorted(p.client_id for route in routes for p in route) == list(range(120))
+    # Each route starts at its highest priority stop
+    assert all(route[0].priority == max(p.priority for p in route) for route in routes)
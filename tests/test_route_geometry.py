@@ -0,0 +1,161 @@
+"""
+Test route geometry store
+Ensures polylines round-trip through the Google encoding, Douglas-Peucker
+levels get coarser as the map zooms out, geometry is traced once per stop
+order and the map endpoint serves the stored, simplified polyline
+"""
+
+import json
+import math
+from datetime import date, datetime
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from api.routers.routes import get_route_map_data
+from api.utils.client_lookup import ClientLookup
+from common.geo_utils import decode_polyline, encode_polyline, simplify_polyline
+from core.database import DatabaseManager
+from models.database_schema import Client, Route, RouteGeometry
+from services import route_geometry
+from services.route_geometry import ZOOM_LEVELS, RouteGeometryStore, polyline_for_zoom
+
+
+def _wiggle(count=400):
+    """A road along a gentle curve with 1 m jitter"""
+    return [
+        (22.75 + 0.0001 * i, 121.15 + 0.01 * math.sin(i / 60) + 1e-5 * (-1) ** i)
+        for i in range(count)
+    ]
+
+
+class FakeMapsClient:
+    def __init__(self, path):
+        self.path = path
+        self.calls = 0
+
+    def calculate_route(self, origin, destination, waypoints=None, optimize_waypoints=True, **kwargs):
+        self.calls += 1
+        return {"overview_polyline": encode_polyline(self.path)}
+
+
+@pytest.fixture
+def db():
+    manager = DatabaseManager("sqlite:///:memory:")
+    manager.initialize()
+    session = manager.get_session()
+    for i in range(1, 4):
+        session.add(Client(id=i, client_code=f"C{i:04d}", invoice_title=f"客戶{i}", address="台東市",
+                           latitude=22.75 + 0.01 * i, longitude=121.15))
+    session.commit()
+    yield session
+    session.close()
+
+
+def _route(client_ids):
+    points = [
+        {"client_id": client_id, "lat": 22.75 + 0.01 * client_id, "lng": 121.15, "sequence": idx + 1,
+         "estimated_arrival": datetime(2025, 7, 1, 9, idx).isoformat()}
+        for idx, client_id in enumerate(client_ids)
+    ]
+    return Route(route_date=date(2025, 7, 1), route_name="r", area="台東市",
+                 route_details=json.dumps({"points": points}))
+
+
+def test_polyline_encoding_and_simplification():
+    # Example from the Google Maps polyline documentation
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(points) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == points
+
+    road = _wiggle()
+    assert simplify_polyline(road[:2], 10) == road[:2]
+    coarse, fine = simplify_polyline(road, 50), simplify_polyline(road, 2)
+    assert coarse[0] == road[0] and coarse[-1] == road[-1]
+    assert len(coarse) < len(fine) < len(road)
+    # Jitter below the tolerance disappears on a straight street
+    street = [(22.75 + 0.0001 * i, 121.15 + 1e-6 * (-1) ** i) for i in range(100)]
+    assert simplify_polyline(street, 1) == [street[0], street[-1]]
+
+
+def test_geometry_is_traced_once_per_stop_order(db):
+    maps = FakeMapsClient(_wiggle())
+    store = RouteGeometryStore(db, maps_client=maps)
+    route = _route([1, 2, 3])
+    db.add(route)
+    db.flush()
+
+    geometry = store.finalize(route)
+    db.commit()
+    assert maps.calls == 1 and geometry.source == "google"
+    assert geometry.point_count == len(_wiggle())
+    sizes = [len(decode_polyline(polyline_for_zoom(geometry, zoom))) for zoom in ZOOM_LEVELS]
+    assert sizes == sorted(sizes) and sizes[0] < geometry.point_count
+    assert polyline_for_zoom(geometry, 18) == geometry.polyline
+
+    # Same stops: nothing is refetched
+    assert store.finalize(route) is geometry and store.get(route) is geometry
+    assert maps.calls == 1
+
+    # New order: traced again, in place
+    route.route_details = _route([3, 1, 2]).route_details
+    store.finalize(route)
+    db.commit()
+    assert maps.calls == 2
+    assert db.query(RouteGeometry).count() == 1
+
+    # Stops rewritten without finalize (older writers): get() catches up
+    route.route_details = _route([2, 3]).route_details
+    db.commit()
+    assert json.loads(store.get(route).stop_sequence) == [2, 3]
+    assert maps.calls == 3
+
+    db.delete(route)
+    db.commit()
+    assert db.query(RouteGeometry).count() == 0
+
+
+def test_geometry_without_routing_services(db):
+    class RoadNetwork:
+        def route(self, origin, destination, vehicle_type):
+            middle = ((origin[0] + destination[0]) / 2, origin[1] + 0.001)
+            return {"path": [origin, middle, destination]}
+
+    route = _route([1, 2])
+    db.add(route)
+    db.flush()
+
+    traced = RouteGeometryStore(db, road_network=RoadNetwork()).finalize(route)
+    assert traced.source == "road_network" and traced.point_count == 7
+
+    straight = RouteGeometryStore(db).finalize(_route([2, 1]))
+    assert straight.source == "straight" and straight.point_count == 4
+
+
+@pytest.mark.asyncio
+async def test_map_endpoint_serves_stored_geometry(db, monkeypatch):
+    maps = FakeMapsClient(_wiggle())
+    monkeypatch.setattr(route_geometry, "get_maps_client", lambda: maps)
+    monkeypatch.setattr(route_geometry, "get_local_routing_engine", lambda: None)
+    route = _route([1, 2, 3])
+    db.add(route)
+    db.commit()
+
+    def fetch(zoom, response_format):
+        return get_route_map_data(route_id=route.id, zoom=zoom, response_format=response_format,
+                                  db=db, lookup=ClientLookup(db))
+
+    full = await fetch(13, "json")
+    assert full.waypoints == [[22.76, 121.15], [22.77, 121.15], [22.78, 121.15]]
+    assert full.polyline == polyline_for_zoom(route.geometry, 13)
+    assert full.markers[0]["position"] == [22.76, 121.15]
+
+    compact = await fetch(10, "encoded")
+    assert maps.calls == 1
+    assert compact.waypoints == [] and [list(p) for p in decode_polyline(compact.waypoints_polyline)] == full.waypoints
+    assert "position" not in compact.markers[0]
+    assert len(compact.polyline) < len(full.polyline) < len(route.geometry.polyline)
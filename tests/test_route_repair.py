@@ -0,0 +1,177 @@
+"""
+Test incremental route repair
+Ensures re-routing repairs the remaining sequence from the GPS position with
+cached matrix rows and slack, matches a full re-evaluation, and only calls
+the maps service when a route is first seen or its sequence changes
+"""
+
+import random
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from common.geo_utils import calculate_haversine_matrix
+from core.database import DatabaseManager
+from integrations.google_maps_client import Location
+from models.database_schema import Client, Delivery, DeliveryStatus, Route
+from services import cloud_route_service
+from services.route_repair import ActiveRoute, active_routes
+
+DEPOT = (22.7553, 121.1504)
+DAY = date(2025, 1, 15)
+
+
+def _route(locations, windows=None, sequence=None):
+    km = calculate_haversine_matrix([DEPOT] + locations) * 1.3
+    minutes = np.rint(km * 2)
+    state = ActiveRoute(
+        route_id=1, depot=DEPOT, delivery_ids=list(range(1, len(locations) + 1)), locations=locations,
+        windows=windows or [(480, 1080)] * len(locations), service_times=[10] * len(locations),
+        distance_matrix=km, time_matrix=minutes
+    )
+    if sequence:
+        state.sequence = sequence
+    return state
+
+
+def _evaluate(state, position, now, sequence):
+    """Lateness and driving minutes of a sequence, computed from scratch"""
+    points = [position] + [tuple(state.points[state.index[d]]) for d in sequence]
+    clock, late, drive, previous = now, 0, 0, None
+    for d in sequence:
+        node = state.index[d]
+        if previous is None:
+            leg = int(np.rint(calculate_haversine_matrix(points[:2])[0][1] * state.minutes_per_km))
+        else:
+            leg = int(state.minutes[previous][node])
+        drive += leg
+        window_start, window_end = state.windows[node]
+        start = max(clock + leg, window_start)
+        late += max(0, start - window_end)
+        clock, previous = start + state.service[node], node
+    return late, drive + int(state.minutes[previous][0])
+
+
+def test_repairs_zigzag_route():
+    locations = [(DEPOT[0] + 0.01 * k, DEPOT[1]) for k in range(1, 9)]
+    state = _route(locations, sequence=[1, 5, 2, 6, 3, 7, 4, 8])
+
+    result = state.repair(DEPOT, 600)
+
+    assert result.changed and result.moves > 0
+    assert result.sequence in ([1, 2, 3, 4, 5, 6, 7, 8], [8, 7, 6, 5, 4, 3, 2, 1])
+    assert result.seconds < 0.05
+    again = state.repair(DEPOT, 600)
+    assert not again.changed and again.moves == 0
+
+
+def test_time_windows_come_first():
+    # Stop 8 is farthest but must be served first
+    locations = [(DEPOT[0] + 0.01 * k, DEPOT[1]) for k in range(1, 9)]
+    windows = [(480, 1080)] * 7 + [(600, 640)]
+    state = _route(locations, windows=windows)
+
+    result = state.repair(DEPOT, 600)
+
+    assert result.late_minutes == 0
+    assert result.sequence.index(8) <= 1
+    assert all(start <= 1080 for start in result.starts)
+
+
+def test_finished_stops_and_improvement_match_full_evaluation():
+    rng = random.Random(11)
+    for _ in range(20):
+        n = rng.randint(3, 14)
+        locations = [(DEPOT[0] + rng.uniform(-0.05, 0.05), DEPOT[1] + rng.uniform(-0.05, 0.05)) for _ in range(n)]
+        windows = []
+        for _ in range(n):
+            start = rng.choice([480, 540, 600, 720])
+            windows.append((start, start + rng.choice([30, 90, 480])))
+        sequence = list(range(1, n + 1))
+        rng.shuffle(sequence)
+        state = _route(locations, windows, sequence)
+        position = (DEPOT[0] + rng.uniform(-0.03, 0.03), DEPOT[1] + rng.uniform(-0.03, 0.03))
+        remaining = sequence[1:]
+
+        result = state.repair(position, 540, remaining=remaining, time_budget=1.0)
+
+        assert sorted(result.sequence) == sorted(remaining)
+        assert _evaluate(state, position, 540, result.sequence) <= _evaluate(state, position, 540, remaining)
+        assert result.late_minutes == _evaluate(state, position, 540, result.sequence)[0]
+
+
+class FakeMapsClient:
+    """Counts calls; stops are 0.05 degrees apart going north, 2 minutes per km"""
+
+    def __init__(self):
+        self.calls = {"geocode": 0, "matrix": 0, "route": 0}
+
+    async def geocode_batch_async(self, addresses):
+        self.calls["geocode"] += 1
+        return [Location(address=a, lat=DEPOT[0] + 0.05 * int(a.split()[-1]), lng=DEPOT[1]) for a in addresses]
+
+    def calculate_distance_matrix(self, origins, destinations, departure_time=None):
+        self.calls["matrix"] += 1
+        km = calculate_haversine_matrix([(o.lat, o.lng) for o in origins] + [(d.lat, d.lng) for d in destinations])
+        km = km[:len(origins), len(origins):]
+        return {"matrix": [
+            [{"distance_meters": int(k * 1000), "duration_in_traffic_seconds": int(k * 120)} for k in row]
+            for row in km
+        ]}
+
+    def calculate_route(self, origin, destination, waypoints=None, optimize_waypoints=True, **kwargs):
+        self.calls["route"] += 1
+        return {"overview_polyline": f"poly{self.calls['route']}"}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(cloud_route_service, "GoogleMapsClient", FakeMapsClient)
+    manager = DatabaseManager("sqlite:///:memory:")
+    manager.initialize()
+    session = manager.get_session()
+    for k in range(1, 6):
+        session.add(Client(id=k, client_code=f"C{k:04d}", invoice_title=f"客戶{k}", address=f"台東市 {k}"))
+        session.add(Delivery(id=k, client_id=k, scheduled_date=DAY, driver_id=1, vehicle_id=1,
+                             route_sequence=k, status=DeliveryStatus.ASSIGNED))
+    session.add(Route(id=7, route_date=DAY, driver_id=1, vehicle_id=1))
+    session.commit()
+    active_routes.clear()
+    yield cloud_route_service.CloudRouteOptimizationService(session)
+    session.close()
+
+
+@pytest.mark.asyncio
+async def test_recalculate_route_uses_cached_state(service):
+    maps = service.maps_client
+    here = Location(address="", lat=DEPOT[0] + 0.02, lng=DEPOT[1])
+    now = datetime(2025, 1, 15, 9, 0)
+
+    first = await service.recalculate_route(7, here, [], now=now)
+    assert first.delivery_sequence == [1, 2, 3, 4, 5]
+    assert maps.calls["geocode"] == 1 and maps.calls["route"] == 1
+    matrix_calls = maps.calls["matrix"]
+
+    # Same plan after finishing a stop: no external calls at all
+    second = await service.recalculate_route(7, here, [1], now=now)
+    assert second.delivery_sequence == [2, 3, 4, 5]
+    assert second.route_polyline == first.route_polyline
+    assert not second.solver_stats["changed"] and second.warnings == []
+    assert maps.calls == {"geocode": 1, "matrix": matrix_calls, "route": 1}
+    assert second.arrival_times[0] > now
+
+    # Driver went the wrong way: repaired locally, only geometry is refetched
+    far = Location(address="", lat=DEPOT[0] + 0.3, lng=DEPOT[1])
+    third = await service.recalculate_route(7, far, [1], now=now)
+    assert third.delivery_sequence == [5, 4, 3, 2]
+    assert third.warnings == ['Route recalculated due to deviation']
+    assert maps.calls == {"geocode": 1, "matrix": matrix_calls, "route": 2}
+
+    assert await service.recalculate_route(7, far, [1, 2, 3, 4, 5], now=now) is None
+    assert active_routes.get(7) is None
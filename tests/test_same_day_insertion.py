@@ -0,0 +1,157 @@
+"""
+Test same-day insertion
+Ensures a day's active routes load with where each driver is now, same-day
+orders are ranked against them without regenerating the day, and applying
+an option renumbers the driver's route and updates its route details
+"""
+
+import json
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from api.routers import scheduling
+from core.database import DatabaseManager, get_db
+from models.database_schema import (
+    Client, Delivery, DeliveryStatus, Driver, Route, Vehicle, VehicleType
+)
+from services import route_geometry
+from services.same_day_insertion import load_day_routes, same_day_candidates
+
+DAY = date(2025, 1, 15)
+OPEN = {f"hour_{h}_{h + 1}": True for h in range(8, 17)}  # 08:00-17:00
+
+
+@pytest.fixture
+def db():
+    manager = DatabaseManager("sqlite:///:memory:")
+    manager.initialize()
+    session = manager.get_session()
+    # Driver 1 heads north, driver 2 heads east
+    for i in range(1, 5):
+        session.add(Client(id=i, client_code=f"C{i:04d}", invoice_title=f"北{i}", address="台東市",
+                           latitude=22.7553 + 0.01 * i, longitude=121.1504, **OPEN))
+        session.add(Client(id=10 + i, client_code=f"C{10 + i:04d}", invoice_title=f"東{i}", address="台東市",
+                           latitude=22.7553, longitude=121.1504 + 0.01 * i, **OPEN))
+    session.add(Client(id=20, client_code="C0020", invoice_title="急單", address="台東市",
+                       latitude=22.7803, longitude=121.1514, needs_same_day_delivery=True, **OPEN))
+    session.add(Client(id=21, client_code="C0021", invoice_title="一般", address="台東市",
+                       latitude=22.7553, longitude=121.1704, **OPEN))
+    session.add_all([
+        Driver(id=1, name="司機甲", employee_id="E1"),
+        Driver(id=2, name="司機乙", employee_id="E2"),
+        Vehicle(id=1, plate_number="AAA-1", vehicle_type=VehicleType.CAR),
+        Vehicle(id=2, plate_number="AAA-2", vehicle_type=VehicleType.CAR),
+    ])
+    statuses = [DeliveryStatus.COMPLETED, DeliveryStatus.IN_PROGRESS, DeliveryStatus.ASSIGNED,
+                DeliveryStatus.ASSIGNED]
+    for k, status in enumerate(statuses):
+        session.add(Delivery(id=1 + k, client_id=1 + k, scheduled_date=DAY, driver_id=1, vehicle_id=1,
+                             route_sequence=k + 1, status=status))
+        session.add(Delivery(id=11 + k, client_id=11 + k, scheduled_date=DAY, driver_id=2, vehicle_id=2,
+                             route_sequence=k + 1, status=DeliveryStatus.ASSIGNED))
+    session.add(Delivery(id=20, client_id=20, scheduled_date=DAY, status=DeliveryStatus.PENDING))
+    session.add(Delivery(id=21, client_id=21, scheduled_date=DAY, status=DeliveryStatus.PENDING))
+    session.add(Route(route_date=DAY, driver_id=1, route_details=json.dumps({"points": [
+        {"client_id": k, "sequence": k} for k in range(1, 5)
+    ]})))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(scheduling.router)
+    app.dependency_overrides[get_db] = lambda: db
+    scheduling._insertion_planners.clear()
+    return TestClient(app)
+
+
+def test_loads_remaining_routes(db):
+    routes = load_day_routes(db, DAY)
+
+    assert [d.id for d in routes.deliveries[1]] == [2, 3, 4]
+    assert [d.id for d in routes.deliveries[2]] == [11, 12, 13, 14]
+    assert routes.start_locations == {1: (pytest.approx(22.7653), pytest.approx(121.1504))}
+    assert routes.locked_stops == {1: 1, 2: 0}
+    assert routes.next_sequence == {1: 2, 2: 1}
+    assert [d.id for d in same_day_candidates(db, DAY)] == [20]
+    assert [d.id for d in same_day_candidates(db, DAY, [21])] == [21]
+
+
+def test_ranks_same_day_orders(client):
+    response = client.post("/scheduling/insertions", json={"schedule_date": str(DAY)})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [d["delivery_id"] for d in body["deliveries"]] == [20]
+    options = body["deliveries"][0]["options"]
+    assert options and options[0]["driver_id"] == 1
+    assert all(o["position"] >= 1 for o in options if o["driver_id"] == 1)  # Not ahead of the stop in progress
+    assert [o["detour_km"] for o in options] == sorted(o["detour_km"] for o in options)
+    assert body["unplaceable"] == []
+
+
+def test_apply_updates_route(client, db, monkeypatch):
+    monkeypatch.setattr(route_geometry, "get_maps_client", lambda: None)
+    ranked = client.post("/scheduling/insertions", json={"schedule_date": str(DAY)}).json()
+    best = ranked["deliveries"][0]["options"][0]
+
+    response = client.post("/scheduling/insertions/apply", json={
+        "schedule_date": str(DAY), "delivery_id": 20, "driver_id": best["driver_id"], "position": best["position"]
+    })
+
+    assert response.status_code == 200
+    order = [2, 3, 4]
+    order.insert(best["position"], 20)
+    assert [stop["delivery_id"] for stop in response.json()["data"]["route"]] == order
+    db.expire_all()
+    delivery = db.get(Delivery, 20)
+    assert (delivery.driver_id, delivery.vehicle_id, delivery.status) == (1, 1, DeliveryStatus.ASSIGNED)
+    assert [d.id for d in db.query(Delivery).filter(Delivery.driver_id == 1).order_by(Delivery.route_sequence)] \
+        == [1] + order
+    points = json.loads(db.query(Route).one().route_details)["points"]
+    assert [p["client_id"] for p in points] == [1] + order
+    assert "estimated_arrival" in points[-1]
+    # The map geometry follows the new stop order
+    geometry = db.query(Route).one().geometry
+    assert json.loads(geometry.stop_sequence) == [p["client_id"] for p in points if p.get("lat")]
+    assert 20 in json.loads(geometry.stop_sequence)
+
+    # The delivery is now routed: nothing left to rank or apply
+    again = client.post("/scheduling/insertions/apply", json={
+        "schedule_date": str(DAY), "delivery_id": 20, "driver_id": 1, "position": 1
+    })
+    assert again.status_code == 404
+
+
+def test_failed_apply_drops_cached_planner(client, db, monkeypatch):
+    ranked = client.post("/scheduling/insertions", json={"schedule_date": str(DAY)}).json()
+    best = ranked["deliveries"][0]["options"][0]
+    apply = {"schedule_date": str(DAY), "delivery_id": 20, "driver_id": best["driver_id"],
+             "position": best["position"]}
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("database unavailable")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(scheduling, "apply_insertion", fail)
+        assert client.post("/scheduling/insertions/apply", json=apply).status_code == 500
+    assert DAY not in scheduling._insertion_planners
+    db.expire_all()
+    assert db.get(Delivery, 20).driver_id is None
+
+    # Nothing was saved, so the same option can still be applied
+    monkeypatch.setattr(route_geometry, "get_maps_client", lambda: None)
+    assert client.post("/scheduling/insertions/apply", json=apply).status_code == 200
+    db.expire_all()
+    assert db.get(Delivery, 20).driver_id == best["driver_id"]
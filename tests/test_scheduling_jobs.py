@@ -0,0 +1,187 @@
+"""
+Test anytime scheduling jobs
+Ensures background scheduling runs report improving incumbents, can be
+stopped early with the best plan so far, and stream progress as SSE
+"""
+
+import json
+import threading
+from datetime import date, datetime
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from api.routers.scheduling import SYNC_TIME_LIMIT_SECONDS, router
+from common.scheduling.engine import SchedulingEngine
+from common.scheduling.models import (
+    DeliveryRequest, DriverAvailability, OptimizationObjective, SchedulingParameters
+)
+from core.database import DatabaseManager
+from services.scheduling_jobs import SchedulingJobRegistry, SharedSchedulingJob, scheduling_jobs
+
+
+def _inputs(count=12):
+    day = datetime(2024, 1, 15)
+    requests = [
+        DeliveryRequest(
+            delivery_id=i + 1,
+            client_id=100 + i,
+            location=(22.75 + i * 0.005, 121.15 + (i % 4) * 0.005),
+            time_windows=[(day.replace(hour=8), day.replace(hour=17))],
+            service_duration=20,
+            cylinder_type="20kg",
+            quantity=1
+        )
+        for i in range(count)
+    ]
+    drivers = [
+        DriverAvailability(driver_id=d + 1, employee_id=f"E{d}", name=f"司機{d}",
+                           available_hours=[(day.replace(hour=8), day.replace(hour=18))])
+        for d in range(3)
+    ]
+    parameters = SchedulingParameters(
+        date=date(2024, 1, 15),
+        optimization_objectives=[OptimizationObjective.MINIMIZE_DISTANCE],
+        max_iterations=100000,
+        time_limit_seconds=30
+    )
+    return requests, drivers, parameters
+
+
+def _run_engine(release=None):
+    requests, drivers, parameters = _inputs()
+
+    def run(job):
+        if release is not None:
+            release.wait(5)
+        result = SchedulingEngine().generate_schedule(
+            requests, drivers, [], parameters, algorithm="simulated_annealing",
+            progress_callback=job.on_progress
+        )
+        return {"scheduled": len(result.schedule), "stopped_early": result.metrics["stopped_early"],
+                "first_start": result.schedule[0].time_slot.start_time}
+    return run
+
+
+def test_engine_reports_datetime_incumbents():
+    requests, drivers, parameters = _inputs()
+    parameters.max_iterations = 500
+    reports = []
+
+    result = SchedulingEngine().generate_schedule(
+        requests, drivers, [], parameters, algorithm="simulated_annealing",
+        progress_callback=reports.append
+    )
+
+    assert reports and reports[0].improved
+    assert all(isinstance(e.time_slot.start_time, datetime) for e in reports[-1].schedule)
+    assert [r.best_score for r in reports] == sorted(r.best_score for r in reports)
+    assert reports[-1].scheduled + reports[-1].unscheduled == len(requests)
+    assert result.metrics["stopped_early"] is False
+
+
+def test_stop_request_ends_job_with_best_plan():
+    registry = SchedulingJobRegistry()
+    job = registry.start(_run_engine())
+
+    job.wait_for_change(0, timeout=5)  # first progress report
+    job.stop_requested.set()
+    while not job.done:
+        job.wait_for_change(job.version, timeout=5)
+
+    assert job.status == "completed"
+    assert job.response["stopped_early"] is True
+    assert job.response["scheduled"] > 0
+    assert job.progress["scheduled"] == job.response["scheduled"]
+    assert registry.get(job.job_id) is job
+
+
+def test_job_endpoints_poll_stream_and_stop():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+
+    release = threading.Event()
+    job = scheduling_jobs.start(_run_engine(release))
+
+    polled = client.get(f"/api/scheduling/jobs/{job.job_id}").json()
+    assert polled["status"] == "running" and polled["progress"] is None
+
+    release.set()
+    job.wait_for_change(0, timeout=5)
+    assert client.post(f"/api/scheduling/jobs/{job.job_id}/stop").json()["stop_requested"] is True
+
+    with client.stream("GET", f"/api/scheduling/jobs/{job.job_id}/events") as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = [block for block in body.split("\n\n") if block.startswith("event:")]
+    assert events[-1].startswith("event: done")
+    done = json.loads(events[-1].split("data: ", 1)[1])
+    assert done["status"] == "completed"
+    assert done["result"]["stopped_early"] is True
+    assert done["result"]["first_start"].startswith("2024-01-15T")
+
+    assert client.get("/api/scheduling/jobs/missing").status_code == 404
+
+
+def test_jobs_are_shared_between_workers():
+    db = DatabaseManager("sqlite:///:memory:")
+    db.initialize()
+    started_by = SchedulingJobRegistry(session_factory=db.get_session)
+    other_worker = SchedulingJobRegistry(session_factory=db.get_session)
+
+    release = threading.Event()
+    job = started_by.start(_run_engine(release))
+
+    shared = other_worker.get(job.job_id)
+    assert isinstance(shared, SharedSchedulingJob)
+    assert shared.to_dict()["status"] == "running"
+
+    release.set()
+    job.wait_for_change(0, timeout=5)
+    shared.request_stop()
+    while not job.done:
+        job.wait_for_change(job.version, timeout=5)
+    assert job.response["stopped_early"] is True
+
+    polled = other_worker.get(job.job_id)
+    while not polled.done:
+        polled.wait_for_change(polled.version, timeout=5)
+    assert polled.to_dict()["result"]["stopped_early"] is True
+    assert polled.to_dict()["result"]["first_start"].startswith("2024-01-15T")
+    assert other_worker.get("missing") is None
+    db.close()
+
+
+def test_stop_is_rejected_for_portfolio_jobs():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+
+    assert SchedulingEngine().supports_early_stop("portfolio") is False
+    assert SchedulingEngine().supports_early_stop("simulated_annealing") is True
+
+    release = threading.Event()
+    job = scheduling_jobs.start(lambda job: release.wait(5) and {}, stoppable=False)
+    response = client.post(f"/api/scheduling/jobs/{job.job_id}/stop")
+    release.set()
+
+    assert response.status_code == 409
+    assert job.stop_requested.is_set() is False
+
+
+def test_generate_keeps_within_the_worker_timeout():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    client = TestClient(app)
+
+    response = client.post("/api/scheduling/generate",
+                           json={"schedule_date": "2024-01-15", "time_limit_seconds": SYNC_TIME_LIMIT_SECONDS + 1})
+    assert response.status_code == 400
+    assert "/api/scheduling/jobs" in response.json()["detail"]
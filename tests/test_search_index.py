@@ -0,0 +1,106 @@
+"""
+Test client/driver keyword search index
+Ensures CJK fragments, prefix lookup and write synchronisation work on SQLite FTS5
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from core.database import DatabaseManager
+from models.database_schema import Client, Driver
+from services.search_service import search_index, segment_text, build_match_expression
+
+
+@pytest.fixture
+def db():
+    manager = DatabaseManager("sqlite:///:memory:")
+    manager.initialize()
+    session = manager.get_session()
+    session.add_all([
+        Client(client_code="C1001", invoice_title="幸福早餐店", name="幸福早餐店",
+               address="台東市中興路二段100號", contact_person="王小明"),
+        Client(client_code="C1002", invoice_title="海岸民宿", name="海岸民宿",
+               address="台東縣卑南鄉杉原88號", contact_person="李大華"),
+        Client(client_code="B2001", invoice_title="知本溫泉會館", name="知本溫泉會館",
+               address="台東縣卑南鄉溫泉村龍泉路1號"),
+        Driver(name="陳志明", employee_id="D001", phone="0912-345-678"),
+        Driver(name="林建宏", employee_id="D002", phone="0922-111-222"),
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+
+def _client_codes(db, keyword):
+    return sorted(
+        c.client_code for c in db.query(Client).filter(search_index.filter_clause(db, Client, keyword))
+    )
+
+
+def test_segment_text_emits_cjk_bigrams():
+    tokens = segment_text("台東市 A12")
+    assert "台東" in tokens
+    assert "東市" in tokens
+    assert "台" in tokens
+    assert "a12" in tokens
+
+
+def test_match_expression_prefix_and_bigrams():
+    assert build_match_expression("中興路") == '"中興" AND "興路"'
+    assert build_match_expression("C10") == '"c10"*'
+    assert build_match_expression("  ") is None
+
+
+def test_cjk_fragment_search(db):
+    assert _client_codes(db, "中興路") == ["C1001"]
+    assert _client_codes(db, "卑南") == ["B2001", "C1002"]
+    assert _client_codes(db, "溫泉") == ["B2001"]
+
+
+def test_prefix_search(db):
+    assert _client_codes(db, "c10") == ["C1001", "C1002"]
+
+
+def test_code_fragment_search(db):
+    assert _client_codes(db, "1001") == ["C1001"]
+    assert _client_codes(db, "001") == ["B2001", "C1001"]
+    assert [row_id for row_id, _ in search_index.rank(db, Client, "1001")] == [
+        db.query(Client).filter_by(client_code="C1001").one().id
+    ]
+
+
+def test_driver_phone_without_separators(db):
+    drivers = db.query(Driver).filter(search_index.filter_clause(db, Driver, "0912345")).all()
+    assert [d.name for d in drivers] == ["陳志明"]
+    for keyword in ("0912-345", "(0922) 111"):
+        drivers = db.query(Driver).filter(search_index.filter_clause(db, Driver, keyword)).all()
+        assert len(drivers) == 1
+    assert build_match_expression("0912-345") == '"0912345"*'
+
+
+def test_index_follows_updates_and_deletes(db):
+    client = db.query(Client).filter_by(client_code="C1002").one()
+    client.address = "台東縣成功鎮港邊路5號"
+    db.commit()
+
+    assert _client_codes(db, "卑南") == ["B2001"]
+    assert _client_codes(db, "成功") == ["C1002"]
+
+    db.delete(client)
+    db.commit()
+    assert _client_codes(db, "成功") == []
+
+
+def test_rank_prefers_name_match(db):
+    db.add(Client(client_code="C1003", invoice_title="中興加油站", name="中興加油站",
+                  address="台東市更生路1號"))
+    db.commit()
+
+    ranked = search_index.rank(db, Client, "中興", limit=5)
+    top = db.get(Client, ranked[0][0])
+    assert top.client_code == "C1003"
+    assert len(ranked) == 2
@@ -0,0 +1,148 @@
+"""
+Test travel profile learning
+Ensures observed legs come from consecutive completed deliveries of one
+driver on one day, breaks are skipped, and refreshed profiles are saved
+and swapped in for planning
+"""
+
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent / "src" / "main" / "python"))
+
+from common.time_utils import calculate_service_time
+from core.database import DatabaseManager
+from models.database_schema import Client, Delivery, DeliveryStatus
+from services.travel_profiles import (
+    TravelProfileStore, acquire_refresh_lock, build_travel_profile, load_travel_observations,
+    refresh_nightly, seconds_until, travel_profiles
+)
+
+DAY = date(2025, 7, 14)
+SERVICE = calculate_service_time("20kg", 1, "residential")
+
+
+def _at(hour, minute=0):
+    return datetime.combine(DAY, datetime.min.time()).replace(hour=hour, minute=minute)
+
+
+@pytest.fixture
+def db():
+    manager = DatabaseManager("sqlite:///:memory:")
+    manager.initialize()
+    session = manager.get_session()
+    for i in range(1, 6):
+        session.add(Client(id=i, client_code=f"C{i:04d}", invoice_title=f"客戶{i}", address="台東市",
+                           latitude=22.75 + 0.02 * i, longitude=121.15))
+    session.add(Client(id=6, client_code="C0006", invoice_title="客戶6", address="台東市"))
+    deliveries = [
+        # Driver 1: two legs, then a lunch break, then a leg
+        (1, 1, _at(8, 10), None),
+        (1, 2, _at(8, 30), None),
+        (1, 3, _at(8, 55), 20),
+        (1, 4, _at(12, 40), 20),  # Lunch: far beyond 3 x 20 + 30 minutes
+        (1, 5, _at(13, 5), None),
+        # Driver 2: the client without coordinates breaks the chain
+        (2, 1, _at(9, 0), None),
+        (2, 6, _at(9, 20), None),
+        (2, 2, _at(9, 45), None),
+    ]
+    for driver_id, client_id, delivered_at, planned in deliveries:
+        session.add(Delivery(client_id=client_id, scheduled_date=DAY, driver_id=driver_id,
+                             status=DeliveryStatus.COMPLETED, actual_delivery_time=delivered_at,
+                             estimated_duration_minutes=planned))
+    # Not completed
+    session.add(Delivery(client_id=5, scheduled_date=DAY, driver_id=1, status=DeliveryStatus.PENDING,
+                         actual_delivery_time=_at(13, 30)))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_loads_legs_between_consecutive_deliveries(db):
+    observations = load_travel_observations(db, DAY, DAY)
+
+    legs = [(o.origin[0], o.destination[0], o.departure, o.minutes) for o in observations]
+    assert legs == [
+        (pytest.approx(22.77), pytest.approx(22.79), 8 * 60 + 10, 20 - SERVICE),
+        (pytest.approx(22.79), pytest.approx(22.81), 8 * 60 + 30, 25 - SERVICE),
+        (pytest.approx(22.83), pytest.approx(22.85), 12 * 60 + 40, 25 - SERVICE),
+    ]
+    assert load_travel_observations(db, DAY + timedelta(days=1), DAY + timedelta(days=7)) == []
+
+
+def test_refresh_saves_and_swaps_profile(db, tmp_path):
+    store = TravelProfileStore()
+    path = tmp_path / "profiles" / "travel_profile.npz"
+    assert store.current() is None
+    assert store.load(path) is None
+
+    profile = store.refresh(db, path, history_days=7, today=DAY + timedelta(days=1))
+
+    assert store.current() is profile and store.version == 1
+    assert path.exists() and not list(path.parent.glob("*.tmp.npz"))
+    zone = profile.zones([(22.77, 121.15)])[0]
+    assert int(profile.samples[zone, :, 8].sum()) == 2
+
+    other = TravelProfileStore()
+    loaded = other.load(path)
+    assert other.version == 1
+    assert (loaded.speeds == profile.speeds).all()
+
+    # Today's deliveries are not history yet
+    assert int(build_travel_profile(db, today=DAY).samples.sum()) == 0
+    store.clear()
+    assert store.current() is None and store.version == 2
+
+
+def test_refresh_writes_its_own_temporary_file(db, tmp_path):
+    path = tmp_path / "travel_profile.npz"
+    # Another worker's save in progress
+    busy = tmp_path / "travel_profile.tmp.npz"
+    busy.write_bytes(b"partial")
+
+    TravelProfileStore().refresh(db, path, history_days=7, today=DAY + timedelta(days=1))
+
+    assert busy.read_bytes() == b"partial"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["travel_profile.npz", "travel_profile.tmp.npz"]
+
+
+def test_only_one_worker_holds_the_refresh_lock(tmp_path):
+    path = tmp_path / "travel_profile.npz"
+    leader = acquire_refresh_lock(path)
+    assert leader is not None
+    assert acquire_refresh_lock(path) is None
+    leader.close()
+    follower = acquire_refresh_lock(path)
+    assert follower is not None
+    follower.close()
+
+
+@pytest.mark.asyncio
+async def test_follower_reloads_the_leaders_profile(db, tmp_path):
+    path = tmp_path / "travel_profile.npz"
+    leader = acquire_refresh_lock(path)
+    follower = asyncio.create_task(refresh_nightly(lambda: db, path, poll_seconds=0.01))
+    try:
+        await asyncio.sleep(0.05)  # follower is polling
+        profile = TravelProfileStore().refresh(db, path, history_days=7, today=DAY + timedelta(days=1))
+        for _ in range(200):
+            if travel_profiles.current() is not None:
+                break
+            await asyncio.sleep(0.01)
+        assert (travel_profiles.current().speeds == profile.speeds).all()
+    finally:
+        follower.cancel()
+        leader.close()
+        travel_profiles.clear()
+
+
+def test_seconds_until():
+    now = datetime(2025, 7, 14, 1, 30)
+    assert seconds_until(2, now) == 30 * 60
+    assert seconds_until(1, now) == 23.5 * 3600